@@ -1,14 +1,40 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from app.core.auth import get_admin_user
 from .frame_routes import router as frame_router
 from .user_routes import router as user_router
+from .upload_routes import router as upload_router
+from .ingest_routes import router as ingest_router
+from app.service.extraction_executor import extraction_executor
+from app.service.result_cache_service import cache_stats
+from app.service.job_control_service import job_control_stats
+from app.service.scratch_space_service import scratch_space
+from app.service.job_queue import job_queue
+from app.service.job_scheduler import job_scheduler
 
 router = APIRouter()
 
 # Inclui todas as rotas dos módulos
 router.include_router(frame_router)
 router.include_router(user_router)
+router.include_router(upload_router)
+router.include_router(ingest_router)
 
 # Rota de Health Check
 @router.get("/health_check")
 async def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+# Rota de métricas do processamento (fila, utilização dos workers, índice de resultados,
+# jobs interrompidos, ocupação do espaço de trabalho, profundidade da fila de jobs e
+# decisões e esperas do agendador). Restrita a administradores: traz usuários e ids de jobs
+# Função síncrona: a fila consulta o SQS/SQLite e o espaço de trabalho o disco, fora do event loop
+@router.get("/metrics", dependencies=[Depends(get_admin_user)])
+def metrics():
+    return {
+        "extraction": extraction_executor.stats(),
+        "result_cache": cache_stats(),
+        "jobs": job_control_stats(),
+        "scratch": scratch_space.stats(),
+        "queue": job_queue.stats(),
+        "scheduler": job_scheduler.stats(),
+    }
@@ -1,33 +1,148 @@
-from fastapi import APIRouter, UploadFile, Form, Depends, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
-from app.service.frame_processor_service import process_video
-from app.service.s3_service import list_user_frame_archives, delete_s3_file
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.service.job_service import (
+    submit_video_job, wait_for_job_or_disconnect, cancel_job, get_job, list_user_jobs, load_job_results
+)
+from app.service.s3_service import delete_s3_file
+from app.service.archive_service import list_frame_archives, ARCHIVE_SORT_FIELDS
+from app.core.config import settings
+from app.service.job_progress_service import job_event_stream
 from app.core.auth import get_current_user
+from app.api.submission_limits import SubmissionLimitedRoute, enforce_submission_limits
+from app.domain.job_model import JobStatus
 from app.domain.process_video_model import ProcessVideoInput
+from app.exceptions.queue_full_error import QueueFullError
 
-router = APIRouter()
+# Os limites de envio são aplicados antes da leitura do upload
+router = APIRouter(route_class=SubmissionLimitedRoute)
 
-@router.post("/process-video")
+@router.post("/process-video", dependencies=[Depends(enforce_submission_limits)])
 async def process_video_route(
-    background_tasks: BackgroundTasks,
+    request: Request,
+    wait: bool = False,
     process_input: ProcessVideoInput = Depends(ProcessVideoInput.as_form),
     current_user: dict = Depends(get_current_user),
 ):
     try:
         username = current_user.get("sub", "anonymous")
-        s3_url = process_video(process_input.file, process_input.interval, username, background_tasks)
+        # Salva o upload e agenda a extração sem bloquear o event loop
+        job = await run_in_threadpool(submit_video_job, process_input, username, current_user.get("role"))
+
+        if not wait:
+            return JSONResponse(
+                content={
+                    "message": "Vídeo recebido e enviado para processamento.",
+                    "job_id": job["job_id"],
+                    "status": job["status"],
+                    "status_url": f"/api/jobs/{job['job_id']}",
+                    "planned_frames": job.get("planned_frames"),
+                    "estimated_seconds": job.get("estimated_seconds"),
+                },
+                status_code=202,
+            )
+
+        # Modo síncrono: aguarda o término do job, cancelando-o se o cliente desconectar
+        job = await wait_for_job_or_disconnect(job["job_id"], request.is_disconnected)
+        if job["status"] != JobStatus.DONE.value:
+            status_code = 504 if job["status"] == JobStatus.TIMED_OUT.value else 500
+            raise HTTPException(status_code=status_code, detail=job.get("error") or "Erro durante o processamento")
+        job = await run_in_threadpool(load_job_results, job)
         return JSONResponse(
-            content={"message": "Arquivo processado e salvo com sucesso!", "file_url": s3_url},
+            content={
+                "message": "Arquivo processado e salvo com sucesso!",
+                "file_url": job["file_url"],
+                "job_id": job["job_id"],
+                "extraction_mode": job["extraction_mode"],
+                "frame_timestamps": job["frame_timestamps"],
+                "output_files": job.get("output_files"),
+                "cache_hit": job.get("cache_hit", False),
+            },
             status_code=200,
         )
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
-    
+
+@router.get("/jobs/{job_id}")
+async def get_job_route(job_id: str, current_user: dict = Depends(get_current_user)):
+    job = await run_in_threadpool(get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+
+    # Verificar se o job pertence ao usuário logado
+    if job["username"] != current_user.get("sub"):
+        raise HTTPException(status_code=403, detail="Acesso negado")
+
+    # Timestamps que não couberam no registro do job são lidos do S3
+    job = await run_in_threadpool(load_job_results, job)
+    return JSONResponse(content=job, status_code=200)
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job_route(job_id: str, current_user: dict = Depends(get_current_user)):
+    job = await run_in_threadpool(get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+
+    # Verificar se o job pertence ao usuário logado
+    if job["username"] != current_user.get("sub"):
+        raise HTTPException(status_code=403, detail="Acesso negado")
+
+    job = await run_in_threadpool(cancel_job, job_id)
+    return JSONResponse(
+        content={
+            "message": "Cancelamento solicitado.",
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "status_url": f"/api/jobs/{job['job_id']}",
+        },
+        status_code=202,
+    )
+
+@router.get("/jobs/{job_id}/events")
+async def job_events_route(job_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    job = await run_in_threadpool(get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+
+    # Verificar se o job pertence ao usuário logado
+    if job["username"] != current_user.get("sub"):
+        raise HTTPException(status_code=403, detail="Acesso negado")
+
+    # Sem suporte a SSE no cliente, GET /jobs/{job_id} traz o mesmo progresso
+    return StreamingResponse(
+        job_event_stream(job_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/{username}/jobs")
+async def list_jobs_route(username: str, current_user: dict = Depends(get_current_user)):
+    # Verificar se o usuário logado tem permissão para acessar essa rota
+    if username != current_user.get("sub"):
+        raise HTTPException(status_code=403, detail="Acesso negado")
+
+    try:
+        jobs = await run_in_threadpool(list_user_jobs, username)
+        return JSONResponse(content={"jobs": jobs}, status_code=200)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
 @router.get("/{username}/list-frame-archives")
 async def list_frame_archives_route(
     username: str,
+    limit: int = Query(settings.ARCHIVE_LIST_DEFAULT_LIMIT, ge=1, le=settings.ARCHIVE_LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    sort: Literal[ARCHIVE_SORT_FIELDS] = "key",
+    order: Literal["asc", "desc"] = "asc",
+    source: Optional[str] = None,
+    modified_after: Optional[datetime] = None,
+    modified_before: Optional[datetime] = None,
     current_user: dict = Depends(get_current_user)
 ):
     # Verificar se o usuário logado tem permissão para acessar essa rota
@@ -35,9 +150,12 @@ async def list_frame_archives_route(
         raise HTTPException(status_code=403, detail="Acesso negado")
 
     try:
-        frame_archives = list_user_frame_archives(username)
+        # Uma página por chamada: 'next_cursor' busca a seguinte
+        frame_archives = await run_in_threadpool(
+            list_frame_archives, username, limit, cursor, sort, order, source, modified_after, modified_before
+        )
         return JSONResponse(
-            content={"archives": frame_archives},
+            content=frame_archives,
             status_code=200,
         )
     except HTTPException as e:
@@ -51,12 +169,12 @@ async def delete_frame_archive(username: str, filename: str, current_user: dict
     logged_username = current_user.get("sub")
     if logged_username != username:
         raise HTTPException(status_code=403, detail="Acesso negado: você só pode excluir seus próprios arquivos.")
-    
+
     try:
         # Chama o serviço para deletar o arquivo
-        delete_s3_file(f"{username}/{filename}")
+        await run_in_threadpool(delete_s3_file, f"{username}/{filename}")
         return {"message": f"Arquivo '{filename}' removido com sucesso!"}
     except HTTPException as e:
         raise e
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao tentar remover o arquivo: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro ao tentar remover o arquivo: {str(e)}")
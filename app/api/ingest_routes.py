@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, Form, HTTPException
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from app.core.auth import get_current_user
+from app.api.submission_limits import (
+    SubmissionLimitedRoute, enforce_submission_limits, enforce_job_quota
+)
+from app.domain.ingest_model import CreateIngestInput, CompleteIngestInput, AbortIngestInput
+from app.domain.process_video_model import ProcessVideoInput
+from app.exceptions.queue_full_error import QueueFullError
+from app.service.ingest_service import create_ingest, complete_ingest, abort_ingest, submit_ingested_video_job
+
+router = APIRouter(route_class=SubmissionLimitedRoute)
+
+@router.post("/ingests", dependencies=[Depends(enforce_job_quota)])
+async def create_ingest_route(ingest: CreateIngestInput, current_user: dict = Depends(get_current_user)):
+    username = current_user.get("sub", "anonymous")
+    upload = await run_in_threadpool(create_ingest, username, ingest.filename, ingest.size)
+    return JSONResponse(content=upload, status_code=201)
+
+@router.post("/ingests/complete")
+async def complete_ingest_route(ingest: CompleteIngestInput, current_user: dict = Depends(get_current_user)):
+    parts = [part.model_dump() for part in ingest.parts]
+    result = await run_in_threadpool(complete_ingest, current_user.get("sub"), ingest.key, ingest.upload_id, parts)
+    return JSONResponse(content=result, status_code=200)
+
+@router.post("/ingests/abort")
+async def abort_ingest_route(ingest: AbortIngestInput, current_user: dict = Depends(get_current_user)):
+    await run_in_threadpool(abort_ingest, current_user.get("sub"), ingest.key, ingest.upload_id)
+    return {"message": "Upload cancelado."}
+
+@router.post("/ingests/process", dependencies=[Depends(enforce_submission_limits)])
+async def process_ingest_route(
+    key: str = Form(...),
+    process_input: ProcessVideoInput = Depends(ProcessVideoInput.parameters_as_form),
+    current_user: dict = Depends(get_current_user),
+):
+    try:
+        job = await run_in_threadpool(
+            submit_ingested_video_job, process_input, current_user.get("sub"), key, current_user.get("role")
+        )
+        return JSONResponse(
+            content={
+                "message": "Vídeo enviado para processamento.",
+                "job_id": job["job_id"],
+                "status": job["status"],
+                "status_url": f"/api/jobs/{job['job_id']}",
+                "planned_frames": job.get("planned_frames"),
+                "estimated_seconds": job.get("estimated_seconds"),
+            },
+            status_code=202,
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
@@ -0,0 +1,58 @@
+from fastapi import Request
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from app.core.jwt import verify_access_token
+from app.service.rate_limit_service import check_submission
+
+async def _enforce(request: Request, take_token: bool):
+    if getattr(request.state, "submission_limits_checked", False):
+        return
+    request.state.submission_limits_checked = True
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    payload = verify_access_token(token) if scheme.lower() == "bearer" and token else None
+    if payload is None:
+        return
+    await run_in_threadpool(check_submission, payload.get("sub"), payload.get("role"), take_token)
+
+async def enforce_submission_limits(request: Request):
+    """
+    Dependência das rotas que criam um job: aplica o rate limit e a cota de
+    jobs simultâneos do usuário do token. Sem token válido não faz nada; a
+    autenticação (get_current_user) responde 401.
+    """
+    await _enforce(request, take_token=True)
+
+async def enforce_job_quota(request: Request):
+    """
+    Dependência das rotas que preparam um envio em etapas (criação de /uploads
+    e de /ingests): só a cota de jobs simultâneos. A ficha do rate limit é
+    cobrada uma vez por job, no finalize ou no /process.
+    """
+    await _enforce(request, take_token=False)
+
+# Dependências que a SubmissionLimitedRoute executa antes da leitura do corpo
+SUBMISSION_DEPENDENCIES = (enforce_submission_limits, enforce_job_quota)
+
+class SubmissionLimitedRoute(APIRoute):
+    """
+    O FastAPI lê o corpo (o multipart inteiro, com o vídeo) antes de resolver as
+    dependências. Nas rotas que declaram enforce_submission_limits (ou
+    enforce_job_quota), esta classe a executa antes, para que um envio recusado
+    não custe o upload.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        limits = next(
+            (dependency.dependency for dependency in self.dependencies
+             if dependency.dependency in SUBMISSION_DEPENDENCIES),
+            None,
+        )
+        if limits is None:
+            return handler
+
+        async def limited_handler(request: Request):
+            await limits(request)
+            return await handler(request)
+
+        return limited_handler
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from app.core.auth import get_current_user
+from app.api.submission_limits import (
+    SubmissionLimitedRoute, enforce_submission_limits, enforce_job_quota
+)
+from app.domain.process_video_model import ProcessVideoInput
+from app.domain.upload_session_model import CreateUploadInput
+from app.exceptions.queue_full_error import QueueFullError
+from app.service.upload_session_service import (
+    create_upload_session, describe_upload_session, append_upload_chunk, finalize_upload_session
+)
+
+router = APIRouter(route_class=SubmissionLimitedRoute)
+
+@router.post("/uploads", dependencies=[Depends(enforce_job_quota)])
+async def create_upload_route(upload: CreateUploadInput, current_user: dict = Depends(get_current_user)):
+    username = current_user.get("sub", "anonymous")
+    session = await run_in_threadpool(create_upload_session, username, upload.filename, upload.size)
+    return JSONResponse(
+        content={**session, "upload_url": f"/api/uploads/{session['upload_id']}"},
+        status_code=201,
+        headers={"Upload-Offset": "0"},
+    )
+
+@router.get("/uploads/{upload_id}")
+async def get_upload_route(upload_id: str, current_user: dict = Depends(get_current_user)):
+    session = await run_in_threadpool(describe_upload_session, upload_id, current_user.get("sub"))
+    return JSONResponse(content=session, status_code=200, headers={"Upload-Offset": str(session["offset"])})
+
+@router.patch("/uploads/{upload_id}")
+async def append_upload_route(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    current_user: dict = Depends(get_current_user),
+):
+    # O corpo é lido em blocos, sem carregar a parte inteira em memória
+    result = await append_upload_chunk(upload_id, current_user.get("sub"), upload_offset, request.stream())
+    return JSONResponse(content=result, status_code=200, headers={"Upload-Offset": str(result["offset"])})
+
+@router.post("/uploads/{upload_id}/finalize", dependencies=[Depends(enforce_submission_limits)])
+async def finalize_upload_route(
+    upload_id: str,
+    process_input: ProcessVideoInput = Depends(ProcessVideoInput.parameters_as_form),
+    current_user: dict = Depends(get_current_user),
+):
+    try:
+        job = await run_in_threadpool(
+            finalize_upload_session, upload_id, current_user.get("sub"), process_input, current_user.get("role")
+        )
+        return JSONResponse(
+            content={
+                "message": "Vídeo recebido e enviado para processamento.",
+                "job_id": job["job_id"],
+                "status": job["status"],
+                "status_url": f"/api/jobs/{job['job_id']}",
+                "planned_frames": job.get("planned_frames"),
+                "estimated_seconds": job.get("estimated_seconds"),
+            },
+            status_code=202,
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -15,10 +16,83 @@ class Settings(BaseSettings):
     AWS_DEFAULT_REGION: str
     AWS_S3_PUBLIC_URL: str
     AWS_SES_ENDPOINT: str
+    AWS_SQS_ENDPOINT: Optional[str] = None  # None = endpoint padrão da AWS
+    AWS_MAX_POOL_CONNECTIONS: int = 50  # conexões mantidas por cliente (uploads em paralelo de vários jobs)
+    AWS_RETRY_MODE: str = "standard"  # legacy, standard ou adaptive
+    AWS_MAX_ATTEMPTS: int = 5  # tentativas por chamada, incluindo a primeira
+    AWS_CONNECT_TIMEOUT: float = 5.0  # (s)
+    AWS_READ_TIMEOUT: float = 60.0  # (s)
     FRONTEND_URL: str
     FERNET_KEY: str
     ADMIN_PASSWORD: str
 
+    # Configurações de processamento
+    EXTRACTION_WORKERS: Optional[int] = None  # None = calculado pela cota de CPU do container
+    EXTRACTION_QUEUE_SIZE: int = 4
+    EXTRACTION_RETRY_AFTER: int = 30
+    SCHEDULER_ROLE_WEIGHTS: dict = {"user_level_1": 1.0, "administrator": 4.0}  # peso de cada role no fair queuing
+    SCHEDULER_SMALL_JOB_COST: float = 200.0  # custo (frames × megapixels) até o qual o job conta como pequeno nas métricas
+    SCHEDULER_HISTORY_SIZE: int = 500  # esperas recentes usadas nos percentis do agendador
+    RATE_LIMIT_BACKEND: str = "memory"  # memory (limites por réplica) ou dynamodb (compartilhados entre réplicas)
+    RATE_LIMITS: dict = {  # por role: envios por minuto, rajada (fichas do bucket) e jobs simultâneos
+        "user_level_1": {"requests_per_minute": 30, "burst": 10, "max_concurrent_jobs": 5},
+        "administrator": {"requests_per_minute": 120, "burst": 40, "max_concurrent_jobs": 20},
+    }
+    RATE_LIMIT_USER_OVERRIDES: dict = {}  # limites de usuários específicos, sobre os da role
+    MAX_UPLOAD_SIZE: int = 1 * 1024 * 1024 * 1024  # 1GB em bytes
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1MB por bloco
+    MAX_RESUMABLE_UPLOAD_SIZE: int = 10 * 1024 * 1024 * 1024  # 10GB no upload em partes
+    UPLOAD_SESSION_TTL_HOURS: int = 24
+    UPLOAD_WRITE_LEASE_SECONDS: int = 120  # uma gravação parada por mais tempo libera o upload para outra requisição
+    STORAGE_SWEEP_INTERVAL: int = 3600  # limpeza das sessões de upload expiradas e dos envios abandonados no S3 (s)
+    INGEST_UPLOAD_URL_EXPIRATION: int = 3600  # validade das URLs de envio direto ao S3 (s)
+    INGEST_READ_URL_EXPIRATION: int = 6 * 3600  # validade da URL lida pelo ffmpeg durante o job (s)
+    INGEST_SINGLE_PUT_MAX_SIZE: int = 100 * 1024 * 1024  # acima disso o envio direto usa multipart
+    INGEST_DELETE_AFTER_PROCESSING: bool = True  # remove o vídeo de {username}/incoming/ ao final do job
+    INGEST_RETENTION_HOURS: int = 48  # envios em {username}/incoming/ mais antigos são removidos pela limpeza
+    KEYFRAME_PROBE_SECONDS: int = 30  # janela lida para estimar o GOP
+    SEEK_MIN_GOP_RATIO: float = 2.0  # intervalo mínimo (em GOPs) para usar o modo seek
+    SEEK_BATCH_SIZE: int = 8
+    SEEK_PARALLELISM: int = 2
+    MAX_TIMESTAMPS: int = 1000
+    DEDUPE_THRESHOLD: float = 0.02  # diferença média mínima (0 a 1) para manter um frame no modo dedupe
+    SCENE_THRESHOLD: float = 0.3  # score de mudança de cena (0 a 1) do modo scene
+    SEGMENT_MIN_DURATION: int = 600  # vídeos a partir de 10 minutos são divididos em segmentos
+    SEGMENT_PARALLELISM: Optional[int] = None  # ffmpeg simultâneos por job; None = núcleos por worker de extração
+    EXTRACTION_ENGINE: str = "ffmpeg"  # ffmpeg (processo externo) ou pyav (decodificação em processo)
+    PYAV_BATCH_SIZE: int = 16  # frames por lote de arrays na engine pyav
+    PYAV_THREADS: Optional[int] = None  # threads do decodificador por job na engine pyav; None = núcleos por worker de extração
+    PROGRESS_MIN_INTERVAL: float = 1.0  # intervalo mínimo entre atualizações de progresso do job (s)
+    PROGRESS_KEEPALIVE_SECONDS: int = 15  # comentário enviado no stream de eventos sem novidades (s)
+    JOB_TIMEOUT_SECONDS: Optional[int] = 3600  # tempo máximo de execução de um job (None = sem limite)
+    JOB_CPU_TIME_LIMIT_SECONDS: Optional[int] = 4 * 3600  # CPU máxima de um job, somando os processos do ffmpeg (não se aplica à engine pyav)
+    JOB_INLINE_RESULTS_MAX_BYTES: int = 64 * 1024  # acima disso os timestamps do job vão para o S3 (item do DynamoDB: até 400KB)
+    JOB_WATCHDOG_INTERVAL: float = 1.0  # intervalo de verificação dos limites do job (s)
+    JOB_LEASE_SECONDS: int = 60  # validade do lease de um job; sem heartbeat, outro worker o retoma
+    JOB_HEARTBEAT_INTERVAL: float = 15.0  # intervalo de renovação dos leases e de busca por jobs abandonados (s)
+    JOB_MAX_ATTEMPTS: int = 3  # tentativas de um job antes de falhar (retomadas após queda do worker)
+    JOB_QUEUE_BACKEND: str = "memory"  # memory (workers no processo da API), sqlite ou sqs (workers em python -m app.worker)
+    JOB_QUEUE_NAME: str = "extraction-jobs"  # nome da fila no SQS
+    JOB_QUEUE_SQLITE_PATH: Optional[str] = None  # None = arquivo no diretório temporário do sistema
+    JOB_QUEUE_VISIBILITY_TIMEOUT: int = 300  # mensagem não confirmada volta para a fila após esse tempo (s)
+    JOB_QUEUE_WAIT_SECONDS: int = 20  # long polling dos workers na fila (s)
+    JOB_QUEUE_MAX_DEPTH: Optional[int] = 1000  # com fila compartilhada, acima disso a API responde 429 (None = sem limite)
+    SYNC_DISCONNECT_POLL_INTERVAL: float = 1.0  # verificação de desconexão do cliente no modo síncrono (s)
+    SCRATCH_ROOT: Optional[str] = None  # espaço de trabalho dos jobs (tmpfs ou PVC); None = diretório temporário do sistema
+    SCRATCH_CAPACITY_BYTES: Optional[int] = None  # None = tamanho do sistema de arquivos de SCRATCH_ROOT
+    SCRATCH_HIGH_WATER_RATIO: float = 0.85  # fração da capacidade que as reservas dos jobs podem ocupar
+    FRAME_PIPELINE: bool = True  # frames enviados por pipe direto para o .zip
+    S3_MULTIPART_PART_SIZE: int = 8 * 1024 * 1024  # 8MB por parte (mínimo do S3: 5MB)
+    S3_UPLOAD_CONCURRENCY: int = 4  # partes enviadas em paralelo por arquivo
+    DECODE_PIXELS_PER_SECOND: int = 150_000_000  # vazão de referência da estimativa de custo
+    MAX_OUTPUT_SPECS: int = 8  # saídas geradas a partir de uma única decodificação
+    THUMBNAIL_WIDTH: int = 320  # largura padrão das miniaturas em folhas de contato e sprites
+    ARCHIVE_LIST_DEFAULT_LIMIT: int = 50  # arquivos por página na listagem de .zip
+    ARCHIVE_LIST_MAX_LIMIT: int = 1000  # maior 'limit' aceito (máximo de uma chamada ao S3)
+    ARCHIVE_LIST_BATCH_SIZE: int = 200  # arquivos lidos por vez quando há filtros
+    ARCHIVE_LIST_MAX_SCAN: int = 2000  # arquivos examinados por chamada com filtros seletivos
+    RESULT_CACHE_ENABLED: bool = True  # reaproveita arquivos de vídeos e parâmetros já processados
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,57 @@
+import os
+
+def _read_file(path: str) -> str:
+    with open(path) as f:
+        return f.read().strip()
+
+def get_cgroup_cpu_limit():
+    """
+    Retorna o limite de CPU do container (em núcleos) definido pelo cgroup,
+    ou None quando não há limite configurado.
+    """
+    # cgroup v2: "<quota> <period>" ou "max <period>"
+    try:
+        quota, period = _read_file("/sys/fs/cgroup/cpu.max").split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    # cgroup v1
+    try:
+        quota = int(_read_file("/sys/fs/cgroup/cpu/cpu.cfs_quota_us"))
+        period = int(_read_file("/sys/fs/cgroup/cpu/cpu.cfs_period_us"))
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+def get_available_cpus() -> float:
+    """
+    Quantidade de CPUs disponível para o processo, considerando afinidade e cgroup.
+    """
+    try:
+        cpus = float(len(os.sched_getaffinity(0)))
+    except AttributeError:
+        cpus = float(os.cpu_count() or 1)
+
+    limit = get_cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, limit)
+    return cpus
+
+def get_default_worker_count() -> int:
+    """
+    Número de workers de extração: um por núcleo inteiro disponível (mínimo 1).
+    """
+    return max(1, int(get_available_cpus()))
+
+def get_cpus_per_worker(workers: int) -> int:
+    """
+    Núcleos de cada worker de extração: as CPUs disponíveis divididas entre os
+    'workers' jobs simultâneos (mínimo 1).
+    """
+    return max(1, int(get_available_cpus() / max(1, workers)))
@@ -0,0 +1,19 @@
+from typing import List
+from pydantic import BaseModel, Field
+
+class CreateIngestInput(BaseModel):
+    filename: str
+    size: int = Field(..., gt=0)
+
+class IngestPart(BaseModel):
+    part_number: int = Field(..., ge=1)
+    etag: str
+
+class CompleteIngestInput(BaseModel):
+    key: str
+    upload_id: str
+    parts: List[IngestPart] = Field(..., min_length=1)
+
+class AbortIngestInput(BaseModel):
+    key: str
+    upload_id: str
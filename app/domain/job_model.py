@@ -0,0 +1,59 @@
+import uuid
+from datetime import datetime, timezone
+from enum import Enum
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from app.domain.process_video_model import OutputOptions, OutputSpec
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    TIMED_OUT = "timed_out"
+
+# Status em que o job não muda mais
+FINAL_JOB_STATUSES = (JobStatus.DONE.value, JobStatus.FAILED.value, JobStatus.CANCELLED.value, JobStatus.TIMED_OUT.value)
+
+class Job(BaseModel):
+    job_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    username: str
+    role: Optional[str] = None  # role do usuário no envio, que define o peso no agendador
+    filename: str
+    interval: Optional[int] = None
+    mode: str = "auto"
+    timestamps: Optional[List[float]] = None
+    output: OutputOptions = Field(default_factory=OutputOptions)
+    outputs: Optional[List[OutputSpec]] = None
+    combine_outputs: bool = False
+    threshold: Optional[float] = None
+    file_size: Optional[int] = None
+    video_sha256: Optional[str] = None
+    source_key: Optional[str] = None  # vídeo enviado direto ao S3 (lido por URL pré-assinada)
+    probe: Optional[dict] = None
+    planned_frames: Optional[int] = None
+    estimated_seconds: Optional[float] = None
+    scratch_bytes: Optional[int] = None  # volume previsto dos frames, reservado no espaço de trabalho
+    cost: Optional[float] = None  # custo relativo no agendador (duração × resolução ÷ intervalo)
+    queue_wait_seconds: Optional[float] = None  # espera entre o envio e o início da execução
+    status: JobStatus = Field(default=JobStatus.QUEUED)
+    progress: Optional[dict] = None  # frames, out_time, speed e percent, atualizado durante a execução
+    file_url: Optional[str] = None
+    extraction_mode: Optional[str] = None
+    frame_timestamps: Optional[List[float]] = None
+    output_files: Optional[List[dict]] = None
+    frame_count: Optional[int] = None  # frames extraídos (somando as saídas)
+    results_key: Optional[str] = None  # JSON no S3 com os timestamps, quando não cabem no registro do job
+    cache_hit: bool = False
+    error: Optional[str] = None
+    attempts: int = 0  # execuções iniciadas (inclusive retomadas por outro worker)
+    worker_id: Optional[str] = None  # worker que detém o lease do job
+    lease_expires_at: Optional[int] = None  # epoch (s); renovado pelo heartbeat do worker
+    cancel_requested: bool = False  # cancelamento pedido a partir de outro processo
+    notified: bool = False  # e-mail com o link já enviado
+    created_at: str = Field(default_factory=_now_iso)
+    updated_at: str = Field(default_factory=_now_iso)
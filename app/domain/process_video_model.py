@@ -1,11 +1,56 @@
+import json
 from pydantic import BaseModel, ValidationError
 from fastapi import UploadFile, File, Form
-from typing import Annotated
+from typing import Annotated, List, Optional
 from fastapi.exceptions import HTTPException
+from app.core.config import settings
+
+def _format_size(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:g}{unit}"
+        size /= 1024
+    return f"{size:g}GB"
+
+def file_too_large_error(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=422,
+        detail=f"O tamanho do arquivo excede o limite permitido de {_format_size(max_size)}."
+    )
+
+EXTRACTION_MODES = {"auto", "select", "seek", "keyframes", "dedupe", "scene"}
+# Modos que descartam frames parecidos e usam o limiar 'threshold'
+SIMILARITY_MODES = {"dedupe", "scene"}
+OUTPUT_FORMATS = {"jpg", "webp", "png"}
+
+class OutputOptions(BaseModel):
+    """Codificação dos frames gerados."""
+    format: str = "jpg"
+    max_width: Optional[int] = None
+    max_height: Optional[int] = None
+    quality: Optional[int] = None  # 1 (menor arquivo) a 100 (melhor qualidade)
+    grayscale: bool = False
+    target_frame_bytes: Optional[int] = None  # escolhe a qualidade pelo tamanho desejado
+
+OUTPUT_KINDS = {"frames", "contact_sheet", "sprite"}
+
+class OutputSpec(OutputOptions):
+    """Uma das saídas geradas a partir de uma única decodificação do vídeo."""
+    name: str
+    interval: int
+    kind: str = "frames"  # frames, contact_sheet (folha de contato) ou sprite
+    columns: int = 5
+    rows: int = 5
 
 class ProcessVideoInput(BaseModel):
-    file: Annotated[UploadFile, File()]
-    interval: Annotated[int, Form(..., description="Intervalo entre frames")]
+    file: Annotated[Optional[UploadFile], File()] = None
+    interval: Annotated[Optional[int], Form(description="Intervalo entre frames")] = None
+    mode: Annotated[str, Form(description="Estratégia de extração")] = "auto"
+    timestamps: Optional[List[float]] = None
+    output: OutputOptions = OutputOptions()
+    outputs: Optional[List[OutputSpec]] = None
+    combine_outputs: bool = False
+    threshold: Optional[float] = None
 
     @classmethod
     def validate_interval_value(cls, interval: int):
@@ -14,34 +59,263 @@ class ProcessVideoInput(BaseModel):
         return interval
 
     @classmethod
-    def validate_file_extension(cls, file: UploadFile):
+    def validate_mode(cls, mode: str):
+        if mode not in EXTRACTION_MODES:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Modo de extração inválido. Use: {', '.join(sorted(EXTRACTION_MODES))}."
+            )
+        return mode
+
+    @classmethod
+    def parse_timestamps(cls, timestamps: str) -> List[float]:
+        """
+        Converte a lista de timestamps enviada no formulário ("0, 12.5, 60")
+        em uma lista ordenada e sem repetições.
+        """
+        try:
+            values = [float(value) for value in timestamps.split(",") if value.strip()]
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Timestamps devem ser números separados por vírgula.")
+        if not values:
+            raise HTTPException(status_code=422, detail="A lista de timestamps está vazia.")
+        if any(value < 0 for value in values):
+            raise HTTPException(status_code=422, detail="Os timestamps não podem ser negativos.")
+        if len(values) > settings.MAX_TIMESTAMPS:
+            raise HTTPException(
+                status_code=422,
+                detail=f"A lista de timestamps excede o limite de {settings.MAX_TIMESTAMPS} itens."
+            )
+        return sorted(set(values))
+
+    @classmethod
+    def validate_output_options(cls, output: OutputOptions):
+        if output.format not in OUTPUT_FORMATS:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Formato de saída inválido. Use: {', '.join(sorted(OUTPUT_FORMATS))}."
+            )
+        for name in ("max_width", "max_height", "target_frame_bytes"):
+            value = getattr(output, name)
+            if value is not None and value <= 0:
+                raise HTTPException(status_code=422, detail=f"O campo {name} deve ser maior que 0")
+        if output.quality is not None and not 1 <= output.quality <= 100:
+            raise HTTPException(status_code=422, detail="A qualidade deve estar entre 1 e 100")
+        if output.target_frame_bytes is not None:
+            if output.quality is not None:
+                raise HTTPException(
+                    status_code=422,
+                    detail="Informe a qualidade ou o tamanho desejado por frame, não ambos."
+                )
+            if output.format == "png":
+                raise HTTPException(
+                    status_code=422,
+                    detail="O tamanho desejado por frame não se aplica ao formato PNG (sem perdas)."
+                )
+        return output
+
+    @classmethod
+    def validate_threshold(cls, threshold: Optional[float], mode: str) -> Optional[float]:
+        """
+        Limiar dos modos dedupe (diferença mínima em relação ao último frame mantido)
+        e scene (score de mudança de cena do ffmpeg), entre 0 e 1.
+        """
+        if mode not in SIMILARITY_MODES:
+            if threshold is not None:
+                raise HTTPException(status_code=422, detail="O limiar só se aplica aos modos dedupe e scene.")
+            return None
+        if threshold is None:
+            return settings.DEDUPE_THRESHOLD if mode == "dedupe" else settings.SCENE_THRESHOLD
+        if not 0 < threshold <= 1:
+            raise HTTPException(status_code=422, detail="O limiar deve estar entre 0 e 1.")
+        return threshold
+
+    @classmethod
+    def parse_output_specs(cls, outputs: str, interval: Optional[int]) -> List[OutputSpec]:
+        """
+        Converte a lista de saídas enviada no formulário (JSON), por exemplo
+        [{"interval": 1, "max_width": 320}, {"interval": 10}, {"kind": "sprite", "interval": 5}].
+        O intervalo de cada saída é, por padrão, o intervalo do formulário.
+        """
+        try:
+            items = json.loads(outputs)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="A lista de saídas deve ser um JSON válido.")
+        if not isinstance(items, list) or not items or not all(isinstance(item, dict) for item in items):
+            raise HTTPException(status_code=422, detail="A lista de saídas deve ser uma lista de objetos.")
+        if len(items) > settings.MAX_OUTPUT_SPECS:
+            raise HTTPException(
+                status_code=422,
+                detail=f"A lista de saídas excede o limite de {settings.MAX_OUTPUT_SPECS} itens."
+            )
+
+        specs = []
+        for index, item in enumerate(items, start=1):
+            item = {"name": f"output_{index}", "interval": interval, **item}
+            if item["interval"] is None:
+                raise HTTPException(status_code=422, detail=f"Informe o intervalo da saída {item['name']}.")
+            try:
+                spec = OutputSpec(**item)
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+            cls.validate_interval_value(spec.interval)
+            cls.validate_output_options(spec)
+            if spec.kind not in OUTPUT_KINDS:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Tipo de saída inválido. Use: {', '.join(sorted(OUTPUT_KINDS))}."
+                )
+            if not (1 <= spec.columns <= 20 and 1 <= spec.rows <= 20):
+                raise HTTPException(status_code=422, detail="A grade deve ter entre 1 e 20 colunas e linhas.")
+            specs.append(spec)
+
+        names = [spec.name for spec in specs]
+        if len(set(names)) != len(names):
+            raise HTTPException(status_code=422, detail="Os nomes das saídas devem ser únicos.")
+        return specs
+
+    @classmethod
+    def validate_filename(cls, filename: str):
         allowed_extensions = {".mp4", ".mov", ".avi"}
-        filename = file.filename.lower()
-        if not any(filename.endswith(ext) for ext in allowed_extensions):
+        if not any(filename.lower().endswith(ext) for ext in allowed_extensions):
             raise HTTPException(
                 status_code=422,
                 detail="Formato de arquivo não suportado. Use MP4, MOV ou AVI."
             )
+        return filename
+
+    @classmethod
+    def validate_file_extension(cls, file: UploadFile):
+        cls.validate_filename(file.filename)
         return file
 
     @classmethod
     def validate_file_size(cls, file: UploadFile):
-        max_size = 1 * 1024 * 1024 * 1024  # 1GB em bytes
+        # O tamanho informado pelo cliente pode não existir; o limite também é
+        # verificado enquanto os bytes são copiados (save_upload)
+        max_size = settings.MAX_UPLOAD_SIZE
         file_size = file.size
-        if file_size > max_size:
+        if file_size is not None and file_size > max_size:
+            raise file_too_large_error(max_size)
+        return file
+
+    @classmethod
+    def parse_parameters(
+        cls,
+        interval: Optional[int] = None,
+        mode: str = "auto",
+        timestamps: Optional[str] = None,
+        output_format: str = "jpg",
+        max_width: Optional[int] = None,
+        max_height: Optional[int] = None,
+        quality: Optional[int] = None,
+        grayscale: bool = False,
+        target_frame_bytes: Optional[int] = None,
+        outputs: Optional[str] = None,
+        combine_outputs: bool = False,
+        threshold: Optional[float] = None,
+    ) -> dict:
+        """Valida os parâmetros de extração enviados no formulário."""
+        if outputs:
+            if timestamps:
+                raise HTTPException(
+                    status_code=422,
+                    detail="A lista de saídas não pode ser combinada com a lista de timestamps."
+                )
+            if mode not in ("auto", "select"):
+                raise HTTPException(
+                    status_code=422,
+                    detail="Com múltiplas saídas o vídeo é decodificado uma única vez (modo select)."
+                )
+        elif mode in SIMILARITY_MODES and timestamps:
             raise HTTPException(
                 status_code=422,
-                detail="O tamanho do arquivo excede o limite permitido de 1GB."
+                detail=f"O modo {mode} não pode ser combinado com a lista de timestamps."
             )
-        return file
+        elif interval is None and not timestamps and mode != "scene":
+            raise HTTPException(
+                status_code=422,
+                detail="Informe o intervalo entre frames ou a lista de timestamps."
+            )
+        if interval is not None:
+            cls.validate_interval_value(interval)
+        cls.validate_mode(mode)
+        parsed_timestamps = cls.parse_timestamps(timestamps) if timestamps else None
+        output = cls.validate_output_options(OutputOptions(
+            format=output_format.lower(),
+            max_width=max_width,
+            max_height=max_height,
+            quality=quality,
+            grayscale=grayscale,
+            target_frame_bytes=target_frame_bytes,
+        ))
+        output_specs = cls.parse_output_specs(outputs, interval) if outputs else None
+        threshold = cls.validate_threshold(threshold, mode)
+
+        return {
+            "interval": interval,
+            "mode": mode,
+            "timestamps": parsed_timestamps,
+            "output": output,
+            "outputs": output_specs,
+            "combine_outputs": combine_outputs,
+            "threshold": threshold,
+        }
 
     @classmethod
-    def as_form(cls, file: UploadFile = File(...), interval: int = Form(...)):
+    def as_form(
+        cls,
+        file: UploadFile = File(...),
+        interval: Annotated[Optional[int], Form()] = None,
+        mode: Annotated[str, Form()] = "auto",
+        timestamps: Annotated[Optional[str], Form()] = None,
+        output_format: Annotated[str, Form()] = "jpg",
+        max_width: Annotated[Optional[int], Form()] = None,
+        max_height: Annotated[Optional[int], Form()] = None,
+        quality: Annotated[Optional[int], Form()] = None,
+        grayscale: Annotated[bool, Form()] = False,
+        target_frame_bytes: Annotated[Optional[int], Form()] = None,
+        outputs: Annotated[Optional[str], Form()] = None,
+        combine_outputs: Annotated[bool, Form()] = False,
+        threshold: Annotated[Optional[float], Form()] = None,
+    ):
         try:
             cls.validate_file_extension(file)
-            cls.validate_interval_value(interval)
+            params = cls.parse_parameters(
+                interval, mode, timestamps, output_format, max_width, max_height,
+                quality, grayscale, target_frame_bytes, outputs, combine_outputs, threshold,
+            )
             cls.validate_file_size(file)
 
-            return cls(file=file, interval=interval)
+            return cls(file=file, **params)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors())
+
+    @classmethod
+    def parameters_as_form(
+        cls,
+        interval: Annotated[Optional[int], Form()] = None,
+        mode: Annotated[str, Form()] = "auto",
+        timestamps: Annotated[Optional[str], Form()] = None,
+        output_format: Annotated[str, Form()] = "jpg",
+        max_width: Annotated[Optional[int], Form()] = None,
+        max_height: Annotated[Optional[int], Form()] = None,
+        quality: Annotated[Optional[int], Form()] = None,
+        grayscale: Annotated[bool, Form()] = False,
+        target_frame_bytes: Annotated[Optional[int], Form()] = None,
+        outputs: Annotated[Optional[str], Form()] = None,
+        combine_outputs: Annotated[bool, Form()] = False,
+        threshold: Annotated[Optional[float], Form()] = None,
+    ):
+        """
+        Parâmetros de extração sem o arquivo, para vídeos enviados por outro
+        caminho (upload em partes ou direto para o S3).
+        """
+        try:
+            params = cls.parse_parameters(
+                interval, mode, timestamps, output_format, max_width, max_height,
+                quality, grayscale, target_frame_bytes, outputs, combine_outputs, threshold,
+            )
+            return cls(file=None, **params)
         except ValidationError as e:
-            raise HTTPException(status_code=422, detail=e.errors())
\ No newline at end of file
+            raise HTTPException(status_code=422, detail=e.errors())
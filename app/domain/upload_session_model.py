@@ -0,0 +1,42 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from app.core.config import settings
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _expires_at() -> int:
+    # Epoch em segundos, usado como TTL pelo DynamoDB
+    return int((datetime.now(timezone.utc) + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)).timestamp())
+
+class UploadSessionStatus(str, Enum):
+    OPEN = "open"
+    COMPLETED = "completed"
+
+class CreateUploadInput(BaseModel):
+    filename: str
+    size: int = Field(..., gt=0)
+
+class UploadSession(BaseModel):
+    upload_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    username: str
+    filename: str
+    size: int
+    offset: int = 0
+    # Os bytes ficam no S3: partes de 'part_size' no multipart upload de 's3_key'
+    # e o restante (menor que uma parte) no objeto 'tail_key'
+    s3_key: str
+    multipart_upload_id: str
+    part_size: int
+    part_etags: List[str] = Field(default_factory=list)
+    tail_key: Optional[str] = None
+    # Requisição que está gravando no upload e validade do seu lease (epoch em segundos)
+    writer: Optional[str] = None
+    writer_expires_at: Optional[int] = None
+    status: UploadSessionStatus = Field(default=UploadSessionStatus.OPEN)
+    job_id: Optional[str] = None
+    created_at: str = Field(default_factory=_now_iso)
+    expires_at: int = Field(default_factory=_expires_at)
@@ -0,0 +1,8 @@
+class JobCancelledError(Exception):
+    """
+    Exceção levantada quando um job é interrompido: cancelamento pelo usuário
+    (ou desconexão do cliente no modo síncrono) ou limite de tempo/CPU excedido.
+    """
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
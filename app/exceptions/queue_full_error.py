@@ -0,0 +1,7 @@
+class QueueFullError(Exception):
+    """
+    Exceção levantada quando a fila de extração atingiu a capacidade máxima.
+    """
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
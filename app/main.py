@@ -2,16 +2,44 @@ from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from app.api.application_routes import router as api_router
 from app.repository.dynamodb_repository import create_users_table, create_admin_user
+from app.repository.job_repository import create_jobs_table
+from app.repository.result_cache_repository import create_results_table
+from app.repository.upload_session_repository import create_upload_sessions_table
+from app.repository.rate_limit_repository import create_rate_limits_table
 from app.repository.s3_repository import create_s3_bucket
 from app.repository.email_ses_repository import verify_ses_email_identity 
+from app.service.extraction_engine import get_extraction_engine
+from app.service.scratch_space_service import scratch_space
+from app.service.job_lease_service import job_leases
+from app.service.job_service import recover_expired_jobs, local_worker
+from app.service.job_queue import job_queue
+from app.service.storage_sweeper import storage_sweeper
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Falha na inicialização se a engine configurada não estiver disponível
+    get_extraction_engine()
+    # Diretórios de jobs interrompidos por uma queda anterior do processo
+    scratch_space.sweep_orphans()
     create_users_table()
+    create_jobs_table()
+    create_results_table()
+    create_upload_sessions_table()
+    create_rate_limits_table()
     create_admin_user()
     create_s3_bucket()
     verify_ses_email_identity()
+    # Com a fila compartilhada a API só publica os jobs; a extração fica com python -m app.worker
+    if not job_queue.shared:
+        # Heartbeat dos leases deste worker e retomada dos jobs de workers perdidos
+        job_leases.start(on_tick=recover_expired_jobs)
+        local_worker.start()
+    # Sessões de upload expiradas e envios abandonados em {username}/incoming/
+    storage_sweeper.start()
     yield
+    storage_sweeper.stop()
+    local_worker.stop()
+    job_leases.stop()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -0,0 +1,47 @@
+import threading
+import boto3
+from botocore.config import Config
+from app.core.config import settings
+
+# Clientes compartilhados pelo processo, um por serviço e endpoint
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client_config() -> Config:
+    """
+    Pool de conexões, retentativas e timeouts dos clientes AWS.
+    """
+    return Config(
+        max_pool_connections=settings.AWS_MAX_POOL_CONNECTIONS,
+        retries={"mode": settings.AWS_RETRY_MODE, "max_attempts": settings.AWS_MAX_ATTEMPTS},
+        connect_timeout=settings.AWS_CONNECT_TIMEOUT,
+        read_timeout=settings.AWS_READ_TIMEOUT,
+    )
+
+def get_shared_client(service_name: str, endpoint_url: str = None):
+    """
+    Retorna o cliente do serviço, criado no primeiro uso e reaproveitado a
+    seguir: criar um cliente carrega os modelos do serviço e abre um novo pool
+    de conexões, sem reaproveitar as conexões TLS. Os clientes do boto3 podem
+    ser usados por várias threads; só a criação precisa do lock.
+    """
+    key = (service_name, endpoint_url)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = boto3.client(
+                    service_name,
+                    endpoint_url=endpoint_url,
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_DEFAULT_REGION,
+                    config=get_client_config(),
+                )
+    return client
+
+def clear_shared_clients():
+    """Descarta os clientes criados (novas credenciais ou configurações)."""
+    with _clients_lock:
+        _clients.clear()
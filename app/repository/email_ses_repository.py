@@ -1,18 +1,12 @@
-import boto3
 from botocore.exceptions import ClientError
 from app.core.config import settings
+from app.repository.aws_client_repository import get_shared_client
 
 def get_email_ses_client():
     """
-    Inicializa e retorna o cliente SES configurado.
+    Retorna o cliente SES configurado, compartilhado pelo processo.
     """
-    return boto3.client(
-        "ses",
-        endpoint_url=settings.AWS_SES_ENDPOINT,
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        region_name=settings.AWS_DEFAULT_REGION
-    )
+    return get_shared_client("ses", settings.AWS_SES_ENDPOINT)
 
 def verify_ses_email_identity():
     """
@@ -0,0 +1,319 @@
+import json
+import time
+from decimal import Decimal
+from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Key
+from app.domain.job_model import Job, JobStatus
+from app.repository.dynamodb_repository import dynamodb
+
+JOBS_TABLE = 'jobs'
+USERNAME_INDEX = 'username-created_at-index'
+LEASE_INDEX = 'lease_group-lease_expires_at-index'
+
+# Índice esparso: só os jobs com lease (na fila ou em execução) têm 'lease_group'
+ACTIVE_LEASE_GROUP = 'active'
+
+# Campos estruturados gravados como JSON (floats não são aceitos pelo DynamoDB)
+_JSON_FIELDS = ("timestamps", "output", "outputs", "probe", "progress", "frame_timestamps", "output_files")
+
+# Função para criar a tabela de jobs
+def create_jobs_table():
+    try:
+        # Verificar se a tabela existe antes de tentar criar
+        existing_tables = dynamodb.tables.all()
+        if JOBS_TABLE in [table.name for table in existing_tables]:
+            print(f"Tabela '{JOBS_TABLE}' já existe.")
+            return
+
+        # O índice por usuário, ordenado pela criação, atende ao histórico de jobs;
+        # o índice de leases localiza os jobs abandonados sem varrer a tabela
+        dynamodb.create_table(
+            TableName=JOBS_TABLE,
+            KeySchema=[
+                {
+                    'AttributeName': 'job_id',
+                    'KeyType': 'HASH'
+                }
+            ],
+            AttributeDefinitions=[
+                {
+                    'AttributeName': 'job_id',
+                    'AttributeType': 'S'
+                },
+                {
+                    'AttributeName': 'username',
+                    'AttributeType': 'S'
+                },
+                {
+                    'AttributeName': 'created_at',
+                    'AttributeType': 'S'
+                },
+                {
+                    'AttributeName': 'lease_group',
+                    'AttributeType': 'S'
+                },
+                {
+                    'AttributeName': 'lease_expires_at',
+                    'AttributeType': 'N'
+                }
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    'IndexName': USERNAME_INDEX,
+                    'KeySchema': [
+                        {
+                            'AttributeName': 'username',
+                            'KeyType': 'HASH'
+                        },
+                        {
+                            'AttributeName': 'created_at',
+                            'KeyType': 'RANGE'
+                        }
+                    ],
+                    'Projection': {
+                        'ProjectionType': 'ALL'
+                    },
+                    'ProvisionedThroughput': {
+                        'ReadCapacityUnits': 5,
+                        'WriteCapacityUnits': 5
+                    }
+                },
+                {
+                    'IndexName': LEASE_INDEX,
+                    'KeySchema': [
+                        {
+                            'AttributeName': 'lease_group',
+                            'KeyType': 'HASH'
+                        },
+                        {
+                            'AttributeName': 'lease_expires_at',
+                            'KeyType': 'RANGE'
+                        }
+                    ],
+                    'Projection': {
+                        'ProjectionType': 'KEYS_ONLY'
+                    },
+                    'ProvisionedThroughput': {
+                        'ReadCapacityUnits': 5,
+                        'WriteCapacityUnits': 5
+                    }
+                }
+            ],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+        print(f"Tabela '{JOBS_TABLE}' criada com sucesso.")
+    except ClientError as e:
+        print(f"Erro ao criar tabela: {e}")
+        if 'ResourceInUseException' in str(e):
+            print("Tabela já existe, ignorando a criação.")
+
+def get_jobs_table():
+    table = dynamodb.Table(JOBS_TABLE)
+    return table
+
+def _to_attribute(name: str, value):
+    if name in _JSON_FIELDS:
+        return json.dumps(value)
+    if isinstance(value, float):
+        return Decimal(str(value))
+    return value
+
+def _from_number(value):
+    # O DynamoDB devolve números como Decimal
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+def _to_job(item):
+    if item is None:
+        return None
+    fields = {
+        name: json.loads(value) if name in _JSON_FIELDS and isinstance(value, str) else _from_number(value)
+        for name, value in item.items()
+    }
+    # Preenche os campos ausentes (None não é gravado) com os valores padrão
+    return Job(**fields).model_dump(mode="json")
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def add_job(job: Job):
+    item = {name: _to_attribute(name, value) for name, value in job.model_dump(mode="json").items() if value is not None}
+    if 'lease_expires_at' in item:
+        item['lease_group'] = ACTIVE_LEASE_GROUP
+    table = get_jobs_table()
+    table.put_item(Item=item)
+
+def get_job_by_id(job_id: str):
+    table = get_jobs_table()
+    response = table.get_item(Key={'job_id': job_id}, ConsistentRead=True)
+    return _to_job(response.get('Item'))
+
+def get_jobs_by_ids(job_ids: list) -> dict:
+    """
+    Lê vários jobs de uma vez (BatchGetItem, até 100 chaves por chamada).
+    Retorna um dicionário job_id -> job só com os jobs encontrados.
+    """
+    jobs = {}
+    job_ids = list(dict.fromkeys(job_ids))
+    for start in range(0, len(job_ids), 100):
+        request = {JOBS_TABLE: {'Keys': [{'job_id': job_id} for job_id in job_ids[start:start + 100]]}}
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response.get('Responses', {}).get(JOBS_TABLE, []):
+                job = _to_job(item)
+                jobs[job['job_id']] = job
+            # Chaves não processadas por limite de capacidade são pedidas de novo
+            request = response.get('UnprocessedKeys') or None
+    return jobs
+
+def get_jobs_by_username(username: str) -> list:
+    table = get_jobs_table()
+    query = {
+        'IndexName': USERNAME_INDEX,
+        'KeyConditionExpression': Key('username').eq(username),
+        'ScanIndexForward': False,
+    }
+    jobs = []
+    while True:
+        response = table.query(**query)
+        jobs.extend(_to_job(item) for item in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return jobs
+        query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def _update(job_id: str, changes: dict, condition: str = None, names: dict = None, values: dict = None,
+            add: dict = None):
+    """
+    Monta e executa o update_item: campos com None são removidos. Retorna o job
+    atualizado ou None se o job não existe ou a condição falhou.
+    """
+    names = dict(names or {})
+    values = dict(values or {})
+    set_parts, remove_parts, add_parts = [], [], []
+    for index, (name, value) in enumerate({**changes, 'updated_at': _now_iso()}.items()):
+        names[f'#f{index}'] = name
+        if value is None:
+            remove_parts.append(f'#f{index}')
+        else:
+            values[f':v{index}'] = _to_attribute(name, value)
+            set_parts.append(f'#f{index} = :v{index}')
+    for index, (name, value) in enumerate((add or {}).items()):
+        names[f'#a{index}'] = name
+        values[f':a{index}'] = value
+        add_parts.append(f'#a{index} :a{index}')
+
+    expression = 'SET ' + ', '.join(set_parts)
+    if remove_parts:
+        expression += ' REMOVE ' + ', '.join(remove_parts)
+    if add_parts:
+        expression += ' ADD ' + ', '.join(add_parts)
+
+    table = get_jobs_table()
+    try:
+        response = table.update_item(
+            Key={'job_id': job_id},
+            UpdateExpression=expression,
+            ConditionExpression='attribute_exists(job_id)' + (f' AND ({condition})' if condition else ''),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues='ALL_NEW',
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return None
+        raise
+    return _to_job(response['Attributes'])
+
+def update_job(job_id: str, **changes):
+    """
+    Atualiza os campos informados do job e retorna o registro atualizado.
+    """
+    return _update(job_id, changes)
+
+def delete_job(job_id: str):
+    table = get_jobs_table()
+    table.delete_item(Key={'job_id': job_id})
+
+def claim_job(job_id: str, worker_id: str, lease_seconds: int, count_attempt: bool = True):
+    """
+    Assume o lease de um job ativo que já é do worker, não tem dono ou cujo lease
+    expirou, contando mais uma tentativa (se 'count_attempt'). Retorna o job ou
+    None se outro worker o detém.
+    """
+    now = int(time.time())
+    return _update(
+        job_id,
+        {'worker_id': worker_id, 'lease_expires_at': now + lease_seconds, 'lease_group': ACTIVE_LEASE_GROUP},
+        condition=(
+            '#status IN (:queued, :running) AND (#worker = :worker OR attribute_not_exists(#lease) '
+            'OR #lease < :now)'
+        ),
+        names={'#status': 'status', '#worker': 'worker_id', '#lease': 'lease_expires_at'},
+        values={
+            ':queued': JobStatus.QUEUED.value,
+            ':running': JobStatus.RUNNING.value,
+            ':worker': worker_id,
+            ':now': now,
+        },
+        add={'attempts': 1} if count_attempt else None,
+    )
+
+def renew_job_lease(job_id: str, worker_id: str, lease_seconds: int):
+    """Heartbeat: estende o lease se o job ainda é do worker. Retorna o job ou None se o lease foi perdido."""
+    return _update(
+        job_id,
+        {'lease_expires_at': int(time.time()) + lease_seconds},
+        condition='#worker = :worker',
+        names={'#worker': 'worker_id'},
+        values={':worker': worker_id},
+    )
+
+def finish_job(job_id: str, worker_id: str, **changes):
+    """Grava o status final e libera o lease, desde que o job ainda seja do worker."""
+    return _update(
+        job_id,
+        {**changes, 'worker_id': None, 'lease_expires_at': None, 'lease_group': None},
+        condition='#worker = :worker OR attribute_not_exists(#worker)',
+        names={'#worker': 'worker_id'},
+        values={':worker': worker_id},
+    )
+
+def list_expired_jobs() -> list:
+    """Ids dos jobs na fila ou em execução cujo lease expirou (o worker parou de enviar heartbeats)."""
+    table = get_jobs_table()
+    query = {
+        'IndexName': LEASE_INDEX,
+        'KeyConditionExpression': Key('lease_group').eq(ACTIVE_LEASE_GROUP) & Key('lease_expires_at').lt(int(time.time())),
+    }
+    job_ids = []
+    while True:
+        response = table.query(**query)
+        job_ids.extend(item['job_id'] for item in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return job_ids
+        query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def mark_job_notified(job_id: str) -> bool:
+    """Marca o e-mail do job como enviado. Retorna False se já estava marcado (retentativa)."""
+    return _update(
+        job_id,
+        {'notified': True},
+        condition='attribute_not_exists(#notified) OR #notified = :false',
+        names={'#notified': 'notified'},
+        values={':false': False},
+    ) is not None
+
+def cancel_queued_job(job_id: str, **changes):
+    """Finaliza um job que ainda espera na fila sem worker. Retorna None se um worker já o assumiu."""
+    return _update(
+        job_id,
+        changes,
+        condition='#status = :queued AND attribute_not_exists(#worker)',
+        names={'#status': 'status', '#worker': 'worker_id'},
+        values={':queued': JobStatus.QUEUED.value},
+    )
@@ -0,0 +1,111 @@
+from decimal import Decimal
+from botocore.exceptions import ClientError
+from app.repository.dynamodb_repository import dynamodb
+
+RATE_LIMITS_TABLE = 'rate_limits'
+
+# Função para criar a tabela dos limites de envio por usuário
+def create_rate_limits_table():
+    try:
+        # Verificar se a tabela existe antes de tentar criar
+        existing_tables = dynamodb.tables.all()
+        if RATE_LIMITS_TABLE in [table.name for table in existing_tables]:
+            print(f"Tabela '{RATE_LIMITS_TABLE}' já existe.")
+            return
+
+        dynamodb.create_table(
+            TableName=RATE_LIMITS_TABLE,
+            KeySchema=[
+                {
+                    'AttributeName': 'username',
+                    'KeyType': 'HASH'
+                }
+            ],
+            AttributeDefinitions=[
+                {
+                    'AttributeName': 'username',
+                    'AttributeType': 'S'
+                }
+            ],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+        print(f"Tabela '{RATE_LIMITS_TABLE}' criada com sucesso.")
+    except ClientError as e:
+        print(f"Erro ao criar tabela: {e}")
+        if 'ResourceInUseException' in str(e):
+            print("Tabela já existe, ignorando a criação.")
+
+def get_rate_limits_table():
+    table = dynamodb.Table(RATE_LIMITS_TABLE)
+    return table
+
+def get_rate_limit(username: str) -> dict:
+    """
+    Estado do usuário: fichas do token bucket, instante da última recarga e ids
+    dos jobs ativos. Usuário sem registro retorna um dicionário vazio.
+    """
+    table = get_rate_limits_table()
+    item = table.get_item(Key={'username': username}, ConsistentRead=True).get('Item') or {}
+    state = {'active_jobs': set(item.get('active_jobs', set()))}
+    if 'tokens' in item:
+        # O DynamoDB devolve números como Decimal
+        state.update(tokens=float(item['tokens']), refilled_at=float(item['refilled_at']))
+    return state
+
+def save_rate_limit_tokens(username: str, tokens: float, refilled_at: float, previous_refilled_at: float = None) -> bool:
+    """
+    Grava as fichas do bucket somente se ninguém o alterou desde a leitura
+    (última recarga igual a 'previous_refilled_at'). Retorna False na disputa.
+    """
+    table = get_rate_limits_table()
+    values = {':tokens': Decimal(str(tokens)), ':now': Decimal(str(refilled_at))}
+    if previous_refilled_at is None:
+        condition = 'attribute_not_exists(refilled_at)'
+    else:
+        condition = 'refilled_at = :previous'
+        values[':previous'] = Decimal(str(previous_refilled_at))
+    try:
+        table.update_item(
+            Key={'username': username},
+            UpdateExpression='SET tokens = :tokens, refilled_at = :now',
+            ConditionExpression=condition,
+            ExpressionAttributeValues=values,
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+    return True
+
+def add_active_job(username: str, job_id: str, max_jobs: int) -> bool:
+    """
+    Inclui o job no conjunto de jobs ativos do usuário, de forma atômica, se ele
+    ainda tiver menos de 'max_jobs'. Retorna False se a cota está esgotada.
+    """
+    table = get_rate_limits_table()
+    try:
+        table.update_item(
+            Key={'username': username},
+            UpdateExpression='ADD active_jobs :job',
+            ConditionExpression=(
+                'attribute_not_exists(active_jobs) OR size(active_jobs) < :max OR contains(active_jobs, :job_id)'
+            ),
+            ExpressionAttributeValues={':job': {job_id}, ':max': max_jobs, ':job_id': job_id},
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+    return True
+
+def remove_active_jobs(username: str, job_ids: set):
+    """Retira os jobs do conjunto de ativos do usuário (sem efeito se já foram retirados)."""
+    table = get_rate_limits_table()
+    table.update_item(
+        Key={'username': username},
+        UpdateExpression='DELETE active_jobs :jobs',
+        ExpressionAttributeValues={':jobs': set(job_ids)},
+    )
@@ -0,0 +1,107 @@
+from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Key
+from app.repository.dynamodb_repository import dynamodb
+
+RESULTS_TABLE = 'frame_results'
+S3_KEY_INDEX = 's3_key-index'
+
+# Função para criar a tabela do índice de resultados
+def create_results_table():
+    try:
+        # Verificar se a tabela existe antes de tentar criar
+        existing_tables = dynamodb.tables.all()
+        if RESULTS_TABLE in [table.name for table in existing_tables]:
+            print(f"Tabela '{RESULTS_TABLE}' já existe.")
+            return
+
+        # O índice por s3_key permite remover as entradas quando o arquivo é excluído
+        dynamodb.create_table(
+            TableName=RESULTS_TABLE,
+            KeySchema=[
+                {
+                    'AttributeName': 'cache_key',
+                    'KeyType': 'HASH'
+                }
+            ],
+            AttributeDefinitions=[
+                {
+                    'AttributeName': 'cache_key',
+                    'AttributeType': 'S'
+                },
+                {
+                    'AttributeName': 's3_key',
+                    'AttributeType': 'S'
+                }
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    'IndexName': S3_KEY_INDEX,
+                    'KeySchema': [
+                        {
+                            'AttributeName': 's3_key',
+                            'KeyType': 'HASH'
+                        }
+                    ],
+                    'Projection': {
+                        'ProjectionType': 'KEYS_ONLY'
+                    },
+                    'ProvisionedThroughput': {
+                        'ReadCapacityUnits': 5,
+                        'WriteCapacityUnits': 5
+                    }
+                }
+            ],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+        print(f"Tabela '{RESULTS_TABLE}' criada com sucesso.")
+    except ClientError as e:
+        print(f"Erro ao criar tabela: {e}")
+        if 'ResourceInUseException' in str(e):
+            print("Tabela já existe, ignorando a criação.")
+
+def get_results_table():
+    table = dynamodb.Table(RESULTS_TABLE)
+    return table
+
+def add_result(item: dict):
+    table = get_results_table()
+    table.put_item(Item=item)
+
+def get_result(cache_key: str):
+    table = get_results_table()
+    response = table.get_item(Key={'cache_key': cache_key})
+    return response.get('Item')
+
+def increment_result_hits(cache_key: str):
+    """Soma um acerto à entrada e registra a data do último uso."""
+    table = get_results_table()
+    table.update_item(
+        Key={'cache_key': cache_key},
+        UpdateExpression="ADD hit_count :one SET last_hit_at = :now",
+        ExpressionAttributeValues={':one': 1, ':now': datetime.now(timezone.utc).isoformat()},
+    )
+
+def delete_result(cache_key: str):
+    table = get_results_table()
+    table.delete_item(Key={'cache_key': cache_key})
+
+def delete_results_by_s3_key(s3_key: str) -> int:
+    """
+    Remove as entradas que apontam para o arquivo informado.
+    Retorna a quantidade de entradas removidas.
+    """
+    table = get_results_table()
+    query = {'IndexName': S3_KEY_INDEX, 'KeyConditionExpression': Key('s3_key').eq(s3_key)}
+    deleted = 0
+    while True:
+        response = table.query(**query)
+        for item in response.get('Items', []):
+            table.delete_item(Key={'cache_key': item['cache_key']})
+            deleted += 1
+        if 'LastEvaluatedKey' not in response:
+            return deleted
+        query['ExclusiveStartKey'] = response['LastEvaluatedKey']
@@ -0,0 +1,31 @@
+from botocore.exceptions import ClientError
+from app.core.config import settings
+from app.repository.aws_client_repository import get_shared_client
+
+def get_sqs_client():
+    """
+    Retorna o cliente SQS configurado, compartilhado pelo processo.
+    """
+    return get_shared_client("sqs", settings.AWS_SQS_ENDPOINT)
+
+def create_sqs_queue(queue_name: str = settings.JOB_QUEUE_NAME) -> str:
+    """
+    Cria a fila de jobs se não existir e retorna a sua URL.
+    """
+    sqs_client = get_sqs_client()
+    try:
+        response = sqs_client.create_queue(
+            QueueName=queue_name,
+            Attributes={
+                "VisibilityTimeout": str(settings.JOB_QUEUE_VISIBILITY_TIMEOUT),
+                "ReceiveMessageWaitTimeSeconds": str(settings.JOB_QUEUE_WAIT_SECONDS),
+            },
+        )
+        print(f"Fila SQS '{queue_name}' pronta")
+        return response["QueueUrl"]
+    except ClientError as e:
+        # Fila criada antes com outros atributos
+        if e.response["Error"]["Code"] == "QueueAlreadyExists":
+            return sqs_client.get_queue_url(QueueName=queue_name)["QueueUrl"]
+        print(f"Erro ao criar fila SQS: {e}")
+        raise
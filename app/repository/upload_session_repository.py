@@ -0,0 +1,202 @@
+import time
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from app.domain.upload_session_model import UploadSession
+from app.repository.dynamodb_repository import dynamodb
+
+UPLOAD_SESSIONS_TABLE = 'upload_sessions'
+
+# Função para criar a tabela das sessões de upload
+def create_upload_sessions_table():
+    try:
+        # Verificar se a tabela existe antes de tentar criar
+        existing_tables = dynamodb.tables.all()
+        if UPLOAD_SESSIONS_TABLE in [table.name for table in existing_tables]:
+            print(f"Tabela '{UPLOAD_SESSIONS_TABLE}' já existe.")
+            return
+
+        dynamodb.create_table(
+            TableName=UPLOAD_SESSIONS_TABLE,
+            KeySchema=[
+                {
+                    'AttributeName': 'upload_id',
+                    'KeyType': 'HASH'
+                }
+            ],
+            AttributeDefinitions=[
+                {
+                    'AttributeName': 'upload_id',
+                    'AttributeType': 'S'
+                }
+            ],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+        print(f"Tabela '{UPLOAD_SESSIONS_TABLE}' criada com sucesso.")
+    except ClientError as e:
+        print(f"Erro ao criar tabela: {e}")
+        if 'ResourceInUseException' in str(e):
+            print("Tabela já existe, ignorando a criação.")
+
+def get_upload_sessions_table():
+    table = dynamodb.Table(UPLOAD_SESSIONS_TABLE)
+    return table
+
+def add_upload_session(session: UploadSession):
+    table = get_upload_sessions_table()
+    # Campos vazios (sem gravação em andamento) ficam fora do item
+    table.put_item(Item=session.model_dump(mode="json", exclude_none=True))
+
+_NUMBER_FIELDS = ('size', 'offset', 'part_size', 'expires_at', 'writer_expires_at')
+
+def _to_session(item: dict) -> dict:
+    # O DynamoDB devolve números como Decimal
+    return {**item, **{name: int(item[name]) for name in _NUMBER_FIELDS if item.get(name) is not None}}
+
+def get_upload_session(upload_id: str):
+    table = get_upload_sessions_table()
+    response = table.get_item(Key={'upload_id': upload_id}, ConsistentRead=True)
+    item = response.get('Item')
+    if item is None:
+        return None
+    return _to_session(item)
+
+def claim_upload_writer(upload_id: str, expected_offset: int, writer: str, lease_seconds: int):
+    """
+    Reserva a gravação do upload para 'writer' se o offset ainda for
+    'expected_offset', a sessão estiver aberta e não houver outra gravação em
+    andamento (ou o lease dela tiver expirado). Retorna a sessão ou None.
+    """
+    table = get_upload_sessions_table()
+    now = int(time.time())
+    try:
+        response = table.update_item(
+            Key={'upload_id': upload_id},
+            UpdateExpression="SET writer = :writer, writer_expires_at = :lease",
+            ConditionExpression=(
+                "#offset = :expected_offset AND #status = :open AND expires_at > :now "
+                "AND (attribute_not_exists(writer) OR writer_expires_at < :now)"
+            ),
+            ExpressionAttributeNames={'#offset': 'offset', '#status': 'status'},
+            ExpressionAttributeValues={
+                ':writer': writer,
+                ':lease': now + lease_seconds,
+                ':expected_offset': expected_offset,
+                ':open': 'open',
+                ':now': now,
+            },
+            ReturnValues='ALL_NEW',
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return None
+        raise
+    return _to_session(response['Attributes'])
+
+def renew_upload_writer(upload_id: str, writer: str, lease_seconds: int) -> bool:
+    """Prorroga o lease da gravação. Retorna False se 'writer' não detém mais o upload."""
+    table = get_upload_sessions_table()
+    try:
+        table.update_item(
+            Key={'upload_id': upload_id},
+            UpdateExpression="SET writer_expires_at = :lease",
+            ConditionExpression="writer = :writer",
+            ExpressionAttributeValues={':writer': writer, ':lease': int(time.time()) + lease_seconds},
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+def commit_upload_chunk(upload_id: str, writer: str, offset: int, part_etags: list, tail_key: str = None) -> bool:
+    """
+    Confirma os bytes gravados por 'writer' (novo offset, partes e objeto com o
+    restante) e libera a gravação. Retorna False se 'writer' perdeu o lease.
+    """
+    table = get_upload_sessions_table()
+    values = {':writer': writer, ':offset': offset, ':part_etags': part_etags}
+    expression = "SET #offset = :offset, part_etags = :part_etags"
+    if tail_key:
+        values[':tail_key'] = tail_key
+        expression += ", tail_key = :tail_key REMOVE writer, writer_expires_at"
+    else:
+        expression += " REMOVE writer, writer_expires_at, tail_key"
+    try:
+        table.update_item(
+            Key={'upload_id': upload_id},
+            UpdateExpression=expression,
+            ConditionExpression="writer = :writer",
+            ExpressionAttributeNames={'#offset': 'offset'},
+            ExpressionAttributeValues=values,
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+def release_upload_writer(upload_id: str, writer: str):
+    """Libera a gravação sem alterar o upload (sem efeito se 'writer' já a perdeu)."""
+    table = get_upload_sessions_table()
+    try:
+        table.update_item(
+            Key={'upload_id': upload_id},
+            UpdateExpression="REMOVE writer, writer_expires_at",
+            ConditionExpression="writer = :writer",
+            ExpressionAttributeValues={':writer': writer},
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+def complete_upload_session(upload_id: str, job_id: str):
+    table = get_upload_sessions_table()
+    table.update_item(
+        Key={'upload_id': upload_id},
+        UpdateExpression="SET #status = :status, job_id = :job_id REMOVE writer, writer_expires_at",
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={':status': 'completed', ':job_id': job_id},
+    )
+
+def list_expired_upload_sessions() -> list:
+    """Ids das sessões cuja validade (expires_at) já passou."""
+    table = get_upload_sessions_table()
+    scan = {
+        'FilterExpression': Attr('expires_at').lt(int(time.time())),
+        'ProjectionExpression': 'upload_id',
+    }
+    upload_ids = []
+    while True:
+        response = table.scan(**scan)
+        upload_ids.extend(item['upload_id'] for item in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return upload_ids
+        scan['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def delete_expired_upload_session(upload_id: str):
+    """
+    Remove a sessão se ela expirou e não há gravação em andamento. Retorna a
+    sessão removida ou None.
+    """
+    table = get_upload_sessions_table()
+    now = int(time.time())
+    try:
+        response = table.delete_item(
+            Key={'upload_id': upload_id},
+            ConditionExpression="expires_at < :now AND (attribute_not_exists(writer) OR writer_expires_at < :now)",
+            ExpressionAttributeValues={':now': now},
+            ReturnValues='ALL_OLD',
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return None
+        raise
+    item = response.get('Attributes')
+    return _to_session(item) if item else None
+
+def delete_upload_session(upload_id: str):
+    table = get_upload_sessions_table()
+    table.delete_item(Key={'upload_id': upload_id})
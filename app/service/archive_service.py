@@ -0,0 +1,126 @@
+import base64
+import binascii
+import re
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from app.core.config import settings
+from app.repository.job_repository import get_jobs_by_ids
+from app.service.s3_service import list_user_frame_archives, archive_prefix
+
+# Ordenações aceitas na listagem (aplicadas aos arquivos da página)
+ARCHIVE_SORT_FIELDS = ("key", "last_modified", "size", "frame_count", "source_video")
+
+# Os .zip dos jobs levam o id do job na chave (ver _archive_key)
+_JOB_ID_PATTERN = re.compile(r"frames_([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})")
+
+def encode_cursor(key: str) -> str:
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, username: str) -> str:
+    """Chave a partir da qual a listagem continua; recusa cursores inválidos ou de outro usuário."""
+    try:
+        key = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
+    if not key.startswith(archive_prefix(username)):
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
+    return key
+
+def _output_frame_count(output: dict) -> int:
+    # Jobs anteriores à contagem gravada têm só a lista de timestamps
+    if output.get("frame_count") is not None:
+        return output["frame_count"]
+    return len(output.get("frame_timestamps") or [])
+
+def _frame_count(job: dict, url: str):
+    # Várias saídas: um .zip por saída ou todas no mesmo .zip (combine_outputs)
+    if job.get("output_files"):
+        outputs = [output for output in job["output_files"] if output.get("file_url") == url]
+        return sum(_output_frame_count(output) for output in outputs) if outputs else None
+    if job.get("frame_count") is not None:
+        return job["frame_count"]
+    if job.get("frame_timestamps") is not None:
+        return len(job["frame_timestamps"])
+    return None
+
+def _job_id(key: str):
+    match = _JOB_ID_PATTERN.search(key)
+    return match.group(1) if match else None
+
+def _describe(archive: dict, jobs: dict) -> dict:
+    job = jobs.get(_job_id(archive["key"]))
+    return {
+        **archive,
+        "filename": archive["key"].rsplit("/", 1)[-1],
+        "job_id": job["job_id"] if job else None,
+        "source_video": job["filename"] if job else None,
+        "frame_count": _frame_count(job, archive["url"]) if job else None,
+    }
+
+def _as_utc(moment: datetime = None):
+    # Datas sem fuso são tratadas como UTC, como as do S3
+    return moment.replace(tzinfo=timezone.utc) if moment and moment.tzinfo is None else moment
+
+def _matches(archive: dict, source: str = None, modified_after: datetime = None,
+             modified_before: datetime = None) -> bool:
+    if source and source.lower() not in (archive["source_video"] or "").lower():
+        return False
+    last_modified = datetime.fromisoformat(archive["last_modified"])
+    if modified_after and last_modified < modified_after:
+        return False
+    if modified_before and last_modified >= modified_before:
+        return False
+    return True
+
+def _sort_key(field: str):
+    # Arquivos sem o metadado (sem job associado) ficam no fim da ordem crescente
+    return lambda archive: (archive[field] is None, archive[field] if archive[field] is not None else 0)
+
+def list_frame_archives(username: str, limit: int = settings.ARCHIVE_LIST_DEFAULT_LIMIT, cursor: str = None,
+                        sort: str = "key", order: str = "asc", source: str = None,
+                        modified_after: datetime = None, modified_before: datetime = None) -> dict:
+    """
+    Uma página dos arquivos .zip do usuário com tamanho, data de modificação,
+    número de frames e nome do vídeo de origem (lidos dos jobs em lote).
+
+    A listagem segue a ordem das chaves no S3; 'next_cursor' continua de onde
+    a página parou. Os filtros são aplicados durante a leitura, que examina no
+    máximo ARCHIVE_LIST_MAX_SCAN arquivos por chamada: com filtros muito
+    seletivos a página pode vir com menos itens e um 'next_cursor'. 'sort' e
+    'order' ordenam os arquivos da página.
+    """
+    if sort not in ARCHIVE_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Ordenação inválida. Use: {', '.join(ARCHIVE_SORT_FIELDS)}.")
+    limit = max(1, min(limit, settings.ARCHIVE_LIST_MAX_LIMIT))
+    start_after = decode_cursor(cursor, username) if cursor else None
+    modified_after, modified_before = _as_utc(modified_after), _as_utc(modified_before)
+    filtered = source or modified_after or modified_before
+
+    archives = []
+    scanned = 0
+    while True:
+        # Sem filtros, uma leitura do tamanho que falta para a página basta
+        wanted = settings.ARCHIVE_LIST_BATCH_SIZE if filtered else limit - len(archives)
+        page = list_user_frame_archives(username, min(wanted, settings.ARCHIVE_LIST_MAX_SCAN - scanned), start_after)
+        # Metadados dos jobs da página em uma única leitura em lote
+        jobs = get_jobs_by_ids([job_id for job_id in (_job_id(archive["key"]) for archive in page["archives"]) if job_id])
+        position = page["last_key"]
+        for archive in page["archives"]:
+            scanned += 1
+            archive = _describe(archive, jobs)
+            if _matches(archive, source, modified_after, modified_before):
+                archives.append(archive)
+            if len(archives) == limit:
+                position = archive["key"]
+                break
+        # Ainda há arquivos depois da posição onde a leitura parou
+        more = page["truncated"] or position != page["last_key"]
+        start_after = position
+        if len(archives) == limit or not more or scanned >= settings.ARCHIVE_LIST_MAX_SCAN:
+            break
+
+    archives.sort(key=_sort_key(sort), reverse=order == "desc")
+    return {
+        "archives": archives,
+        "next_cursor": encode_cursor(start_after) if more and start_after else None,
+    }
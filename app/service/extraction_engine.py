@@ -0,0 +1,232 @@
+import io
+import math
+from abc import ABC, abstractmethod
+from app.core.config import settings
+from app.core.resources import get_cpus_per_worker, get_default_worker_count
+from app.domain.process_video_model import OutputOptions
+from app.service.job_progress_service import current_progress
+from app.service.job_control_service import check_cancelled
+from app.service.frame_dedupe_service import FrameDeduplicator, frame_signatures, write_frame_manifest
+from app.service.frame_processor_service import (
+    extract_frames, probe_video, compute_timestamps, choose_extraction_mode, scaled_frame_size, search_quality
+)
+
+# Dependências opcionais da engine em processo (pip install av numpy Pillow)
+try:
+    import av
+    import numpy as np
+    from PIL import Image
+except ImportError:
+    av = None
+
+# Formatos de saída no Pillow
+_PIL_FORMATS = {"jpg": "JPEG", "webp": "WEBP", "png": "PNG"}
+
+# Tolerância na comparação de timestamps (bem menor que a duração de um frame)
+_TIME_EPSILON = 1e-3
+
+class ExtractionEngine(ABC):
+    """
+    Interface das engines de extração: recebem o vídeo e os parâmetros, gravam os
+    frames no arquivo .zip 'archive' e retornam o modo usado e os timestamps.
+    'threshold' é o limiar dos modos dedupe e scene.
+    """
+    name = None
+
+    @abstractmethod
+    def extract(self, video_path, work_dir, archive, interval, mode="auto", timestamps=None,
+                output: OutputOptions = None, probe=None, threshold=None):
+        pass
+
+class FFmpegCliEngine(ExtractionEngine):
+    """Executa o ffmpeg como processo externo (ffmpeg-python), com todos os modos de extração."""
+    name = "ffmpeg"
+
+    def extract(self, video_path, work_dir, archive, interval, mode="auto", timestamps=None,
+                output: OutputOptions = None, probe=None, threshold=None):
+        return extract_frames(video_path, work_dir, archive, interval, mode, timestamps, output, probe, threshold)
+
+class PyAVEngine(ExtractionEngine):
+    """
+    Decodifica o vídeo no próprio processo com a libav (PyAV), sem iniciar o ffmpeg.
+    Os frames mantidos saem em lotes de arrays NumPy, já redimensionados pela
+    libswscale, para que a lógica por frame seja feita em código vetorizado.
+
+    O decodificador usa até 'threads' threads (por padrão PYAV_THREADS ou os
+    núcleos de cada worker de extração). Essas threads são criadas pela libav e
+    não há como atribuí-las a um job com segurança, então não entram no limite
+    de CPU (JOB_CPU_TIME_LIMIT_SECONDS): ele só é aplicado de fato na engine
+    ffmpeg, em que cada job tem os seus processos.
+    """
+    name = "pyav"
+
+    def __init__(self, batch_size: int = settings.PYAV_BATCH_SIZE, threads: int = None):
+        if av is None:
+            raise RuntimeError("A engine 'pyav' requer os pacotes av, numpy e Pillow.")
+        self.batch_size = max(1, batch_size)
+        self.threads = max(1, threads or settings.PYAV_THREADS or get_cpus_per_worker(
+            settings.EXTRACTION_WORKERS or get_default_worker_count()
+        ))
+
+    def _open(self, video_path, keyframes_only: bool = False):
+        container = av.open(video_path)
+        try:
+            stream = container.streams.video[0]
+            # Decodificação multithread dentro do codec, limitada aos núcleos do job
+            stream.thread_type = "AUTO"
+            stream.codec_context.thread_count = self.threads
+            if keyframes_only:
+                stream.codec_context.skip_frame = "NONKEY"
+        except Exception:
+            container.close()
+            raise
+        return container, stream
+
+    @staticmethod
+    def _frame_time(frame, stream) -> float:
+        if frame.time is not None:
+            return frame.time
+        return float(frame.pts * stream.time_base) if frame.pts is not None else 0.0
+
+    @staticmethod
+    def _to_array(frame, output: OutputOptions):
+        width, height = scaled_frame_size(frame.width, frame.height, output)
+        pixel_format = "gray" if output.grayscale else "rgb24"
+        return frame.reformat(width=width, height=height, format=pixel_format).to_ndarray()
+
+    def _iter_selected(self, video_path, interval, mode, timestamps):
+        """Gera (timestamp, frame) apenas para os frames mantidos."""
+        if mode == "seek":
+            yield from self._iter_seek(video_path, timestamps)
+            return
+
+        container, stream = self._open(video_path, keyframes_only=mode == "keyframes")
+        try:
+            next_time = 0.0
+            for frame in container.decode(stream):
+                timestamp = self._frame_time(frame, stream)
+                if interval and timestamp + _TIME_EPSILON < next_time:
+                    continue
+                yield timestamp, frame
+                if interval:
+                    if mode == "keyframes":
+                        # Keyframes espaçados de pelo menos 'interval' segundos
+                        next_time = timestamp + interval
+                    else:
+                        # Primeiro frame em cada múltiplo do intervalo
+                        next_time = (math.floor(timestamp / interval + _TIME_EPSILON) + 1) * interval
+        finally:
+            container.close()
+
+    def _iter_seek(self, video_path, timestamps):
+        container, stream = self._open(video_path)
+        try:
+            for target in timestamps:
+                # Busca o keyframe anterior e decodifica até o timestamp pedido
+                container.seek(int(target / stream.time_base), stream=stream, backward=True)
+                for frame in container.decode(stream):
+                    timestamp = self._frame_time(frame, stream)
+                    if timestamp + _TIME_EPSILON >= target:
+                        yield round(target, 3), frame
+                        break
+        finally:
+            container.close()
+
+    def iter_frame_batches(self, video_path, interval=None, mode="select", timestamps=None,
+                           output: OutputOptions = None):
+        """
+        Gera lotes (timestamps, array) com até 'batch_size' frames. O array tem
+        forma (N, altura, largura, 3) em RGB ou (N, altura, largura) em tons de cinza.
+        """
+        output = output or OutputOptions()
+        batch_times, batch_frames = [], []
+        for timestamp, frame in self._iter_selected(video_path, interval, mode, timestamps):
+            batch_times.append(round(timestamp, 3))
+            batch_frames.append(self._to_array(frame, output))
+            if len(batch_frames) >= self.batch_size:
+                yield batch_times, np.stack(batch_frames)
+                batch_times, batch_frames = [], []
+        if batch_frames:
+            yield batch_times, np.stack(batch_frames)
+
+    @staticmethod
+    def encode_frame(array, output: OutputOptions, quality=None) -> bytes:
+        quality = quality if quality is not None else output.quality
+        options = {}
+        if output.format != "png":
+            options["quality"] = quality if quality is not None else 75
+        buffer = io.BytesIO()
+        Image.fromarray(array).save(buffer, format=_PIL_FORMATS[output.format], **options)
+        return buffer.getvalue()
+
+    def choose_quality_for_target(self, sample, output: OutputOptions, target_bytes: int) -> int:
+        """Maior qualidade em que o frame de amostra cabe em 'target_bytes'."""
+        return search_quality(lambda quality: len(self.encode_frame(sample, output, quality)), target_bytes)
+
+    def _sample_frame(self, video_path, sample_time, output: OutputOptions):
+        for _, frame in self._iter_seek(video_path, [sample_time]):
+            return self._to_array(frame, output)
+        return None
+
+    def extract(self, video_path, work_dir, archive, interval, mode="auto", timestamps=None,
+                output: OutputOptions = None, probe=None, threshold=None):
+        output = output or OutputOptions()
+        if timestamps:
+            mode = "seek"
+        if mode == "scene":
+            # O score de mudança de cena é calculado pelo filtro select do ffmpeg
+            return FFmpegCliEngine().extract(video_path, work_dir, archive, interval, mode, timestamps, output,
+                                             probe, threshold)
+
+        if probe is None and mode in ("auto", "seek") and not timestamps:
+            probe = probe_video(video_path)
+        if mode == "auto":
+            mode = choose_extraction_mode(interval, probe)
+        if mode == "seek" and not timestamps:
+            timestamps = compute_timestamps(probe["duration"], interval)
+
+        if output.target_frame_bytes:
+            sample_time = probe["duration"] / 2 if probe and probe.get("duration") else (timestamps or [0])[0]
+            sample = self._sample_frame(video_path, sample_time, output)
+            if sample is not None:
+                quality = self.choose_quality_for_target(sample, output, output.target_frame_bytes)
+                print(f"Qualidade {quality} escolhida para {output.target_frame_bytes} bytes por frame.")
+                output = output.model_copy(update={"quality": quality})
+
+        # No modo dedupe os frames descartados nem chegam a ser codificados
+        deduplicator = FrameDeduplicator(threshold or settings.DEDUPE_THRESHOLD) if mode == "dedupe" else None
+        progress = current_progress()
+        frame_timestamps = []
+        for batch_times, batch in self.iter_frame_batches(video_path, interval, mode, timestamps, output):
+            # Sem processo para encerrar, o cancelamento é verificado a cada lote
+            check_cancelled()
+            if progress is not None:
+                # Sem processo do ffmpeg, o progresso é informado a cada lote
+                decoded = deduplicator.candidates + len(batch) if deduplicator else len(frame_timestamps) + len(batch)
+                progress.update(self.name, {"frame": decoded, "out_time_us": batch_times[-1] * 1_000_000})
+            if deduplicator:
+                mask = deduplicator.keep_mask(frame_signatures(batch))
+                batch_times = [timestamp for timestamp, keep in zip(batch_times, mask) if keep]
+                batch = batch[mask]
+            for timestamp, array in zip(batch_times, batch):
+                frame_timestamps.append(timestamp)
+                archive.writestr(f"frame_{len(frame_timestamps):04d}.{output.format}", self.encode_frame(array, output))
+
+        if deduplicator:
+            write_frame_manifest(archive, mode, frame_timestamps, output.format, interval=interval,
+                                 **deduplicator.stats())
+        return mode, frame_timestamps
+
+EXTRACTION_ENGINES = {
+    FFmpegCliEngine.name: FFmpegCliEngine,
+    PyAVEngine.name: PyAVEngine,
+}
+
+def get_extraction_engine(name: str = None) -> ExtractionEngine:
+    """Retorna a engine configurada em EXTRACTION_ENGINE (ou a informada)."""
+    name = name or settings.EXTRACTION_ENGINE
+    if name not in EXTRACTION_ENGINES:
+        raise ValueError(
+            f"Engine de extração desconhecida: {name}. Use uma de: {', '.join(EXTRACTION_ENGINES)}."
+        )
+    return EXTRACTION_ENGINES[name]()
@@ -0,0 +1,175 @@
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from app.core.config import settings
+from app.core.resources import get_default_worker_count
+from app.exceptions.queue_full_error import QueueFullError
+from app.service.job_scheduler import JobScheduler, job_scheduler
+
+class ExtractionExecutor:
+    """
+    Pool limitado de workers de extração com fila de espera de tamanho fixo.
+    Cada worker supervisiona um processo do ffmpeg; com a fila cheia, novos jobs são recusados.
+    A ordem da fila é decidida pelo 'scheduler' (ver job_scheduler), não pela chegada.
+    Jobs ainda não admitidos pelo agendador esperam na fila sem ocupar um
+    worker; 'wake' volta a despachá-los quando algo muda (ex.: espaço liberado).
+    Com a fila em memória, a vaga do job é reservada ('reserve') ao registrá-lo
+    e passa a ele quando o worker o entrega ao executor ('submit').
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, default_retry_after: int = 30,
+                 scheduler: JobScheduler = None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.default_retry_after = default_retry_after
+        self.scheduler = scheduler or JobScheduler()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="extraction")
+        self._lock = threading.Lock()
+        # Serializa o despacho e a contagem dos despachos adiados (sem job admitido)
+        self._dispatch_lock = threading.Lock()
+        self._deferred = 0
+        self._queued = 0
+        self._running = 0
+        # Jobs aceitos que ainda aguardam a entrega ao executor
+        self._reserved = set()
+        self._completed = 0
+        self._rejected = 0
+        self._avg_duration = None
+
+    def _occupied(self) -> int:
+        return self._queued + self._running + len(self._reserved)
+
+    def has_capacity(self) -> bool:
+        with self._lock:
+            return self._occupied() < self.max_workers + self.max_queue
+
+    def reserve(self, job_id: str) -> bool:
+        """
+        Ocupa uma vaga para o job até ele ser entregue ao executor ('submit') ou
+        descartado ('release'). Retorna False com o executor cheio.
+        """
+        with self._lock:
+            if job_id not in self._reserved and self._occupied() >= self.max_workers + self.max_queue:
+                return False
+            self._reserved.add(job_id)
+            return True
+
+    def release(self, job_id: str):
+        """Libera a vaga reservada para o job (sem efeito se já foi usada ou liberada)."""
+        with self._lock:
+            self._reserved.discard(job_id)
+
+    def free_slots(self, include_queue: bool = True) -> int:
+        """
+        Jobs que ainda cabem no executor; sem 'include_queue', só os workers
+        ociosos. As vagas reservadas não contam: os jobs delas chegam pelo
+        mesmo consumidor da fila que usa este número.
+        """
+        with self._lock:
+            limit = self.max_workers + (self.max_queue if include_queue else 0)
+            return max(0, limit - self._queued - self._running)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def retry_after(self) -> int:
+        """
+        Estimativa, em segundos, de quando haverá espaço na fila.
+        """
+        with self._lock:
+            if self._avg_duration is None:
+                return self.default_retry_after
+            waves = self._occupied() / self.max_workers
+            return max(1, math.ceil(self._avg_duration * max(waves, 1) / 2))
+
+    def reject(self):
+        with self._lock:
+            self._rejected += 1
+        raise QueueFullError("Fila de processamento cheia. Tente novamente mais tarde.", self.retry_after())
+
+    def submit(self, fn, *args, schedule: dict = None, **kwargs):
+        """
+        Enfileira fn(*args, **kwargs). 'schedule' traz os dados do job para o
+        agendador (job_id, username, role, cost, submitted_at e admit). Um job
+        com vaga reservada é sempre aceito.
+        """
+        job_id = (schedule or {}).get("job_id")
+        with self._lock:
+            if job_id in self._reserved:
+                self._reserved.discard(job_id)
+                admitted = True
+            else:
+                admitted = self._occupied() < self.max_workers + self.max_queue
+            if admitted:
+                self._queued += 1
+        if not admitted:
+            self.reject()
+        future = Future()
+        self.scheduler.push((future, fn, args, kwargs), **(schedule or {}))
+        # Cada thread livre executa o melhor job pendente naquele momento
+        self._executor.submit(self._run_next)
+        return future
+
+    def wake(self):
+        """Despacha de novo os jobs que não foram admitidos, agora que podem caber."""
+        with self._dispatch_lock:
+            deferred, self._deferred = self._deferred, 0
+        for _ in range(deferred):
+            self._executor.submit(self._run_next)
+
+    def _run_next(self):
+        with self._dispatch_lock:
+            item = self.scheduler.pop()
+            if item is None:
+                # Nenhum job pendente pode começar agora: o worker fica livre até o próximo 'wake'
+                self._deferred += 1
+                return
+        future, fn, args, kwargs = item
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        started = time.monotonic()
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            duration = time.monotonic() - started
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                # Média móvel exponencial da duração dos jobs
+                if self._avg_duration is None:
+                    self._avg_duration = duration
+                else:
+                    self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+            # O job terminado pode ter liberado o que os adiados esperavam
+            self.wake()
+
+    def stats(self) -> dict:
+        with self._dispatch_lock:
+            deferred = self._deferred
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "busy_workers": self._running,
+                "queue_depth": self._queued,
+                "reserved": len(self._reserved),
+                "waiting_for_admission": deferred,
+                "queue_capacity": self.max_queue,
+                "utilization": round(self._running / self.max_workers, 3),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_job_seconds": round(self._avg_duration, 3) if self._avg_duration is not None else None,
+            }
+
+# Executor compartilhado pelo processo, dimensionado pela cota de CPU do container
+extraction_executor = ExtractionExecutor(
+    max_workers=settings.EXTRACTION_WORKERS or get_default_worker_count(),
+    max_queue=settings.EXTRACTION_QUEUE_SIZE,
+    default_retry_after=settings.EXTRACTION_RETRY_AFTER,
+    scheduler=job_scheduler,
+)
@@ -0,0 +1,95 @@
+import json
+
+# Dependência opcional do modo dedupe (pip install numpy)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Lado da assinatura de cada frame: miniatura em tons de cinza de 16x16
+SIGNATURE_SIZE = 16
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("O modo dedupe requer o pacote numpy.")
+
+def frame_signatures(batch):
+    """
+    Reduz um lote de frames (N, altura, largura[, 3]) a miniaturas de 16x16 em
+    tons de cinza pela média de blocos, de forma vetorizada.
+    """
+    _require_numpy()
+    batch = np.asarray(batch, dtype=np.float32)
+    if batch.ndim == 4:
+        # Luminância (BT.601) a partir do RGB
+        batch = batch @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    count, height, width = batch.shape
+    if height < SIGNATURE_SIZE or width < SIGNATURE_SIZE:
+        rows = np.linspace(0, height - 1, SIGNATURE_SIZE).astype(int)
+        columns = np.linspace(0, width - 1, SIGNATURE_SIZE).astype(int)
+        return batch[:, rows][:, :, columns]
+    block_height, block_width = height // SIGNATURE_SIZE, width // SIGNATURE_SIZE
+    cropped = batch[:, :block_height * SIGNATURE_SIZE, :block_width * SIGNATURE_SIZE]
+    return cropped.reshape(count, SIGNATURE_SIZE, block_height, SIGNATURE_SIZE, block_width).mean(axis=(2, 4))
+
+def signatures_from_raw(data: bytes):
+    """Assinaturas geradas pelo ffmpeg (rawvideo gray 16x16), na ordem dos frames."""
+    _require_numpy()
+    pixels = SIGNATURE_SIZE * SIGNATURE_SIZE
+    usable = len(data) - len(data) % pixels
+    return np.frombuffer(data[:usable], dtype=np.uint8).reshape(-1, SIGNATURE_SIZE, SIGNATURE_SIZE).astype(np.float32)
+
+class FrameDeduplicator:
+    """
+    Descarta frames quase iguais ao último frame mantido. A diferença é a média
+    absoluta entre as assinaturas, normalizada entre 0 e 1; frames abaixo de
+    'threshold' são descartados. O estado é mantido entre lotes.
+    """
+
+    def __init__(self, threshold: float):
+        _require_numpy()
+        self.threshold = threshold
+        self.reference = None
+        self.candidates = 0
+        self.kept = 0
+
+    def keep_mask(self, signatures):
+        """Retorna a máscara dos frames mantidos no lote."""
+        count = len(signatures)
+        mask = np.zeros(count, dtype=bool)
+        start = 0
+        if count and self.reference is None:
+            mask[0] = True
+            self.reference = signatures[0]
+            start = 1
+        while start < count:
+            # Compara de uma vez o restante do lote com o último frame mantido
+            differences = np.abs(signatures[start:] - self.reference).mean(axis=(1, 2)) / 255
+            changed = np.flatnonzero(differences >= self.threshold)
+            if not changed.size:
+                break
+            index = start + int(changed[0])
+            mask[index] = True
+            self.reference = signatures[index]
+            start = index + 1
+        self.candidates += count
+        self.kept += int(mask.sum())
+        return mask
+
+    def stats(self) -> dict:
+        return {"candidates": self.candidates, "dropped": self.candidates - self.kept, "threshold": self.threshold}
+
+# Arquivo do .zip com os frames mantidos nos modos dedupe e scene
+MANIFEST_NAME = "manifest.json"
+
+def write_frame_manifest(archive, mode: str, frame_timestamps, image_format: str, **details):
+    """Grava no .zip o manifest.json com o arquivo e o timestamp de cada frame mantido."""
+    manifest = {
+        "mode": mode,
+        **details,
+        "frames": [
+            {"file": f"frame_{number:04d}.{image_format}", "timestamp": timestamp}
+            for number, timestamp in enumerate(frame_timestamps, start=1)
+        ],
+    }
+    archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
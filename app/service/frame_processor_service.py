@@ -1,66 +1,973 @@
 import os
+import re
+import math
+import hashlib
 import ffmpeg
 import zipfile
 import uuid
-from tempfile import TemporaryDirectory
+import subprocess
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import HTTPException
-from app.service.s3_service import upload_to_s3
+from app.service.s3_service import S3MultipartWriter
+from app.service.scratch_space_service import scratch_space
+from app.service.result_cache_service import file_sha256, build_result_cache_key, get_cached_result, store_result
 from app.service.email_ses_service import send_file_url_email_ses
+from app.service.job_progress_service import current_progress, read_ffmpeg_stderr
+from app.service.job_control_service import current_job_control, check_cancelled
+from app.service.frame_dedupe_service import (
+    SIGNATURE_SIZE, FrameDeduplicator, signatures_from_raw, write_frame_manifest, MANIFEST_NAME
+)
 from app.repository.dynamodb_repository import get_user_by_username
 from app.core.cryptography import decrypt_email_hash
+from app.core.config import settings
+from app.core.resources import get_cpus_per_worker, get_default_worker_count
+from app.domain.process_video_model import file_too_large_error, OutputOptions, OutputSpec
+from app.exceptions.job_cancelled_error import JobCancelledError
 
 
-def process_video(file, interval, username, background_tasks):
+def save_upload(file, dest_dir: str, max_size: int = settings.MAX_UPLOAD_SIZE, chunk_size: int = settings.UPLOAD_CHUNK_SIZE):
+    """
+    Copia o vídeo enviado para o diretório informado em blocos de tamanho fixo,
+    validando o limite de tamanho e calculando o SHA-256 na mesma passagem.
+    Retorna (caminho do arquivo, tamanho em bytes, hash SHA-256).
+    """
+    video_path = os.path.join(dest_dir, os.path.basename(file.filename))
+    sha256 = hashlib.sha256()
+    file_size = 0
+    with open(video_path, "wb") as video_file:
+        while True:
+            chunk = file.file.read(chunk_size)
+            if not chunk:
+                break
+            file_size += len(chunk)
+            if file_size > max_size:
+                raise file_too_large_error(max_size)
+            sha256.update(chunk)
+            video_file.write(chunk)
+    return video_path, file_size, sha256.hexdigest()
+
+def _parse_rate(rate: str) -> float:
+    """Converte uma taxa no formato do ffprobe ("30000/1001") para float."""
     try:
-        with TemporaryDirectory() as temp_dir:
-            # Salvar o vídeo temporariamente
-            video_path = os.path.join(temp_dir, file.filename)
-            with open(video_path, "wb") as video_file:
-                video_file.write(file.file.read())
-
-            # Diretório para armazenar os frames
-            frames_dir = os.path.join(temp_dir, "frames")
-            os.makedirs(frames_dir, exist_ok=True)
-
-            # Extrair frames com o ffmpeg
-            output_pattern = os.path.join(frames_dir, "frame_%04d.jpg")
-            (
-                ffmpeg
-                .input(video_path, fflags="+genpts")
-                .filter("select", f"not(mod(t,{interval}))")
-                .output(output_pattern, vsync="vfr", format="image2")
-                .run(capture_stdout=True, capture_stderr=True)
-            )
-
-            # Validar se os frames foram extraídos
-            frames = os.listdir(frames_dir)
-            if not frames:
-                raise HTTPException(status_code=500, detail="Nenhum frame foi extraído do vídeo.")
+        num, _, den = (rate or "0").partition("/")
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+def probe_video(video_path, keyframe_window: int = settings.KEYFRAME_PROBE_SECONDS) -> dict:
+    """
+    Lê com o ffprobe as informações do stream de vídeo e estima o intervalo entre
+    keyframes (GOP) a partir dos pacotes dos primeiros segundos do arquivo.
+    """
+    info = ffmpeg.probe(
+        video_path,
+        select_streams="v:0",
+        show_entries="packet=pts_time,flags",
+        read_intervals=f"%+{keyframe_window}",
+    )
+    stream = next((s for s in info.get("streams", []) if s.get("codec_type") == "video"), None)
+    if stream is None:
+        raise ValueError("O arquivo não possui stream de vídeo.")
+
+    duration = float(info.get("format", {}).get("duration") or stream.get("duration") or 0)
+
+    keyframes = sorted(
+        float(packet["pts_time"])
+        for packet in info.get("packets", [])
+        if "K" in packet.get("flags", "") and packet.get("pts_time") not in (None, "N/A")
+    )
+    if len(keyframes) > 1:
+        keyframe_interval = (keyframes[-1] - keyframes[0]) / (len(keyframes) - 1)
+    else:
+        # Só um keyframe na janela: o GOP é pelo menos do tamanho da janela lida
+        keyframe_interval = min(duration, keyframe_window) if duration else float(keyframe_window)
+
+    return {
+        "duration": duration,
+        "fps": _parse_rate(stream.get("avg_frame_rate") or stream.get("r_frame_rate")),
+        "width": stream.get("width"),
+        "height": stream.get("height"),
+        "codec": stream.get("codec_name"),
+        "keyframe_interval": keyframe_interval,
+    }
+
+def compute_timestamps(duration: float, interval: float) -> list:
+    """Timestamps (em segundos) de 0 até a duração do vídeo, a cada 'interval'."""
+    count = int(duration // interval) + 1 if duration > 0 else 0
+    return [i * interval for i in range(count) if i * interval < duration]
+
+def choose_extraction_mode(interval, probe) -> str:
+    """
+    Escolhe entre decodificar o vídeo inteiro ('select') ou buscar cada timestamp
+    ('seek'). O seek compensa quando o intervalo é grande em relação ao GOP,
+    pois cada busca decodifica apenas a partir do keyframe anterior.
+    """
+    if not probe or not probe.get("keyframe_interval") or not interval:
+        return "select"
+    if interval >= settings.SEEK_MIN_GOP_RATIO * probe["keyframe_interval"]:
+        return "seek"
+    return "select"
+
+def plan_frame_count(probe, interval, mode, timestamps=None, output_specs=None) -> int:
+    """Quantidade de frames prevista para os parâmetros do job."""
+    duration = probe["duration"]
+    if output_specs:
+        return sum(len(compute_timestamps(duration, spec["interval"])) for spec in output_specs)
+    if timestamps:
+        return len([timestamp for timestamp in timestamps if timestamp < duration])
+    if mode == "scene":
+        # Depende do conteúdo: no máximo um frame por frame decodificado
+        return None
+    if mode == "keyframes":
+        spacing = max(interval or 0, probe.get("keyframe_interval") or 0)
+        return math.ceil(duration / spacing) if spacing else 0
+    return len(compute_timestamps(duration, interval))
+
+def estimate_cost(probe, mode, planned_frames, output_specs=None) -> dict:
+    """
+    Estima os frames decodificados e o tempo de processamento. A decodificação
+    domina o custo; a vazão de referência é DECODE_PIXELS_PER_SECOND.
+    """
+    fps = probe.get("fps") or 0
+    gop = probe.get("keyframe_interval") or 0
+    if output_specs or mode in ("select", "dedupe", "scene"):
+        decoded_frames = probe["duration"] * fps
+    elif mode == "seek":
+        # Cada busca decodifica, em média, meio GOP a partir do keyframe anterior
+        decoded_frames = planned_frames * max(1, gop * fps / 2)
+    else:
+        decoded_frames = probe["duration"] / gop if gop else planned_frames
+    pixels = (probe.get("width") or 0) * (probe.get("height") or 0)
+    return {
+        "decoded_frames": int(decoded_frames),
+        "estimated_seconds": round(decoded_frames * pixels / settings.DECODE_PIXELS_PER_SECOND, 1),
+    }
+
+# Bytes por pixel de um frame típico em cada formato de saída (estimativa conservadora)
+_BYTES_PER_PIXEL = {"jpg": 0.3, "webp": 0.2, "png": 1.5}
+
+def estimate_frame_bytes(probe, planned_frames, output_options=None, output_specs=None) -> int:
+    """
+    Volume previsto dos frames em disco, usado na reserva do espaço de trabalho.
+    No modo scene, sem previsão de frames, considera um frame por segundo.
+    """
+    width, height = probe.get("width") or 0, probe.get("height") or 0
+    if not width or not height:
+        return 0
+    if output_specs:
+        total = 0
+        for spec in output_specs:
+            spec = OutputSpec(**spec) if isinstance(spec, dict) else spec
+            frames = len(compute_timestamps(probe["duration"], spec.interval))
+            spec_width, spec_height = scaled_frame_size(width, height, spec)
+            total += frames * spec_width * spec_height * _BYTES_PER_PIXEL[spec.format]
+        return int(total)
+    output = OutputOptions(**output_options) if isinstance(output_options, dict) else output_options or OutputOptions()
+    frames = planned_frames if planned_frames is not None else math.ceil(probe["duration"])
+    output_width, output_height = scaled_frame_size(width, height, output)
+    return int(frames * output_width * output_height * _BYTES_PER_PIXEL[output.format])
+
+def preflight_video(video_path, interval=None, mode="auto", timestamps=None, output_specs=None,
+                    output_options=None) -> dict:
+    """
+    Analisa o vídeo com o ffprobe antes da extração e recusa entradas inutilizáveis
+    (arquivo corrompido, sem stream de vídeo ou mais curto que o intervalo).
+    Retorna o probe, o modo planejado, a quantidade de frames prevista, o custo
+    estimado e o volume previsto dos frames em disco.
+    """
+    try:
+        probe = probe_video(video_path)
+    except ffmpeg.Error:
+        raise HTTPException(status_code=422, detail="Arquivo de vídeo inválido ou corrompido.")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    duration = probe["duration"]
+    if duration <= 0:
+        raise HTTPException(status_code=422, detail="Não foi possível obter a duração do vídeo.")
+
+    intervals = [spec["interval"] for spec in output_specs] if output_specs else [interval]
+    if not timestamps and intervals != [None] and min(intervals) > duration:
+        raise HTTPException(
+            status_code=422,
+            detail=f"O vídeo ({duration:g}s) é mais curto que o intervalo informado ({min(intervals)}s)."
+        )
+
+    if timestamps:
+        mode = "seek"
+    elif output_specs:
+        mode = "fanout"
+    elif mode == "auto":
+        mode = choose_extraction_mode(interval, probe)
+
+    planned_frames = plan_frame_count(probe, interval, mode, timestamps, output_specs)
+    if not planned_frames and mode != "scene":
+        raise HTTPException(status_code=422, detail="Nenhum frame seria extraído com os parâmetros informados.")
+
+    return {
+        "probe": probe,
+        "extraction_mode": mode,
+        "planned_frames": planned_frames,
+        **estimate_cost(probe, mode, planned_frames, output_specs),
+        "scratch_bytes": estimate_frame_bytes(probe, planned_frames, output_options, output_specs),
+    }
+
+_SHOWINFO_PTS_TIME = re.compile(rb"pts_time:\s*(-?[\d.]+)")
+
+def _frame_sort_key(name: str):
+    digits = re.findall(r"\d+", name)
+    return (int(digits[-1]) if digits else 0, name)
+
+def apply_output_filters(stream, output: OutputOptions):
+    """
+    Acrescenta ao grafo de filtros a redução de resolução e a conversão para tons
+    de cinza. Aplicados depois do select, só os frames mantidos são processados.
+    """
+    if output.max_width and output.max_height:
+        stream = stream.filter(
+            "scale",
+            w=f"min(iw,{output.max_width})",
+            h=f"min(ih,{output.max_height})",
+            force_original_aspect_ratio="decrease",
+        )
+    elif output.max_width:
+        stream = stream.filter("scale", w=f"min(iw,{output.max_width})", h=-2)
+    elif output.max_height:
+        stream = stream.filter("scale", w=-2, h=f"min(ih,{output.max_height})")
+    if output.grayscale:
+        stream = stream.filter("format", "gray")
+    return stream
+
+def encoder_options(output: OutputOptions, quality=None) -> dict:
+    """Parâmetros do encoder do ffmpeg para o formato e a qualidade (1 a 100)."""
+    quality = quality if quality is not None else output.quality
+    if output.format == "png":
+        # PNG é sem perdas: a qualidade não se aplica
+        return {"vcodec": "png"}
+    if output.format == "webp":
+        return {"vcodec": "libwebp", "quality": quality if quality is not None else 75}
+    options = {"vcodec": "mjpeg"}
+    if quality is not None:
+        # Escala do mjpeg: 2 (melhor) a 31 (pior)
+        options["q:v"] = round(31 - (quality - 1) * 29 / 99)
+    return options
+
+def _start_ffmpeg(stream, pipe_stdout: bool = True, report_progress: bool = True):
+    """
+    Inicia o ffmpeg com -progress no stderr, em uma sessão própria para que o
+    cancelamento do job encerre o grupo de processos. Uma thread lê o stderr em
+    paralelo (o ffmpeg não trava com o pipe cheio) e encaminha o progresso ao
+    job atual (se 'report_progress'); o restante do stderr fica em
+    'stderr_chunks' ao final da thread.
+    """
+    control = current_job_control()
+    if control is not None:
+        control.check()
+    process = subprocess.Popen(
+        stream.global_args("-progress", "pipe:2", "-nostats").compile(),
+        stdout=subprocess.PIPE if pipe_stdout else None,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+    )
+    if control is not None:
+        control.register(process)
+    progress = current_progress() if report_progress else None
+    stderr_chunks = []
+    stderr_reader = threading.Thread(
+        target=lambda: stderr_chunks.append(read_ffmpeg_stderr(process.stderr, id(process), progress))
+    )
+    stderr_reader.start()
+    return process, stderr_reader, stderr_chunks
+
+def _wait_ffmpeg(process, stderr_reader, stderr_chunks) -> bytes:
+    """
+    Aguarda o fim do ffmpeg e retorna o stderr. Se o job foi interrompido, levanta
+    JobCancelledError no lugar do erro do processo encerrado.
+    """
+    process.wait()
+    stderr_reader.join()
+    control = current_job_control()
+    if control is not None:
+        control.unregister(process)
+        control.check()
+    return b"".join(stderr_chunks)
+
+def _run_ffmpeg(stream, report_progress: bool = True):
+    """Equivalente a .run(capture_stdout=True, capture_stderr=True), com progresso e cancelamento."""
+    process, stderr_reader, stderr_chunks = _start_ffmpeg(stream, report_progress=report_progress)
+    try:
+        stdout = process.stdout.read()
+    finally:
+        stderr = _wait_ffmpeg(process, stderr_reader, stderr_chunks)
+    if process.returncode != 0:
+        raise ffmpeg.Error("ffmpeg", stdout, stderr)
+    return stdout, stderr
+
+def _run_to_frames_dir(stream, frames_dir, output: OutputOptions = None) -> list:
+    """
+    Grava os frames selecionados em 'frames_dir' e retorna os timestamps de cada
+    frame, lidos da saída do filtro showinfo.
+    """
+    output = output or OutputOptions()
+    output_pattern = os.path.join(frames_dir, f"frame_%04d.{output.format}")
+    _, stderr = _run_ffmpeg(
+        apply_output_filters(stream, output)
+        .filter("showinfo")
+        .output(output_pattern, vsync="vfr", format="image2", **encoder_options(output))
+    )
+    return [round(float(value), 3) for value in _SHOWINFO_PTS_TIME.findall(stderr or b"")]
+
+def iter_jpeg_frames(pipe, chunk_size: int = 64 * 1024):
+    """
+    Separa os JPEGs de um stream MJPEG (image2pipe) pelos marcadores SOI/EOI,
+    devolvendo cada frame assim que ele termina de chegar.
+    """
+    buffer = bytearray()
+    scan_from = 0
+    while True:
+        chunk = pipe.read(chunk_size)
+        if not chunk:
+            return
+        buffer += chunk
+        while True:
+            start = buffer.find(b"\xff\xd8")
+            if start < 0:
+                # Mantém o último byte, que pode ser o início de um marcador
+                del buffer[:-1]
+                scan_from = 0
+                break
+            end = buffer.find(b"\xff\xd9", max(start + 2, scan_from))
+            if end < 0:
+                del buffer[:start]
+                scan_from = max(0, len(buffer) - 1)
+                break
+            yield bytes(buffer[start:end + 2])
+            del buffer[:end + 2]
+            scan_from = 0
+
+def _read_exactly(pipe, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = pipe.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return bytes(data)
+
+def iter_webp_frames(pipe):
+    """Separa os arquivos WebP de um stream pelo tamanho do cabeçalho RIFF."""
+    while True:
+        header = _read_exactly(pipe, 8)
+        if len(header) < 8:
+            return
+        size = int.from_bytes(header[4:8], "little")
+        yield header + _read_exactly(pipe, size + (size & 1))
+
+def iter_png_frames(pipe):
+    """Separa os arquivos PNG de um stream percorrendo os chunks até o IEND."""
+    while True:
+        frame = bytearray(_read_exactly(pipe, 8))
+        if len(frame) < 8:
+            return
+        while True:
+            chunk_header = _read_exactly(pipe, 8)
+            if len(chunk_header) < 8:
+                return
+            length = int.from_bytes(chunk_header[:4], "big")
+            frame += chunk_header + _read_exactly(pipe, length + 4)
+            if chunk_header[4:8] == b"IEND":
+                break
+        yield bytes(frame)
+
+def iter_image_frames(pipe, image_format: str = "jpg"):
+    if image_format == "png":
+        return iter_png_frames(pipe)
+    if image_format == "webp":
+        return iter_webp_frames(pipe)
+    return iter_jpeg_frames(pipe)
+
+def _pipe_to_archive(stream, archive, output: OutputOptions = None) -> list:
+    """
+    Recebe os frames do ffmpeg por pipe e grava cada um direto no arquivo .zip,
+    sem diretório de frames em disco. Retorna os timestamps dos frames.
+    """
+    output = output or OutputOptions()
+    process, stderr_reader, stderr_chunks = _start_ffmpeg(
+        apply_output_filters(stream, output)
+        .filter("showinfo")
+        .output("pipe:", format="image2pipe", vsync="vfr", **encoder_options(output))
+    )
+    try:
+        for frame_number, frame in enumerate(iter_image_frames(process.stdout, output.format), start=1):
+            archive.writestr(f"frame_{frame_number:04d}.{output.format}", frame)
+    finally:
+        process.stdout.close()
+        stderr = _wait_ffmpeg(process, stderr_reader, stderr_chunks)
+
+    if process.returncode != 0:
+        raise ffmpeg.Error("ffmpeg", None, stderr)
+    return [round(float(value), 3) for value in _SHOWINFO_PTS_TIME.findall(stderr)]
+
+def _archive_frames_dir(frames_dir, archive, prefix: str = ""):
+    """Adiciona ao .zip os frames gravados em disco, removendo cada um em seguida."""
+    for frame in sorted(os.listdir(frames_dir), key=_frame_sort_key):
+        frame_path = os.path.join(frames_dir, frame)
+        archive.write(frame_path, arcname=f"{prefix}{frame}")
+        os.remove(frame_path)
+
+def _select_stream(video_path, interval):
+    return (
+        ffmpeg
+        .input(video_path, fflags="+genpts")
+        .filter("select", f"not(mod(t,{interval}))")
+    )
+
+def _keyframes_stream(video_path, interval):
+    stream = ffmpeg.input(video_path, skip_frame="nokey", an=None)
+    if interval:
+        stream = stream.filter("select", f"isnan(prev_selected_t)+gte(t-prev_selected_t,{interval})")
+    return stream
+
+def _scene_stream(video_path, threshold):
+    # O primeiro frame sempre entra; os demais quando o score de cena passa do limiar
+    return ffmpeg.input(video_path).filter("select", f"eq(n,0)+gt(scene,{threshold})")
+
+def extract_frames_by_select(video_path, interval, frames_dir, output: OutputOptions = None) -> list:
+    """Decodifica o vídeo inteiro e mantém um frame a cada 'interval' segundos."""
+    return _run_to_frames_dir(_select_stream(video_path, interval), frames_dir, output)
+
+def extract_frames_by_keyframes(video_path, interval, frames_dir, output: OutputOptions = None) -> list:
+    """
+    Decodifica apenas os keyframes (-skip_frame nokey), sem ler o áudio, e emite
+    keyframes espaçados de pelo menos 'interval' segundos.
+    """
+    return _run_to_frames_dir(_keyframes_stream(video_path, interval), frames_dir, output)
+
+def extract_frames_by_dedupe(video_path, interval, threshold, frames_dir, output: OutputOptions = None):
+    """
+    Extrai um frame a cada 'interval' segundos e descarta os quase iguais ao último
+    frame mantido. Na mesma decodificação, o ffmpeg grava os frames candidatos e
+    envia pelo stdout uma miniatura 16x16 em tons de cinza de cada um, comparadas
+    em lote com NumPy. Retorna os timestamps mantidos e as estatísticas.
+    """
+    output = output or OutputOptions()
+    deduplicator = FrameDeduplicator(threshold)
+    candidates = _select_stream(video_path, interval).filter("showinfo").filter_multi_output("split", 2)
+    frames = (
+        apply_output_filters(candidates.stream(0), output)
+        .output(os.path.join(frames_dir, f"frame_%04d.{output.format}"), vsync="vfr", format="image2",
+                **encoder_options(output))
+    )
+    signatures = (
+        candidates.stream(1)
+        .filter("scale", SIGNATURE_SIZE, SIGNATURE_SIZE)
+        .filter("format", "gray")
+        .output("pipe:", format="rawvideo", vsync="vfr")
+    )
+    stdout, stderr = _run_ffmpeg(ffmpeg.merge_outputs(frames, signatures))
+    candidate_timestamps = [round(float(value), 3) for value in _SHOWINFO_PTS_TIME.findall(stderr or b"")]
+    mask = deduplicator.keep_mask(signatures_from_raw(stdout or b""))
+
+    # Remove os descartados e renumera os mantidos em sequência
+    kept_timestamps = []
+    for index, name in enumerate(sorted(os.listdir(frames_dir), key=_frame_sort_key)):
+        frame_path = os.path.join(frames_dir, name)
+        if index < len(mask) and mask[index] and index < len(candidate_timestamps):
+            kept_timestamps.append(candidate_timestamps[index])
+            os.replace(frame_path, os.path.join(frames_dir, f"frame_{len(kept_timestamps):04d}.{output.format}"))
+        else:
+            os.remove(frame_path)
+    return kept_timestamps, deduplicator.stats()
+
+def _extract_seek_batch(video_path, batch, frames_dir, output: OutputOptions):
+    # Um único ffmpeg com um input por timestamp, cada um com -ss antes do -i
+    outputs = [
+        apply_output_filters(ffmpeg.input(video_path, ss=timestamp), output)
+        .output(
+            os.path.join(frames_dir, f"frame_{index:04d}.{output.format}"),
+            vframes=1, format="image2", **encoder_options(output)
+        )
+        for index, timestamp in batch
+    ]
+    _run_ffmpeg(ffmpeg.merge_outputs(*outputs))
+
+def extract_frames_by_seek(video_path, timestamps, frames_dir, batch_size: int = settings.SEEK_BATCH_SIZE,
+                           parallelism: int = settings.SEEK_PARALLELISM, output: OutputOptions = None):
+    """
+    Extrai um frame por timestamp usando busca no input, sem decodificar o vídeo
+    inteiro. Os timestamps são agrupados em lotes executados em paralelo.
+    """
+    output = output or OutputOptions()
+    indexed = list(enumerate(timestamps, start=1))
+    batches = [indexed[i:i + batch_size] for i in range(0, len(indexed), batch_size)]
+    with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+        # Cada lote roda com uma cópia do contexto, para reportar o progresso do job
+        futures = [
+            executor.submit(contextvars.copy_context().run, _extract_seek_batch, video_path, batch, frames_dir, output)
+            for batch in batches
+        ]
+        for future in futures:
+            future.result()
+
+    # Timestamps além do fim do vídeo não geram arquivo
+    return [
+        timestamp for index, timestamp in indexed
+        if os.path.exists(os.path.join(frames_dir, f"frame_{index:04d}.{output.format}"))
+    ]
+
+def plan_segments(duration: float, interval: float, parallelism: int) -> list:
+    """
+    Divide [0, duration) em até 'parallelism' segmentos cujos limites são múltiplos
+    do intervalo, para que nenhum frame fique duplicado ou perdido nas fronteiras.
+    """
+    steps = max(1, math.ceil(duration / interval))
+    steps_per_segment = math.ceil(steps / max(1, parallelism))
+    segment_length = steps_per_segment * interval
+    segments = []
+    start = 0
+    while start < duration:
+        segments.append((start, min(start + segment_length, duration)))
+        start += segment_length
+    return segments
+
+def _extract_select_segment(video_path, interval, start, end, segment_dir, output: OutputOptions = None) -> list:
+    # -copyts mantém os timestamps originais, então 't' no filtro é absoluto
+    stream = (
+        ffmpeg
+        .input(video_path, ss=start, t=end - start + 1, copyts=None, fflags="+genpts")
+        .filter("select", f"gte(t,{start})*lt(t,{end})*not(mod(t,{interval}))")
+    )
+    return _run_to_frames_dir(stream, segment_dir, output)
+
+def extract_frames_by_segments(video_path, interval, duration, frames_dir,
+                               parallelism: int = None, output: OutputOptions = None) -> list:
+    """
+    Extrai os frames em paralelo, com um ffmpeg por segmento de tempo, e junta os
+    resultados em uma única sequência frame_%04d em 'frames_dir'.
 
-            # Criar o arquivo .zip com os frames
-            zip_filename = f"frames_{str(uuid.uuid4())}.zip"
-            zip_path = os.path.join(temp_dir, zip_filename)
-            with zipfile.ZipFile(zip_path, "w") as zipf:
-                for frame in sorted(frames):
-                    zipf.write(os.path.join(frames_dir, frame), arcname=frame)
+    Por padrão usa SEGMENT_PARALLELISM ou os núcleos de cada worker de extração,
+    para que os jobs simultâneos somem cerca das CPUs do container.
+    """
+    parallelism = parallelism or settings.SEGMENT_PARALLELISM or get_cpus_per_worker(
+        settings.EXTRACTION_WORKERS or get_default_worker_count()
+    )
+    segments = plan_segments(duration, interval, parallelism)
+    segment_dirs = []
+    for index in range(len(segments)):
+        segment_dir = os.path.join(frames_dir, f"segment_{index:03d}")
+        os.makedirs(segment_dir, exist_ok=True)
+        segment_dirs.append(segment_dir)
 
-            # Fazer upload do arquivo .zip para o S3
-            # bucket_name = settings.AWS_S3_BUCKET_NAME
-            object_key = f"{username}/{zip_filename}"
-            file_url = upload_to_s3(zip_path, object_key)
+    with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, _extract_select_segment,
+                            video_path, interval, start, end, segment_dir, output)
+            for (start, end), segment_dir in zip(segments, segment_dirs)
+        ]
+        segment_timestamps = [future.result() for future in futures]
 
-            user = get_user_by_username(username)
+    # Renumera os frames na ordem dos segmentos
+    frame_timestamps = []
+    frame_number = 1
+    for segment_dir, timestamps in zip(segment_dirs, segment_timestamps):
+        for name in sorted(os.listdir(segment_dir), key=_frame_sort_key):
+            extension = os.path.splitext(name)[1]
+            os.replace(os.path.join(segment_dir, name), os.path.join(frames_dir, f"frame_{frame_number:04d}{extension}"))
+            frame_number += 1
+        os.rmdir(segment_dir)
+        frame_timestamps.extend(timestamps)
+    return frame_timestamps
 
-            real_email = decrypt_email_hash(user["email_hash"], user["email"])
+def _encoded_frame_size(video_path, timestamp, output: OutputOptions, quality) -> int:
+    # Codificação de teste: cancelável como as demais, mas fora do progresso do job
+    stdout, _ = _run_ffmpeg(
+        apply_output_filters(ffmpeg.input(video_path, ss=timestamp), output)
+        .output("pipe:", vframes=1, format="image2pipe", **encoder_options(output, quality)),
+        report_progress=False,
+    )
+    return len(stdout)
 
-            background_tasks.add_task(send_file_url_email_ses, real_email, user["username"], file_url)
+def search_quality(encoded_size, target_bytes: int) -> int:
+    """
+    Busca binária pela maior qualidade (1 a 100) em que 'encoded_size(quality)',
+    o tamanho do frame de amostra codificado, cabe em 'target_bytes'.
+    """
+    low, high, best = 1, 100, 1
+    while low <= high:
+        quality = (low + high) // 2
+        if encoded_size(quality) <= target_bytes:
+            best = quality
+            low = quality + 1
+        else:
+            high = quality - 1
+    return best
 
-            # Retornar o URL do arquivo salvo
-            return file_url
-    except HTTPException as e:
-        raise e
+def choose_quality_for_target(video_path, output: OutputOptions, target_bytes: int, sample_time: float = 0) -> int:
+    """
+    Maior qualidade em que um frame de amostra, com os mesmos filtros e formato
+    da saída, cabe em 'target_bytes'.
+    """
+    return search_quality(lambda quality: _encoded_frame_size(video_path, sample_time, output, quality), target_bytes)
+
+def extract_frames(video_path, work_dir, archive, interval, mode="auto", timestamps=None, output: OutputOptions = None,
+                   probe=None, threshold=None):
+    """
+    Extrai os frames com a estratégia adequada e os grava no arquivo .zip 'archive'.
+    Os modos de ffmpeg único enviam os frames por pipe; os demais usam 'work_dir'.
+    O probe da análise prévia, se informado, é reaproveitado. Os modos dedupe e
+    scene usam 'threshold' e gravam também o manifest.json com os frames mantidos.
+    Retorna o modo usado e os timestamps dos frames gerados.
+    """
+    output = output or OutputOptions()
+    if timestamps:
+        mode = "seek"
+
+    if probe is None and not timestamps and mode != "keyframes":
+        try:
+            probe = probe_video(video_path)
+        except Exception as e:
+            print(f"Não foi possível analisar o vídeo com o ffprobe: {e}")
+
+    if mode == "auto":
+        mode = choose_extraction_mode(interval, probe)
+
+    if output.target_frame_bytes:
+        # Amostra no meio do vídeo, onde o conteúdo costuma ser representativo
+        sample_time = probe["duration"] / 2 if probe and probe.get("duration") else (timestamps or [0])[0]
+        quality = choose_quality_for_target(video_path, output, output.target_frame_bytes, sample_time)
+        print(f"Qualidade {quality} escolhida para {output.target_frame_bytes} bytes por frame.")
+        output = output.model_copy(update={"quality": quality})
+
+    if mode == "scene":
+        threshold = threshold or settings.SCENE_THRESHOLD
+        frame_timestamps = _pipe_to_archive(_scene_stream(video_path, threshold), archive, output)
+        write_frame_manifest(archive, mode, frame_timestamps, output.format, threshold=threshold)
+        return mode, frame_timestamps
+
+    segmented = mode == "select" and probe and probe["duration"] >= settings.SEGMENT_MIN_DURATION
+    if mode in ("select", "keyframes") and not segmented and settings.FRAME_PIPELINE:
+        stream = _keyframes_stream(video_path, interval) if mode == "keyframes" else _select_stream(video_path, interval)
+        return mode, _pipe_to_archive(stream, archive, output)
+
+    frames_dir = os.path.join(work_dir, "frames")
+    os.makedirs(frames_dir, exist_ok=True)
+
+    if mode == "dedupe":
+        frame_timestamps, stats = extract_frames_by_dedupe(
+            video_path, interval, threshold or settings.DEDUPE_THRESHOLD, frames_dir, output
+        )
+        _archive_frames_dir(frames_dir, archive)
+        write_frame_manifest(archive, mode, frame_timestamps, output.format, interval=interval, **stats)
+        return mode, frame_timestamps
+
+    if mode == "seek":
+        if not timestamps:
+            if not probe:
+                raise HTTPException(status_code=500, detail="Não foi possível obter a duração do vídeo.")
+            timestamps = compute_timestamps(probe["duration"], interval)
+        frame_timestamps = extract_frames_by_seek(video_path, timestamps, frames_dir, output=output)
+    elif mode == "keyframes":
+        frame_timestamps = extract_frames_by_keyframes(video_path, interval, frames_dir, output)
+    elif segmented:
+        # Vídeos longos: um ffmpeg por segmento, em paralelo
+        frame_timestamps = extract_frames_by_segments(video_path, interval, probe["duration"], frames_dir, output=output)
+    else:
+        frame_timestamps = extract_frames_by_select(video_path, interval, frames_dir, output)
+
+    _archive_frames_dir(frames_dir, archive)
+    return mode, frame_timestamps
+
+_FILTER_SEGMENT = re.compile(r"^((?:\[[^\]]*\])*)([\w@]+)(?:=.*?)?((?:\[[^\]]*\])*)$")
+_FILTER_LABEL = re.compile(r"\[([^\]]*)\]")
+_SHOWINFO_LINE = re.compile(rb"\[Parsed_showinfo_(\d+)[^\]]*\][^\n]*?pts_time:\s*(-?[\d.]+)")
+
+def _showinfo_index_by_output(args, output_paths) -> dict:
+    """
+    Descobre, para cada arquivo de saída, a posição do showinfo do seu ramo no
+    grafo de filtros. O ffmpeg nomeia cada filtro como Parsed_<nome>_<posição>,
+    o que permite separar no stderr os timestamps de cada saída.
+    """
+    graph = args[args.index("-filter_complex") + 1]
+    producers = {}
+    for index, segment in enumerate(graph.split(";")):
+        match = _FILTER_SEGMENT.match(segment)
+        inputs = _FILTER_LABEL.findall(match.group(1))
+        for label in _FILTER_LABEL.findall(match.group(3)):
+            producers[label] = (index, match.group(2), inputs)
+
+    indexes = {}
+    mapped_label = None
+    for position, arg in enumerate(args):
+        if arg == "-map":
+            mapped_label = args[position + 1].strip("[]")
+        elif arg in output_paths:
+            # Sobe pelo ramo a partir do rótulo mapeado até encontrar o showinfo
+            label = mapped_label
+            while label in producers:
+                index, name, inputs = producers[label]
+                if name == "showinfo":
+                    indexes[arg] = index
+                    break
+                label = inputs[0] if inputs else None
+    return indexes
+
+def _tile_spec(spec: OutputSpec) -> OutputSpec:
+    # Miniaturas das grades usam a largura padrão quando nenhuma dimensão é informada
+    if spec.kind != "frames" and not spec.max_width and not spec.max_height:
+        return spec.model_copy(update={"max_width": settings.THUMBNAIL_WIDTH})
+    return spec
+
+def extract_fanout(video_path, specs, work_dir) -> list:
+    """
+    Gera todas as saídas com uma única decodificação: o vídeo passa por um filtro
+    split e cada ramo aplica o seu select, escala e formato. Saídas do tipo
+    contact_sheet e sprite agrupam as miniaturas com o filtro tile.
+    Retorna, para cada saída, o diretório gerado e os timestamps dos frames.
+    """
+    source = ffmpeg.input(video_path, fflags="+genpts")
+    branches = source.filter_multi_output("split", len(specs)) if len(specs) > 1 else None
+
+    outputs = []
+    results = []
+    for index, spec in enumerate(specs):
+        spec = _tile_spec(spec)
+        spec_dir = os.path.join(work_dir, f"output_{index:02d}")
+        os.makedirs(spec_dir, exist_ok=True)
+
+        stream = branches.stream(index) if branches else source
+        stream = stream.filter("select", f"not(mod(t,{spec.interval}))")
+        stream = apply_output_filters(stream, spec).filter("showinfo")
+        if spec.kind == "frames":
+            pattern = os.path.join(spec_dir, f"frame_%04d.{spec.format}")
+        else:
+            spacing = {"margin": 4, "padding": 4} if spec.kind == "contact_sheet" else {}
+            stream = stream.filter("tile", f"{spec.columns}x{spec.rows}", **spacing)
+            pattern = os.path.join(spec_dir, f"sheet_%03d.{spec.format}")
+        outputs.append(stream.output(pattern, vsync="vfr", format="image2", **encoder_options(spec)))
+        results.append({"spec": spec, "dir": spec_dir, "pattern": pattern, "frame_timestamps": []})
+
+    command = ffmpeg.merge_outputs(*outputs)
+    showinfo_indexes = _showinfo_index_by_output(command.get_args(), {result["pattern"] for result in results})
+    _, stderr = _run_ffmpeg(command)
+
+    timestamps_by_filter = {}
+    for filter_index, value in _SHOWINFO_LINE.findall(stderr or b""):
+        timestamps_by_filter.setdefault(int(filter_index), []).append(round(float(value), 3))
+    for result in results:
+        result["frame_timestamps"] = timestamps_by_filter.get(showinfo_indexes.get(result["pattern"]), [])
+    return results
+
+def scaled_frame_size(width, height, output: OutputOptions):
+    """Dimensões de um frame depois do filtro de escala de apply_output_filters."""
+    if output.max_width and output.max_height:
+        ratio = min(1, output.max_width / width, output.max_height / height)
+        return int(width * ratio), int(height * ratio)
+    if output.max_width:
+        scaled_width = min(width, output.max_width)
+        return scaled_width, round(height * scaled_width / width / 2) * 2
+    if output.max_height:
+        scaled_height = min(height, output.max_height)
+        return round(width * scaled_height / height / 2) * 2, scaled_height
+    return width, height
+
+def _vtt_time(seconds: float) -> str:
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+
+def build_sprite_vtt(frame_timestamps, spec: OutputSpec, frame_size, duration=None) -> str:
+    """
+    Gera o WebVTT que associa cada intervalo de tempo à miniatura correspondente
+    nas imagens sheet_NNN do sprite (fragmento #xywh).
+    """
+    width, height = frame_size
+    per_sheet = spec.columns * spec.rows
+    lines = ["WEBVTT", ""]
+    for position, start in enumerate(frame_timestamps):
+        if position + 1 < len(frame_timestamps):
+            end = frame_timestamps[position + 1]
+        else:
+            end = duration if duration and duration > start else start + spec.interval
+        sheet, cell = divmod(position, per_sheet)
+        x, y = (cell % spec.columns) * width, (cell // spec.columns) * height
+        lines.append(f"{_vtt_time(start)} --> {_vtt_time(end)}")
+        lines.append(f"sheet_{sheet + 1:03d}.{spec.format}#xywh={x},{y},{width},{height}")
+        lines.append("")
+    return "\n".join(lines)
+
+def _archive_fanout_result(result, archive, prefix: str = "", probe=None):
+    _archive_frames_dir(result["dir"], archive, prefix)
+    spec = result["spec"]
+    if spec.kind == "sprite" and probe and probe.get("width") and probe.get("height"):
+        frame_size = scaled_frame_size(probe["width"], probe["height"], spec)
+        vtt = build_sprite_vtt(result["frame_timestamps"], spec, frame_size, probe.get("duration"))
+        archive.writestr(f"{prefix}sprite.vtt", vtt)
+
+def _archive_key(username, archive_id=None, suffix: str = "") -> str:
+    """
+    Chave do .zip no S3. Com 'archive_id' (o id do job) a chave é determinística:
+    um job retomado por outro worker regrava o mesmo objeto em vez de criar outro.
+    """
+    return f"{username}/frames_{archive_id or str(uuid.uuid4())}{suffix}.zip"
+
+def _lookup_cached_result(video_path, video_sha256, cache_key_args, username, dest_key=None):
+    """Consulta o índice de resultados; falhas no índice não impedem o processamento."""
+    try:
+        video_sha256 = video_sha256 or file_sha256(video_path)
+        cache_key = build_result_cache_key(video_sha256, *cache_key_args)
+        return video_sha256, cache_key, get_cached_result(cache_key, username, dest_key)
+    except Exception as e:
+        print(f"Erro ao consultar o índice de resultados: {e}")
+        return video_sha256, None, None
+
+def process_video(video_path, interval, username, mode="auto", timestamps=None, video_sha256=None,
+                  output_options=None, probe=None, engine=None, threshold=None, archive_id=None) -> dict:
+    """
+    Extrai os frames do vídeo e grava o arquivo .zip direto no S3, enviando as
+    partes do multipart upload enquanto os frames são extraídos.
+    'engine' é a engine de extração (ver extraction_engine); sem ela, usa o ffmpeg.
+    'archive_id' fixa o nome do .zip (ver _archive_key).
+    Se o mesmo vídeo já foi processado com os mesmos parâmetros, reaproveita o
+    arquivo existente sem executar o ffmpeg.
+    Retorna a URL do arquivo salvo, o modo de extração usado e os timestamps dos frames.
+    """
+    output = OutputOptions(**(output_options or {}))
+    cache_key = None
+    if settings.RESULT_CACHE_ENABLED:
+        video_sha256, cache_key, cached = _lookup_cached_result(
+            video_path, video_sha256, (interval, mode, timestamps, output.model_dump(), threshold), username,
+            _archive_key(username, archive_id) if archive_id else None,
+        )
+        if cached:
+            return cached
+
+    try:
+        with scratch_space.work_dir() as temp_dir:
+            object_key = _archive_key(username, archive_id)
+
+            # Em caso de erro o multipart upload é cancelado ao sair do bloco
+            with S3MultipartWriter(object_key) as archive_stream:
+                with zipfile.ZipFile(archive_stream, "w") as zipf:
+                    extract = engine.extract if engine else extract_frames
+                    mode, frame_timestamps = extract(
+                        video_path, temp_dir, zipf, interval, mode, timestamps, output, probe, threshold
+                    )
+
+                    # Validar se os frames foram extraídos (o manifest.json não conta)
+                    if not any(name != MANIFEST_NAME for name in zipf.namelist()):
+                        raise HTTPException(status_code=500, detail="Nenhum frame foi extraído do vídeo.")
+
+                # Job interrompido durante a extração: o upload é cancelado ao sair do bloco
+                check_cancelled()
+                file_url = archive_stream.complete()
+
+            result = {
+                "file_url": file_url,
+                "extraction_mode": mode,
+                "frame_timestamps": frame_timestamps,
+                "cache_hit": False,
+            }
+    except (HTTPException, JobCancelledError):
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Erro durante o processamento: {str(e)}"
         )
+
+    if cache_key:
+        try:
+            store_result(cache_key, video_sha256, object_key, result)
+        except Exception as e:
+            print(f"Erro ao registrar o resultado no índice: {e}")
+
+    # Retornar o URL do arquivo salvo
+    return result
+
+def process_video_outputs(video_path, username, output_specs, combine_outputs=False, probe=None,
+                          archive_id=None) -> dict:
+    """
+    Gera várias saídas (intervalos, tamanhos, folhas de contato e sprites) com
+    uma única decodificação do vídeo. Cada saída vira um .zip próprio ou uma
+    pasta dentro de um .zip combinado.
+    """
+    specs = [OutputSpec(**spec) if isinstance(spec, dict) else spec for spec in output_specs]
+    try:
+        if probe is None:
+            try:
+                probe = probe_video(video_path)
+            except Exception as e:
+                print(f"Não foi possível analisar o vídeo com o ffprobe: {e}")
+
+        resolved = []
+        for spec in map(_tile_spec, specs):
+            if spec.target_frame_bytes:
+                sample_time = probe["duration"] / 2 if probe and probe.get("duration") else 0
+                quality = choose_quality_for_target(video_path, spec, spec.target_frame_bytes, sample_time)
+                spec = spec.model_copy(update={"quality": quality})
+            resolved.append(spec)
+
+        with scratch_space.work_dir() as temp_dir:
+            results = extract_fanout(video_path, resolved, temp_dir)
+            if not any(os.listdir(result["dir"]) for result in results):
+                raise HTTPException(status_code=500, detail="Nenhum frame foi extraído do vídeo.")
+
+            file_url = None
+            output_files = []
+            if combine_outputs:
+                object_key = _archive_key(username, archive_id)
+                with S3MultipartWriter(object_key) as archive_stream:
+                    with zipfile.ZipFile(archive_stream, "w") as zipf:
+                        for result in results:
+                            _archive_fanout_result(result, zipf, f"{result['spec'].name}/", probe)
+                    check_cancelled()
+                    file_url = archive_stream.complete()
+
+            for result in results:
+                output_url = file_url
+                if not combine_outputs:
+                    object_key = _archive_key(username, archive_id, f"_{result['spec'].name}" if archive_id else "")
+                    with S3MultipartWriter(object_key) as archive_stream:
+                        with zipfile.ZipFile(archive_stream, "w") as zipf:
+                            _archive_fanout_result(result, zipf, probe=probe)
+                        check_cancelled()
+                        output_url = archive_stream.complete()
+                output_files.append({
+                    "name": result["spec"].name,
+                    "kind": result["spec"].kind,
+                    "file_url": output_url,
+                    "frame_timestamps": result["frame_timestamps"],
+                })
+
+            return {
+                "file_url": file_url,
+                "extraction_mode": "fanout",
+                "frame_timestamps": None,
+                "output_files": output_files,
+                "cache_hit": False,
+            }
+    except (HTTPException, JobCancelledError):
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro durante o processamento: {str(e)}"
+        )
+
+def notify_file_ready(username, file_url, background_tasks=None):
+    """
+    Envia ao usuário o e-mail com o link do arquivo gerado.
+    Se background_tasks for informado, o envio é enfileirado.
+    """
+    user = get_user_by_username(username)
+
+    real_email = decrypt_email_hash(user["email_hash"], user["email"])
+
+    if background_tasks is not None:
+        background_tasks.add_task(send_file_url_email_ses, real_email, user["username"], file_url)
+    else:
+        send_file_url_email_ses(real_email, user["username"], file_url)
@@ -0,0 +1,99 @@
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from app.core.config import settings
+from app.domain.process_video_model import ProcessVideoInput, file_too_large_error
+from app.service.job_service import submit_saved_video_job, reject_when_queue_full, incoming_prefix
+from app.service.scratch_space_service import scratch_space
+from app.service.s3_service import (
+    create_presigned_upload, complete_presigned_multipart, abort_presigned_multipart,
+    head_s3_file, generate_presigned_download_url, delete_s3_file, list_incoming_objects,
+    list_incoming_multipart_uploads
+)
+
+def _check_ingest_key(key: str, username: str):
+    # O usuário só pode usar objetos enviados para o próprio prefixo de entrada
+    if not key.startswith(incoming_prefix(username)) or ".." in key:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+
+def _reject_oversized(key: str, size: int):
+    # O multipart não limita o tamanho de cada parte: o excesso só aparece no objeto montado
+    if size > settings.MAX_RESUMABLE_UPLOAD_SIZE:
+        delete_s3_file(key)
+        raise file_too_large_error(settings.MAX_RESUMABLE_UPLOAD_SIZE)
+
+def create_ingest(username: str, filename: str, size: int) -> dict:
+    """
+    Gera as URLs para o cliente enviar o vídeo direto ao S3, em
+    {username}/incoming/, sem que os bytes passem pela API.
+    """
+    ProcessVideoInput.validate_filename(filename)
+    if size > settings.MAX_RESUMABLE_UPLOAD_SIZE:
+        raise file_too_large_error(settings.MAX_RESUMABLE_UPLOAD_SIZE)
+
+    key = f"{incoming_prefix(username)}{str(uuid.uuid4())}/{os.path.basename(filename)}"
+    upload = create_presigned_upload(key, size, settings.INGEST_UPLOAD_URL_EXPIRATION)
+    return {"key": key, "size": size, "expires_in": settings.INGEST_UPLOAD_URL_EXPIRATION, **upload}
+
+def complete_ingest(username: str, key: str, upload_id: str, parts: list) -> dict:
+    _check_ingest_key(key, username)
+    complete_presigned_multipart(key, upload_id, sorted(parts, key=lambda part: part["part_number"]))
+    metadata = head_s3_file(key)
+    _reject_oversized(key, metadata["size"])
+    return {"key": key, **metadata}
+
+def abort_ingest(username: str, key: str, upload_id: str):
+    _check_ingest_key(key, username)
+    abort_presigned_multipart(key, upload_id)
+
+def submit_ingested_video_job(process_input, username: str, key: str, role: str = None) -> dict:
+    """
+    Agenda a extração de um vídeo já enviado ao S3. O ffmpeg lê o objeto por uma
+    URL pré-assinada (com requisições Range), sem baixar o arquivo antes.
+    """
+    _check_ingest_key(key, username)
+    reject_when_queue_full()
+
+    # O tamanho é conferido pelos metadados, antes de o vídeo ser lido
+    metadata = head_s3_file(key)
+    _reject_oversized(key, metadata["size"])
+
+    # O conteúdo não passa pela API, então a ETag identifica o vídeo no índice de
+    # resultados no lugar do SHA-256 (o mesmo conteúdo enviado em partes de tamanhos
+    # diferentes apenas deixa de ser reaproveitado)
+    video_sha256 = f"etag:{metadata['etag']}"
+    source_url = generate_presigned_download_url(key, settings.INGEST_READ_URL_EXPIRATION)
+
+    # O diretório do job guarda apenas os arquivos de trabalho da extração
+    job_dir = scratch_space.create_job_dir()
+    return submit_saved_video_job(
+        process_input, username, os.path.basename(key), job_dir, source_url, metadata["size"], video_sha256,
+        source_key=key, role=role,
+    )
+
+def sweep_stale_ingests() -> int:
+    """
+    Remove de {username}/incoming/ o que ficou para trás há mais de
+    INGEST_RETENTION_HOURS: multipart uploads não concluídos e vídeos enviados e
+    nunca processados (ou recusados no preflight). Os vídeos só são removidos
+    com INGEST_DELETE_AFTER_PROCESSING. Retorna quantos itens removeu.
+    """
+    older_than = datetime.now(timezone.utc) - timedelta(hours=settings.INGEST_RETENTION_HOURS)
+    removed = 0
+    for key, upload_id in list_incoming_multipart_uploads(older_than):
+        try:
+            abort_presigned_multipart(key, upload_id)
+            removed += 1
+        except HTTPException as e:
+            if e.status_code != 404:
+                print(f"Erro ao cancelar o upload de {key}: {e.detail}")
+    if not settings.INGEST_DELETE_AFTER_PROCESSING:
+        return removed
+    for key in list_incoming_objects(older_than):
+        try:
+            delete_s3_file(key)
+            removed += 1
+        except HTTPException as e:
+            print(f"Erro ao remover {key}: {e.detail}")
+    return removed
@@ -0,0 +1,166 @@
+import os
+import signal
+import threading
+import time
+import contextvars
+from contextlib import contextmanager
+from app.core.config import settings
+from app.domain.job_model import JobStatus
+from app.exceptions.job_cancelled_error import JobCancelledError
+
+# Motivos de interrupção de um job
+CANCELLED = "cancelled"
+TIMEOUT = "timeout"
+CPU_LIMIT = "cpu_limit"
+
+# Controle do job em execução no contexto atual (herdado pelas threads que copiam o contexto)
+_current_control = contextvars.ContextVar("job_control", default=None)
+
+# Jobs interrompidos por este processo
+_stats_lock = threading.Lock()
+_stats = {JobStatus.CANCELLED.value: 0, JobStatus.TIMED_OUT.value: 0}
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+def _cpu_seconds(stat_path: str):
+    """Tempo de CPU (usuário + sistema) lido de /proc; None fora do Linux ou se o processo já terminou."""
+    try:
+        with open(stat_path) as stat_file:
+            # Os campos após o nome do comando começam no 3º; utime e stime são o 14º e o 15º
+            fields = stat_file.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+    except (OSError, IndexError, ValueError):
+        return None
+
+def _kill_process_group(process):
+    # O ffmpeg é iniciado em uma sessão própria, então o grupo tem o mesmo id do processo
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+class JobControl:
+    """
+    Cancelamento e limites de execução de um job. Os processos do ffmpeg
+    iniciados no contexto do job são registrados para que o cancelamento
+    encerre o grupo de cada um; um watchdog aplica o limite de tempo total e o
+    de CPU (processos do ffmpeg + thread do job, medido a cada
+    JOB_WATCHDOG_INTERVAL). As threads do decodificador da engine pyav não
+    entram nessa conta.
+    """
+
+    def __init__(self, job_id: str, timeout=settings.JOB_TIMEOUT_SECONDS,
+                 cpu_time_limit=settings.JOB_CPU_TIME_LIMIT_SECONDS,
+                 watch_interval: float = settings.JOB_WATCHDOG_INTERVAL):
+        self.job_id = job_id
+        self.timeout = timeout
+        self.cpu_time_limit = cpu_time_limit
+        self.watch_interval = watch_interval
+        self.reason = None
+        self._lock = threading.Lock()
+        self._processes = {}
+        self._cpu_by_pid = {}
+        self._thread_stat = None
+        self._thread_cpu_start = 0.0
+        self._finished = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def message(self) -> str:
+        if self.reason == TIMEOUT:
+            return f"Tempo limite de {self.timeout}s excedido."
+        if self.reason == CPU_LIMIT:
+            return f"Limite de {self.cpu_time_limit}s de CPU excedido."
+        return "Job cancelado."
+
+    def cancel(self, reason: str = CANCELLED) -> bool:
+        """Interrompe o job e encerra os processos em andamento. Retorna False se já estava interrompido."""
+        with self._lock:
+            if self.reason is not None:
+                return False
+            self.reason = reason
+            processes = list(self._processes.values())
+        for process in processes:
+            _kill_process_group(process)
+        return True
+
+    def check(self):
+        """Levanta JobCancelledError se o job foi interrompido."""
+        if self.reason is not None:
+            raise JobCancelledError(self.message(), self.reason)
+
+    def register(self, process):
+        with self._lock:
+            self._processes[process.pid] = process
+            cancelled = self.reason is not None
+        # Cancelado entre a verificação e o início do processo
+        if cancelled:
+            _kill_process_group(process)
+
+    def unregister(self, process):
+        with self._lock:
+            self._processes.pop(process.pid, None)
+
+    def cpu_seconds(self) -> float:
+        """
+        CPU consumida pelo job: processos do ffmpeg (última medição de cada um)
+        e a thread do job.
+        """
+        with self._lock:
+            pids = list(self._processes)
+        for pid in pids:
+            seconds = _cpu_seconds(f"/proc/{pid}/stat")
+            if seconds is not None:
+                self._cpu_by_pid[pid] = seconds
+        total = sum(self._cpu_by_pid.values())
+        if self._thread_stat:
+            thread_seconds = _cpu_seconds(self._thread_stat)
+            if thread_seconds is not None:
+                total += thread_seconds - self._thread_cpu_start
+        return total
+
+    def _watch(self, started: float):
+        while not self._finished.wait(self.watch_interval):
+            if self.timeout and time.monotonic() - started > self.timeout:
+                self.cancel(TIMEOUT)
+                return
+            if self.cpu_time_limit and self.cpu_seconds() > self.cpu_time_limit:
+                self.cancel(CPU_LIMIT)
+                return
+
+    @contextmanager
+    def track(self):
+        """Associa o bloco (e os processos iniciados nele) ao job e aplica os limites durante a execução."""
+        self._thread_stat = f"/proc/self/task/{threading.get_native_id()}/stat"
+        self._thread_cpu_start = _cpu_seconds(self._thread_stat) or 0.0
+        token = _current_control.set(self)
+        watchdog = None
+        if self.timeout or self.cpu_time_limit:
+            watchdog = threading.Thread(target=self._watch, args=(time.monotonic(),), daemon=True)
+            watchdog.start()
+        try:
+            yield self
+        finally:
+            self._finished.set()
+            _current_control.reset(token)
+            if watchdog is not None:
+                watchdog.join()
+
+def current_job_control():
+    return _current_control.get()
+
+def check_cancelled():
+    """Ponto de interrupção: levanta JobCancelledError se o job atual foi interrompido."""
+    control = _current_control.get()
+    if control is not None:
+        control.check()
+
+def count_stopped_job(status: str):
+    with _stats_lock:
+        _stats[status] += 1
+
+def job_control_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
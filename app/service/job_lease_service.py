@@ -0,0 +1,104 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from app.core.config import settings
+from app.repository.job_repository import claim_job, renew_job_lease, finish_job
+
+class JobLeaseKeeper:
+    """
+    Mantém os leases dos jobs deste processo (na fila ou em execução) com um
+    heartbeat periódico no DynamoDB. Se o processo cair, os leases expiram e
+    qualquer worker pode retomar os jobs (ver recover_expired_jobs).
+    """
+
+    def __init__(self, worker_id: str, lease_seconds: int, heartbeat_interval: float):
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self._lock = threading.Lock()
+        self._owned = {}
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def claim(self, job_id: str, on_lost=None, count_attempt: bool = True):
+        """
+        Assume o lease do job (contando uma tentativa) e passa a renová-lo.
+        'on_lost' é chamado se o lease for perdido ou se outro processo pedir o
+        cancelamento. Retorna o job ou None se outro worker o detém.
+        """
+        job = claim_job(job_id, self.worker_id, self.lease_seconds, count_attempt)
+        if job is not None:
+            with self._lock:
+                self._owned[job_id] = on_lost
+        return job
+
+    def watch(self, job_id: str, on_lost=None):
+        """Passa a renovar o lease de um job registrado por este worker."""
+        with self._lock:
+            self._owned[job_id] = on_lost
+
+    def finish(self, job_id: str, **changes):
+        """Grava o status final do job e libera o lease."""
+        with self._lock:
+            self._owned.pop(job_id, None)
+        return finish_job(job_id, self.worker_id, **changes)
+
+    def release(self, job_id: str):
+        with self._lock:
+            self._owned.pop(job_id, None)
+
+    def heartbeat(self):
+        with self._lock:
+            owned = dict(self._owned)
+        for job_id, on_lost in owned.items():
+            try:
+                job = renew_job_lease(job_id, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                # Falha transitória: o lease ainda vale até expirar
+                print(f"Erro ao renovar o lease do job {job_id}: {e}")
+                continue
+            if job is None or job.get("cancel_requested"):
+                if job is None:
+                    print(f"Lease do job {job_id} perdido para outro worker.")
+                    self.release(job_id)
+                if on_lost is not None:
+                    on_lost()
+
+    def lease_expiration(self) -> int:
+        """Validade do lease de um job registrado agora por este worker."""
+        return int(time.time()) + self.lease_seconds
+
+    def _run(self, on_tick=None):
+        while not self._stopped.wait(self.heartbeat_interval):
+            self.heartbeat()
+            if on_tick is None:
+                continue
+            try:
+                on_tick()
+            except Exception as e:
+                print(f"Erro na retomada de jobs abandonados: {e}")
+
+    def start(self, on_tick=None):
+        """Inicia o heartbeat em segundo plano; 'on_tick' roda a cada ciclo (retomada de jobs)."""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, args=(on_tick,), name="job-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+# Identificador deste processo como worker (pod + pid)
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+job_leases = JobLeaseKeeper(
+    worker_id=WORKER_ID,
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+    heartbeat_interval=settings.JOB_HEARTBEAT_INTERVAL,
+)
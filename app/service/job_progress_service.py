@@ -0,0 +1,147 @@
+import re
+import json
+import time
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+from app.core.config import settings
+from app.domain.job_model import FINAL_JOB_STATUSES
+from app.repository.job_repository import get_job_by_id, update_job
+
+# Linhas "chave=valor" emitidas pelo ffmpeg com -progress
+PROGRESS_LINE = re.compile(rb"^([a-z0-9_]+)=(\S*)\s*$")
+
+# Progresso do job em execução no contexto atual (herdado pelas threads que copiam o contexto)
+_current_progress = contextvars.ContextVar("job_progress", default=None)
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class JobProgress:
+    """
+    Agrega o progresso informado pelos processos do ffmpeg de um job (vários, nos
+    modos seek e por segmentos) e grava no registro do job no máximo uma vez a
+    cada 'min_interval' segundos.
+    """
+
+    def __init__(self, job_id: str, planned_frames=None, duration=None,
+                 min_interval: float = settings.PROGRESS_MIN_INTERVAL):
+        self.job_id = job_id
+        self.planned_frames = planned_frames
+        self.duration = duration
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._processes = {}
+        self._speed = None
+        self._last_published = 0.0
+
+    def update(self, process_key, values: dict):
+        """Recebe um bloco de progresso (terminado por progress=continue|end) de um processo."""
+        out_time_us = _to_float(values.get("out_time_us") or values.get("out_time_ms"))
+        frames = _to_float(values.get("frame"))
+        speed = _to_float((values.get("speed") or "").rstrip("x"))
+        with self._lock:
+            state = self._processes.setdefault(process_key, {"frames": 0, "out_time": 0.0})
+            if frames is not None:
+                state["frames"] = int(frames)
+            if out_time_us is not None and out_time_us >= 0:
+                state["out_time"] = out_time_us / 1_000_000
+            if speed is not None:
+                self._speed = speed
+            now = time.monotonic()
+            if now - self._last_published < self.min_interval:
+                return
+            self._last_published = now
+            snapshot = self._snapshot()
+        try:
+            update_job(self.job_id, progress=snapshot)
+        except Exception as e:
+            # Chamado pela thread que drena o stderr do ffmpeg: uma falha aqui travaria o processo
+            print(f"Erro ao gravar o progresso do job {self.job_id}: {e}")
+
+    def _snapshot(self) -> dict:
+        frames = sum(state["frames"] for state in self._processes.values())
+        out_time = max((state["out_time"] for state in self._processes.values()), default=0.0)
+        if self.planned_frames:
+            percent = frames / self.planned_frames * 100
+        elif self.duration:
+            percent = out_time / self.duration * 100
+        else:
+            percent = None
+        return {
+            "frames": frames,
+            "out_time": round(out_time, 3),
+            "speed": self._speed,
+            "percent": round(min(percent, 99.9), 1) if percent is not None else None,
+        }
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return self._snapshot()
+
+@contextmanager
+def track_progress(job_id: str, planned_frames=None, duration=None):
+    """Associa os processos do ffmpeg iniciados dentro do bloco ao progresso do job."""
+    progress = JobProgress(job_id, planned_frames, duration)
+    token = _current_progress.set(progress)
+    try:
+        yield progress
+    finally:
+        _current_progress.reset(token)
+
+def current_progress():
+    return _current_progress.get()
+
+def read_ffmpeg_stderr(stderr, process_key, progress=None) -> bytes:
+    """
+    Lê o stderr do ffmpeg linha a linha, encaminhando os blocos de -progress ao
+    job e retornando o restante (showinfo e mensagens de erro).
+    """
+    chunks = []
+    values = {}
+    for line in iter(stderr.readline, b""):
+        match = PROGRESS_LINE.match(line)
+        if not match:
+            chunks.append(line)
+            continue
+        key, value = match.group(1).decode(), match.group(2).decode()
+        values[key] = value
+        if key == "progress":
+            if progress is not None:
+                progress.update(process_key, values)
+            values = {}
+    return b"".join(chunks)
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def job_event_stream(job_id: str, is_disconnected, poll_interval: float = settings.PROGRESS_MIN_INTERVAL,
+                           keepalive: float = settings.PROGRESS_KEEPALIVE_SECONDS):
+    """
+    Eventos Server-Sent Events do job: 'progress' quando o status ou o progresso
+    mudam (no máximo um por 'poll_interval') e o status final ('done', 'failed',
+    'cancelled' ou 'timed_out') antes de encerrar. Comentários periódicos mantêm a conexão aberta nos proxies.
+    """
+    last_sent = None
+    last_write = time.monotonic()
+    while not await is_disconnected():
+        # A leitura do DynamoDB é bloqueante: roda fora do event loop
+        job = await asyncio.to_thread(get_job_by_id, job_id)
+        if job is None:
+            return
+        data = {"job_id": job_id, "status": job["status"], "progress": job.get("progress")}
+        if job["status"] in FINAL_JOB_STATUSES:
+            yield _sse_event(job["status"], {**data, "file_url": job.get("file_url"), "error": job.get("error")})
+            return
+        if data != last_sent:
+            last_sent = data
+            last_write = time.monotonic()
+            yield _sse_event("progress", data)
+        elif time.monotonic() - last_write >= keepalive:
+            last_write = time.monotonic()
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(poll_interval)
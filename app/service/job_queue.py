@@ -0,0 +1,212 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from tempfile import gettempdir
+from app.core.config import settings
+from app.repository.sqs_repository import get_sqs_client, create_sqs_queue
+
+class JobQueue(ABC):
+    """
+    Interface das filas de jobs: a API publica uma mensagem por job e os workers
+    a recebem, confirmando com 'ack' depois de assumir o job. Uma mensagem
+    recebida e não confirmada volta para a fila (após 'nack' ou o prazo de
+    visibilidade), para que a queda de um worker não perca o job.
+    'shared' indica que a fila é vista por outros processos (workers separados):
+    nesse caso a mensagem não pode depender de arquivos locais da API.
+    """
+    name = None
+    shared = True
+
+    @abstractmethod
+    def send(self, body: dict):
+        pass
+
+    @abstractmethod
+    def receive(self, max_messages: int = 1, wait_seconds: float = 0) -> list:
+        """Retorna até 'max_messages' mensagens no formato {"receipt", "body"}."""
+
+    @abstractmethod
+    def ack(self, receipt):
+        pass
+
+    @abstractmethod
+    def nack(self, receipt):
+        pass
+
+    @abstractmethod
+    def depth(self) -> int:
+        """Mensagens aguardando um worker."""
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "depth": self.depth()}
+
+class InMemoryJobQueue(JobQueue):
+    """Fila no próprio processo, consumida pelos workers embutidos na API (desenvolvimento e testes)."""
+    name = "memory"
+    shared = False
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def send(self, body: dict):
+        self._queue.put(body)
+
+    def receive(self, max_messages: int = 1, wait_seconds: float = 0) -> list:
+        messages = []
+        try:
+            messages.append(self._queue.get(timeout=wait_seconds) if wait_seconds else self._queue.get_nowait())
+            while len(messages) < max_messages:
+                messages.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        # A própria mensagem serve de recibo
+        return [{"receipt": body, "body": body} for body in messages]
+
+    def ack(self, receipt):
+        pass
+
+    def nack(self, receipt):
+        self._queue.put(receipt)
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+class SqliteJobQueue(JobQueue):
+    """
+    Fila em um arquivo SQLite, compartilhada por processos na mesma máquina
+    (API e python -m app.worker em desenvolvimento, sem SQS).
+    """
+    name = "sqlite"
+
+    def __init__(self, path: str, visibility_timeout: int = 300, poll_interval: float = 0.5):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS job_messages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, body TEXT NOT NULL, visible_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # Uma conexão por operação: o sqlite3 não compartilha conexões entre threads
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def send(self, body: dict):
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO job_messages (body, visible_at) VALUES (?, ?)", (json.dumps(body), time.time())
+            )
+
+    def _receive_now(self, max_messages: int) -> list:
+        now = time.time()
+        with self._connect() as connection:
+            # BEGIN IMMEDIATE impede que dois workers recebam a mesma mensagem
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = connection.execute(
+                    "SELECT id, body FROM job_messages WHERE visible_at <= ? ORDER BY id LIMIT ?", (now, max_messages)
+                ).fetchall()
+                connection.executemany(
+                    "UPDATE job_messages SET visible_at = ? WHERE id = ?",
+                    [(now + self.visibility_timeout, row[0]) for row in rows],
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        return [{"receipt": row[0], "body": json.loads(row[1])} for row in rows]
+
+    def receive(self, max_messages: int = 1, wait_seconds: float = 0) -> list:
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            messages = self._receive_now(max_messages)
+            if messages or time.monotonic() >= deadline:
+                return messages
+            time.sleep(self.poll_interval)
+
+    def ack(self, receipt):
+        with self._connect() as connection:
+            connection.execute("DELETE FROM job_messages WHERE id = ?", (receipt,))
+
+    def nack(self, receipt):
+        with self._connect() as connection:
+            connection.execute("UPDATE job_messages SET visible_at = ? WHERE id = ?", (time.time(), receipt))
+
+    def depth(self) -> int:
+        with self._connect() as connection:
+            return connection.execute(
+                "SELECT COUNT(*) FROM job_messages WHERE visible_at <= ?", (time.time(),)
+            ).fetchone()[0]
+
+class SqsJobQueue(JobQueue):
+    """Fila no SQS: a profundidade da fila orienta o autoscaling dos workers."""
+    name = "sqs"
+
+    def __init__(self, queue_name: str, visibility_timeout: int = 300):
+        self.queue_name = queue_name
+        self.visibility_timeout = visibility_timeout
+        self._lock = threading.Lock()
+        self._queue_url = None
+
+    def queue_url(self) -> str:
+        # A fila é criada (ou localizada) no primeiro uso
+        with self._lock:
+            if self._queue_url is None:
+                self._queue_url = create_sqs_queue(self.queue_name)
+            return self._queue_url
+
+    def send(self, body: dict):
+        get_sqs_client().send_message(QueueUrl=self.queue_url(), MessageBody=json.dumps(body))
+
+    def receive(self, max_messages: int = 1, wait_seconds: float = 0) -> list:
+        response = get_sqs_client().receive_message(
+            QueueUrl=self.queue_url(),
+            # O SQS entrega no máximo 10 mensagens e espera no máximo 20s por chamada
+            MaxNumberOfMessages=max(1, min(max_messages, 10)),
+            WaitTimeSeconds=int(min(wait_seconds, 20)),
+            VisibilityTimeout=self.visibility_timeout,
+        )
+        return [
+            {"receipt": message["ReceiptHandle"], "body": json.loads(message["Body"])}
+            for message in response.get("Messages", [])
+        ]
+
+    def ack(self, receipt):
+        get_sqs_client().delete_message(QueueUrl=self.queue_url(), ReceiptHandle=receipt)
+
+    def nack(self, receipt):
+        get_sqs_client().change_message_visibility(
+            QueueUrl=self.queue_url(), ReceiptHandle=receipt, VisibilityTimeout=0
+        )
+
+    def depth(self) -> int:
+        response = get_sqs_client().get_queue_attributes(
+            QueueUrl=self.queue_url(), AttributeNames=["ApproximateNumberOfMessages"]
+        )
+        return int(response["Attributes"]["ApproximateNumberOfMessages"])
+
+def create_job_queue(backend: str = None) -> JobQueue:
+    """Cria a fila configurada em JOB_QUEUE_BACKEND (ou a informada)."""
+    backend = backend or settings.JOB_QUEUE_BACKEND
+    if backend == InMemoryJobQueue.name:
+        return InMemoryJobQueue()
+    if backend == SqliteJobQueue.name:
+        path = settings.JOB_QUEUE_SQLITE_PATH or os.path.join(gettempdir(), "frame-extractor-jobs.db")
+        return SqliteJobQueue(path, settings.JOB_QUEUE_VISIBILITY_TIMEOUT)
+    if backend == SqsJobQueue.name:
+        return SqsJobQueue(settings.JOB_QUEUE_NAME, settings.JOB_QUEUE_VISIBILITY_TIMEOUT)
+    raise ValueError(f"Fila de jobs desconhecida: {backend}. Use memory, sqlite ou sqs.")
+
+# Fila compartilhada pelo processo
+job_queue = create_job_queue()
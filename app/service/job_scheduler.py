@@ -0,0 +1,159 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from app.core.config import settings
+
+def estimate_job_cost(probe: dict = None, interval=None, planned_frames: int = None) -> float:
+    """
+    Custo relativo do job para o agendador: duração × resolução ÷ intervalo
+    (frames extraídos × megapixels). Sem intervalo (timestamps, saídas
+    múltiplas ou modo scene), usa os frames previstos no preflight.
+    """
+    probe = probe or {}
+    megapixels = (probe.get("width") or 0) * (probe.get("height") or 0) / 1_000_000 or 1.0
+    duration = probe.get("duration") or 0
+    frames = duration / interval if duration and interval else planned_frames or duration or 1
+    return round(max(frames, 1) * megapixels, 3)
+
+def _percentile(values, percentile: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, math.ceil(percentile * len(ordered)) - 1)], 3)
+
+class JobScheduler:
+    """
+    Ordem de execução dos jobs que aguardam um worker: weighted fair queuing
+    entre usuários e shortest-job-first dentro de cada usuário.
+
+    Cada usuário tem uma fila ordenada pelo custo e um tempo virtual de início,
+    fixado quando ele passa a ter jobs aguardando: max(V, término anterior do
+    usuário). O próximo job é o do usuário com o menor término, início + custo /
+    peso da role; assim um usuário com cinquenta vídeos grandes não impede que
+    os outros sejam atendidos, e um usuário que ficou ocioso não acumula
+    crédito. Dentro de um usuário, jobs curtos passam na frente.
+
+    Jobs com 'admit' só saem da fila quando a função aceita (por exemplo, quando
+    o espaço de trabalho dos frames foi reservado); enquanto isso os próximos
+    na ordem passam à frente.
+    """
+
+    def __init__(self, role_weights: dict = None, small_job_cost: float = None, history_size: int = 500):
+        self.role_weights = role_weights or {}
+        self.small_job_cost = small_job_cost
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._user_finish = {}
+        self._user_start = {}
+        self._virtual_time = 0.0
+        self._sequence = itertools.count()
+        self._dispatched = 0
+        self._waits = deque(maxlen=history_size)
+        self._small_waits = deque(maxlen=history_size)
+        self._user_waits = {}
+        self._decisions = deque(maxlen=20)
+
+    def weight(self, role: str = None) -> float:
+        return float(self.role_weights.get(role, 1.0)) or 1.0
+
+    def push(self, item, username: str = None, role: str = None, cost: float = None, job_id: str = None,
+             submitted_at: float = None, admit=None):
+        """
+        Enfileira 'item'. 'submitted_at' (epoch) é o envio do job, para que a
+        espera medida inclua o tempo na fila compartilhada. 'admit', se
+        informado, é chamado sem argumentos no momento do despacho e retorna
+        False enquanto o job não pode começar.
+        """
+        entry = {
+            "item": item,
+            "job_id": job_id,
+            "username": username or "",
+            "role": role,
+            "cost": cost if cost is not None else 1.0,
+            "submitted_at": submitted_at or time.time(),
+            "admit": admit,
+        }
+        with self._lock:
+            username = entry["username"]
+            if username not in self._pending:
+                self._user_start[username] = max(self._virtual_time, self._user_finish.get(username, 0.0))
+            heapq.heappush(self._pending.setdefault(username, []), (entry["cost"], next(self._sequence), entry))
+
+    def pop(self):
+        """
+        Retorna o próximo item a executar ou None se não houver jobs aguardando
+        ou nenhum deles for admitido agora.
+        """
+        with self._lock:
+            candidates = []
+            for username, heap in self._pending.items():
+                start = self._user_start[username]
+                for cost, sequence, entry in heap:
+                    candidates.append((start + cost / self.weight(entry["role"]), sequence, start, username, entry))
+            # Na ordem do fair queuing; os jobs não admitidos ficam para o próximo despacho
+            for finish, sequence, start, username, entry in sorted(candidates, key=lambda candidate: candidate[:2]):
+                if entry["admit"] is None or entry["admit"]():
+                    break
+            else:
+                return None
+            heap = self._pending[username]
+            heap.remove((entry["cost"], sequence, entry))
+            heapq.heapify(heap)
+            self._virtual_time = start
+            self._user_finish[username] = finish
+            if heap:
+                self._user_start[username] = finish
+            else:
+                del self._pending[username]
+                del self._user_start[username]
+            self._record(entry, finish)
+        return entry["item"]
+
+    def _record(self, entry: dict, finish: float):
+        wait = max(0.0, time.time() - entry["submitted_at"])
+        self._dispatched += 1
+        self._waits.append(wait)
+        if self.small_job_cost is not None and entry["cost"] <= self.small_job_cost:
+            self._small_waits.append(wait)
+        user_waits = self._user_waits.setdefault(entry["username"], deque(maxlen=self._waits.maxlen))
+        user_waits.append(wait)
+        self._decisions.append({
+            "job_id": entry["job_id"],
+            "username": entry["username"],
+            "role": entry["role"],
+            "cost": entry["cost"],
+            "virtual_finish": round(finish, 3),
+            "wait_seconds": round(wait, 3),
+        })
+        print(
+            f"Agendador: job {entry['job_id']} de {entry['username']} (custo {entry['cost']:g}, "
+            f"espera {wait:.1f}s)"
+        )
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(heap) for heap in self._pending.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "dispatched": self._dispatched,
+                "pending_by_user": {username: len(heap) for username, heap in self._pending.items()},
+                "wait_p50_seconds": _percentile(self._waits, 0.5),
+                "wait_p95_seconds": _percentile(self._waits, 0.95),
+                "small_job_wait_p95_seconds": _percentile(self._small_waits, 0.95),
+                "wait_p95_by_user": {
+                    username: _percentile(waits, 0.95) for username, waits in self._user_waits.items()
+                },
+                "recent_decisions": list(self._decisions),
+            }
+
+# Agendador compartilhado pelo processo (usado pelo executor de extração)
+job_scheduler = JobScheduler(
+    role_weights=settings.SCHEDULER_ROLE_WEIGHTS,
+    small_job_cost=settings.SCHEDULER_SMALL_JOB_COST,
+    history_size=settings.SCHEDULER_HISTORY_SIZE,
+)
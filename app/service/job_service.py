@@ -0,0 +1,502 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from functools import partial
+from fastapi import HTTPException
+from app.core.config import settings
+from app.domain.job_model import Job, JobStatus, FINAL_JOB_STATUSES
+from app.exceptions.job_cancelled_error import JobCancelledError
+from app.repository.job_repository import (
+    add_job, get_job_by_id, get_jobs_by_username, update_job, delete_job, list_expired_jobs, mark_job_notified,
+    cancel_queued_job
+)
+from app.service.frame_processor_service import (
+    save_upload, preflight_video, process_video, process_video_outputs, notify_file_ready
+)
+from app.service.extraction_executor import extraction_executor
+from app.service.extraction_engine import get_extraction_engine
+from app.service.job_progress_service import track_progress
+from app.service.job_control_service import JobControl, CANCELLED, count_stopped_job
+from app.service.scratch_space_service import scratch_space
+from app.service.job_lease_service import job_leases
+from app.service.job_queue import job_queue
+from app.service.job_worker import JobWorker
+from app.service.job_scheduler import estimate_job_cost
+from app.service.rate_limit_service import acquire_job_slot, release_job_slot
+from app.exceptions.queue_full_error import QueueFullError
+from app.service.s3_service import (
+    generate_presigned_download_url, delete_s3_file, upload_to_s3, job_results_key, put_json_object, get_json_object
+)
+
+# Futures e controles de cancelamento dos jobs em andamento neste processo
+_futures: dict = {}
+_controls: dict = {}
+
+def submit_video_job(process_input, username: str, role: str = None) -> dict:
+    """
+    Salva o upload, registra o job como 'queued' e agenda a extração.
+    Retorna o registro do job ou levanta QueueFullError se a fila estiver cheia.
+    """
+    # Recusa antes de copiar o upload para não gastar disco à toa
+    reject_when_queue_full()
+
+    job_dir = scratch_space.create_job_dir()
+    reject_without_scratch_space(job_dir, getattr(process_input.file, "size", None) or 0)
+    try:
+        video_path, file_size, video_sha256 = save_upload(process_input.file, job_dir)
+    except Exception:
+        scratch_space.remove_job_dir(job_dir)
+        raise
+    scratch_space.resize(job_dir, file_size)
+
+    return submit_saved_video_job(
+        process_input, username, process_input.file.filename, job_dir, video_path, file_size, video_sha256,
+        role=role,
+    )
+
+def incoming_prefix(username: str) -> str:
+    return f"{username}/incoming/"
+
+def reject_when_queue_full():
+    """
+    Recusa novos jobs (429) com a fila cheia: a do executor local, com workers
+    embutidos na API, ou a fila compartilhada acima de JOB_QUEUE_MAX_DEPTH.
+    """
+    if not job_queue.shared:
+        if not extraction_executor.has_capacity():
+            extraction_executor.reject()
+        return
+    if settings.JOB_QUEUE_MAX_DEPTH is not None and job_queue.depth() >= settings.JOB_QUEUE_MAX_DEPTH:
+        raise QueueFullError("Fila de processamento cheia. Tente novamente mais tarde.", settings.EXTRACTION_RETRY_AFTER)
+
+def reject_without_scratch_space(job_dir: str, upload_size: int):
+    """
+    Reserva o espaço do upload no espaço de trabalho ou recusa o envio (como
+    com a fila cheia) quando as reservas já estão na marca de ocupação.
+    """
+    if not scratch_space.admit(job_dir, upload_size):
+        scratch_space.remove_job_dir(job_dir)
+        raise QueueFullError(
+            "Espaço de trabalho cheio. Tente novamente mais tarde.", extraction_executor.retry_after()
+        )
+
+def submit_saved_video_job(process_input, username: str, filename: str, job_dir: str, video_path: str,
+                           file_size: int, video_sha256: str, source_key: str = None, role: str = None) -> dict:
+    """
+    Agenda a extração de um vídeo já gravado em 'job_dir' (criado pelo
+    scratch_space). O diretório passa a pertencer ao job e é removido, com a
+    sua reserva, ao final ou em caso de recusa.
+    Com 'source_key', 'video_path' é uma URL pré-assinada do objeto no S3.
+    A capacidade da fila deve ser verificada antes, por quem chama.
+    Com a fila compartilhada, a API só publica o job: o upload é enviado ao S3
+    e a extração fica com os workers (python -m app.worker).
+    """
+    job_id = str(uuid.uuid4())
+    # Com a fila em memória, a vaga no executor é reservada já com o vídeo salvo:
+    # envios simultâneos podem ter passado juntos por reject_when_queue_full
+    if not job_queue.shared and not extraction_executor.reserve(job_id):
+        scratch_space.remove_job_dir(job_dir)
+        extraction_executor.reject()
+    try:
+        return _register_video_job(
+            job_id, process_input, username, filename, job_dir, video_path, file_size, video_sha256, source_key, role
+        )
+    except Exception:
+        # A vaga só passa ao job quando o worker o entrega ao executor
+        extraction_executor.release(job_id)
+        raise
+
+def _register_video_job(job_id: str, process_input, username: str, filename: str, job_dir: str, video_path: str,
+                        file_size: int, video_sha256: str, source_key: str = None, role: str = None) -> dict:
+    try:
+        # Recusa entradas inutilizáveis antes de ocupar um worker
+        preflight = preflight_video(
+            video_path,
+            process_input.interval,
+            process_input.mode,
+            process_input.timestamps,
+            [spec.model_dump() for spec in process_input.outputs] if process_input.outputs else None,
+            process_input.output,
+        )
+        # Jobs maiores que o espaço de trabalho nunca seriam executados
+        scratch_space.check_fits(job_dir, preflight["scratch_bytes"])
+        if job_queue.shared and not source_key:
+            # Os workers rodam em outros processos e leem o vídeo do S3
+            source_key = f"{incoming_prefix(username)}{str(uuid.uuid4())}/{os.path.basename(filename)}"
+            upload_to_s3(video_path, source_key)
+    except Exception:
+        scratch_space.remove_job_dir(job_dir)
+        raise
+
+    job = Job(
+        job_id=job_id,
+        username=username,
+        role=role,
+        filename=filename,
+        interval=process_input.interval,
+        mode=process_input.mode,
+        timestamps=process_input.timestamps,
+        output=process_input.output,
+        outputs=process_input.outputs,
+        combine_outputs=process_input.combine_outputs,
+        threshold=process_input.threshold,
+        file_size=file_size,
+        video_sha256=video_sha256,
+        source_key=source_key,
+        probe=preflight["probe"],
+        planned_frames=preflight["planned_frames"],
+        estimated_seconds=preflight["estimated_seconds"],
+        scratch_bytes=preflight["scratch_bytes"],
+        cost=estimate_job_cost(preflight["probe"], process_input.interval, preflight["planned_frames"]),
+    )
+    message = {"job_id": job.job_id}
+    if job_queue.shared:
+        # Na fila compartilhada o job não tem dono até um worker recebê-lo
+        scratch_space.remove_job_dir(job_dir)
+    else:
+        # Na fila em memória o job nasce com o lease deste processo, renovado enquanto espera
+        job.worker_id = job_leases.worker_id
+        job.lease_expires_at = job_leases.lease_expiration()
+        message.update(video_path=video_path, job_dir=job_dir)
+    try:
+        # Vaga do job entre os simultâneos permitidos ao usuário
+        acquire_job_slot(username, job.job_id, role)
+    except Exception:
+        scratch_space.remove_job_dir(job_dir)
+        raise
+    add_job(job)
+    if not job_queue.shared:
+        job_leases.watch(job.job_id)
+    try:
+        job_queue.send(message)
+    except Exception:
+        job_leases.release(job.job_id)
+        delete_job(job.job_id)
+        release_job_slot(username, job.job_id)
+        scratch_space.remove_job_dir(job_dir)
+        raise
+    if not job_queue.shared:
+        local_worker.start()
+
+    return get_job_by_id(job.job_id)
+
+def start_queued_job(message: dict):
+    """
+    Recebe um job da fila: assume o lease (sem contar tentativa) e o agenda no
+    executor local. Jobs cancelados, finalizados ou de outro worker são descartados.
+    """
+    job_id = message["job_id"]
+    job_dir = message.get("job_dir") or scratch_space.create_job_dir()
+    try:
+        job = job_leases.claim(job_id, count_attempt=False)
+    except Exception:
+        if not message.get("job_dir"):
+            scratch_space.remove_job_dir(job_dir)
+        raise
+    if job is None:
+        print(f"Job {job_id} da fila descartado: finalizado ou com outro worker.")
+        extraction_executor.release(job_id)
+        scratch_space.remove_job_dir(job_dir)
+        return
+    _schedule_video_job(job, message.get("video_path"), job_dir)
+
+def _schedule_video_job(job: dict, video_path: str, job_dir: str):
+    """
+    Agenda o job no executor deste processo, já com o lease deste worker. A
+    ordem de execução fica com o agendador (custo, usuário e role do job).
+    """
+    job_id = job["job_id"]
+    scratch_bytes = job.get("scratch_bytes") or 0
+    try:
+        # Um job retomado que nunca caberia no espaço deste worker falha em vez de esperar para sempre
+        scratch_space.check_fits(job_dir, scratch_bytes)
+    except HTTPException as e:
+        extraction_executor.release(job_id)
+        scratch_space.remove_job_dir(job_dir)
+        _finish_video_job(job, status=JobStatus.FAILED.value, error=str(e.detail))
+        return
+    # Criado já na fila, para que o job possa ser cancelado antes de começar
+    control = _controls[job_id] = JobControl(job_id)
+    job_leases.watch(job_id, on_lost=partial(_cancel_local_job, control))
+    schedule = {
+        "job_id": job_id,
+        "username": job["username"],
+        "role": job.get("role"),
+        "cost": job.get("cost"),
+        "submitted_at": _submitted_at(job),
+        "admit": partial(_admit_video_job, control, job_dir, scratch_bytes),
+    }
+    try:
+        future = extraction_executor.submit(run_video_job, job_id, video_path, job_dir, schedule=schedule)
+    except Exception:
+        _controls.pop(job_id, None)
+        job_leases.release(job_id)
+        scratch_space.remove_job_dir(job_dir)
+        raise
+    _futures[job_id] = future
+    future.add_done_callback(lambda _: _futures.pop(job_id, None))
+
+def _cancel_local_job(control: JobControl):
+    control.cancel(CANCELLED)
+    # Um job que aguardava admissão na fila passa a ser admitido e só grava o status
+    extraction_executor.wake()
+
+def _admit_video_job(control: JobControl, job_dir: str, scratch_bytes: int) -> bool:
+    """
+    Admissão do job pelo agendador: reserva o espaço de trabalho dos frames
+    previstos antes de ocupar um worker. Jobs cancelados na fila seguem para o
+    worker, que só grava o status.
+    """
+    return control.cancelled or scratch_space.admit(job_dir, scratch_bytes)
+
+def run_video_job(job_id: str, video_path: str, job_dir: str):
+    """
+    Executa a extração de um job, atualizando o seu status. O diretório do job,
+    o upload em andamento e o vídeo de entrada são removidos mesmo se o job for
+    cancelado ou exceder os limites de execução.
+    Sem 'video_path', o vídeo é lido do objeto de entrada no S3 (job retomado).
+    """
+    control = _controls.setdefault(job_id, JobControl(job_id))
+    try:
+        # O lease garante que só um worker executa o job, mesmo após uma retomada
+        job = job_leases.claim(job_id, on_lost=partial(control.cancel, CANCELLED))
+        if job is None:
+            print(f"Job {job_id} finalizado ou retomado por outro worker.")
+            return get_job_by_id(job_id)
+        if job["attempts"] > settings.JOB_MAX_ATTEMPTS:
+            return _finish_video_job(
+                job, status=JobStatus.FAILED.value,
+                error=f"O job excedeu o limite de {settings.JOB_MAX_ATTEMPTS} tentativas.",
+            )
+        if job.get("cancel_requested"):
+            # Cancelamento pedido em outro processo enquanto o job não tinha worker
+            control.cancel(CANCELLED)
+        return _execute_video_job(job, video_path, job_dir, control)
+    finally:
+        _controls.pop(job_id, None)
+        scratch_space.remove_job_dir(job_dir)
+
+def _execute_video_job(job: dict, video_path: str, job_dir: str, control: JobControl):
+    job_id = job["job_id"]
+    username = job["username"]
+    try:
+        # O espaço de trabalho dos frames foi reservado na admissão pelo agendador
+        job = update_job(
+            job_id, status=JobStatus.RUNNING.value, queue_wait_seconds=round(time.time() - _submitted_at(job), 3)
+        )
+
+        # O progresso informado pelo ffmpeg é gravado no job durante a execução
+        duration = (job.get("probe") or {}).get("duration")
+        with track_progress(job_id, job.get("planned_frames"), duration) as progress, control.track():
+            # Cancelado enquanto esperava na fila
+            control.check()
+            if job.get("source_key"):
+                # A URL gerada no envio pode ter expirado enquanto o job esperava na fila
+                video_path = generate_presigned_download_url(job["source_key"], settings.INGEST_READ_URL_EXPIRATION)
+            # O .zip leva o id do job: uma nova tentativa regrava o mesmo objeto
+            if job.get("outputs"):
+                # Várias saídas a partir de uma única decodificação
+                result = process_video_outputs(
+                    video_path, username, job["outputs"], job["combine_outputs"], probe=job["probe"],
+                    archive_id=job_id,
+                )
+            else:
+                result = process_video(
+                    video_path,
+                    job["interval"],
+                    username,
+                    mode=job["mode"],
+                    timestamps=job["timestamps"],
+                    video_sha256=job["video_sha256"],
+                    output_options=job["output"],
+                    probe=job["probe"],
+                    engine=get_extraction_engine(),
+                    threshold=job["threshold"],
+                    archive_id=job_id,
+                )
+        result = _store_job_results(job, result)
+    except JobCancelledError as e:
+        status = JobStatus.CANCELLED if e.reason == CANCELLED else JobStatus.TIMED_OUT
+        count_stopped_job(status.value)
+        return _finish_video_job(job, status=status.value, error=str(e))
+    except HTTPException as e:
+        return _finish_video_job(job, status=JobStatus.FAILED.value, error=str(e.detail))
+    except Exception as e:
+        return _finish_video_job(job, status=JobStatus.FAILED.value, error=f"Erro durante o processamento: {str(e)}")
+
+    # Com um .zip por saída, o e-mail lista todos os links
+    file_url = result["file_url"] or "\n".join(output["file_url"] for output in result["output_files"])
+    finished = _finish_video_job(
+        job, status=JobStatus.DONE.value, progress={**progress.snapshot(), "percent": 100.0}, **result
+    )
+
+    # Numa retentativa o e-mail já enviado não é repetido
+    if finished["status"] == JobStatus.DONE.value and mark_job_notified(job_id):
+        try:
+            notify_file_ready(username, file_url)
+        except Exception as e:
+            print(f"Erro ao enviar e-mail do job {job_id}: {e}")
+
+    return finished
+
+def _store_job_results(job: dict, result: dict) -> dict:
+    """
+    Resultado a gravar no job, com a contagem de frames de cada saída. O item do
+    DynamoDB tem limite de 400KB: acima de JOB_INLINE_RESULTS_MAX_BYTES, os
+    timestamps vão para um JSON no S3 e o job guarda só a chave ('results_key').
+    """
+    result = dict(result)
+    if result.get("output_files"):
+        result["output_files"] = [
+            {**output, "frame_count": len(output.get("frame_timestamps") or [])} for output in result["output_files"]
+        ]
+        result["frame_count"] = sum(output["frame_count"] for output in result["output_files"])
+    else:
+        result["frame_count"] = len(result.get("frame_timestamps") or [])
+
+    lists = {"frame_timestamps": result.get("frame_timestamps"), "output_files": result.get("output_files")}
+    if len(json.dumps(lists)) <= settings.JOB_INLINE_RESULTS_MAX_BYTES:
+        return result
+    result["results_key"] = job_results_key(job["username"], job["job_id"])
+    put_json_object(result["results_key"], lists)
+    result["frame_timestamps"] = None
+    if result.get("output_files"):
+        result["output_files"] = [
+            {name: value for name, value in output.items() if name != "frame_timestamps"}
+            for output in result["output_files"]
+        ]
+    return result
+
+def load_job_results(job: dict) -> dict:
+    """Job com os timestamps completos, lidos do S3 quando não couberam no registro."""
+    if not job or not job.get("results_key"):
+        return job
+    return {**job, **get_json_object(job["results_key"])}
+
+def _submitted_at(job: dict) -> float:
+    return datetime.fromisoformat(job["created_at"]).timestamp()
+
+def _finish_video_job(job: dict, **changes) -> dict:
+    """
+    Grava o status final e libera o lease. Se o lease foi perdido (o job foi
+    retomado por outro worker), o resultado desta execução é descartado.
+    """
+    finished = job_leases.finish(job["job_id"], **changes)
+    if finished is None:
+        print(f"Lease do job {job['job_id']} perdido; o resultado desta execução foi descartado.")
+        return get_job_by_id(job["job_id"])
+    release_job_slot(finished["username"], finished["job_id"])
+    if job.get("source_key") and settings.INGEST_DELETE_AFTER_PROCESSING:
+        _delete_source_object(job["source_key"])
+    return finished
+
+def recover_expired_jobs() -> int:
+    """
+    Retoma os jobs cujo worker parou de renovar o lease (queda do pod ou do
+    processo), enquanto houver capacidade no executor. Só jobs com o vídeo de
+    entrada no S3 podem ser retomados; os demais falham, pois o upload ficou no
+    disco do worker perdido. Retorna o número de jobs retomados.
+    """
+    recovered = 0
+    for job_id in list_expired_jobs():
+        if job_id in _controls:
+            continue
+        if not extraction_executor.has_capacity():
+            break
+        job = get_job_by_id(job_id)
+        if job is None:
+            continue
+        if not job.get("source_key"):
+            # Assume o lease só para gravar a falha
+            if job_leases.claim(job_id, count_attempt=False) is not None:
+                job_leases.finish(
+                    job_id, status=JobStatus.FAILED.value,
+                    error="O vídeo de entrada foi perdido com o worker que executava o job. Envie o vídeo novamente.",
+                )
+                release_job_slot(job["username"], job_id)
+            continue
+        try:
+            start_queued_job({"job_id": job_id})
+        except Exception as e:
+            print(f"Erro ao retomar o job {job_id}: {e}")
+            continue
+        if job_id in _controls:
+            print(f"Job {job_id} retomado por este worker.")
+            recovered += 1
+    return recovered
+
+def _delete_source_object(source_key: str):
+    try:
+        delete_s3_file(source_key)
+    except Exception as e:
+        print(f"Erro ao remover o vídeo de entrada {source_key}: {e}")
+
+def cancel_job(job_id: str) -> dict:
+    """
+    Cancela um job na fila ou em execução, encerrando os processos do ffmpeg.
+    A limpeza e o status 'cancelled' ficam a cargo do worker do job, que pode
+    estar em outro processo.
+    """
+    job = get_job_by_id(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    if job["status"] in FINAL_JOB_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job já finalizado com status '{job['status']}'.")
+    control = _controls.get(job_id)
+    if control is not None:
+        _cancel_local_job(control)
+        return get_job_by_id(job_id)
+    if not job.get("worker_id"):
+        # Ainda na fila compartilhada: a mensagem é descartada pelo worker que a receber
+        cancelled = cancel_queued_job(job_id, status=JobStatus.CANCELLED.value, error="Job cancelado.")
+        if cancelled is not None:
+            count_stopped_job(JobStatus.CANCELLED.value)
+            release_job_slot(job["username"], job_id)
+            if job.get("source_key") and settings.INGEST_DELETE_AFTER_PROCESSING:
+                _delete_source_object(job["source_key"])
+            return cancelled
+    # Job de outro worker: o pedido é visto no próximo heartbeat do dono
+    return update_job(job_id, cancel_requested=True)
+
+async def wait_for_job_or_disconnect(job_id: str, is_disconnected,
+                                     poll_interval: float = settings.SYNC_DISCONNECT_POLL_INTERVAL) -> dict:
+    """
+    Modo síncrono: aguarda o término do job sem ocupar uma thread e o cancela se
+    o cliente desconectar antes, já que ninguém receberá o resultado. O job pode
+    rodar em outro processo, então o status é consultado no registro do job.
+    """
+    cancelled = False
+    while True:
+        job = await asyncio.to_thread(get_job_by_id, job_id)
+        if job is None or job["status"] in FINAL_JOB_STATUSES:
+            return job
+        if not cancelled and await is_disconnected():
+            print(f"Cliente desconectado; cancelando o job {job_id}.")
+            cancelled = True
+            try:
+                await asyncio.to_thread(cancel_job, job_id)
+            except HTTPException:
+                # Finalizado nesse meio-tempo
+                pass
+            continue
+        future = _futures.get(job_id)
+        if future is not None:
+            # Executando neste processo: acorda assim que o job terminar
+            await asyncio.wait({asyncio.wrap_future(future)}, timeout=poll_interval)
+        else:
+            await asyncio.sleep(poll_interval)
+
+def get_job(job_id: str):
+    return get_job_by_id(job_id)
+
+def list_user_jobs(username: str) -> list:
+    return get_jobs_by_username(username)
+
+# Jobs que aguardam espaço de trabalho voltam a ser despachados quando uma reserva é liberada
+scratch_space.subscribe(extraction_executor.wake)
+
+# Workers embutidos na API quando a fila é local ao processo (JOB_QUEUE_BACKEND=memory)
+local_worker = JobWorker(job_queue, extraction_executor, start_queued_job, wait_seconds=1, buffer_jobs=True)
@@ -0,0 +1,67 @@
+import threading
+
+class JobWorker:
+    """
+    Consome a fila de jobs e entrega cada mensagem a 'handler', que assume o job
+    e o agenda no executor local. Só recebe mensagens quando há espaço no
+    executor; o restante fica na fila, visível para os outros workers e para o
+    autoscaling. Com 'buffer_jobs', a fila interna do executor também é
+    preenchida (workers embutidos na API, em que ela é o limite de admissão).
+    """
+
+    def __init__(self, queue, executor, handler, wait_seconds: float = 20, idle_interval: float = 1.0,
+                 buffer_jobs: bool = False):
+        self.queue = queue
+        self.executor = executor
+        self.handler = handler
+        self.wait_seconds = wait_seconds
+        self.idle_interval = idle_interval
+        self.buffer_jobs = buffer_jobs
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def poll_once(self) -> int:
+        """Recebe e agenda as mensagens que cabem no executor. Retorna quantas foram recebidas."""
+        slots = self.executor.free_slots(include_queue=self.buffer_jobs)
+        if not slots:
+            return 0
+        messages = self.queue.receive(slots, self.wait_seconds)
+        for message in messages:
+            try:
+                self.handler(message["body"])
+            except Exception as e:
+                # A mensagem volta para a fila para outro worker (ou nova tentativa)
+                print(f"Erro ao agendar o job {message['body'].get('job_id')}: {e}")
+                self.queue.nack(message["receipt"])
+                continue
+            # Com o lease assumido, o job não depende mais da mensagem
+            self.queue.ack(message["receipt"])
+        return len(messages)
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Erro ao consultar a fila de jobs: {e}")
+                self._stopped.wait(self.idle_interval)
+                continue
+            if not self.executor.free_slots(include_queue=self.buffer_jobs):
+                self._stopped.wait(self.idle_interval)
+
+    def start(self):
+        """Inicia o consumo da fila em segundo plano (uma única vez)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self.run, name="job-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
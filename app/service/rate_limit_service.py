@@ -0,0 +1,190 @@
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from fastapi import HTTPException
+from app.core.config import settings
+from app.domain.job_model import FINAL_JOB_STATUSES
+from app.repository.job_repository import get_job_by_id
+from app.repository.rate_limit_repository import (
+    get_rate_limit, save_rate_limit_tokens, add_active_job, remove_active_jobs
+)
+
+def limits_for(username: str, role: str = None) -> dict:
+    """
+    Limites do usuário: os da role (user_level_1 para roles sem limites
+    próprios), sobrepostos pelos definidos para o próprio usuário.
+    """
+    limits = settings.RATE_LIMITS.get(role) or settings.RATE_LIMITS["user_level_1"]
+    return {**limits, **settings.RATE_LIMIT_USER_OVERRIDES.get(username, {})}
+
+def refill_tokens(tokens: float, refilled_at: float, now: float, burst: int, per_minute: float) -> float:
+    """Fichas do token bucket em 'now': recarga de 'per_minute' fichas por minuto, até 'burst'."""
+    return min(float(burst), tokens + max(0.0, now - refilled_at) * per_minute / 60)
+
+class RateLimitStore(ABC):
+    """
+    Estado dos limites de envio: o token bucket e os jobs ativos de cada
+    usuário. 'take_token' retorna 0 se consumiu uma ficha ou os segundos até a
+    próxima; 'add_job' inclui o job nos ativos se o usuário ainda não atingiu a cota.
+    """
+    name = None
+
+    @abstractmethod
+    def take_token(self, username: str, burst: int, per_minute: float) -> float:
+        pass
+
+    @abstractmethod
+    def active_jobs(self, username: str) -> set:
+        pass
+
+    @abstractmethod
+    def add_job(self, username: str, job_id: str, max_jobs: int) -> bool:
+        pass
+
+    @abstractmethod
+    def remove_jobs(self, username: str, job_ids: set):
+        pass
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """Limites no próprio processo: valem por réplica da API."""
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._active = {}
+
+    def take_token(self, username: str, burst: int, per_minute: float) -> float:
+        now = time.time()
+        with self._lock:
+            tokens, refilled_at = self._buckets.get(username, (float(burst), now))
+            tokens = refill_tokens(tokens, refilled_at, now, burst, per_minute)
+            if tokens < 1:
+                self._buckets[username] = (tokens, now)
+                return (1 - tokens) * 60 / per_minute
+            self._buckets[username] = (tokens - 1, now)
+            return 0.0
+
+    def active_jobs(self, username: str) -> set:
+        with self._lock:
+            return set(self._active.get(username, set()))
+
+    def add_job(self, username: str, job_id: str, max_jobs: int) -> bool:
+        with self._lock:
+            active = self._active.setdefault(username, set())
+            if job_id not in active and len(active) >= max_jobs:
+                return False
+            active.add(job_id)
+            return True
+
+    def remove_jobs(self, username: str, job_ids: set):
+        with self._lock:
+            self._active.get(username, set()).difference_update(job_ids)
+
+class DynamoDBRateLimitStore(RateLimitStore):
+    """
+    Limites na tabela rate_limits, compartilhados entre as réplicas: o bucket
+    é gravado com uma condição sobre a última recarga e os jobs ativos são um
+    conjunto alterado com ADD/DELETE atômicos.
+    """
+    name = "dynamodb"
+
+    def __init__(self, max_retries: int = 5):
+        self.max_retries = max_retries
+
+    def take_token(self, username: str, burst: int, per_minute: float) -> float:
+        for _ in range(self.max_retries):
+            state = get_rate_limit(username)
+            now = time.time()
+            previous = state.get("refilled_at")
+            tokens = refill_tokens(state.get("tokens", float(burst)), previous or now, now, burst, per_minute)
+            if tokens < 1:
+                return (1 - tokens) * 60 / per_minute
+            if save_rate_limit_tokens(username, tokens - 1, now, previous):
+                return 0.0
+        # Disputa contínua pelo mesmo bucket: o próprio usuário está enviando em rajada
+        return 60 / per_minute
+
+    def active_jobs(self, username: str) -> set:
+        return get_rate_limit(username)["active_jobs"]
+
+    def add_job(self, username: str, job_id: str, max_jobs: int) -> bool:
+        return add_active_job(username, job_id, max_jobs)
+
+    def remove_jobs(self, username: str, job_ids: set):
+        if job_ids:
+            remove_active_jobs(username, job_ids)
+
+def create_rate_limit_store(backend: str = None) -> RateLimitStore:
+    """Cria o armazenamento configurado em RATE_LIMIT_BACKEND (ou o informado)."""
+    backend = backend or settings.RATE_LIMIT_BACKEND
+    if backend == InMemoryRateLimitStore.name:
+        return InMemoryRateLimitStore()
+    if backend == DynamoDBRateLimitStore.name:
+        return DynamoDBRateLimitStore()
+    raise ValueError(f"Armazenamento de limites desconhecido: {backend}. Use memory ou dynamodb.")
+
+# Estado dos limites compartilhado pelo processo
+rate_limits = create_rate_limit_store()
+
+def _too_many_requests(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+def _running_jobs(username: str) -> set:
+    """
+    Jobs ativos do usuário, descartando os já finalizados: uma liberação
+    perdida (queda do worker) não prende a cota para sempre.
+    """
+    active = rate_limits.active_jobs(username)
+    finished = set()
+    for job_id in active:
+        job = get_job_by_id(job_id)
+        if job is None or job["status"] in FINAL_JOB_STATUSES:
+            finished.add(job_id)
+    rate_limits.remove_jobs(username, finished)
+    return active - finished
+
+def check_submission(username: str, role: str = None, take_token: bool = True):
+    """
+    Admissão de um novo envio, antes de ler o vídeo: consome uma ficha do
+    token bucket e recusa (429) o usuário que já tem o máximo de jobs ativos.
+    Sem 'take_token', só verifica os jobs ativos (etapas que ainda não criam o job).
+    """
+    limits = limits_for(username, role)
+    if len(rate_limits.active_jobs(username)) >= limits["max_concurrent_jobs"] and \
+            len(_running_jobs(username)) >= limits["max_concurrent_jobs"]:
+        raise _too_many_requests(
+            f"Limite de {limits['max_concurrent_jobs']} jobs simultâneos atingido. "
+            "Aguarde o término de um job para enviar outro.",
+            settings.EXTRACTION_RETRY_AFTER,
+        )
+    if not take_token:
+        return
+    retry_after = rate_limits.take_token(username, limits["burst"], limits["requests_per_minute"])
+    if retry_after:
+        raise _too_many_requests("Muitos envios em pouco tempo. Tente novamente mais tarde.", retry_after)
+
+def acquire_job_slot(username: str, job_id: str, role: str = None):
+    """
+    Ocupa uma vaga de job simultâneo do usuário ao registrar o job. A
+    verificação antes do upload pode deixar passar envios concorrentes; esta é
+    a garantia. Levanta HTTPException 429 se a cota está esgotada.
+    """
+    max_jobs = limits_for(username, role)["max_concurrent_jobs"]
+    if rate_limits.add_job(username, job_id, max_jobs):
+        return
+    _running_jobs(username)
+    if not rate_limits.add_job(username, job_id, max_jobs):
+        raise _too_many_requests(
+            f"Limite de {max_jobs} jobs simultâneos atingido. Aguarde o término de um job para enviar outro.",
+            settings.EXTRACTION_RETRY_AFTER,
+        )
+
+def release_job_slot(username: str, job_id: str):
+    """Libera a vaga do job finalizado (sem efeito se já foi liberada)."""
+    try:
+        rate_limits.remove_jobs(username, {job_id})
+    except Exception as e:
+        # A vaga é recuperada na próxima verificação do usuário
+        print(f"Erro ao liberar a vaga do job {job_id}: {e}")
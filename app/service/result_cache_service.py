@@ -0,0 +1,101 @@
+import json
+import uuid
+import hashlib
+import threading
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from app.core.config import settings
+from app.repository.result_cache_repository import add_result, get_result, increment_result_hits, delete_result
+from app.service.s3_service import copy_s3_file
+
+# Contadores de acertos e falhas deste processo
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+def file_sha256(file_path: str, chunk_size: int = settings.UPLOAD_CHUNK_SIZE) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as video_file:
+        for chunk in iter(lambda: video_file.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def build_result_cache_key(video_sha256: str, interval, mode: str, timestamps=None, output_options=None,
+                           threshold=None) -> str:
+    """
+    Chave do índice de resultados: o hash do conteúdo do vídeo mais todos os
+    parâmetros que alteram o arquivo gerado.
+    """
+    params = {
+        "interval": interval,
+        "mode": mode,
+        "timestamps": timestamps,
+        "output": output_options or {},
+    }
+    if threshold is not None:
+        # Só nos modos dedupe e scene, mantendo as chaves já gravadas dos demais
+        params["threshold"] = threshold
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    return f"{video_sha256}:{digest}"
+
+def get_cached_result(cache_key: str, username: str, dest_key: str = None):
+    """
+    Procura um resultado já processado para a chave. Se existir, copia o arquivo
+    para 'dest_key' (o .zip do job, que leva o seu id) ou, sem 'dest_key', para o
+    prefixo do usuário, reaproveitando o próprio arquivo se já for dele. Retorna
+    o resultado ou None.
+    """
+    entry = get_result(cache_key)
+    if not entry:
+        _count("misses")
+        return None
+
+    source_key = entry["s3_key"]
+    try:
+        if dest_key == source_key or (dest_key is None and source_key.startswith(f"{username}/")):
+            # Nova tentativa do mesmo job ou arquivo avulso do próprio usuário
+            file_url = f"{settings.AWS_S3_PUBLIC_URL}/{settings.AWS_S3_BUCKET_NAME}/{source_key}"
+        else:
+            file_url = copy_s3_file(source_key, dest_key or f"{username}/frames_{str(uuid.uuid4())}.zip")
+    except HTTPException as e:
+        if e.status_code != 404:
+            raise
+        # O arquivo foi removido fora da API: descarta a entrada
+        delete_result(cache_key)
+        _count("misses")
+        return None
+
+    increment_result_hits(cache_key)
+    _count("hits")
+    return {
+        "file_url": file_url,
+        "extraction_mode": entry["extraction_mode"],
+        "frame_timestamps": json.loads(entry["frame_timestamps"]),
+        "cache_hit": True,
+    }
+
+def store_result(cache_key: str, video_sha256: str, s3_key: str, result: dict):
+    """Registra no índice o arquivo gerado para a chave."""
+    add_result({
+        "cache_key": cache_key,
+        "video_sha256": video_sha256,
+        "s3_key": s3_key,
+        "extraction_mode": result["extraction_mode"],
+        # Floats não são aceitos pelo DynamoDB; os timestamps vão como JSON
+        "frame_timestamps": json.dumps(result["frame_timestamps"]),
+        "hit_count": 0,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    })
+
+def cache_stats() -> dict:
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+    }
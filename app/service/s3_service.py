@@ -1,7 +1,12 @@
+import json
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import BotoCoreError, ClientError
 from fastapi import HTTPException
 from app.core.config import settings
 from app.repository.s3_repository import get_s3_client
+from app.repository.result_cache_repository import delete_results_by_s3_key
 
 def upload_to_s3(file_path: str, s3_key: str, bucket_name: str = settings.AWS_S3_BUCKET_NAME) -> str:
     try:
@@ -18,31 +23,192 @@ def upload_to_s3(file_path: str, s3_key: str, bucket_name: str = settings.AWS_S3
     except (BotoCoreError, ClientError) as e:
         error_msg = f"Erro ao enviar {s3_key} para {bucket_name}: {str(e)}"
         raise HTTPException(status_code=500, detail=error_msg)
-    
-def list_user_frame_archives(username: str) -> list:
+
+def copy_s3_file(source_key: str, dest_key: str, bucket_name: str = settings.AWS_S3_BUCKET_NAME) -> str:
+    """
+    Copia um arquivo dentro do bucket sem baixá-lo (cópia no próprio S3).
+    Retorna a URL da cópia.
+    """
+    s3_client = get_s3_client()
     try:
-        s3_client = get_s3_client()
-        # Prefixo para localizar arquivos do usuário
-        prefix = f"{username}/"
+        s3_client.copy({"Bucket": bucket_name, "Key": source_key}, bucket_name, dest_key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+            raise HTTPException(status_code=404, detail="Arquivo não encontrado.")
+        raise HTTPException(status_code=500, detail=f"Erro ao copiar {source_key} para {dest_key}: {str(e)}")
+    except BotoCoreError as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao copiar {source_key} para {dest_key}: {str(e)}")
 
-        # Listar objetos no bucket com prefixo
-        response = s3_client.list_objects_v2(
-            Bucket=settings.AWS_S3_BUCKET_NAME,
-            Prefix=prefix
-        )
+    return f"{settings.AWS_S3_PUBLIC_URL}/{bucket_name}/{dest_key}"
 
-        # Verificar se existem objetos
-        if 'Contents' not in response:
-            return []
+# Tamanho mínimo de uma parte do multipart upload (exceto a última)
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
 
-        # Filtrar apenas arquivos .zip e gerar URLs
-        frame_archives = [
-            f"{settings.AWS_S3_PUBLIC_URL}/{settings.AWS_S3_BUCKET_NAME}/{obj['Key']}"
-            for obj in response['Contents']
-            if obj['Key'].endswith('.zip')
-        ]
+class S3MultipartWriter:
+    """
+    Arquivo somente-escrita que envia o conteúdo ao S3 em partes de um multipart
+    upload à medida que é gravado. Usado como destino do zipfile, o upload ocorre
+    em paralelo à extração e o .zip completo nunca existe em disco.
+    """
+
+    def __init__(self, s3_key: str, bucket_name: str = settings.AWS_S3_BUCKET_NAME,
+                 part_size: int = settings.S3_MULTIPART_PART_SIZE,
+                 concurrency: int = settings.S3_UPLOAD_CONCURRENCY):
+        self.s3_key = s3_key
+        self.bucket_name = bucket_name
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.closed = False
+        self._s3_client = get_s3_client()
+        self._buffer = bytearray()
+        self._position = 0
+        self._upload_id = None
+        self._parts = []
+        self._executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+        # Limita as partes em memória: a escrita espera quando todas estão em envio
+        self._slots = threading.BoundedSemaphore(max(1, concurrency))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None or not self.closed:
+            self.abort()
+        return False
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        # As partes só são enviadas quando o buffer atinge o tamanho mínimo
+        pass
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("Escrita em um upload já finalizado.")
+        self._buffer += data
+        self._position += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._send_part(part)
+        return len(data)
+
+    def _send_part(self, body: bytes):
+        # Interrompe cedo se alguma parte anterior já falhou
+        for future in self._parts:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+
+        if self._upload_id is None:
+            response = self._s3_client.create_multipart_upload(Bucket=self.bucket_name, Key=self.s3_key)
+            self._upload_id = response["UploadId"]
+
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._upload_part, len(self._parts) + 1, body)
+        except Exception:
+            self._slots.release()
+            raise
+        self._parts.append(future)
+
+    def _upload_part(self, part_number: int, body: bytes) -> dict:
+        try:
+            response = self._s3_client.upload_part(
+                Bucket=self.bucket_name,
+                Key=self.s3_key,
+                UploadId=self._upload_id,
+                PartNumber=part_number,
+                Body=body,
+            )
+            return {"PartNumber": part_number, "ETag": response["ETag"]}
+        finally:
+            self._slots.release()
+
+    def complete(self) -> str:
+        """Envia o restante do buffer, conclui o upload e retorna a URL do arquivo."""
+        try:
+            if self._upload_id is None:
+                # Arquivo menor que uma parte: um único PUT basta
+                self._s3_client.put_object(Bucket=self.bucket_name, Key=self.s3_key, Body=bytes(self._buffer))
+            else:
+                if self._buffer:
+                    self._send_part(bytes(self._buffer))
+                parts = [future.result() for future in self._parts]
+                self._s3_client.complete_multipart_upload(
+                    Bucket=self.bucket_name,
+                    Key=self.s3_key,
+                    UploadId=self._upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+        except (BotoCoreError, ClientError) as e:
+            self.abort()
+            error_msg = f"Erro ao enviar {self.s3_key} para {self.bucket_name}: {str(e)}"
+            raise HTTPException(status_code=500, detail=error_msg)
+
+        self._buffer.clear()
+        self._executor.shutdown()
+        self.closed = True
+        return f"{settings.AWS_S3_PUBLIC_URL}/{self.bucket_name}/{self.s3_key}"
 
-        return frame_archives
+    def abort(self):
+        """Descarta as partes enviadas e cancela o multipart upload."""
+        if self.closed:
+            return
+        self.closed = True
+        self._buffer.clear()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._upload_id is None:
+            return
+        try:
+            self._s3_client.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=self.s3_key, UploadId=self._upload_id
+            )
+        except (BotoCoreError, ClientError) as e:
+            print(f"Erro ao cancelar o upload de {self.s3_key}: {str(e)}")
+
+def archive_prefix(username: str) -> str:
+    """Prefixo dos .zip de frames do usuário (os vídeos de entrada ficam em {username}/incoming/)."""
+    return f"{username}/frames_"
+
+def is_archive_key(s3_key: str) -> bool:
+    """Indica se a chave é de um .zip de frames ({username}/frames_...zip)."""
+    username, _, name = s3_key.partition("/")
+    return bool(username) and s3_key.startswith(archive_prefix(username)) and name.endswith(".zip")
+
+def list_user_frame_archives(username: str, max_keys: int = 1000, start_after: str = None) -> dict:
+    """
+    Lista até 'max_keys' arquivos .zip do usuário, em ordem de chave, a partir
+    de 'start_after', seguindo os continuation tokens do S3. Retorna os
+    arquivos com tamanho e data de modificação, a última chave lida e se ainda
+    há arquivos depois dela.
+    """
+    try:
+        s3_client = get_s3_client()
+        request = {"Bucket": settings.AWS_S3_BUCKET_NAME, "Prefix": archive_prefix(username)}
+        if start_after:
+            request["StartAfter"] = start_after
+
+        frame_archives = []
+        last_key = start_after
+        while True:
+            response = s3_client.list_objects_v2(**request, MaxKeys=max(1, max_keys - len(frame_archives)))
+            for obj in response.get('Contents', []):
+                last_key = obj['Key']
+                if obj['Key'].endswith('.zip'):
+                    frame_archives.append({
+                        "key": obj['Key'],
+                        "url": f"{settings.AWS_S3_PUBLIC_URL}/{settings.AWS_S3_BUCKET_NAME}/{obj['Key']}",
+                        "size": obj['Size'],
+                        "last_modified": obj['LastModified'].isoformat(),
+                    })
+            truncated = response.get('IsTruncated', False)
+            if not truncated or len(frame_archives) >= max_keys:
+                return {"archives": frame_archives, "last_key": last_key, "truncated": truncated}
+            request["ContinuationToken"] = response['NextContinuationToken']
 
     except (BotoCoreError, ClientError) as e:
         error_msg = f"Erro ao listar arquivos de frames para {username}: {str(e)}"
@@ -56,4 +222,184 @@ def delete_s3_file(s3_key: str, bucket_name: str = settings.AWS_S3_BUCKET_NAME)
     except s3_client.exceptions.NoSuchKey:
         raise HTTPException(status_code=404, detail="Arquivo não encontrado.")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao excluir o arquivo: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro ao excluir o arquivo: {str(e)}")
+
+    # Só os .zip de frames estão no índice de resultados (os vídeos de entrada não)
+    if not is_archive_key(s3_key):
+        return
+
+    # Remove do índice de resultados as entradas que apontavam para o arquivo
+    try:
+        delete_results_by_s3_key(s3_key)
+    except Exception as e:
+        print(f"Erro ao remover {s3_key} do índice de resultados: {str(e)}")
+
+def head_s3_file(s3_key: str, bucket_name: str = settings.AWS_S3_BUCKET_NAME) -> dict:
+    """Retorna os metadados do arquivo (tamanho e ETag) sem baixá-lo."""
+    s3_client = get_s3_client()
+    try:
+        response = s3_client.head_object(Bucket=bucket_name, Key=s3_key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+            raise HTTPException(status_code=404, detail="Arquivo não encontrado.")
+        raise HTTPException(status_code=500, detail=f"Erro ao consultar {s3_key}: {str(e)}")
+    except BotoCoreError as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao consultar {s3_key}: {str(e)}")
+    return {"size": response["ContentLength"], "etag": response["ETag"].strip('"')}
+
+def job_results_key(username: str, job_id: str) -> str:
+    """Chave do JSON com os timestamps de um job que não couberam no registro do job."""
+    return f"{username}/job-results/{job_id}.json"
+
+def put_s3_object(s3_key: str, body: bytes, content_type: str = None,
+                  bucket_name: str = settings.AWS_S3_BUCKET_NAME) -> None:
+    s3_client = get_s3_client()
+    extra = {"ContentType": content_type} if content_type else {}
+    try:
+        s3_client.put_object(Bucket=bucket_name, Key=s3_key, Body=body, **extra)
+    except (BotoCoreError, ClientError) as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao gravar {s3_key}: {str(e)}")
+
+def read_s3_object(s3_key: str, bucket_name: str = settings.AWS_S3_BUCKET_NAME) -> bytes:
+    s3_client = get_s3_client()
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=s3_key)
+        return response["Body"].read()
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+            raise HTTPException(status_code=404, detail="Arquivo não encontrado.")
+        raise HTTPException(status_code=500, detail=f"Erro ao ler {s3_key}: {str(e)}")
+    except BotoCoreError as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao ler {s3_key}: {str(e)}")
+
+def put_json_object(s3_key: str, data: dict, bucket_name: str = settings.AWS_S3_BUCKET_NAME) -> None:
+    put_s3_object(s3_key, json.dumps(data).encode(), "application/json", bucket_name)
+
+def get_json_object(s3_key: str, bucket_name: str = settings.AWS_S3_BUCKET_NAME) -> dict:
+    return json.loads(read_s3_object(s3_key, bucket_name))
+
+def generate_presigned_download_url(s3_key: str, expires_in: int,
+                                    bucket_name: str = settings.AWS_S3_BUCKET_NAME) -> str:
+    """URL temporária de leitura; o ffmpeg a lê por HTTP com requisições Range."""
+    s3_client = get_s3_client()
+    return s3_client.generate_presigned_url(
+        "get_object", Params={"Bucket": bucket_name, "Key": s3_key}, ExpiresIn=expires_in
+    )
+
+def multipart_part_size(size: int) -> int:
+    """Tamanho das partes de um multipart upload de 'size' bytes (o S3 aceita no máximo 10.000 partes)."""
+    return max(settings.S3_MULTIPART_PART_SIZE, MIN_PART_SIZE, -(-size // MAX_PARTS))
+
+def create_presigned_upload(s3_key: str, size: int, expires_in: int,
+                            bucket_name: str = settings.AWS_S3_BUCKET_NAME) -> dict:
+    """
+    Gera as URLs para o cliente enviar o arquivo direto ao S3: um único POST até
+    INGEST_SINGLE_PUT_MAX_SIZE e, acima disso, um multipart upload com uma URL por parte.
+    A política do POST limita o envio a 'size' bytes; no multipart o tamanho é
+    conferido depois (ver complete_ingest).
+    """
+    s3_client = get_s3_client()
+    try:
+        if size <= settings.INGEST_SINGLE_PUT_MAX_SIZE:
+            post = s3_client.generate_presigned_post(
+                bucket_name, s3_key, Conditions=[["content-length-range", 1, size]], ExpiresIn=expires_in
+            )
+            return {"method": "POST", "url": post["url"], "fields": post["fields"]}
+
+        part_size = multipart_part_size(size)
+        part_count = -(-size // part_size)
+        upload_id = s3_client.create_multipart_upload(Bucket=bucket_name, Key=s3_key)["UploadId"]
+        parts = [
+            {
+                "part_number": part_number,
+                "url": s3_client.generate_presigned_url(
+                    "upload_part",
+                    Params={"Bucket": bucket_name, "Key": s3_key, "UploadId": upload_id, "PartNumber": part_number},
+                    ExpiresIn=expires_in,
+                ),
+            }
+            for part_number in range(1, part_count + 1)
+        ]
+        return {"method": "MULTIPART", "upload_id": upload_id, "part_size": part_size, "parts": parts}
+    except (BotoCoreError, ClientError) as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao preparar o envio de {s3_key}: {str(e)}")
+
+def complete_presigned_multipart(s3_key: str, upload_id: str, parts: list,
+                                 bucket_name: str = settings.AWS_S3_BUCKET_NAME) -> None:
+    """Conclui o multipart upload com as ETags devolvidas pelo S3 ao cliente."""
+    s3_client = get_s3_client()
+    try:
+        s3_client.complete_multipart_upload(
+            Bucket=bucket_name,
+            Key=s3_key,
+            UploadId=upload_id,
+            MultipartUpload={
+                "Parts": [{"PartNumber": part["part_number"], "ETag": part["etag"]} for part in parts]
+            },
+        )
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchUpload", "InvalidPart", "InvalidPartOrder"):
+            raise HTTPException(status_code=409, detail=f"Não foi possível concluir o upload: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro ao concluir o upload de {s3_key}: {str(e)}")
+    except BotoCoreError as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao concluir o upload de {s3_key}: {str(e)}")
+
+def abort_presigned_multipart(s3_key: str, upload_id: str, bucket_name: str = settings.AWS_S3_BUCKET_NAME) -> None:
+    s3_client = get_s3_client()
+    try:
+        s3_client.abort_multipart_upload(Bucket=bucket_name, Key=s3_key, UploadId=upload_id)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "NoSuchUpload":
+            raise HTTPException(status_code=404, detail="Upload não encontrado.")
+        raise HTTPException(status_code=500, detail=f"Erro ao cancelar o upload de {s3_key}: {str(e)}")
+
+def create_multipart_upload(s3_key: str, bucket_name: str = settings.AWS_S3_BUCKET_NAME) -> str:
+    """Inicia um multipart upload e retorna o seu id."""
+    s3_client = get_s3_client()
+    try:
+        return s3_client.create_multipart_upload(Bucket=bucket_name, Key=s3_key)["UploadId"]
+    except (BotoCoreError, ClientError) as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao preparar o envio de {s3_key}: {str(e)}")
+
+def upload_multipart_part(s3_key: str, upload_id: str, part_number: int, body: bytes,
+                          bucket_name: str = settings.AWS_S3_BUCKET_NAME) -> str:
+    """Envia uma parte do multipart upload e retorna a sua ETag."""
+    s3_client = get_s3_client()
+    try:
+        response = s3_client.upload_part(
+            Bucket=bucket_name, Key=s3_key, UploadId=upload_id, PartNumber=part_number, Body=body
+        )
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "NoSuchUpload":
+            raise HTTPException(status_code=404, detail="Upload não encontrado.")
+        raise HTTPException(status_code=500, detail=f"Erro ao enviar a parte {part_number} de {s3_key}: {str(e)}")
+    except BotoCoreError as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao enviar a parte {part_number} de {s3_key}: {str(e)}")
+    return response["ETag"]
+
+def _user_prefixes(s3_client, bucket_name: str) -> list:
+    # Primeiro nível das chaves: um prefixo por usuário
+    prefixes = []
+    for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket_name, Delimiter="/"):
+        prefixes.extend(prefix["Prefix"] for prefix in page.get("CommonPrefixes", []))
+    return prefixes
+
+def list_incoming_objects(older_than: datetime, bucket_name: str = settings.AWS_S3_BUCKET_NAME) -> list:
+    """Chaves em {username}/incoming/ de todos os usuários modificadas antes de 'older_than'."""
+    s3_client = get_s3_client()
+    keys = []
+    for user_prefix in _user_prefixes(s3_client, bucket_name):
+        pages = s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket_name, Prefix=f"{user_prefix}incoming/")
+        for page in pages:
+            keys.extend(item["Key"] for item in page.get("Contents", []) if item["LastModified"] < older_than)
+    return keys
+
+def list_incoming_multipart_uploads(older_than: datetime, bucket_name: str = settings.AWS_S3_BUCKET_NAME) -> list:
+    """Multipart uploads em {username}/incoming/ iniciados antes de 'older_than', como (chave, id)."""
+    s3_client = get_s3_client()
+    uploads = []
+    for page in s3_client.get_paginator("list_multipart_uploads").paginate(Bucket=bucket_name):
+        for upload in page.get("Uploads", []):
+            if upload["Key"].split("/")[1:2] == ["incoming"] and upload["Initiated"] < older_than:
+                uploads.append((upload["Key"], upload["UploadId"]))
+    return uploads
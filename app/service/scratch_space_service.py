@@ -0,0 +1,156 @@
+import os
+import shutil
+import threading
+from tempfile import gettempdir, mkdtemp, TemporaryDirectory
+from fastapi import HTTPException
+from app.core.config import settings
+
+# Prefixos dos diretórios criados pelo gerenciador (e removidos na varredura de órfãos)
+JOB_DIR_PREFIX = "job_"
+WORK_DIR_PREFIX = "work_"
+
+def _format_gb(size: int) -> str:
+    return f"{size / 1024 ** 3:.1f}GB"
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(directory, name)).st_size
+            except OSError:
+                pass
+    return total
+
+class ScratchSpace:
+    """
+    Espaço de trabalho dos jobs (uploads e frames) em um diretório configurável,
+    que pode ser um tmpfs ou um PVC. Cada job reserva o tamanho do upload mais o
+    volume previsto dos frames; quando a soma das reservas passaria da marca de
+    'high_water_ratio' da capacidade, novos uploads são recusados e os jobs
+    aguardam na fila, sem ocupar um worker, até que outros liberem espaço (ver
+    'subscribe').
+    """
+
+    def __init__(self, root: str, capacity: int = None, high_water_ratio: float = 0.85):
+        self.root = root
+        self.capacity = capacity
+        self.high_water_ratio = high_water_ratio
+        self._lock = threading.Lock()
+        self._reservations = {}
+        self._listeners = []
+
+    def _ensure_root(self):
+        os.makedirs(self.root, exist_ok=True)
+
+    def total_capacity(self) -> int:
+        if self.capacity:
+            return self.capacity
+        self._ensure_root()
+        return shutil.disk_usage(self.root).total
+
+    def high_water(self) -> int:
+        return int(self.total_capacity() * self.high_water_ratio)
+
+    def _reserved(self) -> int:
+        return sum(self._reservations.values())
+
+    def create_job_dir(self) -> str:
+        self._ensure_root()
+        return mkdtemp(prefix=JOB_DIR_PREFIX, dir=self.root)
+
+    def work_dir(self) -> TemporaryDirectory:
+        """Diretório de trabalho temporário da extração, removido ao sair do bloco."""
+        self._ensure_root()
+        return TemporaryDirectory(prefix=WORK_DIR_PREFIX, dir=self.root)
+
+    def check_fits(self, key: str, size: int):
+        """Recusa jobs que sozinhos nunca caberiam abaixo da marca de ocupação."""
+        with self._lock:
+            needed = self._reservations.get(key, 0) + size
+        high_water = self.high_water()
+        if needed > high_water:
+            raise HTTPException(
+                status_code=507,
+                detail=(
+                    f"O job precisa de cerca de {_format_gb(needed)} de espaço de trabalho, "
+                    f"acima do limite de {_format_gb(high_water)}."
+                ),
+            )
+
+    def admit(self, key: str, size: int) -> bool:
+        """Reserva 'size' bytes para 'key' sem esperar. Retorna False se a reserva passaria da marca."""
+        high_water = self.high_water()
+        with self._lock:
+            if self._reserved() + size > high_water:
+                return False
+            self._reservations[key] = self._reservations.get(key, 0) + size
+            return True
+
+    def subscribe(self, callback):
+        """Registra uma função chamada sempre que uma reserva é removida ou ajustada (espaço pode ter sobrado)."""
+        self._listeners.append(callback)
+
+    def _notify(self):
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Erro ao avisar sobre espaço de trabalho liberado: {e}")
+
+    def resize(self, key: str, size: int):
+        """Ajusta a reserva de 'key' ao tamanho real (por exemplo, depois de gravado o upload)."""
+        with self._lock:
+            self._reservations[key] = size
+        self._notify()
+
+    def release(self, key: str):
+        with self._lock:
+            released = self._reservations.pop(key, None) is not None
+        if released:
+            self._notify()
+
+    def remove_job_dir(self, path: str):
+        """Remove o diretório do job e libera a sua reserva."""
+        shutil.rmtree(path, ignore_errors=True)
+        self.release(path)
+
+    def sweep_orphans(self) -> int:
+        """
+        Remove os diretórios de jobs deixados por uma execução anterior (queda do
+        processo antes da limpeza). Deve ser chamado na inicialização, antes de
+        qualquer job deste processo. Retorna os bytes liberados.
+        """
+        if not os.path.isdir(self.root):
+            return 0
+        freed = 0
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if not entry.name.startswith((JOB_DIR_PREFIX, WORK_DIR_PREFIX)) or not entry.is_dir(follow_symlinks=False):
+                    continue
+                freed += _directory_size(entry.path)
+                shutil.rmtree(entry.path, ignore_errors=True)
+        if freed:
+            print(f"Espaço de trabalho: {_format_gb(freed)} de diretórios órfãos removidos de {self.root}.")
+        return freed
+
+    def stats(self) -> dict:
+        capacity = self.total_capacity()
+        with self._lock:
+            reserved = self._reserved()
+            jobs = len(self._reservations)
+        return {
+            "root": self.root,
+            "capacity_bytes": capacity,
+            "high_water_bytes": int(capacity * self.high_water_ratio),
+            "reserved_bytes": reserved,
+            "used_bytes": shutil.disk_usage(self.root).used if os.path.isdir(self.root) else 0,
+            "jobs": jobs,
+        }
+
+# Espaço de trabalho compartilhado pelo processo
+scratch_space = ScratchSpace(
+    root=settings.SCRATCH_ROOT or os.path.join(gettempdir(), "frame-extractor"),
+    capacity=settings.SCRATCH_CAPACITY_BYTES,
+    high_water_ratio=settings.SCRATCH_HIGH_WATER_RATIO,
+)
@@ -0,0 +1,47 @@
+import threading
+from app.core.config import settings
+from app.service.ingest_service import sweep_stale_ingests
+from app.service.upload_session_service import sweep_expired_upload_sessions
+
+class StorageSweeper:
+    """
+    Executa periodicamente, em segundo plano, as limpezas dos dados abandonados
+    no S3. Cada limpeza retorna quantos itens removeu; uma falha não interrompe
+    as demais nem os próximos ciclos.
+    """
+
+    def __init__(self, interval: float, sweeps: list):
+        self.interval = interval
+        self.sweeps = sweeps
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def sweep_once(self):
+        for sweep in self.sweeps:
+            try:
+                removed = sweep()
+                if removed:
+                    print(f"{sweep.__name__}: {removed} itens removidos.")
+            except Exception as e:
+                print(f"Erro em {sweep.__name__}: {e}")
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.sweep_once()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="storage-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+storage_sweeper = StorageSweeper(
+    settings.STORAGE_SWEEP_INTERVAL, [sweep_expired_upload_sessions, sweep_stale_ingests]
+)
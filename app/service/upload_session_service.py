@@ -0,0 +1,290 @@
+import os
+import time
+import uuid
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from app.core.config import settings
+from app.domain.process_video_model import ProcessVideoInput, file_too_large_error
+from app.domain.upload_session_model import UploadSession, UploadSessionStatus
+from app.repository.upload_session_repository import (
+    add_upload_session, get_upload_session, claim_upload_writer, renew_upload_writer, commit_upload_chunk,
+    release_upload_writer, complete_upload_session, list_expired_upload_sessions, delete_expired_upload_session
+)
+from app.service.ingest_service import submit_ingested_video_job
+from app.service.job_service import reject_when_queue_full, get_job, incoming_prefix
+from app.service.s3_service import (
+    multipart_part_size, create_multipart_upload, upload_multipart_part, complete_presigned_multipart,
+    abort_presigned_multipart, put_s3_object, read_s3_object, delete_s3_file, head_s3_file
+)
+
+# Campos da sessão devolvidos ao cliente (os demais controlam o armazenamento no S3)
+PUBLIC_FIELDS = ("upload_id", "username", "filename", "size", "offset", "status", "job_id", "created_at", "expires_at")
+
+def _public(session: dict) -> dict:
+    return {field: session.get(field) for field in PUBLIC_FIELDS}
+
+def create_upload_session(username: str, filename: str, size: int) -> dict:
+    """
+    Abre uma sessão de upload em partes. Os bytes vão para um multipart upload
+    em {username}/incoming/ e o progresso confirmado fica no DynamoDB, então
+    qualquer réplica da API recebe a continuação do envio.
+    """
+    ProcessVideoInput.validate_filename(filename)
+    if size > settings.MAX_RESUMABLE_UPLOAD_SIZE:
+        raise file_too_large_error(settings.MAX_RESUMABLE_UPLOAD_SIZE)
+
+    upload_id = str(uuid.uuid4())
+    filename = os.path.basename(filename)
+    s3_key = f"{incoming_prefix(username)}{upload_id}/{filename}"
+    session = UploadSession(
+        upload_id=upload_id,
+        username=username,
+        filename=filename,
+        size=size,
+        s3_key=s3_key,
+        multipart_upload_id=create_multipart_upload(s3_key),
+        part_size=multipart_part_size(size),
+    )
+    add_upload_session(session)
+    return _public(session.model_dump(mode="json"))
+
+def get_user_upload_session(upload_id: str, username: str) -> dict:
+    session = get_upload_session(upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload não encontrado.")
+    if session["username"] != username:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    return session
+
+def describe_upload_session(upload_id: str, username: str) -> dict:
+    return _public(get_user_upload_session(upload_id, username))
+
+def _check_open(session: dict):
+    if session["status"] != UploadSessionStatus.OPEN.value:
+        raise HTTPException(status_code=409, detail="O upload já foi finalizado.")
+    if session["expires_at"] <= time.time():
+        raise HTTPException(status_code=410, detail="O upload expirou. Inicie um novo upload.")
+
+def _offset_conflict(offset: int) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail=f"O offset informado não corresponde ao upload. Continue a partir de {offset}.",
+        headers={"Upload-Offset": str(offset)},
+    )
+
+def _write_conflict(upload_id: str) -> HTTPException:
+    """Erro para a requisição que não conseguiu (ou deixou de) reservar a gravação do upload."""
+    session = get_upload_session(upload_id)
+    if session is None:
+        return HTTPException(status_code=404, detail="Upload não encontrado.")
+    try:
+        _check_open(session)
+    except HTTPException as e:
+        return e
+    if session.get("writer") and session["writer_expires_at"] >= time.time():
+        return HTTPException(
+            status_code=409,
+            detail=f"Outra requisição está gravando neste upload. Continue a partir de {session['offset']}.",
+            headers={"Upload-Offset": str(session["offset"])},
+        )
+    return _offset_conflict(session["offset"])
+
+class UploadWriter:
+    """
+    Reserva de gravação de uma requisição no upload. Só quem detém o lease
+    envia partes e confirma o offset; o lease é renovado durante o envio e
+    expira (UPLOAD_WRITE_LEASE_SECONDS) se a requisição parar.
+    """
+
+    def __init__(self, upload_id: str, lease_seconds: int = settings.UPLOAD_WRITE_LEASE_SECONDS):
+        self.upload_id = upload_id
+        self.token = str(uuid.uuid4())
+        self.lease_seconds = lease_seconds
+        self._renew_at = 0.0
+
+    def claim(self, offset: int):
+        """Reserva o upload se o offset confirmado for 'offset'. Retorna a sessão ou None."""
+        session = claim_upload_writer(self.upload_id, offset, self.token, self.lease_seconds)
+        self._renew_at = time.monotonic() + self.lease_seconds / 2
+        return session
+
+    def renewal_due(self) -> bool:
+        return time.monotonic() >= self._renew_at
+
+    def keep(self):
+        """Renova o lease na metade da validade; levanta 409 se outra requisição assumiu o upload."""
+        if not self.renewal_due():
+            return
+        if not renew_upload_writer(self.upload_id, self.token, self.lease_seconds):
+            raise _write_conflict(self.upload_id)
+        self._renew_at = time.monotonic() + self.lease_seconds / 2
+
+    def release(self):
+        release_upload_writer(self.upload_id, self.token)
+
+def _tail_key(session: dict, writer: UploadWriter) -> str:
+    # Uma chave por gravação: a confirmação troca de objeto, sem sobrescrever o anterior
+    return f"{incoming_prefix(session['username'])}{session['upload_id']}/tail-{writer.token}"
+
+def _discard(s3_key: str):
+    if not s3_key:
+        return
+    try:
+        delete_s3_file(s3_key)
+    except Exception as e:
+        print(f"Erro ao remover {s3_key}: {e}")
+
+def _send_part(session: dict, writer: UploadWriter, part_etags: list, body: bytes):
+    writer.keep()
+    part_etags.append(
+        upload_multipart_part(session["s3_key"], session["multipart_upload_id"], len(part_etags) + 1, body)
+    )
+
+def _commit_chunk(session: dict, writer: UploadWriter, offset: int, part_etags: list, buffer: bytearray):
+    """
+    Grava o restante do buffer (a última parte, se o upload chegou ao fim, ou um
+    novo objeto com o restante) e confirma o offset se 'writer' ainda detém o upload.
+    """
+    tail_key = None
+    if offset == session["size"]:
+        if buffer:
+            _send_part(session, writer, part_etags, bytes(buffer))
+    elif buffer:
+        tail_key = _tail_key(session, writer)
+        put_s3_object(tail_key, bytes(buffer))
+    if not commit_upload_chunk(session["upload_id"], writer.token, offset, part_etags, tail_key):
+        _discard(tail_key)
+        raise _write_conflict(session["upload_id"])
+    _discard(session.get("tail_key"))
+
+async def append_upload_chunk(upload_id: str, username: str, offset: int, stream) -> dict:
+    """
+    Grava os bytes recebidos a partir de 'offset' e confirma o novo offset.
+
+    A requisição reserva o upload antes de gravar, então duas requisições com o
+    mesmo offset não gravam a mesma região: a segunda recebe 409. Os bytes são
+    enviados ao S3 em partes de 'part_size'; o que sobra fica em um objeto à
+    parte até a próxima requisição. Se o cliente desconectar no meio da parte,
+    o que já chegou é mantido e o envio pode ser retomado do offset confirmado.
+    """
+    session = await run_in_threadpool(get_user_upload_session, upload_id, username)
+    _check_open(session)
+    if offset != session["offset"]:
+        raise _offset_conflict(session["offset"])
+
+    writer = UploadWriter(upload_id)
+    session = await run_in_threadpool(writer.claim, offset)
+    if session is None:
+        raise await run_in_threadpool(_write_conflict, upload_id)
+
+    part_size = session["part_size"]
+    part_etags = list(session.get("part_etags") or [])
+    received = 0
+    committed = False
+    try:
+        # O restante confirmado pela requisição anterior volta para o buffer
+        buffer = bytearray(await run_in_threadpool(read_s3_object, session["tail_key"])) \
+            if session.get("tail_key") else bytearray()
+        try:
+            async for chunk in stream:
+                if offset + received + len(chunk) > session["size"]:
+                    raise HTTPException(status_code=413, detail="O conteúdo excede o tamanho declarado do upload.")
+                buffer += chunk
+                received += len(chunk)
+                if writer.renewal_due():
+                    await run_in_threadpool(writer.keep)
+                while len(buffer) >= part_size:
+                    await run_in_threadpool(_send_part, session, writer, part_etags, bytes(buffer[:part_size]))
+                    del buffer[:part_size]
+        except ClientDisconnect:
+            print(f"Cliente desconectado durante o upload {upload_id} após {received} bytes.")
+        finally:
+            # Só confirma o offset depois que os bytes estão no S3
+            if received:
+                await run_in_threadpool(_commit_chunk, session, writer, offset + received, part_etags, buffer)
+                committed = True
+    finally:
+        if not committed:
+            await run_in_threadpool(writer.release)
+
+    return {"upload_id": upload_id, "offset": offset + received, "size": session["size"]}
+
+def _assemble_upload(session: dict):
+    """Conclui o multipart upload, se um finalize anterior ainda não o concluiu."""
+    try:
+        head_s3_file(session["s3_key"])
+        return
+    except HTTPException as e:
+        if e.status_code != 404:
+            raise
+    parts = [{"part_number": number, "etag": etag} for number, etag in enumerate(session["part_etags"], start=1)]
+    try:
+        complete_presigned_multipart(session["s3_key"], session["multipart_upload_id"], parts)
+    except HTTPException as e:
+        if e.status_code != 409:
+            raise
+        raise HTTPException(
+            status_code=410, detail="Os dados do upload não estão mais disponíveis. Inicie um novo upload."
+        )
+
+def finalize_upload_session(upload_id: str, username: str, process_input, role: str = None) -> dict:
+    """
+    Transforma um upload completo em um job de extração: conclui o multipart
+    upload e agenda o job sobre o objeto no S3, como /ingests/process. Repetir
+    a chamada devolve o mesmo job.
+    """
+    session = get_user_upload_session(upload_id, username)
+    if session["status"] == UploadSessionStatus.COMPLETED.value:
+        return get_job(session["job_id"])
+    _check_open(session)
+    if session["offset"] != session["size"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"O upload ainda não foi concluído ({session['offset']} de {session['size']} bytes).",
+            headers={"Upload-Offset": str(session["offset"])},
+        )
+
+    # Com a fila cheia o upload continua na sessão e o cliente pode tentar de novo
+    reject_when_queue_full()
+
+    writer = UploadWriter(upload_id)
+    session = writer.claim(session["size"])
+    if session is None:
+        current = get_upload_session(upload_id)
+        if current and current["status"] == UploadSessionStatus.COMPLETED.value:
+            return get_job(current["job_id"])
+        raise HTTPException(status_code=409, detail="O upload já está sendo finalizado.")
+
+    try:
+        _assemble_upload(session)
+        job = submit_ingested_video_job(process_input, username, session["s3_key"], role=role)
+    except Exception:
+        writer.release()
+        raise
+    complete_upload_session(upload_id, job["job_id"])
+    return job
+
+def sweep_expired_upload_sessions() -> int:
+    """
+    Remove as sessões expiradas e os seus dados no S3: o multipart upload, o
+    objeto com o restante e o vídeo montado por um finalize que não virou job.
+    O TTL do DynamoDB só apagaria o registro. Retorna quantas sessões removeu.
+    """
+    removed = 0
+    for upload_id in list_expired_upload_sessions():
+        session = delete_expired_upload_session(upload_id)
+        if session is None:
+            continue
+        removed += 1
+        # O vídeo de uma sessão concluída pertence ao job
+        if session["status"] == UploadSessionStatus.COMPLETED.value or not session.get("s3_key"):
+            continue
+        try:
+            abort_presigned_multipart(session["s3_key"], session["multipart_upload_id"])
+        except HTTPException as e:
+            if e.status_code != 404:
+                print(f"Erro ao cancelar o upload {upload_id}: {e.detail}")
+        _discard(session.get("tail_key"))
+        _discard(session["s3_key"])
+    return removed
@@ -1,5 +1,9 @@
 import pytest
 from app.repository.dynamodb_repository import create_users_table
+from app.repository.job_repository import create_jobs_table
+from app.repository.result_cache_repository import create_results_table
+from app.repository.upload_session_repository import create_upload_sessions_table
+from app.repository.rate_limit_repository import create_rate_limits_table
 from app.repository.s3_repository import create_s3_bucket
 from app.repository.email_ses_repository import verify_ses_email_identity
 
@@ -9,5 +13,9 @@ def setup_app_dependencies():
     Configura dependências como tabelas DynamoDB, bucket S3 e SES Identity antes dos testes.
     """
     create_users_table()
+    create_jobs_table()
+    create_results_table()
+    create_upload_sessions_table()
+    create_rate_limits_table()
     create_s3_bucket()
     verify_ses_email_identity()
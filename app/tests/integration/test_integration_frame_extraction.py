@@ -44,7 +44,7 @@ def test_process_video_integration_success(client):
     files = {"file": ("sample_video.mp4", BytesIO(video_bytes), "video/mp4")}
     data = {"interval": 5}
 
-    response = client.post("/api/process-video", files=files, data=data)
+    response = client.post("/api/process-video?wait=true", files=files, data=data)
 
     if response.status_code != 200:
         if os.environ.get("GITHUB_ACTIONS") == "true":
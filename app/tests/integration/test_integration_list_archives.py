@@ -15,21 +15,23 @@ client = TestClient(app)
 def test_list_frame_archives_success():
     """
     Testa o caminho feliz: um usuário logado "testuser" solicita a listagem
-    de seus arquivos, e o serviço retorna uma lista de URLs para os arquivos .zip.
+    de seus arquivos, e o serviço retorna uma página com os arquivos .zip.
     """
     expected_archives = [
-        f"{settings.AWS_S3_PUBLIC_URL}/{settings.AWS_S3_BUCKET_NAME}/testuser/file1.zip",
-        f"{settings.AWS_S3_PUBLIC_URL}/{settings.AWS_S3_BUCKET_NAME}/testuser/file2.zip",
+        {"key": "testuser/frames_1.zip", "url": f"{settings.AWS_S3_PUBLIC_URL}/{settings.AWS_S3_BUCKET_NAME}/testuser/frames_1.zip"},
+        {"key": "testuser/frames_2.zip", "url": f"{settings.AWS_S3_PUBLIC_URL}/{settings.AWS_S3_BUCKET_NAME}/testuser/frames_2.zip"},
     ]
     
-    # Patch na função list_user_frame_archives usada no endpoint (no namespace do router)
-    with patch("app.api.frame_routes.list_user_frame_archives", return_value=expected_archives) as mock_list:
+    # Patch na função list_frame_archives usada no endpoint (no namespace do router)
+    with patch("app.api.frame_routes.list_frame_archives",
+               return_value={"archives": expected_archives, "next_cursor": None}) as mock_list:
         response = client.get("/api/testuser/list-frame-archives")
         assert response.status_code == 200, f"Status code inesperado: {response.status_code}"
         json_data = response.json()
         assert "archives" in json_data, "Campo 'archives' não encontrado na resposta"
         assert json_data["archives"] == expected_archives
-        mock_list.assert_called_once_with("testuser")
+        assert json_data["next_cursor"] is None
+        mock_list.assert_called_once_with("testuser", 50, None, "key", "asc", None, None, None)
 
 def test_list_frame_archives_unauthorized():
     """
@@ -49,11 +51,11 @@ def test_list_frame_archives_unauthorized():
 
 def test_list_frame_archives_exception():
     """
-    Testa que, se a função list_user_frame_archives lançar uma exceção, o endpoint
+    Testa que, se a função list_frame_archives lançar uma exceção, o endpoint
     retorna 500 com a mensagem de erro apropriada.
     """
-    with patch("app.api.frame_routes.list_user_frame_archives", side_effect=Exception("List error")) as mock_list:
+    with patch("app.api.frame_routes.list_frame_archives", side_effect=Exception("List error")) as mock_list:
         response = client.get("/api/testuser/list-frame-archives")
         assert response.status_code == 500, f"Esperado 500, obtido {response.status_code}"
         assert "An error occurred: List error" in response.json()["detail"]
-        mock_list.assert_called_once_with("testuser")
+        mock_list.assert_called_once()
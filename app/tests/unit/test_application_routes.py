@@ -0,0 +1,28 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.application_routes import router as application_router
+from app.core.auth import get_current_user
+
+app = FastAPI()
+app.include_router(application_router, prefix="/api")
+
+client = TestClient(app)
+
+def test_metrics_requires_admin():
+    # As métricas do agendador trazem usuários e ids de jobs
+    assert client.get("/api/metrics").status_code == 401
+
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "user", "role": "user_level_1"}
+    try:
+        assert client.get("/api/metrics").status_code == 403
+    finally:
+        app.dependency_overrides.clear()
+
+def test_metrics_for_admin():
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "admin", "role": "administrator"}
+    try:
+        response = client.get("/api/metrics")
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert {"extraction", "scheduler", "queue", "scratch"} <= set(response.json())
@@ -0,0 +1,99 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import HTTPException
+from unittest.mock import patch
+from app.core.config import settings
+from app.domain.job_model import Job, JobStatus
+from app.repository.job_repository import add_job
+from app.repository.s3_repository import get_s3_client
+from app.service.archive_service import list_frame_archives, encode_cursor
+
+def _put_archive(key: str, size: int = 10):
+    get_s3_client().put_object(Bucket=settings.AWS_S3_BUCKET_NAME, Key=key, Body=b"z" * size)
+
+@pytest.fixture
+def archives_user():
+    """Usuário com três .zip de jobs, um .zip sem job e um vídeo de entrada."""
+    username = f"archives_{uuid.uuid4().hex[:8]}"
+    jobs = [
+        Job(username=username, filename="aula.mp4", interval=5, status=JobStatus.DONE, frame_timestamps=[0.0, 5.0]),
+        Job(username=username, filename="palestra.mp4", interval=5, status=JobStatus.DONE,
+            frame_timestamps=[0.0, 5.0, 10.0]),
+        Job(username=username, filename="aula-2.mp4", interval=5, status=JobStatus.DONE),
+    ]
+    for size, job in enumerate(jobs, start=1):
+        add_job(job)
+        _put_archive(f"{username}/frames_{job.job_id}.zip", size * 100)
+    # Várias saídas do terceiro job, uma por .zip
+    jobs[2] = jobs[2].model_copy(update={"output_files": [
+        {"name": "thumbs", "kind": "frames", "frame_timestamps": [1.0],
+         "file_url": f"{settings.AWS_S3_PUBLIC_URL}/{settings.AWS_S3_BUCKET_NAME}/{username}/frames_{jobs[2].job_id}_thumbs.zip"},
+    ]})
+    add_job(jobs[2])
+    _put_archive(f"{username}/frames_{jobs[2].job_id}_thumbs.zip", 50)
+    _put_archive(f"{username}/frames_legado.zip", 5)
+    _put_archive(f"{username}/incoming/abc/video.mp4", 1000)
+    return username, jobs
+
+def test_list_archives_with_job_metadata(archives_user):
+    username, jobs = archives_user
+    page = list_frame_archives(username)
+
+    assert page["next_cursor"] is None
+    archives = {archive["key"]: archive for archive in page["archives"]}
+    # O vídeo de entrada não é listado
+    assert len(archives) == 5
+    first = archives[f"{username}/frames_{jobs[0].job_id}.zip"]
+    assert first["size"] == 100
+    assert first["source_video"] == "aula.mp4"
+    assert first["frame_count"] == 2
+    assert first["job_id"] == jobs[0].job_id
+    assert first["filename"] == f"frames_{jobs[0].job_id}.zip"
+    datetime.fromisoformat(first["last_modified"])
+    assert archives[f"{username}/frames_{jobs[2].job_id}_thumbs.zip"]["frame_count"] == 1
+    legacy = archives[f"{username}/frames_legado.zip"]
+    assert legacy["source_video"] is None and legacy["frame_count"] is None
+
+def test_list_archives_paginates_with_cursor(archives_user):
+    username, _ = archives_user
+    keys = []
+    cursor = None
+    pages = 0
+    while True:
+        page = list_frame_archives(username, limit=2, cursor=cursor)
+        assert len(page["archives"]) <= 2
+        keys.extend(archive["key"] for archive in page["archives"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert keys == sorted(keys) and len(set(keys)) == 5
+
+def test_list_archives_filters_and_sorts(archives_user):
+    username, jobs = archives_user
+    page = list_frame_archives(username, source="AULA", sort="size", order="desc")
+    assert [archive["source_video"] for archive in page["archives"]] == ["aula-2.mp4", "aula.mp4", "aula-2.mp4"]
+    assert [archive["size"] for archive in page["archives"]] == [300, 100, 50]
+
+    future = datetime.now(timezone.utc) + timedelta(days=1)
+    assert list_frame_archives(username, modified_after=future)["archives"] == []
+    assert len(list_frame_archives(username, modified_before=future.replace(tzinfo=None))["archives"]) == 5
+
+def test_list_archives_selective_filter_stops_at_scan_limit(archives_user):
+    username, _ = archives_user
+    with patch("app.service.archive_service.settings.ARCHIVE_LIST_BATCH_SIZE", 2), \
+         patch("app.service.archive_service.settings.ARCHIVE_LIST_MAX_SCAN", 2):
+        page = list_frame_archives(username, source="inexistente")
+    # Nenhum resultado nos arquivos examinados, mas a listagem pode continuar
+    assert page["archives"] == []
+    assert page["next_cursor"] is not None
+
+def test_list_archives_rejects_cursor_of_other_user(archives_user):
+    username, _ = archives_user
+    with pytest.raises(HTTPException) as exc_info:
+        list_frame_archives(username, cursor=encode_cursor("outro/frames_1.zip"))
+    assert exc_info.value.status_code == 400
+    with pytest.raises(HTTPException):
+        list_frame_archives(username, cursor="%%%")
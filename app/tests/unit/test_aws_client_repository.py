@@ -0,0 +1,43 @@
+import threading
+from unittest.mock import patch, MagicMock
+from app.repository.aws_client_repository import get_shared_client, get_client_config, clear_shared_clients
+
+def test_client_config_from_settings():
+    with patch("app.repository.aws_client_repository.settings.AWS_MAX_POOL_CONNECTIONS", 32), \
+         patch("app.repository.aws_client_repository.settings.AWS_RETRY_MODE", "adaptive"), \
+         patch("app.repository.aws_client_repository.settings.AWS_READ_TIMEOUT", 120.0):
+        config = get_client_config()
+    assert config.max_pool_connections == 32
+    assert config.retries["mode"] == "adaptive"
+    assert config.read_timeout == 120.0
+
+def test_shared_client_per_service_and_endpoint():
+    with patch("app.repository.aws_client_repository._clients", {}), \
+         patch("app.repository.aws_client_repository.boto3.client", side_effect=lambda *a, **k: MagicMock()) as mock_boto:
+        s3 = get_shared_client("s3", "http://localhost:4566")
+        assert get_shared_client("s3", "http://localhost:4566") is s3
+        assert get_shared_client("s3", "http://outro:4566") is not s3
+        assert get_shared_client("ses", "http://localhost:4566") is not s3
+        assert mock_boto.call_count == 3
+
+        clear_shared_clients()
+        assert get_shared_client("s3", "http://localhost:4566") is not s3
+
+def test_shared_client_created_once_across_threads():
+    barrier = threading.Barrier(8)
+    clients = []
+
+    def get_client():
+        barrier.wait()
+        clients.append(get_shared_client("s3", "http://localhost:4566"))
+
+    with patch("app.repository.aws_client_repository._clients", {}), \
+         patch("app.repository.aws_client_repository.boto3.client", side_effect=lambda *a, **k: MagicMock()) as mock_boto:
+        threads = [threading.Thread(target=get_client) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert mock_boto.call_count == 1
+    assert all(client is clients[0] for client in clients)
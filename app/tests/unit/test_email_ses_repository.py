@@ -2,19 +2,23 @@ import pytest
 from botocore.exceptions import ClientError
 from app.repository.email_ses_repository import get_email_ses_client, verify_ses_email_identity
 from app.core.config import settings
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, ANY
 
 # Testa get_email_ses_client
 def test_get_email_ses_client():
-    with patch("app.repository.email_ses_repository.boto3.client", return_value="dummy_ses_client") as mock_boto:
+    with patch("app.repository.aws_client_repository._clients", {}), \
+         patch("app.repository.aws_client_repository.boto3.client", return_value="dummy_ses_client") as mock_boto:
         client = get_email_ses_client()
         assert client == "dummy_ses_client"
+        # O cliente é criado uma vez e reaproveitado
+        assert get_email_ses_client() is client
         mock_boto.assert_called_once_with(
             "ses",
             endpoint_url=settings.AWS_SES_ENDPOINT,
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_DEFAULT_REGION
+            region_name=settings.AWS_DEFAULT_REGION,
+            config=ANY,
         )
 
 # Função dummy que simula um cliente SES com e-mail já verificado
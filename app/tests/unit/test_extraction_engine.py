@@ -0,0 +1,131 @@
+import io
+import zipfile
+import pytest
+from unittest.mock import patch
+from app.domain.process_video_model import OutputOptions
+from app.service.extraction_engine import (
+    ExtractionEngine, FFmpegCliEngine, PyAVEngine, get_extraction_engine
+)
+from app.service.frame_processor_service import process_video
+
+class DummyArchiveStream(io.BytesIO):
+    def __init__(self, s3_key, *args, **kwargs):
+        super().__init__()
+        self.s3_key = s3_key
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def complete(self):
+        return f"http://fake-s3.com/{self.s3_key}"
+
+class DummyEngine(ExtractionEngine):
+    name = "dummy"
+
+    def extract(self, video_path, work_dir, archive, interval, mode="auto", timestamps=None, output=None, probe=None,
+                threshold=None):
+        archive.writestr("frame_0001.jpg", b"frame")
+        return "select", [0.0]
+
+def test_get_extraction_engine_default_is_ffmpeg():
+    assert isinstance(get_extraction_engine(), FFmpegCliEngine)
+    assert isinstance(get_extraction_engine("ffmpeg"), FFmpegCliEngine)
+
+def test_get_extraction_engine_unknown():
+    with pytest.raises(ValueError) as exc_info:
+        get_extraction_engine("gstreamer")
+    assert "ffmpeg, pyav" in str(exc_info.value)
+
+def test_extraction_engine_is_abstract():
+    with pytest.raises(TypeError):
+        ExtractionEngine()
+
+def test_pyav_engine_requires_optional_packages():
+    with patch("app.service.extraction_engine.av", None):
+        with pytest.raises(RuntimeError):
+            get_extraction_engine("pyav")
+
+def test_ffmpeg_engine_delegates_to_extract_frames():
+    output = OutputOptions(format="png")
+    with patch("app.service.extraction_engine.extract_frames", return_value=("select", [0.0])) as mock_extract:
+        result = FFmpegCliEngine().extract("/tmp/video.mp4", "/tmp/work", "archive", 5, output=output)
+    assert result == ("select", [0.0])
+    mock_extract.assert_called_once_with("/tmp/video.mp4", "/tmp/work", "archive", 5, "auto", None, output, None, None)
+
+def test_process_video_uses_engine():
+    with patch("app.service.frame_processor_service.S3MultipartWriter", side_effect=DummyArchiveStream), \
+         patch("app.service.frame_processor_service.settings.RESULT_CACHE_ENABLED", False), \
+         patch("app.service.frame_processor_service.ffmpeg.input") as mock_ffmpeg_input:
+        result = process_video("/tmp/video.mp4", 5, "testuser", engine=DummyEngine())
+
+    mock_ffmpeg_input.assert_not_called()
+    assert result["extraction_mode"] == "select"
+    assert result["frame_timestamps"] == [0.0]
+
+def _write_test_video(path, seconds=3, fps=10, value=lambda index: index * 8 % 256):
+    av = pytest.importorskip("av")
+    np = pytest.importorskip("numpy")
+    with av.open(path, "w") as container:
+        stream = container.add_stream("mpeg4", rate=fps)
+        stream.width, stream.height, stream.pix_fmt = 64, 48, "yuv420p"
+        for index in range(seconds * fps):
+            array = np.full((48, 64, 3), value(index), dtype=np.uint8)
+            for packet in stream.encode(av.VideoFrame.from_ndarray(array, format="rgb24")):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+
+def test_pyav_engine_extracts_in_process(tmp_path):
+    pytest.importorskip("PIL")
+    video_path = str(tmp_path / "video.mp4")
+    _write_test_video(video_path)
+    engine = PyAVEngine(batch_size=2)
+
+    batches = list(engine.iter_frame_batches(video_path, 1, output=OutputOptions(max_width=32, grayscale=True)))
+    assert [times for times, _ in batches] == [[0.0, 1.0], [2.0]]
+    assert batches[0][1].shape == (2, 24, 32)
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        mode, frame_timestamps = engine.extract(video_path, str(tmp_path), archive, 1, mode="select")
+        assert archive.namelist() == ["frame_0001.jpg", "frame_0002.jpg", "frame_0003.jpg"]
+    assert mode == "select"
+    assert frame_timestamps == [0.0, 1.0, 2.0]
+
+    _, seek_timestamps = engine.extract(video_path, str(tmp_path), zipfile.ZipFile(io.BytesIO(), "w"), None,
+                                        timestamps=[0.5, 2.0, 10.0])
+    # Timestamps além do fim do vídeo não geram frame
+    assert seek_timestamps == [0.5, 2.0]
+
+def test_pyav_engine_dedupe_skips_static_frames(tmp_path):
+    pytest.importorskip("PIL")
+    video_path = str(tmp_path / "video.mp4")
+    # Conteúdo estático por 3s e depois uma mudança
+    _write_test_video(video_path, seconds=5, value=lambda index: 30 if index < 30 else 220)
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        mode, frame_timestamps = PyAVEngine().extract(video_path, str(tmp_path), archive, 1, mode="dedupe", threshold=0.1)
+        names = archive.namelist()
+    assert mode == "dedupe"
+    assert frame_timestamps == [0.0, 3.0]
+    assert names == ["frame_0001.jpg", "frame_0002.jpg", "manifest.json"]
+
+def test_pyav_engine_sets_decoder_threads(tmp_path):
+    pytest.importorskip("PIL")
+    video_path = str(tmp_path / "video.mp4")
+    _write_test_video(video_path)
+
+    container, stream = PyAVEngine(threads=2)._open(video_path)
+    container.close()
+    assert stream.codec_context.thread_count == 2
+
+def test_pyav_engine_threads_default_to_worker_share():
+    pytest.importorskip("av")
+    with patch("app.service.extraction_engine.settings.PYAV_THREADS", None), \
+         patch("app.service.extraction_engine.settings.EXTRACTION_WORKERS", 2), \
+         patch("app.core.resources.get_available_cpus", return_value=8.0):
+        assert PyAVEngine().threads == 4
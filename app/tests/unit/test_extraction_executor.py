@@ -0,0 +1,73 @@
+import threading
+import pytest
+from unittest.mock import patch, mock_open
+from app.service.extraction_executor import ExtractionExecutor
+from app.exceptions.queue_full_error import QueueFullError
+from app.core.resources import get_cgroup_cpu_limit, get_default_worker_count
+
+def test_submit_runs_job():
+    executor = ExtractionExecutor(max_workers=1, max_queue=1)
+    future = executor.submit(lambda x: x * 2, 21)
+    assert future.result(timeout=5) == 42
+    stats = executor.stats()
+    assert stats["completed"] == 1
+    assert stats["busy_workers"] == 0
+    assert stats["queue_depth"] == 0
+
+def test_submit_rejects_when_queue_full():
+    executor = ExtractionExecutor(max_workers=1, max_queue=1, default_retry_after=15)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking_job():
+        started.set()
+        release.wait(timeout=5)
+
+    running = executor.submit(blocking_job)
+    started.wait(timeout=5)
+    queued = executor.submit(lambda: None)
+
+    assert not executor.has_capacity()
+    with pytest.raises(QueueFullError) as exc_info:
+        executor.submit(lambda: None)
+    assert exc_info.value.retry_after == 15
+
+    stats = executor.stats()
+    assert stats["busy_workers"] == 1
+    assert stats["queue_depth"] == 1
+    assert stats["utilization"] == 1.0
+    assert stats["rejected"] == 1
+
+    release.set()
+    running.result(timeout=5)
+    queued.result(timeout=5)
+    assert executor.has_capacity()
+
+def test_reserved_slot_is_used_by_submit():
+    executor = ExtractionExecutor(max_workers=1, max_queue=0)
+    assert executor.reserve("job-1")
+    # A vaga reservada conta na admissão, mas não para o consumidor da fila
+    assert not executor.has_capacity()
+    assert not executor.reserve("job-2")
+    assert executor.free_slots() == 1
+
+    future = executor.submit(lambda: "ok", schedule={"job_id": "job-1"})
+    assert future.result(timeout=5) == "ok"
+    assert executor.stats()["reserved"] == 0
+
+    assert executor.reserve("job-3")
+    executor.release("job-3")
+    assert executor.has_capacity()
+
+def test_cgroup_v2_cpu_limit():
+    with patch("builtins.open", mock_open(read_data="50000 100000\n")):
+        assert get_cgroup_cpu_limit() == 0.5
+
+def test_cgroup_v2_unlimited():
+    with patch("builtins.open", mock_open(read_data="max 100000\n")):
+        assert get_cgroup_cpu_limit() is None
+
+def test_default_worker_count_half_cpu():
+    # Pod com limite de 500m ainda recebe um worker
+    with patch("app.core.resources.get_cgroup_cpu_limit", return_value=0.5):
+        assert get_default_worker_count() == 1
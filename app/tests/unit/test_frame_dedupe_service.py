@@ -0,0 +1,55 @@
+import io
+import json
+import zipfile
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.service.frame_dedupe_service import (
+    SIGNATURE_SIZE, FrameDeduplicator, frame_signatures, signatures_from_raw, write_frame_manifest
+)
+
+def solid_frames(*values, shape=(48, 64, 3)):
+    return np.stack([np.full(shape, value, dtype=np.uint8) for value in values])
+
+def test_frame_signatures_shapes():
+    rgb = frame_signatures(solid_frames(10, 200))
+    assert rgb.shape == (2, SIGNATURE_SIZE, SIGNATURE_SIZE)
+    assert np.allclose(rgb[0], 10, atol=0.1) and np.allclose(rgb[1], 200, atol=0.1)
+
+    gray = frame_signatures(solid_frames(50, shape=(33, 70)))
+    assert gray.shape == (1, SIGNATURE_SIZE, SIGNATURE_SIZE)
+
+    # Frames menores que a assinatura são amostrados
+    tiny = frame_signatures(solid_frames(7, shape=(8, 8)))
+    assert tiny.shape == (1, SIGNATURE_SIZE, SIGNATURE_SIZE)
+
+def test_signatures_from_raw():
+    data = bytes(range(256)) * 2 + b"\x00" * 10
+    signatures = signatures_from_raw(data)
+    assert signatures.shape == (2, SIGNATURE_SIZE, SIGNATURE_SIZE)
+    assert signatures[1, 0, 1] == 1
+
+def test_deduplicator_drops_near_identical_frames_across_batches():
+    deduplicator = FrameDeduplicator(threshold=0.05)
+    # Frames 0-2 quase iguais, 3 diferente, 4 igual ao 3
+    first = deduplicator.keep_mask(frame_signatures(solid_frames(100, 101, 102)))
+    second = deduplicator.keep_mask(frame_signatures(solid_frames(103, 180, 181)))
+    assert first.tolist() == [True, False, False]
+    assert second.tolist() == [False, True, False]
+    # A comparação é com o último frame mantido, não com o anterior
+    assert deduplicator.keep_mask(frame_signatures(solid_frames(186, 200))).tolist() == [False, True]
+    assert deduplicator.stats() == {"candidates": 8, "dropped": 5, "threshold": 0.05}
+
+def test_write_frame_manifest():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        write_frame_manifest(archive, "dedupe", [0.0, 12.0], "jpg", interval=1, candidates=30, dropped=28)
+    with zipfile.ZipFile(buffer) as archive:
+        manifest = json.loads(archive.read("manifest.json"))
+    assert manifest["mode"] == "dedupe"
+    assert manifest["dropped"] == 28
+    assert manifest["frames"] == [
+        {"file": "frame_0001.jpg", "timestamp": 0.0},
+        {"file": "frame_0002.jpg", "timestamp": 12.0},
+    ]
@@ -1,12 +1,23 @@
 import os
+import json
+import hashlib
 import zipfile
 from io import BytesIO
 import pytest
 from fastapi import HTTPException
 from unittest.mock import patch, MagicMock
 import boto3
-from app.service.frame_processor_service import process_video
+from app.service.frame_processor_service import (
+    process_video, save_upload, notify_file_ready, probe_video, compute_timestamps,
+    choose_extraction_mode, extract_frames, extract_frames_by_seek, plan_segments,
+    extract_frames_by_segments, iter_jpeg_frames, iter_png_frames, iter_webp_frames, apply_output_filters,
+    encoder_options, choose_quality_for_target, extract_fanout, build_sprite_vtt, process_video_outputs,
+    preflight_video, _encoded_frame_size, plan_frame_count, estimate_cost, estimate_frame_bytes
+)
 from app.core.cryptography import get_email_hash, encrypt_email
+from app.service.frame_dedupe_service import write_frame_manifest
+import ffmpeg
+from app.domain.process_video_model import OutputOptions, OutputSpec
 
 # Classe dummy para simular um UploadFile
 class DummyUploadFile:
@@ -14,8 +25,28 @@ class DummyUploadFile:
         self.filename = filename
         self.file = BytesIO(content)
 
-def dummy_upload_to_s3(file_path, s3_key):
-    return f"http://fake-s3.com/{s3_key}"
+# Destino dummy do .zip no lugar do multipart upload do S3
+class DummyArchiveStream(BytesIO):
+    instances = []
+
+    def __init__(self, s3_key):
+        super().__init__()
+        self.s3_key = s3_key
+        self.completed = False
+        self.aborted = False
+        DummyArchiveStream.instances.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.aborted = True
+        return False
+
+    def complete(self):
+        self.completed = True
+        return f"http://fake-s3.com/{self.s3_key}"
 
 def dummy_get_user_by_username(username):
     email = f"{username}@example.com"
@@ -26,64 +57,685 @@ def dummy_get_user_by_username(username):
         "email_hash": get_email_hash(email)
     }
 
+# Processo dummy do ffmpeg que escreve frames JPEG no stdout (image2pipe)
+FAKE_JPEG_1 = b"\xff\xd8frame-one\xff\xd9"
+FAKE_JPEG_2 = b"\xff\xd8frame-two\xff\xd9"
+SHOWINFO_STDERR = b"[Parsed_showinfo_1] n:0 pts:0 pts_time:0\n[Parsed_showinfo_1] n:1 pts:5 pts_time:5\n"
+
+class DummyFFmpegProcess:
+    def __init__(self, stdout=b"", stderr=b"", returncode=0):
+        self.pid = 0
+        self.stdout = BytesIO(stdout)
+        self.stderr = BytesIO(stderr)
+        self.returncode = returncode
+
+    def wait(self):
+        return self.returncode
+
+@pytest.fixture(autouse=True)
+def ffmpeg_popen():
+    """
+    Nenhum teste unitário inicia o ffmpeg. Nos streams simulados, compile() retorna
+    o próprio DummyFFmpegProcess, que o Popen simulado devolve; nos demais casos,
+    um processo sem saída.
+    """
+    def fake_popen(args, **kwargs):
+        return args if isinstance(args, DummyFFmpegProcess) else DummyFFmpegProcess()
+
+    with patch("app.service.frame_processor_service.subprocess.Popen", side_effect=fake_popen) as mock_popen:
+        yield mock_popen
+
+def mock_merged_process(process):
+    """Saída de ffmpeg.merge_outputs cujo comando (com -progress) executa 'process'."""
+    merged = MagicMock()
+    merged.global_args.return_value.compile.return_value = process
+    return merged
+
+def mock_pipe_process(mock_ffmpeg_input, process):
+    mock_ffmpeg = MagicMock()
+    mock_ffmpeg.filter.return_value.filter.return_value.output.return_value.global_args.return_value.compile.return_value = \
+        process
+    mock_ffmpeg_input.return_value = mock_ffmpeg
+    return mock_ffmpeg
+
 # Teste do caminho feliz para process_video
-@patch("boto3.client")  # Bloqueia o S3 real
-def test_process_video_success(mock_boto_client):
-    # Mocka boto3 S3 client
-    mock_s3 = MagicMock()
-    mock_boto_client.return_value = mock_s3
-    
-    dummy_file = DummyUploadFile("video.mp4", b"fake video content")
+def test_process_video_success():
     dummy_interval = 5
     dummy_username = "testuser"
+    DummyArchiveStream.instances.clear()
 
-    # Cria um objeto dummy para background_tasks
-    dummy_background = MagicMock()
+    with patch("app.service.frame_processor_service.S3MultipartWriter", side_effect=DummyArchiveStream), \
+         patch("app.service.frame_processor_service.probe_video", side_effect=Exception("ffprobe indisponível")), \
+         patch("app.service.frame_processor_service.ffmpeg.input") as mock_ffmpeg_input:
 
-    with patch("app.service.frame_processor_service.upload_to_s3", side_effect=dummy_upload_to_s3) as mock_upload, \
-         patch("app.service.frame_processor_service.get_user_by_username", side_effect=dummy_get_user_by_username) as mock_get_user, \
-         patch("app.service.frame_processor_service.ffmpeg.input") as mock_ffmpeg_input, \
-         patch("zipfile.ZipFile.write", return_value=None):
-
-        # Simula o pipeline do ffmpeg
-        fake_run = MagicMock(return_value=(b"stdout", b"stderr"))
-        mock_ffmpeg = MagicMock()
-        mock_ffmpeg.filter.return_value.output.return_value.run = fake_run
-        mock_ffmpeg_input.return_value = mock_ffmpeg
-
-        # Simula que existem frames extraídos
-        with patch("os.listdir", return_value=["frame_0001.jpg", "frame_0002.jpg"]):
-            file_url = process_video(dummy_file, dummy_interval, dummy_username, background_tasks=dummy_background)
-            assert file_url.startswith("http://fake-s3.com/")
-            mock_upload.assert_called_once()
-            mock_get_user.assert_called_once_with(dummy_username)
-            dummy_background.add_task.assert_called_once()
-            args, _ = dummy_background.add_task.call_args
-            from app.service.email_ses_service import send_file_url_email_ses
-            assert args[0] == send_file_url_email_ses
-            assert args[1] == f"{dummy_username}@example.com"
-            assert args[2] == dummy_username
-            assert args[3] == file_url
+        # Simula o pipeline do ffmpeg emitindo dois frames pelo stdout
+        mock_ffmpeg = mock_pipe_process(mock_ffmpeg_input, DummyFFmpegProcess(FAKE_JPEG_1 + FAKE_JPEG_2, SHOWINFO_STDERR))
+
+        result = process_video("/tmp/video.mp4", dummy_interval, dummy_username)
+        assert result["file_url"].startswith("http://fake-s3.com/testuser/frames_")
+        assert result["extraction_mode"] == "select"
+        assert result["frame_timestamps"] == [0.0, 5.0]
+        mock_ffmpeg_input.assert_called_once_with("/tmp/video.mp4", fflags="+genpts")
+        mock_ffmpeg.filter.return_value.filter.return_value.output.assert_called_once_with(
+            "pipe:", format="image2pipe", vcodec="mjpeg", vsync="vfr"
+        )
+
+    # O .zip é gravado direto no upload, sem arquivo local
+    (stream,) = DummyArchiveStream.instances
+    assert stream.completed and not stream.aborted
+    with zipfile.ZipFile(BytesIO(stream.getvalue())) as zipf:
+        archived = {name: zipf.read(name) for name in zipf.namelist()}
+    assert archived == {"frame_0001.jpg": FAKE_JPEG_1, "frame_0002.jpg": FAKE_JPEG_2}
 
 # Teste para o caso em que nenhum frame é extraído
 def test_process_video_no_frames():
-    dummy_file = DummyUploadFile("video.mp4", b"fake video content")
+    DummyArchiveStream.instances.clear()
     with patch("app.service.frame_processor_service.ffmpeg.input") as mock_ffmpeg_input, \
-         patch("os.listdir", return_value=[]):
-        
-        fake_run = MagicMock(return_value=(b"stdout", b"stderr"))
-        mock_ffmpeg = MagicMock()
-        mock_ffmpeg.filter.return_value.output.return_value.run = fake_run
-        mock_ffmpeg_input.return_value = mock_ffmpeg
+         patch("app.service.frame_processor_service.probe_video", side_effect=Exception("ffprobe indisponível")), \
+         patch("app.service.frame_processor_service.S3MultipartWriter", side_effect=DummyArchiveStream):
+        mock_pipe_process(mock_ffmpeg_input, DummyFFmpegProcess(b"", b"stderr"))
 
         with pytest.raises(HTTPException) as exc_info:
-            process_video(dummy_file, 5, "testuser", background_tasks=MagicMock())
+            process_video("/tmp/video.mp4", 5, "testuser")
         assert "Nenhum frame foi extraído do vídeo." in str(exc_info.value)
 
+    # O upload é cancelado em vez de concluído
+    (stream,) = DummyArchiveStream.instances
+    assert stream.aborted and not stream.completed
+
+def test_process_video_no_frames_with_manifest():
+    # No modo dedupe o manifest.json sempre entra no .zip, mas não conta como frame
+    def extract_only_manifest(video_path, work_dir, archive, *args):
+        write_frame_manifest(archive, "dedupe", [], "jpg")
+        return "dedupe", []
+
+    with patch("app.service.frame_processor_service.extract_frames", side_effect=extract_only_manifest), \
+         patch("app.service.frame_processor_service.settings.RESULT_CACHE_ENABLED", False), \
+         patch("app.service.frame_processor_service.S3MultipartWriter", side_effect=DummyArchiveStream):
+        with pytest.raises(HTTPException) as exc_info:
+            process_video("/tmp/video.mp4", 5, "testuser", mode="dedupe")
+    assert "Nenhum frame foi extraído do vídeo." in str(exc_info.value)
+
+# Vídeo e parâmetros já processados: reaproveita o arquivo sem executar o ffmpeg
+def test_process_video_cache_hit():
+    cached = {"file_url": "http://fake-s3.com/copy.zip", "extraction_mode": "select",
+              "frame_timestamps": [0.0, 5.0], "cache_hit": True}
+    with patch("app.service.frame_processor_service.get_cached_result", return_value=cached) as mock_lookup, \
+         patch("app.service.frame_processor_service.ffmpeg.input") as mock_ffmpeg_input, \
+         patch("app.service.frame_processor_service.S3MultipartWriter") as mock_writer:
+        result = process_video("/tmp/video.mp4", 5, "testuser", video_sha256="abc")
+
+    assert result == cached
+    cache_key = mock_lookup.call_args[0][0]
+    assert cache_key.startswith("abc:")
+    mock_ffmpeg_input.assert_not_called()
+    mock_writer.assert_not_called()
+
+# Após processar, o resultado é registrado no índice com a chave do arquivo
+def test_process_video_cache_miss_stores_result():
+    DummyArchiveStream.instances.clear()
+    with patch("app.service.frame_processor_service.get_cached_result", return_value=None), \
+         patch("app.service.frame_processor_service.store_result") as mock_store, \
+         patch("app.service.frame_processor_service.S3MultipartWriter", side_effect=DummyArchiveStream), \
+         patch("app.service.frame_processor_service.probe_video", side_effect=Exception("ffprobe indisponível")), \
+         patch("app.service.frame_processor_service.ffmpeg.input") as mock_ffmpeg_input:
+        mock_pipe_process(mock_ffmpeg_input, DummyFFmpegProcess(FAKE_JPEG_1, SHOWINFO_STDERR))
+        result = process_video("/tmp/video.mp4", 5, "testuser", video_sha256="abc")
+
+    assert result["cache_hit"] is False
+    cache_key, video_sha256, s3_key, stored = mock_store.call_args[0]
+    assert cache_key.startswith("abc:")
+    assert video_sha256 == "abc"
+    assert s3_key == DummyArchiveStream.instances[0].s3_key
+    assert stored == result
+
+# Falhas no índice não impedem o processamento
+def test_process_video_cache_error_falls_back_to_processing():
+    DummyArchiveStream.instances.clear()
+    with patch("app.service.frame_processor_service.get_cached_result", side_effect=Exception("DynamoDB fora")), \
+         patch("app.service.frame_processor_service.store_result", side_effect=Exception("DynamoDB fora")), \
+         patch("app.service.frame_processor_service.S3MultipartWriter", side_effect=DummyArchiveStream), \
+         patch("app.service.frame_processor_service.probe_video", side_effect=Exception("ffprobe indisponível")), \
+         patch("app.service.frame_processor_service.ffmpeg.input") as mock_ffmpeg_input:
+        mock_pipe_process(mock_ffmpeg_input, DummyFFmpegProcess(FAKE_JPEG_1, SHOWINFO_STDERR))
+        result = process_video("/tmp/video.mp4", 5, "testuser", video_sha256="abc")
+    assert result["file_url"].startswith("http://fake-s3.com/testuser/")
+
+# Testa falha do ffmpeg no modo pipe
+def test_process_video_ffmpeg_failure():
+    with patch("app.service.frame_processor_service.ffmpeg.input") as mock_ffmpeg_input, \
+         patch("app.service.frame_processor_service.S3MultipartWriter", side_effect=DummyArchiveStream), \
+         patch("app.service.frame_processor_service.probe_video", side_effect=Exception("ffprobe indisponível")):
+        mock_pipe_process(mock_ffmpeg_input, DummyFFmpegProcess(b"", b"Invalid data found", returncode=1))
+
+        with pytest.raises(HTTPException) as exc_info:
+            process_video("/tmp/video.mp4", 5, "testuser")
+        assert "Erro durante o processamento" in str(exc_info.value.detail)
+
+# Testa a separação de frames JPEG no stream, mesmo quebrados entre leituras
+def test_iter_jpeg_frames_split_across_chunks():
+    stream = BytesIO(b"lixo" + FAKE_JPEG_1 + FAKE_JPEG_2)
+    assert list(iter_jpeg_frames(stream, chunk_size=3)) == [FAKE_JPEG_1, FAKE_JPEG_2]
+
 # Testa exceção genérica durante o processamento
 def test_process_video_generic_exception():
-    dummy_file = DummyUploadFile("video.mp4", b"fake video content")
-    with patch("app.service.frame_processor_service.ffmpeg.input", side_effect=Exception("FFmpeg error")):
+    with patch("app.service.frame_processor_service.ffmpeg.input", side_effect=Exception("FFmpeg error")), \
+         patch("app.service.frame_processor_service.S3MultipartWriter", side_effect=DummyArchiveStream), \
+         patch("app.service.frame_processor_service.probe_video", side_effect=Exception("ffprobe indisponível")):
         with pytest.raises(HTTPException) as exc_info:
-            process_video(dummy_file, 5, "testuser", background_tasks=MagicMock())
+            process_video("/tmp/video.mp4", 5, "testuser")
         assert "Erro durante o processamento: FFmpeg error" in str(exc_info.value)
+
+# Testa o salvamento do upload no diretório do job
+def test_save_upload(tmp_path):
+    dummy_file = DummyUploadFile("video.mp4", b"fake video content")
+    video_path, file_size, video_sha256 = save_upload(dummy_file, str(tmp_path), chunk_size=4)
+    assert video_path == os.path.join(str(tmp_path), "video.mp4")
+    assert file_size == len(b"fake video content")
+    assert video_sha256 == hashlib.sha256(b"fake video content").hexdigest()
+    with open(video_path, "rb") as f:
+        assert f.read() == b"fake video content"
+
+# Testa que o limite de tamanho é validado durante a cópia
+def test_save_upload_exceeds_max_size(tmp_path):
+    dummy_file = DummyUploadFile("video.mp4", b"x" * 2048)
+    with pytest.raises(HTTPException) as exc_info:
+        save_upload(dummy_file, str(tmp_path), max_size=1024, chunk_size=512)
+    assert exc_info.value.status_code == 422
+    assert "O tamanho do arquivo excede o limite permitido de 1KB." in str(exc_info.value.detail)
+    # Só o que coube no limite chegou ao disco
+    assert os.path.getsize(os.path.join(str(tmp_path), "video.mp4")) <= 1024
+
+# Testa o envio do e-mail enfileirado em background
+def test_notify_file_ready_background():
+    dummy_background = MagicMock()
+    with patch("app.service.frame_processor_service.get_user_by_username", side_effect=dummy_get_user_by_username) as mock_get_user:
+        notify_file_ready("testuser", "http://fake-s3.com/file.zip", background_tasks=dummy_background)
+        mock_get_user.assert_called_once_with("testuser")
+        dummy_background.add_task.assert_called_once()
+        args, _ = dummy_background.add_task.call_args
+        from app.service.email_ses_service import send_file_url_email_ses
+        assert args[0] == send_file_url_email_ses
+        assert args[1] == "testuser@example.com"
+        assert args[2] == "testuser"
+        assert args[3] == "http://fake-s3.com/file.zip"
+
+# Testa o envio direto do e-mail (execução fora de uma requisição)
+def test_notify_file_ready_direct():
+    with patch("app.service.frame_processor_service.get_user_by_username", side_effect=dummy_get_user_by_username), \
+         patch("app.service.frame_processor_service.send_file_url_email_ses") as mock_send:
+        notify_file_ready("testuser", "http://fake-s3.com/file.zip")
+        mock_send.assert_called_once_with("testuser@example.com", "testuser", "http://fake-s3.com/file.zip")
+
+# --- Testes das estratégias de extração ---
+def dummy_probe_response():
+    return {
+        "format": {"duration": "7200.0"},
+        "streams": [{
+            "codec_type": "video", "codec_name": "h264", "width": 1920, "height": 1080,
+            "avg_frame_rate": "30000/1001",
+        }],
+        "packets": [
+            {"pts_time": "0.000000", "flags": "K__"},
+            {"pts_time": "0.033367", "flags": "___"},
+            {"pts_time": "2.002000", "flags": "K__"},
+            {"pts_time": "4.004000", "flags": "K__"},
+        ],
+    }
+
+def test_probe_video():
+    with patch("app.service.frame_processor_service.ffmpeg.probe", return_value=dummy_probe_response()):
+        probe = probe_video("/tmp/video.mp4")
+    assert probe["duration"] == 7200.0
+    assert probe["codec"] == "h264"
+    assert probe["width"] == 1920
+    assert round(probe["fps"], 2) == 29.97
+    assert round(probe["keyframe_interval"], 3) == 2.002
+
+def test_probe_video_without_video_stream():
+    with patch("app.service.frame_processor_service.ffmpeg.probe", return_value={"streams": [{"codec_type": "audio"}]}):
+        with pytest.raises(ValueError):
+            probe_video("/tmp/audio.mp4")
+
+def test_compute_timestamps():
+    assert compute_timestamps(25, 10) == [0, 10, 20]
+    assert compute_timestamps(20, 10) == [0, 10]
+    assert compute_timestamps(0, 10) == []
+
+def test_choose_extraction_mode():
+    probe = {"keyframe_interval": 2.0}
+    assert choose_extraction_mode(60, probe) == "seek"
+    assert choose_extraction_mode(1, probe) == "select"
+    assert choose_extraction_mode(60, None) == "select"
+
+def test_extract_frames_auto_uses_seek_for_sparse_interval(tmp_path):
+    probe = {"duration": 25.0, "keyframe_interval": 2.0}
+    with patch("app.service.frame_processor_service.probe_video", return_value=probe), \
+         patch("app.service.frame_processor_service.ffmpeg.input") as mock_input, \
+         patch("app.service.frame_processor_service.ffmpeg.merge_outputs",
+               return_value=mock_merged_process(DummyFFmpegProcess())) as mock_merge:
+        mode, _ = extract_frames("/tmp/video.mp4", str(tmp_path), MagicMock(), 10, mode="auto")
+
+    assert mode == "seek"
+    # Um input com -ss por timestamp, todos no mesmo lote
+    seeks = [call.kwargs["ss"] for call in mock_input.call_args_list]
+    assert seeks == [0, 10, 20]
+    mock_merge.return_value.global_args.assert_called_once_with("-progress", "pipe:2", "-nostats")
+    mock_merge.return_value.global_args.return_value.compile.assert_called_once()
+    output_paths = [call.args[0] for call in mock_input.return_value.output.call_args_list]
+    assert [os.path.basename(path) for path in output_paths] == ["frame_0001.jpg", "frame_0002.jpg", "frame_0003.jpg"]
+
+def test_extract_frames_explicit_timestamps_skip_probe(tmp_path):
+    with patch("app.service.frame_processor_service.probe_video") as mock_probe, \
+         patch("app.service.frame_processor_service.ffmpeg.input") as mock_input, \
+         patch("app.service.frame_processor_service.ffmpeg.merge_outputs",
+               return_value=mock_merged_process(DummyFFmpegProcess())):
+        mode, _ = extract_frames("/tmp/video.mp4", str(tmp_path), MagicMock(), None, mode="auto", timestamps=[1.5, 42.0])
+
+    assert mode == "seek"
+    mock_probe.assert_not_called()
+    assert [call.kwargs["ss"] for call in mock_input.call_args_list] == [1.5, 42.0]
+
+def test_extract_frames_auto_falls_back_to_select(tmp_path):
+    with patch("app.service.frame_processor_service.probe_video", side_effect=Exception("ffprobe error")), \
+         patch("app.service.frame_processor_service._pipe_to_archive", return_value=[0.0]) as mock_pipe:
+        mode, _ = extract_frames("/tmp/video.mp4", str(tmp_path), MagicMock(), 10, mode="auto")
+    assert mode == "select"
+    mock_pipe.assert_called_once()
+
+def test_extract_frames_by_seek_reports_existing_frames(tmp_path):
+    # Só o primeiro timestamp gera arquivo (o segundo está além do fim do vídeo)
+    def fake_merge(*outputs):
+        (tmp_path / "frame_0001.jpg").write_bytes(b"jpg")
+        return mock_merged_process(DummyFFmpegProcess())
+
+    with patch("app.service.frame_processor_service.ffmpeg.input"), \
+         patch("app.service.frame_processor_service.ffmpeg.merge_outputs", side_effect=fake_merge):
+        produced = extract_frames_by_seek("/tmp/video.mp4", [3.0, 9999.0], str(tmp_path))
+    assert produced == [3.0]
+
+def test_extract_frames_keyframes_mode(tmp_path):
+    stderr = b"[Parsed_showinfo_1] n:0 pts:0 pts_time:0\n[Parsed_showinfo_1] n:1 pts:250 pts_time:10.01\n"
+    with patch("app.service.frame_processor_service.probe_video") as mock_probe, \
+         patch("app.service.frame_processor_service.ffmpeg.input") as mock_input:
+        mock_pipe_process(mock_input, DummyFFmpegProcess(FAKE_JPEG_1 + FAKE_JPEG_2, stderr))
+        archive = MagicMock()
+        mode, frame_timestamps = extract_frames("/tmp/video.mp4", str(tmp_path), archive, 10, mode="keyframes")
+
+    assert mode == "keyframes"
+    assert frame_timestamps == [0.0, 10.01]
+    mock_probe.assert_not_called()
+    # Decodifica só keyframes e ignora o áudio
+    mock_input.assert_called_once_with("/tmp/video.mp4", skip_frame="nokey", an=None)
+    select_args = mock_input.return_value.filter.call_args[0]
+    assert select_args == ("select", "isnan(prev_selected_t)+gte(t-prev_selected_t,10)")
+    assert archive.writestr.call_count == 2
+    # Nenhum diretório de frames é criado no modo pipe
+    assert not (tmp_path / "frames").exists()
+
+def test_extract_frames_disk_mode_when_pipeline_disabled(tmp_path):
+    def fake_select(video_path, interval, frames_dir, output):
+        (tmp_path / "frames" / "frame_0001.jpg").write_bytes(b"jpg")
+        return [0.0]
+
+    archive = MagicMock()
+    with patch("app.service.frame_processor_service.probe_video", return_value={"duration": 30.0, "keyframe_interval": 10.0}), \
+         patch("app.service.frame_processor_service.extract_frames_by_select", side_effect=fake_select), \
+         patch("app.service.frame_processor_service.settings.FRAME_PIPELINE", False):
+        mode, _ = extract_frames("/tmp/video.mp4", str(tmp_path), archive, 5, mode="select")
+
+    assert mode == "select"
+    archive.write.assert_called_once_with(str(tmp_path / "frames" / "frame_0001.jpg"), arcname="frame_0001.jpg")
+    # Cada frame é removido do disco assim que entra no .zip
+    assert os.listdir(tmp_path / "frames") == []
+
+# --- Testes da extração paralela por segmentos ---
+def test_plan_segments_aligned_to_interval():
+    segments = plan_segments(3600, 7, 4)
+    assert segments[0][0] == 0
+    assert segments[-1][1] == 3600
+    # Fronteiras internas múltiplas do intervalo e sem lacunas entre segmentos
+    for (_, end), (next_start, _) in zip(segments, segments[1:]):
+        assert end == next_start
+        assert end % 7 == 0
+    assert len(segments) == 4
+
+def test_plan_segments_short_video():
+    assert plan_segments(5, 10, 8) == [(0, 5)]
+
+def test_extract_frames_by_segments_merges_in_order(tmp_path):
+    # Cada segmento gera dois frames; a junção renumera na ordem dos segmentos
+    def fake_segment(video_path, interval, start, end, segment_dir, output):
+        for number in (1, 2):
+            with open(os.path.join(segment_dir, f"frame_{number:04d}.jpg"), "w") as f:
+                f.write(f"{start}-{number}")
+        return [float(start), float(start + interval)]
+
+    with patch("app.service.frame_processor_service._extract_select_segment", side_effect=fake_segment):
+        timestamps = extract_frames_by_segments("/tmp/video.mp4", 10, 40, str(tmp_path), parallelism=2)
+
+    assert timestamps == [0.0, 10.0, 20.0, 30.0]
+    assert sorted(os.listdir(tmp_path)) == ["frame_0001.jpg", "frame_0002.jpg", "frame_0003.jpg", "frame_0004.jpg"]
+    with open(tmp_path / "frame_0003.jpg") as f:
+        assert f.read() == "20-1"
+
+def test_extract_frames_by_segments_defaults_to_worker_share(tmp_path):
+    # Com 2 workers em 8 núcleos, cada job usa até 4 ffmpeg simultâneos
+    with patch("app.service.frame_processor_service.settings.SEGMENT_PARALLELISM", None), \
+         patch("app.service.frame_processor_service.settings.EXTRACTION_WORKERS", 2), \
+         patch("app.core.resources.get_available_cpus", return_value=8.0), \
+         patch("app.service.frame_processor_service.plan_segments", return_value=[(0, 7200)]) as mock_plan, \
+         patch("app.service.frame_processor_service._extract_select_segment", return_value=[]):
+        extract_frames_by_segments("/tmp/video.mp4", 10, 7200, str(tmp_path))
+    mock_plan.assert_called_once_with(7200, 10, 4)
+
+def test_extract_frames_uses_segments_for_long_video(tmp_path):
+    probe = {"duration": 7200.0, "keyframe_interval": 10.0}
+    with patch("app.service.frame_processor_service.probe_video", return_value=probe), \
+         patch("app.service.frame_processor_service.extract_frames_by_segments", return_value=[0.0]) as mock_segments:
+        mode, _ = extract_frames("/tmp/video.mp4", str(tmp_path), MagicMock(), 1, mode="select")
+    assert mode == "select"
+    mock_segments.assert_called_once_with(
+        "/tmp/video.mp4", 1, 7200.0, os.path.join(str(tmp_path), "frames"), output=OutputOptions()
+    )
+
+# --- Testes das opções de codificação da saída ---
+def test_apply_output_filters_scale_and_grayscale():
+    stream = MagicMock()
+    output = OutputOptions(max_width=640, max_height=360, grayscale=True)
+    result = apply_output_filters(stream, output)
+    stream.filter.assert_called_once_with(
+        "scale", w="min(iw,640)", h="min(ih,360)", force_original_aspect_ratio="decrease"
+    )
+    stream.filter.return_value.filter.assert_called_once_with("format", "gray")
+    assert result is stream.filter.return_value.filter.return_value
+
+def test_apply_output_filters_width_only():
+    stream = MagicMock()
+    apply_output_filters(stream, OutputOptions(max_width=1280))
+    stream.filter.assert_called_once_with("scale", w="min(iw,1280)", h=-2)
+
+def test_apply_output_filters_defaults_keep_stream():
+    stream = MagicMock()
+    assert apply_output_filters(stream, OutputOptions()) is stream
+    stream.filter.assert_not_called()
+
+def test_encoder_options():
+    assert encoder_options(OutputOptions()) == {"vcodec": "mjpeg"}
+    assert encoder_options(OutputOptions(quality=100)) == {"vcodec": "mjpeg", "q:v": 2}
+    assert encoder_options(OutputOptions(quality=1)) == {"vcodec": "mjpeg", "q:v": 31}
+    assert encoder_options(OutputOptions(format="webp")) == {"vcodec": "libwebp", "quality": 75}
+    assert encoder_options(OutputOptions(format="webp"), quality=40) == {"vcodec": "libwebp", "quality": 40}
+    assert encoder_options(OutputOptions(format="png", quality=50)) == {"vcodec": "png"}
+
+def _png(payload):
+    def chunk(kind, data):
+        return len(data).to_bytes(4, "big") + kind + data + b"\x00\x00\x00\x00"
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", b"\x00" * 13) + chunk(b"IDAT", payload) + chunk(b"IEND", b"")
+
+def _webp(payload):
+    body = b"WEBP" + payload
+    return b"RIFF" + len(body).to_bytes(4, "little") + body + (b"\x00" if len(body) % 2 else b"")
+
+def test_iter_png_frames():
+    frames = [_png(b"IEND-like data"), _png(b"second")]
+    assert list(iter_png_frames(BytesIO(b"".join(frames)))) == frames
+
+def test_iter_webp_frames():
+    frames = [_webp(b"odd"), _webp(b"even")]
+    assert list(iter_webp_frames(BytesIO(b"".join(frames)))) == frames
+
+def test_pipe_to_archive_png_names(tmp_path):
+    frames = [_png(b"one"), _png(b"two")]
+    archive = MagicMock()
+    with patch("app.service.frame_processor_service.probe_video", side_effect=Exception("ffprobe indisponível")), \
+         patch("app.service.frame_processor_service.ffmpeg.input") as mock_ffmpeg_input:
+        mock_ffmpeg = mock_pipe_process(mock_ffmpeg_input, DummyFFmpegProcess(b"".join(frames), SHOWINFO_STDERR))
+        extract_frames("/tmp/video.mp4", str(tmp_path), archive, 5, mode="select", output=OutputOptions(format="png"))
+
+    mock_ffmpeg.filter.return_value.filter.return_value.output.assert_called_once_with(
+        "pipe:", format="image2pipe", vsync="vfr", vcodec="png"
+    )
+    names = [call[0][0] for call in archive.writestr.call_args_list]
+    assert names == ["frame_0001.png", "frame_0002.png"]
+
+def test_choose_quality_for_target():
+    # Tamanho do frame cresce com a qualidade: 1000 bytes por ponto
+    with patch("app.service.frame_processor_service._encoded_frame_size",
+               side_effect=lambda video_path, timestamp, output, quality: quality * 1000) as mock_size:
+        quality = choose_quality_for_target("/tmp/video.mp4", OutputOptions(), 42500, sample_time=30)
+    assert quality == 42
+    assert mock_size.call_count <= 7
+    assert all(call[0][1] == 30 for call in mock_size.call_args_list)
+
+def test_encoded_frame_size_uses_tracked_ffmpeg():
+    # A codificação de teste passa pelo ffmpeg rastreado (cancelável), sem contar no progresso
+    with patch("app.service.frame_processor_service._run_ffmpeg", return_value=(b"x" * 1234, b"")) as mock_run:
+        size = _encoded_frame_size("/tmp/video.mp4", 30, OutputOptions(), 50)
+    assert size == 1234
+    assert mock_run.call_args[1] == {"report_progress": False}
+
+def test_extract_frames_applies_target_quality(tmp_path):
+    probe = {"duration": 60.0, "keyframe_interval": 10.0}
+    with patch("app.service.frame_processor_service.probe_video", return_value=probe), \
+         patch("app.service.frame_processor_service.choose_quality_for_target", return_value=63) as mock_choose, \
+         patch("app.service.frame_processor_service._pipe_to_archive", return_value=[0.0]) as mock_pipe:
+        extract_frames("/tmp/video.mp4", str(tmp_path), MagicMock(), 5, mode="select",
+                       output=OutputOptions(target_frame_bytes=20000))
+
+    assert mock_choose.call_args[0][2:] == (20000, 30.0)
+    assert mock_pipe.call_args[0][2].quality == 63
+
+# --- Testes das múltiplas saídas com uma única decodificação ---
+def test_extract_fanout_single_decode(tmp_path, ffmpeg_popen):
+    specs = [
+        OutputSpec(name="a", interval=1),
+        OutputSpec(name="b", interval=10, kind="sprite", columns=2, rows=2),
+    ]
+    commands = []
+
+    def fake_popen(args, **kwargs):
+        commands.append(args)
+        # Cada ramo tem o seu showinfo (Parsed_showinfo_<posição no grafo>)
+        stderr = (
+            b"[Parsed_showinfo_2 @ 0x1] n:0 pts:0 pts_time:0\n"
+            b"[Parsed_showinfo_5 @ 0x2] n:0 pts:0 pts_time:0\n"
+            b"[Parsed_showinfo_2 @ 0x1] n:1 pts:1 pts_time:1\n"
+            b"[Parsed_showinfo_5 @ 0x2] n:1 pts:10 pts_time:10\n"
+        )
+        return DummyFFmpegProcess(b"", stderr)
+
+    ffmpeg_popen.side_effect = fake_popen
+    results = extract_fanout("/tmp/video.mp4", specs, str(tmp_path))
+
+    # Um único ffmpeg, com um input e um split para os dois ramos
+    (args,) = commands
+    assert args.count("-i") == 1
+    graph = args[args.index("-filter_complex") + 1]
+    assert "split=2" in graph
+    assert "tile=2x2" in graph
+    # Sprite sem dimensões usa a largura padrão das miniaturas
+    assert "w=min(iw\\,320)" in graph
+    assert results[0]["frame_timestamps"] == [0.0, 1.0]
+    assert results[1]["frame_timestamps"] == [0.0, 10.0]
+    assert results[1]["pattern"].endswith("sheet_%03d.jpg")
+
+def test_build_sprite_vtt():
+    spec = OutputSpec(name="sprite", interval=10, kind="sprite", columns=2, rows=1)
+    vtt = build_sprite_vtt([0.0, 10.0, 20.0], spec, (320, 180), duration=25.0)
+    assert vtt.splitlines() == [
+        "WEBVTT", "",
+        "00:00:00.000 --> 00:00:10.000", "sheet_001.jpg#xywh=0,0,320,180", "",
+        "00:00:10.000 --> 00:00:20.000", "sheet_001.jpg#xywh=320,0,320,180", "",
+        "00:00:20.000 --> 00:00:25.000", "sheet_002.jpg#xywh=0,0,320,180",
+    ]
+
+def fake_fanout(video_path, specs, work_dir):
+    results = []
+    for index, spec in enumerate(specs):
+        spec_dir = os.path.join(work_dir, f"output_{index:02d}")
+        os.makedirs(spec_dir)
+        name = "frame_0001.jpg" if spec.kind == "frames" else "sheet_001.jpg"
+        with open(os.path.join(spec_dir, name), "wb") as f:
+            f.write(spec.name.encode())
+        results.append({"spec": spec, "dir": spec_dir, "pattern": "", "frame_timestamps": [0.0]})
+    return results
+
+def test_process_video_outputs_combined():
+    DummyArchiveStream.instances.clear()
+    specs = [
+        OutputSpec(name="small", interval=1, max_width=320).model_dump(),
+        OutputSpec(name="sprite", interval=10, kind="sprite").model_dump(),
+    ]
+    probe = {"duration": 20.0, "width": 1920, "height": 1080, "keyframe_interval": 2.0}
+    with patch("app.service.frame_processor_service.probe_video", return_value=probe), \
+         patch("app.service.frame_processor_service.extract_fanout", side_effect=fake_fanout), \
+         patch("app.service.frame_processor_service.S3MultipartWriter", side_effect=DummyArchiveStream):
+        result = process_video_outputs("/tmp/video.mp4", "testuser", specs, combine_outputs=True)
+
+    (stream,) = DummyArchiveStream.instances
+    assert result["file_url"] == f"http://fake-s3.com/{stream.s3_key}"
+    assert [output["name"] for output in result["output_files"]] == ["small", "sprite"]
+    assert all(output["file_url"] == result["file_url"] for output in result["output_files"])
+    with zipfile.ZipFile(BytesIO(stream.getvalue())) as zipf:
+        names = sorted(zipf.namelist())
+        vtt = zipf.read("sprite/sprite.vtt").decode()
+    assert names == ["small/frame_0001.jpg", "sprite/sheet_001.jpg", "sprite/sprite.vtt"]
+    assert "sheet_001.jpg#xywh=0,0,320,180" in vtt
+
+def test_process_video_outputs_one_archive_per_spec():
+    DummyArchiveStream.instances.clear()
+    specs = [OutputSpec(name="a", interval=1).model_dump(), OutputSpec(name="b", interval=10).model_dump()]
+    with patch("app.service.frame_processor_service.probe_video", side_effect=Exception("ffprobe indisponível")), \
+         patch("app.service.frame_processor_service.extract_fanout", side_effect=fake_fanout), \
+         patch("app.service.frame_processor_service.S3MultipartWriter", side_effect=DummyArchiveStream):
+        result = process_video_outputs("/tmp/video.mp4", "testuser", specs)
+
+    assert result["file_url"] is None
+    assert len(DummyArchiveStream.instances) == 2
+    assert [output["file_url"] for output in result["output_files"]] == [
+        f"http://fake-s3.com/{stream.s3_key}" for stream in DummyArchiveStream.instances
+    ]
+
+# --- Testes da análise prévia (preflight) ---
+PREFLIGHT_PROBE = {"duration": 60.0, "fps": 30.0, "width": 1920, "height": 1080, "codec": "h264", "keyframe_interval": 2.0}
+
+def test_preflight_video_plan():
+    with patch("app.service.frame_processor_service.probe_video", return_value=PREFLIGHT_PROBE):
+        plan = preflight_video("/tmp/video.mp4", interval=1, mode="auto")
+    assert plan["probe"] == PREFLIGHT_PROBE
+    assert plan["extraction_mode"] == "select"
+    assert plan["planned_frames"] == 60
+    assert plan["decoded_frames"] == 1800
+    assert plan["estimated_seconds"] > 0
+
+def test_preflight_video_corrupt_file():
+    with patch("app.service.frame_processor_service.probe_video", side_effect=ffmpeg.Error("ffprobe", b"", b"moov atom not found")):
+        with pytest.raises(HTTPException) as exc_info:
+            preflight_video("/tmp/video.mp4", interval=5)
+    assert exc_info.value.status_code == 422
+    assert "corrompido" in exc_info.value.detail
+
+def test_preflight_video_audio_only():
+    with patch("app.service.frame_processor_service.probe_video", side_effect=ValueError("O arquivo não possui stream de vídeo.")):
+        with pytest.raises(HTTPException) as exc_info:
+            preflight_video("/tmp/video.mp4", interval=5)
+    assert exc_info.value.status_code == 422
+    assert exc_info.value.detail == "O arquivo não possui stream de vídeo."
+
+def test_preflight_video_shorter_than_interval():
+    with patch("app.service.frame_processor_service.probe_video", return_value={**PREFLIGHT_PROBE, "duration": 4.0}):
+        with pytest.raises(HTTPException) as exc_info:
+            preflight_video("/tmp/video.mp4", interval=10)
+    assert exc_info.value.status_code == 422
+    assert "mais curto que o intervalo" in exc_info.value.detail
+
+def test_preflight_video_timestamps_beyond_end():
+    with patch("app.service.frame_processor_service.probe_video", return_value=PREFLIGHT_PROBE):
+        with pytest.raises(HTTPException) as exc_info:
+            preflight_video("/tmp/video.mp4", timestamps=[90.0, 120.0])
+    assert "Nenhum frame seria extraído" in exc_info.value.detail
+
+def test_plan_frame_count_modes():
+    assert plan_frame_count(PREFLIGHT_PROBE, 10, "seek") == 6
+    assert plan_frame_count(PREFLIGHT_PROBE, None, "seek", timestamps=[1.0, 59.0, 61.0]) == 2
+    # No modo keyframes o espaçamento mínimo é o GOP
+    assert plan_frame_count(PREFLIGHT_PROBE, 1, "keyframes") == 30
+    assert plan_frame_count(PREFLIGHT_PROBE, 1, "fanout", output_specs=[{"interval": 1}, {"interval": 10}]) == 66
+
+def test_estimate_cost_seek_cheaper_than_select():
+    select_cost = estimate_cost(PREFLIGHT_PROBE, "select", 6)
+    seek_cost = estimate_cost(PREFLIGHT_PROBE, "seek", 6)
+    assert seek_cost["decoded_frames"] < select_cost["decoded_frames"]
+    assert seek_cost["estimated_seconds"] < select_cost["estimated_seconds"]
+
+def test_estimate_frame_bytes():
+    probe = {"duration": 60.0, "width": 1920, "height": 1080}
+    full = estimate_frame_bytes(probe, 60)
+    assert full == int(60 * 1920 * 1080 * 0.3)
+    # Frames reduzidos ocupam proporcionalmente menos espaço
+    assert estimate_frame_bytes(probe, 60, {"max_width": 960}) == full // 4
+    # Sem previsão de frames (modo scene), um frame por segundo
+    assert estimate_frame_bytes(probe, None) == full
+    specs = [{"name": "a", "interval": 1}, {"name": "b", "interval": 10, "format": "png"}]
+    assert estimate_frame_bytes(probe, None, output_specs=specs) == int(full + 6 * 1920 * 1080 * 1.5)
+
+def test_extract_frames_reuses_preflight_probe(tmp_path):
+    with patch("app.service.frame_processor_service.probe_video") as mock_probe, \
+         patch("app.service.frame_processor_service._pipe_to_archive", return_value=[0.0]):
+        mode, _ = extract_frames("/tmp/video.mp4", str(tmp_path), MagicMock(), 1, probe=PREFLIGHT_PROBE)
+    assert mode == "select"
+    mock_probe.assert_not_called()
+
+# --- Modos dedupe e scene ---
+def test_extract_frames_dedupe_mode(tmp_path):
+    np = pytest.importorskip("numpy")
+    stderr = b"".join(b"[Parsed_showinfo_1] n:%d pts:%d pts_time:%d\n" % (n, n, n) for n in range(4))
+    # Assinaturas: dois frames estáticos, uma mudança e outro estático
+    signatures = b"".join(bytes([value]) * 256 for value in (10, 11, 200, 201))
+
+    def fake_merge(*outputs):
+        for number in range(1, 5):
+            (tmp_path / "frames" / f"frame_{number:04d}.jpg").write_bytes(b"jpg%d" % number)
+        return mock_merged_process(DummyFFmpegProcess(signatures, stderr))
+
+    archive_buffer = BytesIO()
+    with patch("app.service.frame_processor_service.ffmpeg.input"), \
+         patch("app.service.frame_processor_service.ffmpeg.merge_outputs", side_effect=fake_merge):
+        with zipfile.ZipFile(archive_buffer, "w") as archive:
+            mode, frame_timestamps = extract_frames(
+                "/tmp/video.mp4", str(tmp_path), archive, 1, mode="dedupe", probe=PREFLIGHT_PROBE, threshold=0.1
+            )
+
+    assert mode == "dedupe"
+    assert frame_timestamps == [0.0, 2.0]
+    with zipfile.ZipFile(archive_buffer) as archive:
+        assert archive.read("frame_0001.jpg") == b"jpg1"
+        assert archive.read("frame_0002.jpg") == b"jpg3"
+        manifest = json.loads(archive.read("manifest.json"))
+    assert manifest["candidates"] == 4 and manifest["dropped"] == 2
+    assert [frame["timestamp"] for frame in manifest["frames"]] == [0.0, 2.0]
+
+def test_extract_frames_scene_mode(tmp_path):
+    with patch("app.service.frame_processor_service.ffmpeg.input") as mock_ffmpeg_input:
+        mock_ffmpeg = mock_pipe_process(mock_ffmpeg_input, DummyFFmpegProcess(FAKE_JPEG_1 + FAKE_JPEG_2, SHOWINFO_STDERR))
+        archive_buffer = BytesIO()
+        with zipfile.ZipFile(archive_buffer, "w") as archive:
+            mode, frame_timestamps = extract_frames(
+                "/tmp/video.mp4", str(tmp_path), archive, None, mode="scene", probe=PREFLIGHT_PROBE, threshold=0.4
+            )
+
+    assert mode == "scene"
+    assert frame_timestamps == [0.0, 5.0]
+    assert mock_ffmpeg.filter.call_args[0] == ("select", "eq(n,0)+gt(scene,0.4)")
+    with zipfile.ZipFile(archive_buffer) as archive:
+        manifest = json.loads(archive.read("manifest.json"))
+    assert manifest["threshold"] == 0.4
+    assert manifest["frames"][1] == {"file": "frame_0002.jpg", "timestamp": 5.0}
+
+def test_preflight_video_scene_mode_without_interval():
+    with patch("app.service.frame_processor_service.probe_video", return_value=PREFLIGHT_PROBE):
+        plan = preflight_video("/tmp/video.mp4", mode="scene")
+    assert plan["extraction_mode"] == "scene"
+    assert plan["planned_frames"] is None
+    assert plan["decoded_frames"] == 1800
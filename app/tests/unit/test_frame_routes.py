@@ -4,6 +4,7 @@ from fastapi.testclient import TestClient
 from unittest.mock import patch, ANY
 from app.api.frame_routes import router as frame_router
 from app.core.auth import get_current_user
+from app.core.jwt import create_access_token
 
 # Cria um app de teste e inclui o router real com prefixo "/api"
 app = FastAPI()
@@ -18,24 +19,67 @@ app.dependency_overrides[get_current_user] = fake_current_user
 client = TestClient(app)
 
 # --- Testes para a rota POST /process-video ---
+def dummy_job(status="queued", **fields):
+    job = {"job_id": "job-123", "username": "testuser", "filename": "video.mp4", "interval": 5,
+           "status": status, "file_url": None, "error": None}
+    job.update(fields)
+    return job
+
 def test_process_video_success(): 
-    # Cria um objeto que simula o ProcessVideoInput (note que na rota essa classe é utilizada via Depends)
-    # Vamos simular a chamada ao process_video, que é a função que efetivamente faz o processamento.
-    with patch("app.api.frame_routes.process_video", return_value="http://fake-s3-url.com/file.zip") as mock_process:
+    # A rota apenas registra o job e responde 202 com o identificador
+    with patch("app.api.frame_routes.submit_video_job", return_value=dummy_job()) as mock_submit:
         # Envie uma requisição multipart/form-data
         files = {"file": ("video.mp4", b"fake video content", "video/mp4")}
         data = {"interval": 5}
         response = client.post("/api/process-video", files=files, data=data)
         
+        assert response.status_code == 202
+        json_data = response.json()
+        assert json_data["job_id"] == "job-123"
+        assert json_data["status"] == "queued"
+        assert json_data["status_url"] == "/api/jobs/job-123"
+        mock_submit.assert_called_once_with(ANY, "testuser", "administrator")
+        process_input = mock_submit.call_args[0][0]
+        assert process_input.interval == 5
+        assert process_input.mode == "auto"
+
+def test_process_video_wait_success():
+    done_job = dummy_job(status="done", file_url="http://fake-s3-url.com/file.zip",
+                         extraction_mode="keyframes", frame_timestamps=[0.0, 10.01])
+    with patch("app.api.frame_routes.submit_video_job", return_value=dummy_job()), \
+         patch("app.api.frame_routes.wait_for_job_or_disconnect", return_value=done_job) as mock_wait:
+        files = {"file": ("video.mp4", b"fake video content", "video/mp4")}
+        response = client.post("/api/process-video?wait=true", files=files, data={"interval": 5})
+
         assert response.status_code == 200
         json_data = response.json()
         assert json_data["message"] == "Arquivo processado e salvo com sucesso!"
         assert json_data["file_url"] == "http://fake-s3-url.com/file.zip"
-        mock_process.assert_called_once()
-        
+        assert json_data["extraction_mode"] == "keyframes"
+        assert json_data["frame_timestamps"] == [0.0, 10.01]
+        mock_wait.assert_called_once_with("job-123", ANY)
+
+def test_process_video_wait_failed_job():
+    failed_job = dummy_job(status="failed", error="Nenhum frame foi extraído do vídeo.")
+    with patch("app.api.frame_routes.submit_video_job", return_value=dummy_job()), \
+         patch("app.api.frame_routes.wait_for_job_or_disconnect", return_value=failed_job):
+        files = {"file": ("video.mp4", b"fake video content", "video/mp4")}
+        response = client.post("/api/process-video?wait=true", files=files, data={"interval": 5})
+        assert response.status_code == 500
+        assert "Nenhum frame foi extraído do vídeo." in response.json()["detail"]
+
+def test_process_video_wait_timed_out_job():
+    timed_out_job = dummy_job(status="timed_out", error="Tempo limite de 3600s excedido.")
+    with patch("app.api.frame_routes.submit_video_job", return_value=dummy_job()), \
+         patch("app.api.frame_routes.wait_for_job_or_disconnect", return_value=timed_out_job):
+        files = {"file": ("video.mp4", b"fake video content", "video/mp4")}
+        response = client.post("/api/process-video?wait=true", files=files, data={"interval": 5})
+        assert response.status_code == 504
+        assert "Tempo limite" in response.json()["detail"]
+
 def test_process_video_exception():
-    with patch("app.api.frame_routes.process_video") as mock_process:
-        mock_process.side_effect = Exception("Processing error")
+    with patch("app.api.frame_routes.submit_video_job") as mock_submit:
+        mock_submit.side_effect = Exception("Processing error")
         files = {"file": ("video.mp4", b"fake video content", "video/mp4")}
         data = {"interval": 5}
         response = client.post("/api/process-video", files=files, data=data)
@@ -43,15 +87,98 @@ def test_process_video_exception():
         assert response.status_code == 500
         assert "Erro interno: Processing error" in response.json()["detail"]
 
+def test_process_video_queue_full():
+    from app.exceptions.queue_full_error import QueueFullError
+    with patch("app.api.frame_routes.submit_video_job", side_effect=QueueFullError("Fila de processamento cheia.", 12)):
+        files = {"file": ("video.mp4", b"fake video content", "video/mp4")}
+        response = client.post("/api/process-video", files=files, data={"interval": 5})
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "12"
+
+# --- Testes para as rotas de consulta de jobs ---
+def test_get_job_success():
+    with patch("app.api.frame_routes.get_job", return_value=dummy_job(status="running")):
+        response = client.get("/api/jobs/job-123")
+        assert response.status_code == 200
+        assert response.json()["status"] == "running"
+
+def test_get_job_not_found():
+    with patch("app.api.frame_routes.get_job", return_value=None):
+        response = client.get("/api/jobs/unknown")
+        assert response.status_code == 404
+
+def test_get_job_other_user():
+    with patch("app.api.frame_routes.get_job", return_value=dummy_job(username="otheruser")):
+        response = client.get("/api/jobs/job-123")
+        assert response.status_code == 403
+        assert "Acesso negado" in response.json()["detail"]
+
+def test_cancel_job_success():
+    with patch("app.api.frame_routes.get_job", return_value=dummy_job(status="running")), \
+         patch("app.api.frame_routes.cancel_job", return_value=dummy_job(status="running")) as mock_cancel:
+        response = client.delete("/api/jobs/job-123")
+        assert response.status_code == 202
+        assert response.json()["message"] == "Cancelamento solicitado."
+        mock_cancel.assert_called_once_with("job-123")
+
+def test_cancel_job_other_user():
+    with patch("app.api.frame_routes.get_job", return_value=dummy_job(username="otheruser")), \
+         patch("app.api.frame_routes.cancel_job") as mock_cancel:
+        response = client.delete("/api/jobs/job-123")
+        assert response.status_code == 403
+        mock_cancel.assert_not_called()
+
+def test_job_events_streams_final_status():
+    done_job = dummy_job(status="done")
+    done_job.update(progress={"frames": 6, "percent": 100.0}, file_url="https://example.com/frames.zip")
+    with patch("app.api.frame_routes.get_job", return_value=done_job), \
+         patch("app.service.job_progress_service.get_job_by_id", return_value=done_job):
+        response = client.get("/api/jobs/job-123/events")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "event: done" in response.text
+        assert "frames.zip" in response.text
+
+def test_job_events_other_user():
+    with patch("app.api.frame_routes.get_job", return_value=dummy_job(username="otheruser")):
+        response = client.get("/api/jobs/job-123/events")
+        assert response.status_code == 403
+
+def test_list_jobs_success():
+    with patch("app.api.frame_routes.list_user_jobs", return_value=[dummy_job()]) as mock_list:
+        response = client.get("/api/testuser/jobs")
+        assert response.status_code == 200
+        assert response.json()["jobs"][0]["job_id"] == "job-123"
+        mock_list.assert_called_once_with("testuser")
+
+def test_list_jobs_unauthorized():
+    response = client.get("/api/otheruser/jobs")
+    assert response.status_code == 403
+
 # --- Testes para a rota GET /{username}/list-frame-archives ---
 def test_list_frame_archives_success():
-    with patch("app.api.frame_routes.list_user_frame_archives", return_value=["url1", "url2"]) as mock_list:
+    page = {"archives": [{"key": "testuser/frames_1.zip", "size": 10}], "next_cursor": "abc"}
+    with patch("app.api.frame_routes.list_frame_archives", return_value=page) as mock_list:
         response = client.get("/api/testuser/list-frame-archives")
         assert response.status_code == 200
-        json_data = response.json()
-        assert "archives" in json_data
-        assert json_data["archives"] == ["url1", "url2"]
-        mock_list.assert_called_once_with("testuser")
+        assert response.json() == page
+        mock_list.assert_called_once_with("testuser", 50, None, "key", "asc", None, None, None)
+
+def test_list_frame_archives_with_query_parameters():
+    with patch("app.api.frame_routes.list_frame_archives", return_value={"archives": [], "next_cursor": None}) as mock_list:
+        response = client.get(
+            "/api/testuser/list-frame-archives",
+            params={"limit": 10, "cursor": "abc", "sort": "size", "order": "desc", "source": "aula",
+                    "modified_after": "2026-01-01T00:00:00+00:00"},
+        )
+        assert response.status_code == 200
+        args = mock_list.call_args[0]
+        assert args[:6] == ("testuser", 10, "abc", "size", "desc", "aula")
+        assert args[6].year == 2026
+
+def test_list_frame_archives_invalid_parameters():
+    assert client.get("/api/testuser/list-frame-archives", params={"limit": 0}).status_code == 422
+    assert client.get("/api/testuser/list-frame-archives", params={"sort": "owner"}).status_code == 422
 
 def test_list_frame_archives_unauthorized():
     # Simula um usuário logado com "sub" diferente do parâmetro
@@ -63,7 +190,7 @@ def test_list_frame_archives_unauthorized():
     app.dependency_overrides[get_current_user] = fake_current_user
 
 def test_list_frame_archives_exception():
-    with patch("app.api.frame_routes.list_user_frame_archives") as mock_list:
+    with patch("app.api.frame_routes.list_frame_archives") as mock_list:
         mock_list.side_effect = Exception("List error")
         response = client.get("/api/testuser/list-frame-archives")
         assert response.status_code == 500
@@ -91,3 +218,32 @@ def test_delete_frame_archive_exception():
         response = client.delete("/api/testuser/delete-frame-archive/testfile.txt")
         assert response.status_code == 500
         assert "Erro ao tentar remover o arquivo: Delete error" in response.json()["detail"]
+
+def test_process_video_rate_limited_before_reading_body():
+    # O limite é verificado antes do multipart: nem um corpo inválido chega a ser lido
+    token = create_access_token({"sub": "testuser", "role": "user_level_1"})
+    limited = HTTPException(status_code=429, detail="Muitos envios", headers={"Retry-After": "7"})
+    with patch("app.api.submission_limits.check_submission", side_effect=limited) as mock_check, \
+         patch("app.api.frame_routes.submit_video_job") as mock_submit:
+        response = client.post(
+            "/api/process-video",
+            content=b"corpo que nao e multipart",
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "multipart/form-data; boundary=x"},
+        )
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+    mock_check.assert_called_once_with("testuser", "user_level_1", True)
+    mock_submit.assert_not_called()
+
+def test_process_video_checks_limits_once():
+    token = create_access_token({"sub": "testuser", "role": "user_level_1"})
+    with patch("app.api.submission_limits.check_submission") as mock_check, \
+         patch("app.api.frame_routes.submit_video_job", return_value=dummy_job()):
+        files = {"file": ("video.mp4", b"fake video content", "video/mp4")}
+        response = client.post(
+            "/api/process-video", files=files, data={"interval": 5}, headers={"Authorization": f"Bearer {token}"}
+        )
+
+    assert response.status_code == 202
+    mock_check.assert_called_once_with("testuser", "user_level_1", True)
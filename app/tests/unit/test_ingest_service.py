@@ -0,0 +1,132 @@
+import base64
+import json
+import os
+import boto3
+import pytest
+import requests
+from botocore.config import Config
+from fastapi import HTTPException
+from moto import mock_aws
+from unittest.mock import patch
+from app.core.config import settings
+from app.domain.process_video_model import ProcessVideoInput
+from app.service.ingest_service import (
+    create_ingest, complete_ingest, abort_ingest, submit_ingested_video_job, sweep_stale_ingests
+)
+from app.service.s3_service import MIN_PART_SIZE
+
+@pytest.fixture
+def moto_s3_client():
+    with mock_aws():
+        # As URLs pré-assinadas são atendidas pelo próprio moto, no lugar do S3
+        s3_client = boto3.client("s3", region_name="us-east-1", config=Config(request_checksum_calculation="when_required"))
+        s3_client.create_bucket(Bucket=settings.AWS_S3_BUCKET_NAME)
+        with patch("app.service.s3_service.get_s3_client", return_value=s3_client):
+            yield s3_client
+
+def test_create_ingest_single_post(moto_s3_client):
+    ingest = create_ingest("testuser", "video.mp4", 1024)
+    assert ingest["method"] == "POST"
+    assert ingest["key"].startswith("testuser/incoming/")
+    assert ingest["key"].endswith("/video.mp4")
+    # A política assinada limita o envio ao tamanho declarado
+    policy = json.loads(base64.b64decode(ingest["fields"]["policy"]))
+    assert ["content-length-range", 1, 1024] in policy["conditions"]
+
+    response = requests.post(ingest["url"], data=ingest["fields"], files={"file": b"fake video content"})
+    assert response.status_code == 204
+    body = moto_s3_client.get_object(Bucket=settings.AWS_S3_BUCKET_NAME, Key=ingest["key"])["Body"].read()
+    assert body == b"fake video content"
+
+def test_create_ingest_multipart(moto_s3_client):
+    data = os.urandom(MIN_PART_SIZE * 2 + 1024)
+    with patch("app.service.s3_service.settings.INGEST_SINGLE_PUT_MAX_SIZE", MIN_PART_SIZE), \
+         patch("app.service.s3_service.settings.S3_MULTIPART_PART_SIZE", MIN_PART_SIZE):
+        ingest = create_ingest("testuser", "video.mp4", len(data))
+
+    assert ingest["method"] == "MULTIPART"
+    assert ingest["part_size"] == MIN_PART_SIZE
+    assert [part["part_number"] for part in ingest["parts"]] == [1, 2, 3]
+
+    parts = []
+    for part in reversed(ingest["parts"]):
+        start = (part["part_number"] - 1) * ingest["part_size"]
+        response = requests.put(part["url"], data=data[start:start + ingest["part_size"]])
+        parts.append({"part_number": part["part_number"], "etag": response.headers["ETag"]})
+
+    result = complete_ingest("testuser", ingest["key"], ingest["upload_id"], parts)
+    assert result["size"] == len(data)
+    body = moto_s3_client.get_object(Bucket=settings.AWS_S3_BUCKET_NAME, Key=ingest["key"])["Body"].read()
+    assert body == data
+
+def test_complete_ingest_rejects_oversized_object(moto_s3_client):
+    # O multipart não limita as partes: o objeto montado acima do limite é removido
+    with patch("app.service.s3_service.settings.INGEST_SINGLE_PUT_MAX_SIZE", 1):
+        ingest = create_ingest("testuser", "video.mp4", 1024)
+    response = requests.put(ingest["parts"][0]["url"], data=b"x" * 2048)
+    parts = [{"part_number": 1, "etag": response.headers["ETag"]}]
+
+    with patch("app.service.ingest_service.settings.MAX_RESUMABLE_UPLOAD_SIZE", 1024):
+        with pytest.raises(HTTPException) as exc_info:
+            complete_ingest("testuser", ingest["key"], ingest["upload_id"], parts)
+    assert exc_info.value.status_code == 422
+    assert moto_s3_client.list_objects_v2(Bucket=settings.AWS_S3_BUCKET_NAME).get("KeyCount") == 0
+
+def test_sweep_stale_ingests(moto_s3_client):
+    moto_s3_client.put_object(Bucket=settings.AWS_S3_BUCKET_NAME, Key="testuser/incoming/abc/video.mp4", Body=b"x")
+    moto_s3_client.put_object(Bucket=settings.AWS_S3_BUCKET_NAME, Key="testuser/frames_abc.zip", Body=b"x")
+    with patch("app.service.s3_service.settings.INGEST_SINGLE_PUT_MAX_SIZE", 1):
+        create_ingest("otheruser", "video.mp4", 1024)
+
+    # Com retenção negativa, tudo o que já existe conta como abandonado
+    with patch("app.service.ingest_service.settings.INGEST_RETENTION_HOURS", -1):
+        assert sweep_stale_ingests() == 2
+
+    keys = [item["Key"] for item in moto_s3_client.list_objects_v2(Bucket=settings.AWS_S3_BUCKET_NAME)["Contents"]]
+    assert keys == ["testuser/frames_abc.zip"]
+    assert moto_s3_client.list_multipart_uploads(Bucket=settings.AWS_S3_BUCKET_NAME).get("Uploads", []) == []
+
+def test_abort_ingest(moto_s3_client):
+    with patch("app.service.s3_service.settings.INGEST_SINGLE_PUT_MAX_SIZE", 1):
+        ingest = create_ingest("testuser", "video.mp4", 1024)
+    abort_ingest("testuser", ingest["key"], ingest["upload_id"])
+    assert moto_s3_client.list_multipart_uploads(Bucket=settings.AWS_S3_BUCKET_NAME).get("Uploads", []) == []
+
+def test_create_ingest_invalid_file(moto_s3_client):
+    with pytest.raises(HTTPException) as exc_info:
+        create_ingest("testuser", "video.txt", 1024)
+    assert exc_info.value.status_code == 422
+    with pytest.raises(HTTPException) as exc_info:
+        create_ingest("testuser", "video.mp4", settings.MAX_RESUMABLE_UPLOAD_SIZE + 1)
+    assert exc_info.value.status_code == 422
+
+def test_ingest_other_user_key_denied(moto_s3_client):
+    with pytest.raises(HTTPException) as exc_info:
+        complete_ingest("testuser", "otheruser/incoming/abc/video.mp4", "upload", [{"part_number": 1, "etag": "x"}])
+    assert exc_info.value.status_code == 403
+    with pytest.raises(HTTPException) as exc_info:
+        submit_ingested_video_job(ProcessVideoInput(interval=5), "testuser", "testuser/frames_abc.zip")
+    assert exc_info.value.status_code == 403
+
+def test_submit_ingested_video_job(moto_s3_client):
+    key = "testuser/incoming/abc/video.mp4"
+    moto_s3_client.put_object(Bucket=settings.AWS_S3_BUCKET_NAME, Key=key, Body=b"fake video content")
+    process_input = ProcessVideoInput(interval=5)
+
+    with patch("app.service.ingest_service.submit_saved_video_job", return_value={"job_id": "job-123"}) as mock_submit:
+        assert submit_ingested_video_job(process_input, "testuser", key) == {"job_id": "job-123"}
+
+    args, kwargs = mock_submit.call_args
+    assert args[0] is process_input
+    assert args[1:3] == ("testuser", "video.mp4")
+    # O ffmpeg recebe uma URL pré-assinada do objeto em vez de um arquivo local
+    assert key in args[4] and "Signature" in args[4]
+    assert args[5] == len(b"fake video content")
+    assert args[6].startswith("etag:")
+    assert kwargs == {"source_key": key, "role": None}
+    os.rmdir(args[3])
+
+def test_submit_ingested_video_job_missing_object(moto_s3_client):
+    with pytest.raises(HTTPException) as exc_info:
+        submit_ingested_video_job(ProcessVideoInput(interval=5), "testuser", "testuser/incoming/abc/missing.mp4")
+    assert exc_info.value.status_code == 404
@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+import subprocess
+import pytest
+from app.exceptions.job_cancelled_error import JobCancelledError
+from app.service.job_control_service import (
+    JobControl, CANCELLED, TIMEOUT, current_job_control, check_cancelled, _cpu_seconds
+)
+
+def test_cancel_kills_registered_process_group():
+    process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"], start_new_session=True)
+    control = JobControl("job-123", timeout=None, cpu_time_limit=None)
+    control.register(process)
+
+    assert control.cancel() is True
+    assert process.wait(timeout=5) < 0
+    # Um segundo cancelamento não muda o motivo
+    assert control.cancel(TIMEOUT) is False
+    assert control.reason == CANCELLED
+    with pytest.raises(JobCancelledError) as exc_info:
+        control.check()
+    assert exc_info.value.reason == CANCELLED
+
+def test_register_after_cancel_kills_process():
+    control = JobControl("job-123", timeout=None, cpu_time_limit=None)
+    control.cancel()
+    process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"], start_new_session=True)
+    control.register(process)
+    assert process.wait(timeout=5) < 0
+
+def test_track_sets_context_and_enforces_timeout():
+    control = JobControl("job-123", timeout=0.05, cpu_time_limit=None, watch_interval=0.01)
+    with control.track():
+        assert current_job_control() is control
+        for _ in range(100):
+            if control.cancelled:
+                break
+            time.sleep(0.01)
+        with pytest.raises(JobCancelledError) as exc_info:
+            check_cancelled()
+    assert exc_info.value.reason == TIMEOUT
+    assert "Tempo limite" in str(exc_info.value)
+    assert current_job_control() is None
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Tempo de CPU lido de /proc")
+def test_cpu_seconds_reads_proc_stat(tmp_path):
+    stat = tmp_path / "stat"
+    # Nome do comando com espaço e parênteses, como permitido pelo kernel
+    stat.write_text("123 (ff mpeg) R 1 123 123 0 -1 4194304 0 0 0 0 250 50 0 0 20 0 4 0\n")
+    assert _cpu_seconds(str(stat)) == pytest.approx(300 / os.sysconf("SC_CLK_TCK"))
+    assert _cpu_seconds(str(tmp_path / "missing")) is None
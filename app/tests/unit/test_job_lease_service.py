@@ -0,0 +1,47 @@
+from unittest.mock import MagicMock, patch
+from app.service.job_lease_service import JobLeaseKeeper
+
+def test_heartbeat_renews_owned_jobs():
+    keeper = JobLeaseKeeper("worker-a", lease_seconds=60, heartbeat_interval=15)
+    on_lost = MagicMock()
+    keeper.watch("job-1", on_lost)
+    with patch("app.service.job_lease_service.renew_job_lease",
+               return_value={"job_id": "job-1", "cancel_requested": False}) as mock_renew:
+        keeper.heartbeat()
+
+    mock_renew.assert_called_once_with("job-1", "worker-a", 60)
+    on_lost.assert_not_called()
+
+def test_heartbeat_lost_lease_stops_job():
+    keeper = JobLeaseKeeper("worker-a", lease_seconds=60, heartbeat_interval=15)
+    on_lost = MagicMock()
+    keeper.watch("job-1", on_lost)
+    with patch("app.service.job_lease_service.renew_job_lease", return_value=None) as mock_renew:
+        keeper.heartbeat()
+        keeper.heartbeat()
+
+    # O job deixa de ser renovado depois de perdido
+    mock_renew.assert_called_once()
+    on_lost.assert_called_once_with()
+
+def test_heartbeat_forwards_cancel_request():
+    keeper = JobLeaseKeeper("worker-a", lease_seconds=60, heartbeat_interval=15)
+    on_lost = MagicMock()
+    keeper.watch("job-1", on_lost)
+    with patch("app.service.job_lease_service.renew_job_lease",
+               return_value={"job_id": "job-1", "cancel_requested": True}):
+        keeper.heartbeat()
+
+    on_lost.assert_called_once_with()
+
+def test_heartbeat_error_keeps_lease():
+    keeper = JobLeaseKeeper("worker-a", lease_seconds=60, heartbeat_interval=15)
+    on_lost = MagicMock()
+    keeper.watch("job-1", on_lost)
+    with patch("app.service.job_lease_service.renew_job_lease", side_effect=Exception("DynamoDB indisponível")):
+        keeper.heartbeat()
+
+    on_lost.assert_not_called()
+    with patch("app.service.job_lease_service.finish_job", return_value={"job_id": "job-1"}) as mock_finish:
+        keeper.finish("job-1", status="done")
+    mock_finish.assert_called_once_with("job-1", "worker-a", status="done")
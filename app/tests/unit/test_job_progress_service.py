@@ -0,0 +1,92 @@
+import asyncio
+from io import BytesIO
+from unittest.mock import patch
+from app.service.job_progress_service import (
+    JobProgress, track_progress, current_progress, read_ffmpeg_stderr, job_event_stream
+)
+
+FFMPEG_STDERR = (
+    b"[Parsed_showinfo_1] n:0 pts:0 pts_time:0\n"
+    b"frame=12\nout_time_us=4000000\nspeed=2.5x\nprogress=continue\n"
+    b"[Parsed_showinfo_1] n:1 pts:5 pts_time:5\n"
+    b"frame=24\nout_time_us=8000000\nspeed=2.0x\nprogress=end\n"
+)
+
+def test_read_ffmpeg_stderr_splits_progress_blocks():
+    with patch("app.service.job_progress_service.update_job") as mock_update:
+        progress = JobProgress("job-123", planned_frames=48, min_interval=0)
+        remaining = read_ffmpeg_stderr(BytesIO(FFMPEG_STDERR), "main", progress)
+
+    # O showinfo continua disponível para o cálculo dos timestamps
+    assert remaining == b"[Parsed_showinfo_1] n:0 pts:0 pts_time:0\n[Parsed_showinfo_1] n:1 pts:5 pts_time:5\n"
+    assert mock_update.call_count == 2
+    mock_update.assert_called_with("job-123", progress={"frames": 24, "out_time": 8.0, "speed": 2.0, "percent": 50.0})
+
+def test_read_ffmpeg_stderr_keeps_draining_when_update_fails():
+    # Uma falha ao gravar o progresso (throttling, rede) não pode parar a leitura do pipe
+    with patch("app.service.job_progress_service.update_job", side_effect=Exception("throttled")) as mock_update:
+        progress = JobProgress("job-123", planned_frames=48, min_interval=0)
+        remaining = read_ffmpeg_stderr(BytesIO(FFMPEG_STDERR), "main", progress)
+
+    assert mock_update.call_count == 2
+    assert remaining.count(b"showinfo") == 2
+    assert progress.snapshot()["frames"] == 24
+
+def test_read_ffmpeg_stderr_without_progress():
+    assert read_ffmpeg_stderr(BytesIO(FFMPEG_STDERR), "main") == (
+        b"[Parsed_showinfo_1] n:0 pts:0 pts_time:0\n[Parsed_showinfo_1] n:1 pts:5 pts_time:5\n"
+    )
+
+def test_job_progress_rate_limited_and_aggregated():
+    with patch("app.service.job_progress_service.update_job") as mock_update:
+        progress = JobProgress("job-123", duration=100.0, min_interval=60)
+        progress.update("seek-1", {"frame": "3", "out_time_us": "10000000"})
+        progress.update("seek-2", {"frame": "5", "out_time_us": "40000000"})
+
+    # Só a primeira atualização é gravada dentro do intervalo mínimo
+    mock_update.assert_called_once()
+    # Vários processos: frames somados e maior posição no vídeo
+    assert progress.snapshot() == {"frames": 8, "out_time": 40.0, "speed": None, "percent": 40.0}
+
+def test_job_progress_percent_capped_before_done():
+    with patch("app.service.job_progress_service.update_job"):
+        progress = JobProgress("job-123", planned_frames=10, min_interval=0)
+        progress.update("main", {"frame": "12"})
+    assert progress.snapshot()["percent"] == 99.9
+
+def test_track_progress_sets_context():
+    assert current_progress() is None
+    with track_progress("job-123", planned_frames=10) as progress:
+        assert current_progress() is progress
+    assert current_progress() is None
+
+def collect_events(jobs, disconnect_after=None):
+    checks = {"count": 0}
+
+    async def is_disconnected():
+        checks["count"] += 1
+        return disconnect_after is not None and checks["count"] > disconnect_after
+
+    async def run():
+        return [event async for event in job_event_stream("job-123", is_disconnected, poll_interval=0)]
+
+    with patch("app.service.job_progress_service.get_job_by_id", side_effect=jobs):
+        return asyncio.run(run())
+
+def test_job_event_stream_until_done():
+    running = {"job_id": "job-123", "status": "running", "progress": {"frames": 3, "percent": 50.0}}
+    done = {"job_id": "job-123", "status": "done", "progress": {"frames": 6, "percent": 100.0},
+            "file_url": "https://example.com/frames.zip", "error": None}
+    events = collect_events([running, running, done])
+
+    # Progresso repetido não gera novo evento
+    assert len(events) == 2
+    assert events[0].startswith("event: progress\n")
+    assert '"percent": 50.0' in events[0]
+    assert events[1].startswith("event: done\n")
+    assert "frames.zip" in events[1]
+
+def test_job_event_stream_stops_on_disconnect():
+    running = {"job_id": "job-123", "status": "running", "progress": None}
+    events = collect_events([running] * 5, disconnect_after=2)
+    assert len(events) == 1
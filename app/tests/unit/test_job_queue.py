@@ -0,0 +1,62 @@
+import uuid
+import pytest
+from unittest.mock import patch
+from app.core.config import settings
+from app.service.job_queue import JobQueue, InMemoryJobQueue, SqliteJobQueue, SqsJobQueue, create_job_queue
+
+def test_job_queue_is_abstract():
+    with pytest.raises(TypeError):
+        JobQueue()
+
+def test_in_memory_queue_nack_redelivers():
+    queue = InMemoryJobQueue()
+    queue.send({"job_id": "job-1"})
+    queue.send({"job_id": "job-2"})
+    assert queue.depth() == 2
+
+    messages = queue.receive(max_messages=5)
+    assert [message["body"]["job_id"] for message in messages] == ["job-1", "job-2"]
+    queue.nack(messages[1]["receipt"])
+    assert [message["body"]["job_id"] for message in queue.receive()] == ["job-2"]
+    assert queue.receive(wait_seconds=0.01) == []
+
+def test_sqlite_queue_hides_received_messages(tmp_path):
+    queue = SqliteJobQueue(str(tmp_path / "jobs.db"), visibility_timeout=300, poll_interval=0.01)
+    queue.send({"job_id": "job-1"})
+    queue.send({"job_id": "job-2"})
+
+    first = queue.receive()
+    assert first[0]["body"] == {"job_id": "job-1"}
+    # Outro processo vê a mesma fila, sem a mensagem já recebida
+    other = SqliteJobQueue(str(tmp_path / "jobs.db"), poll_interval=0.01)
+    second = other.receive(max_messages=5)
+    assert [message["body"]["job_id"] for message in second] == ["job-2"]
+    assert other.receive(wait_seconds=0.05) == []
+
+    queue.ack(first[0]["receipt"])
+    other.nack(second[0]["receipt"])
+    assert queue.depth() == 1
+    assert queue.receive()[0]["body"] == {"job_id": "job-2"}
+
+def test_sqlite_queue_visibility_timeout(tmp_path):
+    queue = SqliteJobQueue(str(tmp_path / "jobs.db"), visibility_timeout=0)
+    queue.send({"job_id": "job-1"})
+    queue.receive()
+    # Sem confirmação, a mensagem volta para a fila (worker caiu)
+    assert queue.receive()[0]["body"] == {"job_id": "job-1"}
+
+def test_sqs_queue_round_trip():
+    with patch.object(settings, "AWS_SQS_ENDPOINT", settings.AWS_S3_ENDPOINT):
+        queue = SqsJobQueue(f"test-jobs-{uuid.uuid4().hex[:8]}", visibility_timeout=30)
+        queue.send({"job_id": "job-1"})
+        assert queue.depth() == 1
+
+        messages = queue.receive(max_messages=5)
+        assert [message["body"] for message in messages] == [{"job_id": "job-1"}]
+        queue.ack(messages[0]["receipt"])
+        assert queue.receive() == []
+
+def test_create_job_queue_unknown_backend():
+    with pytest.raises(ValueError) as exc_info:
+        create_job_queue("kafka")
+    assert "kafka" in str(exc_info.value)
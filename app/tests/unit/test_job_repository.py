@@ -0,0 +1,84 @@
+import time
+import uuid
+from app.domain.job_model import Job
+from app.repository.job_repository import (
+    add_job, get_job_by_id, get_jobs_by_username, update_job, claim_job, renew_job_lease, finish_job,
+    list_expired_jobs, mark_job_notified, get_jobs_by_ids
+)
+
+def test_job_round_trip_keeps_structured_fields():
+    job = Job(username="repouser", filename="video.mp4", interval=2, timestamps=[1.5, 3.0],
+              probe={"duration": 30.0, "fps": 29.97})
+    add_job(job)
+    update_job(job.job_id, progress={"frames": 3, "percent": 12.5})
+
+    stored = get_job_by_id(job.job_id)
+    assert stored["interval"] == 2
+    assert stored["timestamps"] == [1.5, 3.0]
+    assert stored["probe"] == {"duration": 30.0, "fps": 29.97}
+    assert stored["progress"] == {"frames": 3, "percent": 12.5}
+    # None remove o atributo
+    assert update_job(job.job_id, progress=None)["progress"] is None
+
+def test_get_jobs_by_username_newest_first():
+    username = f"history_{uuid.uuid4().hex[:8]}"
+    first = Job(username=username, filename="a.mp4", interval=5, created_at="2026-01-01T00:00:00+00:00")
+    second = Job(username=username, filename="b.mp4", interval=5, created_at="2026-01-02T00:00:00+00:00")
+    add_job(first)
+    add_job(second)
+
+    jobs = get_jobs_by_username(username)
+    assert [job["job_id"] for job in jobs] == [second.job_id, first.job_id]
+
+def test_claim_job_respects_active_lease():
+    job = Job(username="repouser", filename="video.mp4", interval=5)
+    add_job(job)
+
+    claimed = claim_job(job.job_id, "worker-a", 60)
+    assert claimed["worker_id"] == "worker-a"
+    assert claimed["attempts"] == 1
+    # Lease válido de outro worker
+    assert claim_job(job.job_id, "worker-b", 60) is None
+    assert renew_job_lease(job.job_id, "worker-b", 60) is None
+    assert renew_job_lease(job.job_id, "worker-a", 60)["worker_id"] == "worker-a"
+
+def test_expired_lease_is_listed_and_taken_over():
+    job = Job(username="repouser", filename="video.mp4", interval=5, worker_id="worker-a",
+              lease_expires_at=int(time.time()) - 5, attempts=1)
+    add_job(job)
+    assert job.job_id in list_expired_jobs()
+
+    claimed = claim_job(job.job_id, "worker-b", 60, count_attempt=False)
+    assert claimed["worker_id"] == "worker-b"
+    assert claimed["attempts"] == 1
+    assert job.job_id not in list_expired_jobs()
+    # O worker antigo não consegue mais gravar o resultado
+    assert finish_job(job.job_id, "worker-a", status="done") is None
+
+def test_finish_job_releases_lease():
+    job = Job(username="repouser", filename="video.mp4", interval=5)
+    add_job(job)
+    claim_job(job.job_id, "worker-a", 60)
+
+    finished = finish_job(job.job_id, "worker-a", status="done")
+    assert finished["status"] == "done"
+    assert finished["worker_id"] is None
+    assert finished["lease_expires_at"] is None
+    # Jobs finalizados não podem ser assumidos de novo
+    assert claim_job(job.job_id, "worker-a", 60) is None
+
+def test_mark_job_notified_only_once():
+    job = Job(username="repouser", filename="video.mp4", interval=5)
+    add_job(job)
+    assert mark_job_notified(job.job_id) is True
+    assert mark_job_notified(job.job_id) is False
+
+def test_get_jobs_by_ids_in_batches():
+    jobs = [Job(username="repouser", filename=f"{index}.mp4", interval=5) for index in range(3)]
+    for job in jobs:
+        add_job(job)
+
+    found = get_jobs_by_ids([jobs[0].job_id, jobs[2].job_id, jobs[0].job_id, "inexistente"])
+    assert set(found) == {jobs[0].job_id, jobs[2].job_id}
+    assert found[jobs[2].job_id]["filename"] == "2.mp4"
+    assert get_jobs_by_ids([]) == {}
@@ -0,0 +1,127 @@
+import threading
+import time
+from app.service.extraction_executor import ExtractionExecutor
+from app.service.job_scheduler import JobScheduler, estimate_job_cost
+
+def _drain(scheduler):
+    order = []
+    while (item := scheduler.pop()) is not None:
+        order.append(item)
+    return order
+
+def test_estimate_job_cost_uses_duration_resolution_and_interval():
+    probe = {"duration": 60.0, "width": 1920, "height": 1080}
+    assert estimate_job_cost(probe, interval=2) == round(30 * 1920 * 1080 / 1_000_000, 3)
+    # Sem intervalo (timestamps ou scene), usa os frames previstos
+    assert estimate_job_cost(probe, planned_frames=5) == round(5 * 1920 * 1080 / 1_000_000, 3)
+    assert estimate_job_cost() == 1.0
+
+def test_shortest_job_first_within_user():
+    scheduler = JobScheduler()
+    for job_id, cost in (("grande", 500.0), ("pequeno", 5.0), ("medio", 50.0)):
+        scheduler.push(job_id, username="alice", cost=cost, job_id=job_id)
+    assert _drain(scheduler) == ["pequeno", "medio", "grande"]
+
+def test_big_batch_does_not_starve_other_user():
+    scheduler = JobScheduler()
+    for index in range(50):
+        scheduler.push(f"alice-{index}", username="alice", cost=100.0)
+    scheduler.push("bob-0", username="bob", cost=100.0)
+    order = _drain(scheduler)
+    # O job do segundo usuário entra logo depois do primeiro job do lote
+    assert order.index("bob-0") <= 1
+
+def test_small_job_passes_large_jobs_of_other_user():
+    scheduler = JobScheduler()
+    for index in range(10):
+        scheduler.push(f"alice-{index}", username="alice", cost=1000.0)
+    scheduler.push("bob-small", username="bob", cost=10.0)
+    assert scheduler.pop() == "bob-small"
+
+def test_administrator_weight_gets_larger_share():
+    scheduler = JobScheduler(role_weights={"user_level_1": 1.0, "administrator": 4.0})
+    for index in range(20):
+        scheduler.push(f"user-{index}", username="user", role="user_level_1", cost=10.0)
+        scheduler.push(f"admin-{index}", username="admin", role="administrator", cost=10.0)
+    first = [scheduler.pop() for _ in range(10)]
+    assert sum(item.startswith("admin") for item in first) == 8
+
+def test_idle_user_does_not_accumulate_credit():
+    scheduler = JobScheduler()
+    for index in range(5):
+        scheduler.push(f"alice-{index}", username="alice", cost=10.0)
+    _drain(scheduler)
+    for index in range(4):
+        scheduler.push(f"bob-{index}", username="bob", cost=10.0)
+        scheduler.push(f"alice-new-{index}", username="alice", cost=10.0)
+    order = _drain(scheduler)
+    # Alice volta a disputar em pé de igualdade com Bob
+    assert order[:2] in (["bob-0", "alice-new-0"], ["alice-new-0", "bob-0"])
+
+def test_job_not_admitted_is_skipped_until_it_fits():
+    scheduler = JobScheduler()
+    fits = {"alice": False}
+    scheduler.push("alice-1", username="alice", cost=1.0, admit=lambda: fits["alice"])
+    scheduler.push("bob-1", username="bob", cost=50.0)
+    # O job de alice vem antes na ordem, mas ainda não cabe: bob passa à frente
+    assert scheduler.pop() == "bob-1"
+    assert scheduler.pop() is None
+    assert scheduler.pending() == 1
+    fits["alice"] = True
+    assert scheduler.pop() == "alice-1"
+
+def test_stats_report_waits_and_decisions():
+    scheduler = JobScheduler(small_job_cost=20.0)
+    now = time.time()
+    scheduler.push("a", username="alice", cost=10.0, job_id="job-a", submitted_at=now - 4)
+    scheduler.push("b", username="bob", cost=100.0, job_id="job-b", submitted_at=now - 10)
+    assert scheduler.pending() == 2
+    assert scheduler.stats()["pending_by_user"] == {"alice": 1, "bob": 1}
+    _drain(scheduler)
+
+    stats = scheduler.stats()
+    assert stats["dispatched"] == 2
+    assert stats["pending_by_user"] == {}
+    assert 4 <= stats["small_job_wait_p95_seconds"] < 5
+    assert 10 <= stats["wait_p95_seconds"] < 11
+    assert set(stats["wait_p95_by_user"]) == {"alice", "bob"}
+    assert [decision["job_id"] for decision in stats["recent_decisions"]] == ["job-a", "job-b"]
+
+def test_executor_runs_queued_jobs_in_scheduler_order():
+    executor = ExtractionExecutor(max_workers=1, max_queue=5, scheduler=JobScheduler())
+    release = threading.Event()
+    started = threading.Event()
+    order = []
+
+    def blocking_job():
+        started.set()
+        release.wait(timeout=5)
+
+    running = executor.submit(blocking_job)
+    started.wait(timeout=5)
+    futures = [
+        executor.submit(order.append, name, schedule={"username": user, "cost": cost})
+        for name, user, cost in (("alice-grande", "alice", 900.0), ("alice-pequeno", "alice", 9.0), ("bob", "bob", 90.0))
+    ]
+    release.set()
+    running.result(timeout=5)
+    for future in futures:
+        future.result(timeout=5)
+    assert order == ["alice-pequeno", "bob", "alice-grande"]
+
+def test_executor_does_not_hold_worker_while_job_waits_for_admission():
+    executor = ExtractionExecutor(max_workers=1, max_queue=5, scheduler=JobScheduler())
+    admitted = threading.Event()
+    order = []
+
+    waiting = executor.submit(order.append, "grande", schedule={"username": "alice", "admit": admitted.is_set})
+    # O único worker não fica preso esperando o job que ainda não cabe
+    executor.submit(order.append, "pequeno", schedule={"username": "bob"}).result(timeout=5)
+    assert order == ["pequeno"]
+    assert executor.stats()["waiting_for_admission"] == 1
+
+    admitted.set()
+    executor.wake()
+    waiting.result(timeout=5)
+    assert order == ["pequeno", "grande"]
+    assert executor.stats()["waiting_for_admission"] == 0
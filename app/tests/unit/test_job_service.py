@@ -0,0 +1,447 @@
+import os
+import time
+import asyncio
+import threading
+import pytest
+from io import BytesIO
+from tempfile import mkdtemp
+from fastapi import HTTPException
+from unittest.mock import patch, ANY
+from app.service.job_service import (
+    submit_video_job, run_video_job, wait_for_job_or_disconnect, cancel_job, list_user_jobs,
+    recover_expired_jobs, start_queued_job, load_job_results
+)
+from app.service import job_service
+from app.service.job_control_service import JobControl, check_cancelled, job_control_stats
+from app.repository.job_repository import add_job, get_job_by_id
+from app.domain.job_model import Job, FINAL_JOB_STATUSES
+from app.domain.process_video_model import ProcessVideoInput
+from app.service.job_queue import SqliteJobQueue, InMemoryJobQueue
+from app.service.extraction_executor import ExtractionExecutor
+from app.exceptions.queue_full_error import QueueFullError
+
+def wait_for_job(job_id: str, timeout: float = 10, poll_interval: float = 0.05) -> dict:
+    """Aguarda o job terminar (neste processo ou em outro) e retorna o registro atualizado."""
+    deadline = time.monotonic() + timeout
+    while True:
+        future = job_service._futures.get(job_id)
+        if future is not None:
+            future.result(timeout=timeout)
+        job = get_job_by_id(job_id)
+        if job is None or job["status"] in FINAL_JOB_STATUSES:
+            return job
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"O job {job_id} não terminou em {timeout}s.")
+        time.sleep(poll_interval)
+
+# Classe dummy para simular um UploadFile
+class DummyUploadFile:
+    def __init__(self, filename, content):
+        self.filename = filename
+        self.file = BytesIO(content)
+
+def dummy_result():
+    return {"file_url": "http://fake-s3.com/file.zip", "extraction_mode": "select", "frame_timestamps": [0.0, 5.0]}
+
+def dummy_preflight():
+    probe = {"duration": 30.0, "fps": 30.0, "width": 1280, "height": 720, "codec": "h264", "keyframe_interval": 2.0}
+    return {"probe": probe, "extraction_mode": "select", "planned_frames": 6, "decoded_frames": 900, "estimated_seconds": 1.5,
+            "scratch_bytes": 6 * 1024 * 1024}
+
+def test_submit_video_job_done():
+    dummy_file = DummyUploadFile("video.mp4", b"fake video content")
+    with patch("app.service.job_service.preflight_video", return_value=dummy_preflight()) as mock_preflight, \
+         patch("app.service.job_service.process_video", return_value=dummy_result()) as mock_process, \
+         patch("app.service.job_service.notify_file_ready") as mock_notify:
+        process_input = ProcessVideoInput.model_construct(file=dummy_file, interval=5, mode="auto", timestamps=None)
+        job = submit_video_job(process_input, "jobuser")
+        assert job["username"] == "jobuser"
+        assert job["filename"] == "video.mp4"
+        assert job["planned_frames"] == 6
+        assert job["estimated_seconds"] == 1.5
+        mock_preflight.assert_called_once_with(ANY, 5, "auto", None, None, ANY)
+
+        finished = wait_for_job(job["job_id"])
+        assert finished["status"] == "done"
+        assert finished["file_url"] == "http://fake-s3.com/file.zip"
+        assert finished["extraction_mode"] == "select"
+        assert finished["frame_timestamps"] == [0.0, 5.0]
+        mock_process.assert_called_once_with(ANY, 5, "jobuser", mode="auto", timestamps=None,
+                                             video_sha256=job["video_sha256"], output_options=job["output"],
+                                             probe=dummy_preflight()["probe"], engine=ANY,
+                                             threshold=None, archive_id=job["job_id"])
+        mock_notify.assert_called_once_with("jobuser", "http://fake-s3.com/file.zip")
+        # O lease é liberado ao final e o e-mail fica registrado como enviado
+        assert finished["attempts"] == 1
+        assert finished["worker_id"] is None
+        assert finished["notified"] is True
+
+    # O diretório temporário do job é removido ao final
+    video_path = mock_process.call_args[0][0]
+    assert not os.path.exists(os.path.dirname(video_path))
+    assert any(j["job_id"] == job["job_id"] for j in list_user_jobs("jobuser"))
+
+def test_submit_video_job_preflight_rejected():
+    dummy_file = DummyUploadFile("video.mp4", b"not a video")
+    error = HTTPException(status_code=422, detail="Arquivo de vídeo inválido ou corrompido.")
+    with patch("app.service.job_service.preflight_video", side_effect=error), \
+         patch("app.service.job_service.extraction_executor") as mock_executor, \
+         patch("app.service.job_service.scratch_space.create_job_dir", return_value=mkdtemp(prefix="job_")) as mock_mkdtemp:
+        mock_executor.has_capacity.return_value = True
+        process_input = ProcessVideoInput.model_construct(file=dummy_file, interval=5, mode="auto", timestamps=None)
+        with pytest.raises(HTTPException) as exc_info:
+            submit_video_job(process_input, "jobuser")
+
+    assert exc_info.value.status_code == 422
+    # Nada é agendado e o upload é removido
+    mock_executor.submit.assert_not_called()
+    assert not os.path.exists(mock_mkdtemp.return_value)
+
+def test_submit_video_job_rejected_without_scratch_space():
+    dummy_file = DummyUploadFile("video.mp4", b"fake video content")
+    with patch("app.service.job_service.scratch_space.admit", return_value=False), \
+         patch("app.service.job_service.save_upload") as mock_save:
+        process_input = ProcessVideoInput.model_construct(file=dummy_file, interval=5, mode="auto", timestamps=None)
+        with pytest.raises(QueueFullError):
+            submit_video_job(process_input, "jobuser")
+    mock_save.assert_not_called()
+
+def test_concurrent_submits_respect_executor_capacity():
+    # Os envios passam juntos pela verificação inicial; só cabem 2 (1 worker + 1 na fila)
+    executor = ExtractionExecutor(max_workers=1, max_queue=1)
+    uploads_done = threading.Barrier(3)
+
+    def slow_save_upload(file, job_dir):
+        uploads_done.wait(timeout=5)
+        video_path = os.path.join(job_dir, file.filename)
+        with open(video_path, "wb") as f:
+            f.write(file.file.read())
+        return video_path, os.path.getsize(video_path), "sha-" + os.path.basename(job_dir)
+
+    results, errors = [], []
+
+    def submit():
+        process_input = ProcessVideoInput.model_construct(
+            file=DummyUploadFile("video.mp4", b"fake video content"), interval=5, mode="auto", timestamps=None
+        )
+        try:
+            results.append(submit_video_job(process_input, "concurrentuser", role="administrator"))
+        except QueueFullError as e:
+            errors.append(e)
+
+    with patch("app.service.job_service.extraction_executor", executor), \
+         patch("app.service.job_service.job_queue", InMemoryJobQueue()), \
+         patch("app.service.job_service.local_worker"), \
+         patch("app.service.job_service.save_upload", side_effect=slow_save_upload), \
+         patch("app.service.job_service.preflight_video", return_value=dummy_preflight()):
+        threads = [threading.Thread(target=submit) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+
+    assert len(results) == 2
+    assert len(errors) == 1
+    assert executor.stats()["reserved"] == 2
+    for job in results:
+        job_service.job_leases.release(job["job_id"])
+
+def test_run_video_job_failed(tmp_path):
+    job = Job(username="jobuser", filename="video.mp4", interval=5)
+    add_job(job)
+    error = HTTPException(status_code=500, detail="Nenhum frame foi extraído do vídeo.")
+    with patch("app.service.job_service.process_video", side_effect=error), \
+         patch("app.service.job_service.notify_file_ready") as mock_notify:
+        run_video_job(job.job_id, str(tmp_path / "video.mp4"), str(tmp_path))
+
+    stored = get_job_by_id(job.job_id)
+    assert stored["status"] == "failed"
+    assert stored["error"] == "Nenhum frame foi extraído do vídeo."
+    mock_notify.assert_not_called()
+    assert not tmp_path.exists()
+
+def test_run_video_job_email_error_keeps_done(tmp_path):
+    job = Job(username="jobuser", filename="video.mp4", interval=5)
+    add_job(job)
+    with patch("app.service.job_service.process_video", return_value=dummy_result()), \
+         patch("app.service.job_service.notify_file_ready", side_effect=Exception("SES down")):
+        run_video_job(job.job_id, str(tmp_path / "video.mp4"), str(tmp_path))
+
+    assert get_job_by_id(job.job_id)["status"] == "done"
+
+def test_run_video_job_fanout_notifies_all_archives(tmp_path):
+    job = Job(username="jobuser", filename="video.mp4", outputs=[{"name": "a", "interval": 1}, {"name": "b", "interval": 10}])
+    add_job(job)
+    result = {
+        "file_url": None,
+        "extraction_mode": "fanout",
+        "frame_timestamps": None,
+        "output_files": [
+            {"name": "a", "kind": "frames", "file_url": "http://fake-s3.com/a.zip", "frame_timestamps": [0.0]},
+            {"name": "b", "kind": "frames", "file_url": "http://fake-s3.com/b.zip", "frame_timestamps": [0.0]},
+        ],
+        "cache_hit": False,
+    }
+    with patch("app.service.job_service.process_video_outputs", return_value=result) as mock_fanout, \
+         patch("app.service.job_service.process_video") as mock_process, \
+         patch("app.service.job_service.notify_file_ready") as mock_notify:
+        run_video_job(job.job_id, str(tmp_path / "video.mp4"), str(tmp_path))
+
+    mock_process.assert_not_called()
+    specs = mock_fanout.call_args[0][2]
+    assert [spec["name"] for spec in specs] == ["a", "b"]
+    mock_notify.assert_called_once_with("jobuser", "http://fake-s3.com/a.zip\nhttp://fake-s3.com/b.zip")
+    stored = get_job_by_id(job.job_id)
+    assert stored["status"] == "done"
+    assert len(stored["output_files"]) == 2
+
+def test_run_video_job_reads_ingested_object_from_s3(tmp_path):
+    job = Job(username="jobuser", filename="video.mp4", interval=5, source_key="jobuser/incoming/abc/video.mp4")
+    add_job(job)
+    with patch("app.service.job_service.generate_presigned_download_url", return_value="http://fake-s3.com/signed") as mock_url, \
+         patch("app.service.job_service.process_video", return_value=dummy_result()) as mock_process, \
+         patch("app.service.job_service.delete_s3_file") as mock_delete, \
+         patch("app.service.job_service.notify_file_ready"):
+        run_video_job(job.job_id, "http://fake-s3.com/expired", str(tmp_path))
+
+    # A URL é renovada na hora da execução e o vídeo de entrada é removido ao final
+    mock_url.assert_called_once_with("jobuser/incoming/abc/video.mp4", ANY)
+    assert mock_process.call_args[0][0] == "http://fake-s3.com/signed"
+    mock_delete.assert_called_once_with("jobuser/incoming/abc/video.mp4")
+    assert get_job_by_id(job.job_id)["status"] == "done"
+
+def wait_until_cancelled(*args, **kwargs):
+    # Simula uma extração longa, interrompida só pelo cancelamento do job
+    for _ in range(500):
+        check_cancelled()
+        time.sleep(0.01)
+    raise AssertionError("O job não foi interrompido.")
+
+def test_cancel_running_job(tmp_path):
+    dummy_file = DummyUploadFile("video.mp4", b"fake video content")
+    cancelled_before = job_control_stats()["cancelled"]
+    started = []
+
+    def slow_process(*args, **kwargs):
+        started.append(True)
+        return wait_until_cancelled()
+
+    with patch("app.service.job_service.preflight_video", return_value=dummy_preflight()), \
+         patch("app.service.job_service.process_video", side_effect=slow_process) as mock_process, \
+         patch("app.service.job_service.notify_file_ready") as mock_notify:
+        process_input = ProcessVideoInput.model_construct(file=dummy_file, interval=5, mode="auto", timestamps=None)
+        job = submit_video_job(process_input, "jobuser")
+        while not started:
+            time.sleep(0.01)
+        cancel_job(job["job_id"])
+        finished = wait_for_job(job["job_id"])
+
+    assert finished["status"] == "cancelled"
+    assert finished["error"] == "Job cancelado."
+    mock_notify.assert_not_called()
+    assert job_control_stats()["cancelled"] == cancelled_before + 1
+    # O diretório do job é removido mesmo com o cancelamento
+    assert not os.path.exists(os.path.dirname(mock_process.call_args[0][0]))
+
+    # Um job já finalizado não pode ser cancelado
+    with pytest.raises(HTTPException) as exc_info:
+        cancel_job(job["job_id"])
+    assert exc_info.value.status_code == 409
+
+def test_run_video_job_timeout(tmp_path):
+    job = Job(username="jobuser", filename="video.mp4", interval=5)
+    add_job(job)
+    timed_out_before = job_control_stats()["timed_out"]
+    control = JobControl(job.job_id, timeout=0.05, cpu_time_limit=None, watch_interval=0.01)
+    with patch("app.service.job_service.JobControl", return_value=control), \
+         patch("app.service.job_service.process_video", side_effect=wait_until_cancelled):
+        run_video_job(job.job_id, str(tmp_path / "video.mp4"), str(tmp_path))
+
+    stored = get_job_by_id(job.job_id)
+    assert stored["status"] == "timed_out"
+    assert "Tempo limite" in stored["error"]
+    assert job_control_stats()["timed_out"] == timed_out_before + 1
+    assert not tmp_path.exists()
+
+def test_wait_for_job_cancels_on_disconnect():
+    dummy_file = DummyUploadFile("video.mp4", b"fake video content")
+
+    async def is_disconnected():
+        return True
+
+    with patch("app.service.job_service.preflight_video", return_value=dummy_preflight()), \
+         patch("app.service.job_service.process_video", side_effect=wait_until_cancelled), \
+         patch("app.service.job_service.notify_file_ready"):
+        process_input = ProcessVideoInput.model_construct(file=dummy_file, interval=5, mode="auto", timestamps=None)
+        job = submit_video_job(process_input, "jobuser")
+        finished = asyncio.run(wait_for_job_or_disconnect(job["job_id"], is_disconnected, poll_interval=0.01))
+
+    assert finished["status"] == "cancelled"
+
+def test_run_video_job_skips_job_leased_by_another_worker(tmp_path):
+    job = Job(username="jobuser", filename="video.mp4", interval=5, worker_id="other-worker",
+              lease_expires_at=int(time.time()) + 60)
+    add_job(job)
+    with patch("app.service.job_service.process_video") as mock_process:
+        run_video_job(job.job_id, str(tmp_path / "video.mp4"), str(tmp_path))
+
+    mock_process.assert_not_called()
+    stored = get_job_by_id(job.job_id)
+    assert stored["status"] == "queued"
+    assert stored["worker_id"] == "other-worker"
+    assert not tmp_path.exists()
+
+def test_run_video_job_retry_does_not_resend_email(tmp_path):
+    # Tentativa anterior enviou o e-mail, mas o worker caiu antes de gravar o status
+    job = Job(username="jobuser", filename="video.mp4", interval=5, attempts=1, notified=True)
+    add_job(job)
+    with patch("app.service.job_service.process_video", return_value=dummy_result()) as mock_process, \
+         patch("app.service.job_service.notify_file_ready") as mock_notify:
+        run_video_job(job.job_id, str(tmp_path / "video.mp4"), str(tmp_path))
+
+    # O .zip tem o nome do job, então a nova tentativa regrava o mesmo objeto
+    assert mock_process.call_args.kwargs["archive_id"] == job.job_id
+    mock_notify.assert_not_called()
+    stored = get_job_by_id(job.job_id)
+    assert stored["status"] == "done"
+    assert stored["attempts"] == 2
+
+def test_run_video_job_fails_after_max_attempts(tmp_path):
+    job = Job(username="jobuser", filename="video.mp4", interval=5, attempts=3)
+    add_job(job)
+    with patch("app.service.job_service.settings.JOB_MAX_ATTEMPTS", 3), \
+         patch("app.service.job_service.process_video") as mock_process:
+        run_video_job(job.job_id, str(tmp_path / "video.mp4"), str(tmp_path))
+
+    mock_process.assert_not_called()
+    stored = get_job_by_id(job.job_id)
+    assert stored["status"] == "failed"
+    assert "3 tentativas" in stored["error"]
+
+def test_recover_expired_jobs():
+    expired = int(time.time()) - 10
+    ingested = Job(username="jobuser", filename="video.mp4", interval=5, source_key="jobuser/incoming/abc/video.mp4",
+                   worker_id="dead-worker", lease_expires_at=expired, attempts=1)
+    uploaded = Job(username="jobuser", filename="video.mp4", interval=5, worker_id="dead-worker",
+                   lease_expires_at=expired, attempts=1)
+    add_job(ingested)
+    add_job(uploaded)
+    with patch("app.service.job_service.generate_presigned_download_url", return_value="http://fake-s3.com/signed"), \
+         patch("app.service.job_service.process_video", return_value=dummy_result()) as mock_process, \
+         patch("app.service.job_service.delete_s3_file"), \
+         patch("app.service.job_service.notify_file_ready"):
+        assert recover_expired_jobs() >= 1
+        finished = wait_for_job(ingested.job_id)
+
+    # O job com o vídeo no S3 é retomado e o que dependia do disco do worker perdido falha
+    assert finished["status"] == "done"
+    assert finished["attempts"] == 2
+    assert any(call.args[0] == "http://fake-s3.com/signed" for call in mock_process.call_args_list)
+    stored = get_job_by_id(uploaded.job_id)
+    assert stored["status"] == "failed"
+    assert "perdido" in stored["error"]
+
+def test_cancel_job_of_another_worker_is_requested():
+    job = Job(username="jobuser", filename="video.mp4", interval=5, worker_id="other-worker",
+              lease_expires_at=int(time.time()) + 60)
+    add_job(job)
+
+    cancelled = cancel_job(job.job_id)
+
+    # O worker dono do job vê o pedido no próximo heartbeat
+    assert cancelled["cancel_requested"] is True
+    assert cancelled["status"] == "queued"
+
+def test_submit_with_shared_queue_only_enqueues(tmp_path):
+    # Fila compartilhada: a API publica o job e um worker separado o executa
+    queue = SqliteJobQueue(str(tmp_path / "jobs.db"), poll_interval=0.01)
+    dummy_file = DummyUploadFile("video.mp4", b"fake video content")
+    with patch("app.service.job_service.job_queue", queue), \
+         patch("app.service.job_service.preflight_video", return_value=dummy_preflight()), \
+         patch("app.service.job_service.upload_to_s3") as mock_upload, \
+         patch("app.service.job_service.process_video", return_value=dummy_result()) as mock_process:
+        process_input = ProcessVideoInput.model_construct(file=dummy_file, interval=5, mode="auto", timestamps=None)
+        job = submit_video_job(process_input, "jobuser")
+
+        # O upload vai para o S3 e o diretório local da API é removido
+        video_path, source_key = mock_upload.call_args[0]
+        assert source_key.startswith("jobuser/incoming/") and source_key.endswith("/video.mp4")
+        assert not os.path.exists(os.path.dirname(video_path))
+        assert job["source_key"] == source_key
+        assert job["worker_id"] is None
+        mock_process.assert_not_called()
+        messages = queue.receive()
+        assert [message["body"] for message in messages] == [{"job_id": job["job_id"]}]
+
+    with patch("app.service.job_service.generate_presigned_download_url", return_value="http://fake-s3.com/signed"), \
+         patch("app.service.job_service.process_video", return_value=dummy_result()) as mock_process, \
+         patch("app.service.job_service.delete_s3_file") as mock_delete, \
+         patch("app.service.job_service.notify_file_ready"):
+        start_queued_job(messages[0]["body"])
+        finished = wait_for_job(job["job_id"])
+
+    assert finished["status"] == "done"
+    assert mock_process.call_args[0][0] == "http://fake-s3.com/signed"
+    mock_delete.assert_called_once_with(source_key)
+
+def test_cancel_job_waiting_in_shared_queue():
+    job = Job(username="jobuser", filename="video.mp4", interval=5)
+    add_job(job)
+
+    cancelled = cancel_job(job.job_id)
+    assert cancelled["status"] == "cancelled"
+
+    # O worker que receber a mensagem a descarta
+    with patch("app.service.job_service.process_video") as mock_process:
+        start_queued_job({"job_id": job.job_id})
+    mock_process.assert_not_called()
+
+def test_start_queued_job_larger_than_scratch_space_fails():
+    job = Job(username="jobuser", filename="video.mp4", interval=5, source_key="jobuser/incoming/x/video.mp4",
+              scratch_bytes=10 ** 15)
+    add_job(job)
+    with patch("app.service.job_service.extraction_executor") as mock_executor, \
+         patch("app.service.job_service.delete_s3_file"):
+        start_queued_job({"job_id": job.job_id})
+
+    # Falha na hora em vez de aguardar na fila um espaço que nunca haverá
+    mock_executor.submit.assert_not_called()
+    stored = get_job_by_id(job.job_id)
+    assert stored["status"] == "failed"
+    assert "espaço de trabalho" in stored["error"]
+
+def test_run_video_job_stores_large_timestamps_in_s3(tmp_path):
+    # Acima do limite os timestamps saem do item do DynamoDB (até 400KB) e vão para o S3
+    job = Job(username="jobuser", filename="video.mp4", interval=1)
+    add_job(job)
+    timestamps = [float(second) for second in range(2000)]
+    stored_objects = {}
+    with patch("app.service.job_service.process_video", return_value={**dummy_result(), "frame_timestamps": timestamps}), \
+         patch("app.service.job_service.settings.JOB_INLINE_RESULTS_MAX_BYTES", 1024), \
+         patch("app.service.job_service.put_json_object", side_effect=stored_objects.__setitem__), \
+         patch("app.service.job_service.notify_file_ready"):
+        run_video_job(job.job_id, str(tmp_path / "video.mp4"), str(tmp_path))
+
+    stored = get_job_by_id(job.job_id)
+    assert stored["status"] == "done"
+    assert stored["frame_timestamps"] is None
+    assert stored["frame_count"] == 2000
+    assert stored["results_key"] == f"jobuser/job-results/{job.job_id}.json"
+
+    with patch("app.service.job_service.get_json_object", side_effect=stored_objects.__getitem__):
+        assert load_job_results(stored)["frame_timestamps"] == timestamps
+
+def test_run_video_job_keeps_small_timestamps_inline(tmp_path):
+    job = Job(username="jobuser", filename="video.mp4", interval=5)
+    add_job(job)
+    with patch("app.service.job_service.process_video", return_value=dummy_result()), \
+         patch("app.service.job_service.put_json_object") as mock_put, \
+         patch("app.service.job_service.notify_file_ready"):
+        run_video_job(job.job_id, str(tmp_path / "video.mp4"), str(tmp_path))
+
+    stored = get_job_by_id(job.job_id)
+    assert stored["frame_timestamps"] == [0.0, 5.0]
+    assert stored["frame_count"] == 2
+    assert stored["results_key"] is None
+    mock_put.assert_not_called()
+    assert load_job_results(stored) == stored
@@ -0,0 +1,37 @@
+from unittest.mock import MagicMock
+from app.service.job_queue import InMemoryJobQueue
+from app.service.job_worker import JobWorker
+
+def make_worker(free_slots, handler, buffer_jobs=False):
+    queue = InMemoryJobQueue()
+    executor = MagicMock()
+    executor.free_slots.return_value = free_slots
+    return queue, executor, JobWorker(queue, executor, handler, wait_seconds=0, buffer_jobs=buffer_jobs)
+
+def test_poll_once_receives_only_idle_slots():
+    handled = []
+    queue, executor, worker = make_worker(2, handled.append)
+    for index in range(3):
+        queue.send({"job_id": f"job-{index}"})
+
+    assert worker.poll_once() == 2
+    assert [body["job_id"] for body in handled] == ["job-0", "job-1"]
+    # O restante fica na fila para outros workers
+    assert queue.depth() == 1
+    executor.free_slots.assert_called_with(include_queue=False)
+
+def test_poll_once_without_slots_leaves_queue():
+    handler = MagicMock()
+    queue, executor, worker = make_worker(0, handler, buffer_jobs=True)
+    queue.send({"job_id": "job-1"})
+
+    assert worker.poll_once() == 0
+    handler.assert_not_called()
+    executor.free_slots.assert_called_with(include_queue=True)
+
+def test_poll_once_handler_error_returns_message():
+    queue, executor, worker = make_worker(1, MagicMock(side_effect=Exception("DynamoDB indisponível")))
+    queue.send({"job_id": "job-1"})
+
+    worker.poll_once()
+    assert queue.depth() == 1
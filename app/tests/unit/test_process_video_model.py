@@ -1,6 +1,7 @@
 import io
 import pytest
 from fastapi import UploadFile, HTTPException
+from app.core.config import settings
 from app.domain.process_video_model import ProcessVideoInput
 
 def create_dummy_upload_file(filename: str, size: int, content: bytes = b"dummy content") -> UploadFile:
@@ -66,3 +67,128 @@ def test_invalid_file_size():
     
     assert exc_info.value.status_code == 422
     assert "O tamanho do arquivo excede o limite permitido de 1GB." in str(exc_info.value.detail)
+
+def test_unknown_file_size():
+    """
+    Testa que um upload sem tamanho informado é aceito (o limite é validado na cópia).
+    """
+    dummy_file = create_dummy_upload_file("video.mp4", size=None)
+    model_instance = ProcessVideoInput.as_form(file=dummy_file, interval=5)
+    assert model_instance.file == dummy_file
+
+def test_timestamps_without_interval():
+    """
+    Testa que a lista de timestamps substitui o intervalo e é normalizada.
+    """
+    dummy_file = create_dummy_upload_file("video.mp4", size=500)
+    model_instance = ProcessVideoInput.as_form(file=dummy_file, timestamps="60, 1.5,60")
+    assert model_instance.interval is None
+    assert model_instance.timestamps == [1.5, 60.0]
+
+def test_missing_interval_and_timestamps():
+    dummy_file = create_dummy_upload_file("video.mp4", size=500)
+    with pytest.raises(HTTPException) as exc_info:
+        ProcessVideoInput.as_form(file=dummy_file)
+    assert exc_info.value.status_code == 422
+
+def test_invalid_timestamps():
+    dummy_file = create_dummy_upload_file("video.mp4", size=500)
+    with pytest.raises(HTTPException) as exc_info:
+        ProcessVideoInput.as_form(file=dummy_file, timestamps="10, abc")
+    assert exc_info.value.status_code == 422
+
+def test_invalid_mode():
+    dummy_file = create_dummy_upload_file("video.mp4", size=500)
+    with pytest.raises(HTTPException) as exc_info:
+        ProcessVideoInput.as_form(file=dummy_file, interval=5, mode="fast")
+    assert exc_info.value.status_code == 422
+    assert "Modo de extração inválido" in str(exc_info.value.detail)
+
+def test_output_options():
+    dummy_file = create_dummy_upload_file("video.mp4", size=500)
+    model_instance = ProcessVideoInput.as_form(
+        file=dummy_file, interval=5, output_format="WEBP", max_width=640, quality=80, grayscale=True
+    )
+    assert model_instance.output.format == "webp"
+    assert model_instance.output.max_width == 640
+    assert model_instance.output.max_height is None
+    assert model_instance.output.quality == 80
+    assert model_instance.output.grayscale is True
+
+def test_default_output_options():
+    dummy_file = create_dummy_upload_file("video.mp4", size=500)
+    model_instance = ProcessVideoInput.as_form(file=dummy_file, interval=5)
+    assert model_instance.output.format == "jpg"
+    assert model_instance.output.target_frame_bytes is None
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"output_format": "gif"}, "Formato de saída inválido"),
+    ({"max_width": 0}, "max_width deve ser maior que 0"),
+    ({"quality": 101}, "A qualidade deve estar entre 1 e 100"),
+    ({"quality": 80, "target_frame_bytes": 20000}, "não ambos"),
+    ({"output_format": "png", "target_frame_bytes": 20000}, "não se aplica ao formato PNG"),
+])
+def test_invalid_output_options(kwargs, message):
+    dummy_file = create_dummy_upload_file("video.mp4", size=500)
+    with pytest.raises(HTTPException) as exc_info:
+        ProcessVideoInput.as_form(file=dummy_file, interval=5, **kwargs)
+    assert exc_info.value.status_code == 422
+    assert message in str(exc_info.value.detail)
+
+def test_output_specs():
+    dummy_file = create_dummy_upload_file("video.mp4", size=500)
+    outputs = '[{"interval": 1, "max_width": 320}, {"name": "full"}, {"kind": "sprite", "interval": 5, "columns": 4}]'
+    model_instance = ProcessVideoInput.as_form(file=dummy_file, interval=10, outputs=outputs, combine_outputs=True)
+    specs = model_instance.outputs
+    assert [spec.name for spec in specs] == ["output_1", "full", "output_3"]
+    assert [spec.interval for spec in specs] == [1, 10, 5]
+    assert specs[0].max_width == 320
+    assert specs[2].kind == "sprite"
+    assert specs[2].columns == 4
+    assert model_instance.combine_outputs is True
+
+def test_output_specs_without_form_interval():
+    dummy_file = create_dummy_upload_file("video.mp4", size=500)
+    model_instance = ProcessVideoInput.as_form(file=dummy_file, outputs='[{"interval": 2}]')
+    assert model_instance.interval is None
+    assert model_instance.outputs[0].interval == 2
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"outputs": "not json"}, "JSON válido"),
+    ({"outputs": "[]"}, "lista de objetos"),
+    ({"outputs": '[{"max_width": 320}]'}, "Informe o intervalo da saída output_1"),
+    ({"outputs": '[{"interval": 1, "kind": "gif"}]'}, "Tipo de saída inválido"),
+    ({"outputs": '[{"interval": 1, "name": "a"}, {"interval": 2, "name": "a"}]'}, "únicos"),
+    ({"outputs": '[{"interval": 1, "columns": 50}]'}, "entre 1 e 20"),
+    ({"outputs": '[{"interval": 1}]', "timestamps": "1,2"}, "timestamps"),
+    ({"outputs": '[{"interval": 1}]', "mode": "seek"}, "uma única vez"),
+])
+def test_invalid_output_specs(kwargs, message):
+    dummy_file = create_dummy_upload_file("video.mp4", size=500)
+    with pytest.raises(HTTPException) as exc_info:
+        ProcessVideoInput.as_form(file=dummy_file, **kwargs)
+    assert exc_info.value.status_code == 422
+    assert message in str(exc_info.value.detail)
+
+def test_similarity_modes_threshold():
+    dummy_file = create_dummy_upload_file("video.mp4", size=500)
+    dedupe = ProcessVideoInput.as_form(file=dummy_file, interval=1, mode="dedupe")
+    assert dedupe.threshold == settings.DEDUPE_THRESHOLD
+    # O modo scene não exige intervalo
+    scene = ProcessVideoInput.as_form(file=dummy_file, mode="scene", threshold=0.5)
+    assert scene.interval is None
+    assert scene.threshold == 0.5
+    assert ProcessVideoInput.as_form(file=dummy_file, interval=1).threshold is None
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"interval": 1, "threshold": 0.5}, "só se aplica"),
+    ({"interval": 1, "mode": "dedupe", "threshold": 2}, "entre 0 e 1"),
+    ({"mode": "dedupe"}, "Informe o intervalo"),
+    ({"mode": "scene", "timestamps": "1,2"}, "não pode ser combinado"),
+])
+def test_invalid_similarity_parameters(kwargs, message):
+    dummy_file = create_dummy_upload_file("video.mp4", size=500)
+    with pytest.raises(HTTPException) as exc_info:
+        ProcessVideoInput.as_form(file=dummy_file, **kwargs)
+    assert exc_info.value.status_code == 422
+    assert message in str(exc_info.value.detail)
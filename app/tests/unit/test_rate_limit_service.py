@@ -0,0 +1,100 @@
+import uuid
+import pytest
+from fastapi import HTTPException
+from unittest.mock import patch
+from app.domain.job_model import Job, JobStatus
+from app.repository.job_repository import add_job
+from app.service.rate_limit_service import (
+    RateLimitStore, InMemoryRateLimitStore, DynamoDBRateLimitStore, limits_for, check_submission, acquire_job_slot,
+    release_job_slot
+)
+
+LIMITS = {
+    "user_level_1": {"requests_per_minute": 60, "burst": 2, "max_concurrent_jobs": 1},
+    "administrator": {"requests_per_minute": 600, "burst": 20, "max_concurrent_jobs": 10},
+}
+
+def _username():
+    return f"limited_{uuid.uuid4().hex[:8]}"
+
+def test_rate_limit_store_is_abstract():
+    with pytest.raises(TypeError):
+        RateLimitStore()
+
+def test_limits_for_role_and_user_override():
+    with patch("app.service.rate_limit_service.settings.RATE_LIMITS", LIMITS), \
+         patch("app.service.rate_limit_service.settings.RATE_LIMIT_USER_OVERRIDES", {"vip": {"max_concurrent_jobs": 3}}):
+        assert limits_for("alice", "administrator")["burst"] == 20
+        # Roles sem limites próprios usam os de user_level_1
+        assert limits_for("alice", None) == LIMITS["user_level_1"]
+        assert limits_for("vip", "user_level_1") == {**LIMITS["user_level_1"], "max_concurrent_jobs": 3}
+
+@pytest.mark.parametrize("store_class", [InMemoryRateLimitStore, DynamoDBRateLimitStore])
+def test_token_bucket_allows_burst_then_refills(store_class):
+    store = store_class()
+    username = _username()
+    with patch("app.service.rate_limit_service.time.time", return_value=1000.0):
+        assert store.take_token(username, burst=2, per_minute=60) == 0
+        assert store.take_token(username, burst=2, per_minute=60) == 0
+        # Bucket vazio: uma ficha por segundo
+        assert store.take_token(username, burst=2, per_minute=60) == pytest.approx(1.0)
+    with patch("app.service.rate_limit_service.time.time", return_value=1001.5):
+        assert store.take_token(username, burst=2, per_minute=60) == 0
+
+@pytest.mark.parametrize("store_class", [InMemoryRateLimitStore, DynamoDBRateLimitStore])
+def test_active_jobs_respect_quota(store_class):
+    store = store_class()
+    username = _username()
+    assert store.add_job(username, "job-1", max_jobs=2)
+    assert store.add_job(username, "job-2", max_jobs=2)
+    assert not store.add_job(username, "job-3", max_jobs=2)
+    # Repetir um job já ativo não ocupa outra vaga
+    assert store.add_job(username, "job-2", max_jobs=2)
+    store.remove_jobs(username, {"job-1"})
+    store.remove_jobs(username, {"job-1"})
+    assert store.active_jobs(username) == {"job-2"}
+    assert store.add_job(username, "job-3", max_jobs=2)
+
+def test_check_submission_rejects_burst_with_retry_after():
+    username = _username()
+    with patch("app.service.rate_limit_service.settings.RATE_LIMITS", LIMITS), \
+         patch("app.service.rate_limit_service.rate_limits", InMemoryRateLimitStore()):
+        check_submission(username)
+        check_submission(username)
+        with pytest.raises(HTTPException) as exc_info:
+            check_submission(username)
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.headers["Retry-After"] == "1"
+        # A role de administrador tem outro bucket de tamanho
+        check_submission(_username(), "administrator")
+
+def test_check_submission_without_token_keeps_bucket():
+    # Etapas que preparam o envio só verificam a cota de jobs, sem gastar fichas
+    username = _username()
+    with patch("app.service.rate_limit_service.settings.RATE_LIMITS", LIMITS), \
+         patch("app.service.rate_limit_service.rate_limits", InMemoryRateLimitStore()):
+        for _ in range(5):
+            check_submission(username, take_token=False)
+        check_submission(username)
+        check_submission(username)
+
+def test_concurrent_quota_frees_finished_jobs():
+    username = _username()
+    running = Job(username=username, filename="a.mp4", interval=5, status=JobStatus.RUNNING)
+    add_job(running)
+    store = InMemoryRateLimitStore()
+    with patch("app.service.rate_limit_service.settings.RATE_LIMITS", LIMITS), \
+         patch("app.service.rate_limit_service.rate_limits", store):
+        acquire_job_slot(username, running.job_id)
+        with pytest.raises(HTTPException) as exc_info:
+            check_submission(username)
+        assert exc_info.value.status_code == 429
+        with pytest.raises(HTTPException):
+            acquire_job_slot(username, "job-novo")
+
+        # Liberação perdida: o job terminou sem passar por release_job_slot
+        add_job(running.model_copy(update={"status": JobStatus.DONE}))
+        acquire_job_slot(username, "job-novo")
+        assert store.active_jobs(username) == {"job-novo"}
+        release_job_slot(username, "job-novo")
+        check_submission(username)
@@ -0,0 +1,17 @@
+import uuid
+from unittest.mock import patch
+from app.repository.result_cache_repository import add_result, get_result, delete_results_by_s3_key, get_results_table
+
+def test_delete_results_by_s3_key_follows_pages():
+    s3_key = f"cacheuser/frames_{uuid.uuid4()}.zip"
+    cache_keys = [f"cache-{uuid.uuid4().hex}" for _ in range(3)]
+    for cache_key in cache_keys:
+        add_result({"cache_key": cache_key, "s3_key": s3_key})
+
+    table = get_results_table()
+    query = table.query
+    # Uma entrada por página, como em um índice com muitas entradas
+    with patch("app.repository.result_cache_repository.get_results_table", return_value=table), \
+         patch.object(table, "query", side_effect=lambda **kwargs: query(**kwargs, Limit=1)):
+        assert delete_results_by_s3_key(s3_key) == 3
+    assert all(get_result(cache_key) is None for cache_key in cache_keys)
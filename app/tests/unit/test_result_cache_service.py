@@ -0,0 +1,100 @@
+import json
+import hashlib
+import pytest
+from fastapi import HTTPException
+from unittest.mock import patch
+from app.core.config import settings
+from app.service.result_cache_service import (
+    build_result_cache_key, get_cached_result, store_result, cache_stats, file_sha256
+)
+
+def dummy_entry(s3_key="otheruser/frames_abc.zip"):
+    return {
+        "cache_key": "sha:params",
+        "s3_key": s3_key,
+        "extraction_mode": "select",
+        "frame_timestamps": json.dumps([0.0, 5.0]),
+    }
+
+def test_build_result_cache_key_depends_on_parameters():
+    key = build_result_cache_key("abc", 5, "auto")
+    assert key.startswith("abc:")
+    assert key == build_result_cache_key("abc", 5, "auto", None, {})
+    assert key != build_result_cache_key("abc", 10, "auto")
+    assert key != build_result_cache_key("abc", 5, "keyframes")
+    assert key != build_result_cache_key("abc", 5, "auto", output_options={"format": "png"})
+    assert key != build_result_cache_key("def", 5, "auto")
+
+def test_file_sha256(tmp_path):
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"fake video content")
+    assert file_sha256(str(video), chunk_size=4) == hashlib.sha256(b"fake video content").hexdigest()
+
+def test_get_cached_result_miss():
+    before = cache_stats()["misses"]
+    with patch("app.service.result_cache_service.get_result", return_value=None):
+        assert get_cached_result("sha:params", "testuser") is None
+    assert cache_stats()["misses"] == before + 1
+
+def test_get_cached_result_hit_copies_to_user_prefix():
+    before = cache_stats()["hits"]
+    with patch("app.service.result_cache_service.get_result", return_value=dummy_entry()), \
+         patch("app.service.result_cache_service.copy_s3_file", return_value="http://fake-s3.com/copy.zip") as mock_copy, \
+         patch("app.service.result_cache_service.increment_result_hits") as mock_hits:
+        result = get_cached_result("sha:params", "testuser")
+
+    assert result == {
+        "file_url": "http://fake-s3.com/copy.zip",
+        "extraction_mode": "select",
+        "frame_timestamps": [0.0, 5.0],
+        "cache_hit": True,
+    }
+    source_key, dest_key = mock_copy.call_args[0]
+    assert source_key == "otheruser/frames_abc.zip"
+    assert dest_key.startswith("testuser/frames_")
+    mock_hits.assert_called_once_with("sha:params")
+    assert cache_stats()["hits"] == before + 1
+
+def test_get_cached_result_hit_same_user_reuses_archive():
+    with patch("app.service.result_cache_service.get_result", return_value=dummy_entry("testuser/frames_abc.zip")), \
+         patch("app.service.result_cache_service.copy_s3_file") as mock_copy, \
+         patch("app.service.result_cache_service.increment_result_hits"):
+        result = get_cached_result("sha:params", "testuser")
+
+    mock_copy.assert_not_called()
+    assert result["file_url"] == f"{settings.AWS_S3_PUBLIC_URL}/{settings.AWS_S3_BUCKET_NAME}/testuser/frames_abc.zip"
+
+def test_get_cached_result_same_user_copies_to_job_archive():
+    # Cada job tem o próprio .zip: a listagem associa o arquivo ao job pelo id na chave
+    with patch("app.service.result_cache_service.get_result", return_value=dummy_entry("testuser/frames_abc.zip")), \
+         patch("app.service.result_cache_service.copy_s3_file", return_value="http://fake-s3.com/job.zip") as mock_copy, \
+         patch("app.service.result_cache_service.increment_result_hits"):
+        result = get_cached_result("sha:params", "testuser", "testuser/frames_job-2.zip")
+
+    mock_copy.assert_called_once_with("testuser/frames_abc.zip", "testuser/frames_job-2.zip")
+    assert result["file_url"] == "http://fake-s3.com/job.zip"
+
+def test_get_cached_result_missing_archive_evicts_entry():
+    not_found = HTTPException(status_code=404, detail="Arquivo não encontrado.")
+    with patch("app.service.result_cache_service.get_result", return_value=dummy_entry()), \
+         patch("app.service.result_cache_service.copy_s3_file", side_effect=not_found), \
+         patch("app.service.result_cache_service.delete_result") as mock_delete:
+        assert get_cached_result("sha:params", "testuser") is None
+    mock_delete.assert_called_once_with("sha:params")
+
+def test_get_cached_result_copy_error_is_raised():
+    error = HTTPException(status_code=500, detail="Erro ao copiar")
+    with patch("app.service.result_cache_service.get_result", return_value=dummy_entry()), \
+         patch("app.service.result_cache_service.copy_s3_file", side_effect=error):
+        with pytest.raises(HTTPException):
+            get_cached_result("sha:params", "testuser")
+
+def test_store_result():
+    result = {"file_url": "http://fake-s3.com/file.zip", "extraction_mode": "seek", "frame_timestamps": [1.5]}
+    with patch("app.service.result_cache_service.add_result") as mock_add:
+        store_result("sha:params", "sha", "testuser/frames_abc.zip", result)
+    item = mock_add.call_args[0][0]
+    assert item["cache_key"] == "sha:params"
+    assert item["s3_key"] == "testuser/frames_abc.zip"
+    assert item["extraction_mode"] == "seek"
+    assert json.loads(item["frame_timestamps"]) == [1.5]
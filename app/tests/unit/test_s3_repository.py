@@ -2,19 +2,23 @@ import pytest
 from botocore.exceptions import ClientError
 from app.repository.s3_repository import get_s3_client, create_s3_bucket
 from app.core.config import settings
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, patch, ANY
 
 # Testa a função get_s3_client
 def test_get_s3_client():
-    with patch("app.repository.s3_repository.boto3.client", return_value="dummy_s3_client") as mock_boto:
+    with patch("app.repository.aws_client_repository._clients", {}), \
+         patch("app.repository.aws_client_repository.boto3.client", return_value="dummy_s3_client") as mock_boto:
         client = get_s3_client()
         assert client == "dummy_s3_client"
+        # O cliente é criado uma vez e reaproveitado
+        assert get_s3_client() is client
         mock_boto.assert_called_once_with(
             "s3",
             endpoint_url=settings.AWS_S3_ENDPOINT,
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_DEFAULT_REGION
+            region_name=settings.AWS_DEFAULT_REGION,
+            config=ANY,
         )
 
 # Testa create_s3_bucket para o caminho de sucesso
@@ -1,7 +1,14 @@
+import os
+import boto3
+from botocore.config import Config
 import pytest
+from datetime import datetime, timezone
 from botocore.exceptions import ClientError
 from fastapi import HTTPException
-from app.service.s3_service import upload_to_s3, list_user_frame_archives, delete_s3_file
+from moto import mock_aws
+from app.service.s3_service import (
+    upload_to_s3, list_user_frame_archives, delete_s3_file, copy_s3_file, S3MultipartWriter, MIN_PART_SIZE
+)
 from app.core.config import settings
 from unittest.mock import MagicMock, patch
 
@@ -31,28 +38,51 @@ def test_upload_to_s3_error():
 # --- Teste para list_user_frame_archives ---
 def test_list_user_frame_archives_success():
     dummy_client = MagicMock()
+    modified = datetime(2026, 1, 2, tzinfo=timezone.utc)
     dummy_response = {
         "Contents": [
-            {"Key": "testuser/file1.zip"},
-            {"Key": "testuser/file2.zip"},
-            {"Key": "testuser/notzip.txt"}
+            {"Key": "testuser/frames_1.zip", "Size": 10, "LastModified": modified},
+            {"Key": "testuser/frames_2.zip", "Size": 20, "LastModified": modified},
+            {"Key": "testuser/frames_notzip.txt", "Size": 5, "LastModified": modified},
         ]
     }
     with patch("app.service.s3_service.get_s3_client", return_value=dummy_client):
         dummy_client.list_objects_v2.return_value = dummy_response
-        archives = list_user_frame_archives("testuser")
-        expected = [
-            f"{settings.AWS_S3_PUBLIC_URL}/{settings.AWS_S3_BUCKET_NAME}/testuser/file1.zip",
-            f"{settings.AWS_S3_PUBLIC_URL}/{settings.AWS_S3_BUCKET_NAME}/testuser/file2.zip"
+        page = list_user_frame_archives("testuser")
+        dummy_client.list_objects_v2.assert_called_once_with(
+            Bucket=settings.AWS_S3_BUCKET_NAME, Prefix="testuser/frames_", MaxKeys=1000
+        )
+        assert page["archives"] == [
+            {"key": "testuser/frames_1.zip", "size": 10, "last_modified": modified.isoformat(),
+             "url": f"{settings.AWS_S3_PUBLIC_URL}/{settings.AWS_S3_BUCKET_NAME}/testuser/frames_1.zip"},
+            {"key": "testuser/frames_2.zip", "size": 20, "last_modified": modified.isoformat(),
+             "url": f"{settings.AWS_S3_PUBLIC_URL}/{settings.AWS_S3_BUCKET_NAME}/testuser/frames_2.zip"},
         ]
-        assert archives == expected
+        assert page["last_key"] == "testuser/frames_notzip.txt"
+        assert page["truncated"] is False
+
+def test_list_user_frame_archives_follows_continuation_token():
+    dummy_client = MagicMock()
+    modified = datetime(2026, 1, 2, tzinfo=timezone.utc)
+    dummy_client.list_objects_v2.side_effect = [
+        {"Contents": [{"Key": "testuser/frames_1.zip", "Size": 1, "LastModified": modified}],
+         "IsTruncated": True, "NextContinuationToken": "token-1"},
+        {"Contents": [{"Key": "testuser/frames_2.zip", "Size": 2, "LastModified": modified}], "IsTruncated": False},
+    ]
+    with patch("app.service.s3_service.get_s3_client", return_value=dummy_client):
+        page = list_user_frame_archives("testuser", max_keys=5, start_after="testuser/frames_0.zip")
+    assert [archive["key"] for archive in page["archives"]] == ["testuser/frames_1.zip", "testuser/frames_2.zip"]
+    second_call = dummy_client.list_objects_v2.call_args_list[1].kwargs
+    assert second_call["ContinuationToken"] == "token-1"
+    assert second_call["StartAfter"] == "testuser/frames_0.zip"
+    assert second_call["MaxKeys"] == 4
 
 def test_list_user_frame_archives_no_contents():
     dummy_client = MagicMock()
     with patch("app.service.s3_service.get_s3_client", return_value=dummy_client):
         dummy_client.list_objects_v2.return_value = {}
-        archives = list_user_frame_archives("testuser")
-        assert archives == []
+        page = list_user_frame_archives("testuser")
+        assert page == {"archives": [], "last_key": None, "truncated": False}
 
 def test_list_user_frame_archives_error():
     dummy_client = MagicMock()
@@ -69,8 +99,28 @@ def test_delete_s3_file_success():
     dummy_client = MagicMock()
     with patch("app.service.s3_service.get_s3_client", return_value=dummy_client):
         dummy_client.delete_object.return_value = {}
+        with patch("app.service.s3_service.delete_results_by_s3_key") as mock_evict:
+            delete_s3_file("testuser/frames_dummy.zip")
+        dummy_client.delete_object.assert_called_once_with(Bucket=settings.AWS_S3_BUCKET_NAME, Key="testuser/frames_dummy.zip")
+        # O arquivo excluído sai do índice de resultados
+        mock_evict.assert_called_once_with("testuser/frames_dummy.zip")
+
+def test_delete_s3_file_other_objects_skip_index():
+    # Vídeos de entrada e outros arquivos não estão no índice de resultados
+    dummy_client = MagicMock()
+    with patch("app.service.s3_service.get_s3_client", return_value=dummy_client), \
+         patch("app.service.s3_service.delete_results_by_s3_key") as mock_evict:
+        delete_s3_file("testuser/incoming/abc/video.mp4")
         delete_s3_file("testuser/dummy.zip")
-        dummy_client.delete_object.assert_called_once_with(Bucket=settings.AWS_S3_BUCKET_NAME, Key="testuser/dummy.zip")
+    assert dummy_client.delete_object.call_count == 2
+    mock_evict.assert_not_called()
+
+def test_delete_s3_file_index_error_is_ignored():
+    dummy_client = MagicMock()
+    with patch("app.service.s3_service.get_s3_client", return_value=dummy_client), \
+         patch("app.service.s3_service.delete_results_by_s3_key", side_effect=Exception("DynamoDB fora")):
+        delete_s3_file("testuser/frames_dummy.zip")
+    dummy_client.delete_object.assert_called_once()
 
 def test_delete_s3_file_nosuchkey():
     # Definir uma exceção dummy que herda de Exception para simular NoSuchKey
@@ -85,3 +135,77 @@ def test_delete_s3_file_nosuchkey():
             delete_s3_file("testuser/dummy.zip")
         assert "Arquivo não encontrado" in str(exc_info.value)
 
+# --- Testes para copy_s3_file ---
+def test_copy_s3_file_success():
+    dummy_client = MagicMock()
+    with patch("app.service.s3_service.get_s3_client", return_value=dummy_client):
+        file_url = copy_s3_file("otheruser/a.zip", "testuser/b.zip")
+    dummy_client.copy.assert_called_once_with(
+        {"Bucket": settings.AWS_S3_BUCKET_NAME, "Key": "otheruser/a.zip"}, settings.AWS_S3_BUCKET_NAME, "testuser/b.zip"
+    )
+    assert file_url == f"{settings.AWS_S3_PUBLIC_URL}/{settings.AWS_S3_BUCKET_NAME}/testuser/b.zip"
+
+def test_copy_s3_file_not_found():
+    dummy_client = MagicMock()
+    dummy_client.copy.side_effect = ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+    with patch("app.service.s3_service.get_s3_client", return_value=dummy_client):
+        with pytest.raises(HTTPException) as exc_info:
+            copy_s3_file("otheruser/a.zip", "testuser/b.zip")
+    assert exc_info.value.status_code == 404
+
+# --- Testes para S3MultipartWriter (S3 simulado com o moto) ---
+@pytest.fixture
+def moto_s3_client():
+    with mock_aws():
+        # O moto não decodifica o corpo aws-chunked dos checksums padrão do botocore
+        s3_client = boto3.client("s3", region_name="us-east-1", config=Config(request_checksum_calculation="when_required"))
+        s3_client.create_bucket(Bucket="multipart-bucket")
+        with patch("app.service.s3_service.get_s3_client", return_value=s3_client):
+            yield s3_client
+
+def test_s3_multipart_writer_uploads_parts(moto_s3_client):
+    data = os.urandom(MIN_PART_SIZE * 2 + 1024)
+    with S3MultipartWriter("testuser/frames.zip", bucket_name="multipart-bucket", part_size=MIN_PART_SIZE, concurrency=2) as writer:
+        for offset in range(0, len(data), 1024 * 1024):
+            writer.write(data[offset:offset + 1024 * 1024])
+        # As partes cheias já foram enviadas antes do fechamento
+        assert writer._upload_id is not None
+        assert len(writer._parts) == 2
+        file_url = writer.complete()
+
+    assert file_url == f"{settings.AWS_S3_PUBLIC_URL}/multipart-bucket/testuser/frames.zip"
+    body = moto_s3_client.get_object(Bucket="multipart-bucket", Key="testuser/frames.zip")["Body"].read()
+    assert body == data
+
+def test_s3_multipart_writer_small_file_uses_put(moto_s3_client):
+    with S3MultipartWriter("testuser/small.zip", bucket_name="multipart-bucket") as writer:
+        writer.write(b"small archive")
+        writer.complete()
+    assert writer._upload_id is None
+    body = moto_s3_client.get_object(Bucket="multipart-bucket", Key="testuser/small.zip")["Body"].read()
+    assert body == b"small archive"
+
+def test_s3_multipart_writer_aborts_on_error(moto_s3_client):
+    with pytest.raises(RuntimeError):
+        with S3MultipartWriter("testuser/failed.zip", bucket_name="multipart-bucket", part_size=MIN_PART_SIZE) as writer:
+            writer.write(os.urandom(MIN_PART_SIZE + 10))
+            raise RuntimeError("falha na extração")
+
+    # Nenhum objeto nem upload pendente fica no bucket
+    assert moto_s3_client.list_multipart_uploads(Bucket="multipart-bucket").get("Uploads", []) == []
+    assert "Contents" not in moto_s3_client.list_objects_v2(Bucket="multipart-bucket")
+
+def test_s3_multipart_writer_complete_error_aborts():
+    dummy_client = MagicMock()
+    dummy_client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+    dummy_client.upload_part.return_value = {"ETag": "etag-1"}
+    dummy_client.complete_multipart_upload.side_effect = ClientError({"Error": {"Message": "Complete failed"}}, "CompleteMultipartUpload")
+    with patch("app.service.s3_service.get_s3_client", return_value=dummy_client):
+        writer = S3MultipartWriter("testuser/frames.zip", part_size=MIN_PART_SIZE)
+        writer.write(b"x" * MIN_PART_SIZE)
+        with pytest.raises(HTTPException) as exc_info:
+            writer.complete()
+    assert "Erro ao enviar" in str(exc_info.value)
+    dummy_client.abort_multipart_upload.assert_called_once_with(
+        Bucket=settings.AWS_S3_BUCKET_NAME, Key="testuser/frames.zip", UploadId="upload-1"
+    )
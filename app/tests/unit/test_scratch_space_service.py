@@ -0,0 +1,62 @@
+import os
+import pytest
+from fastapi import HTTPException
+from app.service.scratch_space_service import ScratchSpace
+
+@pytest.fixture
+def scratch(tmp_path):
+    # Capacidade de 1000 bytes com marca de ocupação em 800
+    return ScratchSpace(str(tmp_path / "scratch"), capacity=1000, high_water_ratio=0.8)
+
+def test_admit_until_high_water(scratch):
+    assert scratch.admit("job-1", 500)
+    assert scratch.admit("job-2", 300)
+    assert not scratch.admit("job-3", 1)
+    scratch.release("job-1")
+    assert scratch.admit("job-3", 400)
+    assert scratch.stats()["reserved_bytes"] == 700
+
+def test_release_notifies_subscribers(scratch):
+    released = []
+    scratch.subscribe(lambda: released.append(scratch.stats()["reserved_bytes"]))
+    scratch.admit("job-1", 600)
+    assert not scratch.admit("job-2", 300)
+
+    scratch.release("job-1")
+    # Avisados depois de liberada a reserva, quando o job que esperava já cabe
+    assert released == [0]
+    assert scratch.admit("job-2", 300)
+    scratch.release("missing")
+    assert released == [0]
+
+def test_job_larger_than_high_water_rejected(scratch):
+    scratch.admit("job-1", 100)
+    with pytest.raises(HTTPException) as exc_info:
+        scratch.check_fits("job-1", 750)
+    assert exc_info.value.status_code == 507
+
+def test_remove_job_dir_releases_reservation(scratch):
+    job_dir = scratch.create_job_dir()
+    assert os.path.basename(job_dir).startswith("job_")
+    scratch.admit(job_dir, 500)
+    scratch.resize(job_dir, 200)
+    assert scratch.stats()["reserved_bytes"] == 200
+
+    scratch.remove_job_dir(job_dir)
+    assert not os.path.exists(job_dir)
+    assert scratch.stats()["reserved_bytes"] == 0
+
+def test_sweep_orphans(scratch):
+    orphan = scratch.create_job_dir()
+    with open(os.path.join(orphan, "video.mp4"), "wb") as f:
+        f.write(b"x" * 100)
+    work_dir = scratch.work_dir()
+    other = os.path.join(scratch.root, "keep")
+    os.makedirs(other)
+
+    # Somente os diretórios criados pelo gerenciador são removidos
+    assert scratch.sweep_orphans() == 100
+    assert not os.path.exists(orphan)
+    assert not os.path.exists(work_dir.name)
+    assert os.path.exists(other)
+    work_dir.cleanup()
@@ -0,0 +1,257 @@
+import asyncio
+import time
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from app.api.upload_routes import router as upload_router
+from app.core.auth import get_current_user
+from app.core.config import settings
+from app.core.jwt import create_access_token
+from app.exceptions.queue_full_error import QueueFullError
+from app.repository.s3_repository import get_s3_client
+from app.repository.upload_session_repository import (
+    get_upload_session, get_upload_sessions_table, claim_upload_writer
+)
+from app.service.s3_service import read_s3_object
+from app.service.upload_session_service import (
+    create_upload_session, append_upload_chunk, sweep_expired_upload_sessions
+)
+
+app = FastAPI()
+app.include_router(upload_router, prefix="/api")
+
+def fake_current_user():
+    return {"sub": "testuser", "role": "administrator"}
+
+app.dependency_overrides[get_current_user] = fake_current_user
+
+client = TestClient(app)
+
+def create_upload(size, filename="video.mp4"):
+    response = client.post("/api/uploads", json={"filename": filename, "size": size})
+    assert response.status_code == 201
+    return response.json()["upload_id"]
+
+def patch_upload(upload_id, content, offset):
+    return client.patch(f"/api/uploads/{upload_id}", content=content, headers={"Upload-Offset": str(offset)})
+
+def fake_submit(received):
+    def submit(process_input, username, filename, job_dir, video_url, file_size, video_sha256,
+               source_key=None, role=None):
+        received.update(
+            content=read_s3_object(source_key), filename=filename, file_size=file_size, interval=process_input.interval
+        )
+        return {"job_id": "job-123", "status": "queued", "planned_frames": 6, "estimated_seconds": 1.0}
+    return submit
+
+def test_resumable_upload_flow():
+    content = b"0123456789" * 10
+    upload_id = create_upload(len(content))
+
+    # Duas partes enviadas em sequência
+    response = patch_upload(upload_id, content[:60], 0)
+    assert response.status_code == 200
+    assert response.headers["Upload-Offset"] == "60"
+
+    response = client.get(f"/api/uploads/{upload_id}")
+    assert response.json()["offset"] == 60
+    assert "multipart_upload_id" not in response.json()
+
+    response = patch_upload(upload_id, content[60:], 60)
+    assert response.json()["offset"] == len(content)
+
+    received = {}
+    with patch("app.service.ingest_service.submit_saved_video_job", side_effect=fake_submit(received)):
+        response = client.post(f"/api/uploads/{upload_id}/finalize", data={"interval": 5})
+
+    assert response.status_code == 202
+    assert response.json()["job_id"] == "job-123"
+    assert received == {"content": content, "filename": "video.mp4", "file_size": len(content), "interval": 5}
+    assert get_upload_session(upload_id)["status"] == "completed"
+
+    # Finalizar de novo devolve o mesmo job
+    with patch("app.service.upload_session_service.get_job", return_value={"job_id": "job-123", "status": "running"}):
+        response = client.post(f"/api/uploads/{upload_id}/finalize", data={"interval": 5})
+    assert response.json()["job_id"] == "job-123"
+
+def test_resumable_upload_multipart_parts():
+    # Partes de 5MB no S3 e o restante de cada requisição guardado até a próxima
+    mb = 1024 * 1024
+    content = bytes(range(256)) * (11 * mb // 256)
+    with patch("app.service.s3_service.settings.S3_MULTIPART_PART_SIZE", 5 * mb):
+        upload_id = create_upload(len(content))
+
+    assert patch_upload(upload_id, content[:3 * mb], 0).json()["offset"] == 3 * mb
+    assert patch_upload(upload_id, content[3 * mb:7 * mb], 3 * mb).json()["offset"] == 7 * mb
+    session = get_upload_session(upload_id)
+    assert len(session["part_etags"]) == 1
+    assert len(read_s3_object(session["tail_key"])) == 2 * mb
+
+    assert patch_upload(upload_id, content[7 * mb:], 7 * mb).json()["offset"] == len(content)
+    session = get_upload_session(upload_id)
+    assert len(session["part_etags"]) == 3
+    assert "tail_key" not in session
+
+    received = {}
+    with patch("app.service.ingest_service.submit_saved_video_job", side_effect=fake_submit(received)):
+        response = client.post(f"/api/uploads/{upload_id}/finalize", data={"interval": 5})
+    assert response.status_code == 202
+    assert received["content"] == content
+
+def test_upload_wrong_offset():
+    upload_id = create_upload(100)
+    patch_upload(upload_id, b"x" * 10, 0)
+
+    # Reenvio da mesma parte: o servidor indica de onde continuar
+    response = patch_upload(upload_id, b"x" * 10, 0)
+    assert response.status_code == 409
+    assert response.headers["Upload-Offset"] == "10"
+
+def test_upload_concurrent_writer():
+    upload_id = create_upload(100)
+
+    # Outra réplica está gravando a partir do mesmo offset
+    assert claim_upload_writer(upload_id, 0, "other-request", 60) is not None
+    response = patch_upload(upload_id, b"x" * 10, 0)
+    assert response.status_code == 409
+    assert response.headers["Upload-Offset"] == "0"
+    assert "Outra requisição" in response.json()["detail"]
+
+    # Com o lease expirado, a gravação abandonada deixa de bloquear o upload
+    get_upload_sessions_table().update_item(
+        Key={"upload_id": upload_id},
+        UpdateExpression="SET writer_expires_at = :expired",
+        ExpressionAttributeValues={":expired": int(time.time()) - 1},
+    )
+    response = patch_upload(upload_id, b"x" * 10, 0)
+    assert response.status_code == 200
+    assert response.headers["Upload-Offset"] == "10"
+
+def test_upload_lease_lost_during_write():
+    upload_id = create_upload(100)
+
+    async def stream():
+        yield b"a" * 10
+        # Lease assumido por outra requisição enquanto esta ainda recebia os bytes
+        get_upload_sessions_table().update_item(
+            Key={"upload_id": upload_id},
+            UpdateExpression="SET writer = :writer",
+            ExpressionAttributeValues={":writer": "other-request"},
+        )
+        yield b"b" * 10
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(append_upload_chunk(upload_id, "testuser", 0, stream()))
+    assert error.value.status_code == 409
+    session = get_upload_session(upload_id)
+    assert session["offset"] == 0
+    assert "tail_key" not in session
+
+def test_upload_exceeds_declared_size():
+    upload_id = create_upload(5)
+    response = patch_upload(upload_id, b"x" * 10, 0)
+    assert response.status_code == 413
+    session = get_upload_session(upload_id)
+    assert session["offset"] == 0
+    assert "writer" not in session
+
+def test_finalize_incomplete_upload():
+    upload_id = create_upload(100)
+    patch_upload(upload_id, b"x" * 10, 0)
+    response = client.post(f"/api/uploads/{upload_id}/finalize", data={"interval": 5})
+    assert response.status_code == 409
+    assert response.headers["Upload-Offset"] == "10"
+
+def test_finalize_queue_full_keeps_upload():
+    upload_id = create_upload(10)
+    patch_upload(upload_id, b"x" * 10, 0)
+    with patch("app.service.upload_session_service.reject_when_queue_full",
+               side_effect=QueueFullError("Fila de processamento cheia.", 12)):
+        response = client.post(f"/api/uploads/{upload_id}/finalize", data={"interval": 5})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "12"
+
+    # O upload continua disponível para uma nova tentativa
+    received = {}
+    with patch("app.service.ingest_service.submit_saved_video_job", side_effect=fake_submit(received)):
+        response = client.post(f"/api/uploads/{upload_id}/finalize", data={"interval": 5})
+    assert response.status_code == 202
+    assert received["content"] == b"x" * 10
+
+def test_finalize_retry_after_failed_submit():
+    # O multipart já concluído por um finalize anterior não impede a nova tentativa
+    upload_id = create_upload(10)
+    patch_upload(upload_id, b"y" * 10, 0)
+    limited = HTTPException(status_code=429, detail="Limite de jobs", headers={"Retry-After": "3"})
+    with patch("app.service.ingest_service.submit_saved_video_job", side_effect=limited):
+        response = client.post(f"/api/uploads/{upload_id}/finalize", data={"interval": 5})
+    assert response.status_code == 429
+    assert "writer" not in get_upload_session(upload_id)
+
+    received = {}
+    with patch("app.service.ingest_service.submit_saved_video_job", side_effect=fake_submit(received)):
+        response = client.post(f"/api/uploads/{upload_id}/finalize", data={"interval": 5})
+    assert response.status_code == 202
+    assert received["content"] == b"y" * 10
+
+def test_finalize_checks_submission_limits():
+    # O finalize cria o job: passa pelo rate limit e pela cota de jobs simultâneos
+    upload_id = create_upload(10)
+    patch_upload(upload_id, b"x" * 10, 0)
+    token = create_access_token({"sub": "testuser", "role": "user_level_1"})
+    limited = HTTPException(status_code=429, detail="Muitos envios", headers={"Retry-After": "7"})
+    with patch("app.api.submission_limits.check_submission", side_effect=limited) as mock_check, \
+         patch("app.service.upload_session_service.submit_ingested_video_job") as mock_submit:
+        response = client.post(f"/api/uploads/{upload_id}/finalize", data={"interval": 5},
+                               headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 429
+    mock_check.assert_called_once_with("testuser", "user_level_1", True)
+    mock_submit.assert_not_called()
+    assert get_upload_session(upload_id)["status"] != "completed"
+
+def test_create_upload_does_not_take_a_token():
+    # A ficha do rate limit é cobrada uma vez por job, no finalize
+    token = create_access_token({"sub": "testuser", "role": "user_level_1"})
+    with patch("app.api.submission_limits.check_submission") as mock_check:
+        response = client.post("/api/uploads", json={"filename": "video.mp4", "size": 10},
+                               headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 201
+    mock_check.assert_called_once_with("testuser", "user_level_1", False)
+
+def test_sweep_expired_upload_sessions():
+    upload_id = create_upload(100)
+    patch_upload(upload_id, b"x" * 10, 0)
+    session = get_upload_session(upload_id)
+
+    get_upload_sessions_table().update_item(
+        Key={"upload_id": upload_id},
+        UpdateExpression="SET expires_at = :expired",
+        ExpressionAttributeValues={":expired": int(time.time()) - 1},
+    )
+    assert patch_upload(upload_id, b"x" * 10, 10).status_code == 410
+
+    assert sweep_expired_upload_sessions() >= 1
+    assert get_upload_session(upload_id) is None
+    # O restante guardado e o multipart upload também saem do S3
+    with pytest.raises(HTTPException) as error:
+        read_s3_object(session["tail_key"])
+    assert error.value.status_code == 404
+    uploads = get_s3_client().list_multipart_uploads(Bucket=settings.AWS_S3_BUCKET_NAME, Prefix=session["s3_key"])
+    assert session["multipart_upload_id"] not in [upload["UploadId"] for upload in uploads.get("Uploads", [])]
+
+def test_upload_other_user():
+    upload_id = create_upload_session("otheruser", "video.mp4", 10)["upload_id"]
+    response = client.get(f"/api/uploads/{upload_id}")
+    assert response.status_code == 403
+
+def test_upload_not_found():
+    response = client.get("/api/uploads/missing")
+    assert response.status_code == 404
+
+def test_create_upload_invalid():
+    response = client.post("/api/uploads", json={"filename": "video.txt", "size": 10})
+    assert response.status_code == 422
+    response = client.post("/api/uploads", json={"filename": "video.mp4", "size": 20 * 1024 ** 3})
+    assert response.status_code == 422
+    assert "excede o limite" in response.json()["detail"]
@@ -0,0 +1,52 @@
+import signal
+import threading
+from app.core.config import settings
+from app.service.extraction_engine import get_extraction_engine
+from app.service.extraction_executor import extraction_executor
+from app.service.job_lease_service import job_leases
+from app.service.job_queue import job_queue
+from app.service.job_service import start_queued_job, recover_expired_jobs
+from app.service.job_worker import JobWorker
+from app.service.scratch_space_service import scratch_space
+
+def main():
+    """
+    Worker de extração (python -m app.worker): recebe os jobs publicados pela
+    API na fila e executa a extração, escalando separado dos pods da API.
+    Não cria tabelas nem recursos; isso fica com a inicialização da API.
+    """
+    if not job_queue.shared:
+        raise SystemExit(
+            f"JOB_QUEUE_BACKEND={settings.JOB_QUEUE_BACKEND} é local ao processo da API; use sqlite ou sqs."
+        )
+    # Falha na inicialização se a engine configurada não estiver disponível
+    get_extraction_engine()
+    # Diretórios de jobs interrompidos por uma queda anterior do processo
+    scratch_space.sweep_orphans()
+
+    # O worker recebe também os jobs da fila interna do executor (EXTRACTION_QUEUE_SIZE),
+    # que o agendador reordena por custo, usuário e role
+    worker = JobWorker(job_queue, extraction_executor, start_queued_job, wait_seconds=settings.JOB_QUEUE_WAIT_SECONDS,
+                       buffer_jobs=True)
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        # SIGTERM do Kubernetes: para de receber jobs e termina os que estão em execução
+        print(f"Sinal {signum} recebido; encerrando o worker.")
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    job_leases.start(on_tick=recover_expired_jobs)
+    print(f"Worker {job_leases.worker_id} consumindo a fila {job_queue.name} com "
+          f"{extraction_executor.max_workers} workers de extração.")
+    worker.start()
+    stopping.wait()
+    worker.stop()
+    # Os jobs já assumidos terminam; se o pod for morto antes, o lease expira e outro worker os retoma
+    extraction_executor.shutdown(wait=True)
+    job_leases.stop()
+
+if __name__ == "__main__":
+    main()
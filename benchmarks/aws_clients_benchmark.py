@@ -0,0 +1,66 @@
+"""
+Benchmark dos clientes AWS: um cliente novo a cada chamada (como antes) contra
+o cliente compartilhado pelo processo.
+
+Mede a latência por chamada de uma operação leve no S3 (head_bucket) e no SES
+(list_verified_email_addresses), incluindo a criação do cliente quando ela
+acontece, e o tempo só de criação de um cliente.
+
+Uso (com o .env configurado e o LocalStack, ou a AWS, acessível):
+    python -m benchmarks.aws_clients_benchmark --calls 200
+"""
+import argparse
+import statistics
+import time
+import boto3
+from app.core.config import settings
+from app.repository.aws_client_repository import get_shared_client
+
+def new_client(service_name, endpoint_url):
+    # Equivalente ao get_s3_client/get_email_ses_client anteriores
+    return boto3.client(
+        service_name,
+        endpoint_url=endpoint_url,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_DEFAULT_REGION,
+    )
+
+OPERATIONS = [
+    ("s3", settings.AWS_S3_ENDPOINT, lambda client: client.head_bucket(Bucket=settings.AWS_S3_BUCKET_NAME)),
+    ("ses", settings.AWS_SES_ENDPOINT, lambda client: client.list_verified_email_addresses()),
+]
+
+def time_calls(calls, call):
+    durations = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        call()
+        durations.append((time.perf_counter() - started) * 1000)
+    durations.sort()
+    return statistics.mean(durations), durations[len(durations) // 2], durations[int(len(durations) * 0.95) - 1]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200, help="Chamadas por cenário")
+    args = parser.parse_args()
+
+    print(f"{'cenário':>26} | {'média (ms)':>10} | {'p50 (ms)':>8} | {'p95 (ms)':>8}")
+    for service_name, endpoint_url, operation in OPERATIONS:
+        # Aquece o cliente compartilhado e o carregamento dos modelos do botocore
+        operation(get_shared_client(service_name, endpoint_url))
+        scenarios = [
+            (f"{service_name} só criação", lambda: new_client(service_name, endpoint_url)),
+            (f"{service_name} cliente novo", lambda: operation(new_client(service_name, endpoint_url))),
+            (f"{service_name} compartilhado", lambda: operation(get_shared_client(service_name, endpoint_url))),
+        ]
+        for name, call in scenarios:
+            try:
+                mean, p50, p95 = time_calls(args.calls, call)
+            except Exception as e:
+                print(f"{name:>26} | falhou: {e}")
+                continue
+            print(f"{name:>26} | {mean:>10.2f} | {p50:>8.2f} | {p95:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark das engines de extração: ffmpeg (processo externo) e pyav (decodificação
+em processo com lotes de arrays NumPy).
+
+Gera um vídeo sintético com o ffmpeg e extrai os frames com cada engine para um
+.zip em memória, informando a vazão (frames/s) e o pico de memória. Cada engine
+roda em um processo separado para que o pico medido seja só dela, somando o
+próprio processo e os filhos (o ffmpeg, no caso da engine de CLI).
+
+Uso (com o .env configurado):
+    python -m benchmarks.extraction_engines_benchmark --duration 120 --size 1920x1080 --interval 1
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import time
+import zipfile
+from tempfile import TemporaryDirectory
+from app.domain.process_video_model import OutputOptions
+from app.service.extraction_engine import EXTRACTION_ENGINES, get_extraction_engine
+from benchmarks.extraction_modes_benchmark import generate_video
+
+def run_engine(name, video_path, interval, mode, output, results):
+    engine = get_extraction_engine(name)
+    with TemporaryDirectory() as work_dir:
+        started = time.perf_counter()
+        with zipfile.ZipFile(io.BytesIO(), "w") as archive:
+            engine.extract(video_path, work_dir, archive, interval, mode=mode, output=output)
+            frames = len(archive.namelist())
+        elapsed = time.perf_counter() - started
+
+    # ru_maxrss é informado em KB no Linux
+    peak_kb = (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    results.put((elapsed, frames, peak_kb / 1024))
+
+def time_engine(name, video_path, interval, mode, output):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=run_engine, args=(name, video_path, interval, mode, output, results))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"processo terminou com código {process.exitcode}")
+    return results.get()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=int, default=120, help="Duração do vídeo sintético (s)")
+    parser.add_argument("--size", default="1920x1080", help="Resolução do vídeo sintético")
+    parser.add_argument("--interval", type=int, default=1, help="Intervalo entre frames (s)")
+    parser.add_argument("--modes", default="select,keyframes,seek", help="Modos de extração testados")
+    parser.add_argument("--max-width", type=int, default=None, help="Largura máxima dos frames")
+    args = parser.parse_args()
+
+    output = OutputOptions(max_width=args.max_width)
+    with TemporaryDirectory() as temp_dir:
+        video_path = os.path.join(temp_dir, "bench.mp4")
+        print(f"Gerando vídeo de {args.duration}s em {args.size}...")
+        generate_video(video_path, args.duration, 2.0, size=args.size)
+
+        print(f"{'engine':>8} | {'modo':>9} | {'frames':>6} | {'tempo (s)':>9} | {'frames/s':>8} | {'pico (MB)':>9}")
+        for mode in args.modes.split(","):
+            for name in EXTRACTION_ENGINES:
+                try:
+                    elapsed, frames, peak_mb = time_engine(name, video_path, args.interval, mode, output)
+                except Exception as e:
+                    print(f"{name:>8} | {mode:>9} | falhou: {e}")
+                    continue
+                print(
+                    f"{name:>8} | {mode:>9} | {frames:>6} | {elapsed:>9.2f} | "
+                    f"{frames / elapsed:>8.1f} | {peak_mb:>9.1f}"
+                )
+
+if __name__ == "__main__":
+    main()
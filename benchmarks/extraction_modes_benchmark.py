@@ -0,0 +1,72 @@
+"""
+Benchmark dos modos de extração 'select' (decodifica tudo), 'seek' (busca por timestamp)
+e 'keyframes' (decodifica só keyframes).
+
+Gera um vídeo sintético com o ffmpeg e mede o tempo de cada modo para vários intervalos,
+indicando a partir de qual intervalo o seek passa a ser mais rápido.
+
+Uso (com o .env configurado):
+    python -m benchmarks.extraction_modes_benchmark --duration 600 --gop 2
+"""
+import argparse
+import os
+import time
+from tempfile import TemporaryDirectory
+import ffmpeg
+from app.service.frame_processor_service import (
+    compute_timestamps, extract_frames_by_select, extract_frames_by_seek, extract_frames_by_keyframes
+)
+
+def generate_video(path, duration, gop_seconds, fps=30, size="1280x720"):
+    (
+        ffmpeg
+        .input(f"testsrc2=size={size}:rate={fps}", f="lavfi", t=duration)
+        .output(path, vcodec="libx264", pix_fmt="yuv420p", g=int(gop_seconds * fps), preset="veryfast")
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+
+def time_mode(video_path, interval, duration, mode):
+    with TemporaryDirectory() as frames_dir:
+        started = time.perf_counter()
+        if mode == "select":
+            extract_frames_by_select(video_path, interval, frames_dir)
+        elif mode == "keyframes":
+            extract_frames_by_keyframes(video_path, interval, frames_dir)
+        else:
+            extract_frames_by_seek(video_path, compute_timestamps(duration, interval), frames_dir)
+        elapsed = time.perf_counter() - started
+        return elapsed, len(os.listdir(frames_dir))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=int, default=600, help="Duração do vídeo sintético (s)")
+    parser.add_argument("--gop", type=float, default=2.0, help="Intervalo entre keyframes (s)")
+    parser.add_argument("--intervals", default="1,2,5,10,30,60", help="Intervalos testados (s)")
+    args = parser.parse_args()
+
+    intervals = [int(value) for value in args.intervals.split(",")]
+
+    with TemporaryDirectory() as temp_dir:
+        video_path = os.path.join(temp_dir, "bench.mp4")
+        print(f"Gerando vídeo de {args.duration}s com GOP de {args.gop}s...")
+        generate_video(video_path, args.duration, args.gop)
+
+        print(f"{'intervalo':>9} | {'frames':>6} | {'select (s)':>10} | {'seek (s)':>8} | {'keyframes (s)':>13} | melhor exato")
+        crossover = None
+        for interval in intervals:
+            select_time, frames = time_mode(video_path, interval, args.duration, "select")
+            seek_time, _ = time_mode(video_path, interval, args.duration, "seek")
+            keyframes_time, _ = time_mode(video_path, interval, args.duration, "keyframes")
+            best = "seek" if seek_time < select_time else "select"
+            if best == "seek" and crossover is None:
+                crossover = interval
+            print(f"{interval:>9} | {frames:>6} | {select_time:>10.2f} | {seek_time:>8.2f} | {keyframes_time:>13.2f} | {best}")
+
+        if crossover is None:
+            print("O modo seek não foi mais rápido em nenhum intervalo testado.")
+        else:
+            print(f"Ponto de virada: intervalo >= {crossover}s ({crossover / args.gop:g} GOPs).")
+
+if __name__ == "__main__":
+    main()
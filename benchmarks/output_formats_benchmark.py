@@ -0,0 +1,68 @@
+"""
+Benchmark das opções de saída: formato (jpg/webp/png), resolução máxima e tons de cinza.
+
+Gera um vídeo sintético com o ffmpeg e extrai os frames de cada configuração para um
+.zip em memória, informando a vazão (frames/s) e o tamanho médio por frame.
+
+Uso (com o .env configurado):
+    python -m benchmarks.output_formats_benchmark --duration 120 --size 3840x2160
+"""
+import argparse
+import io
+import os
+import time
+import zipfile
+from tempfile import TemporaryDirectory
+from app.domain.process_video_model import OutputOptions
+from app.service.frame_processor_service import extract_frames
+from benchmarks.extraction_modes_benchmark import generate_video
+
+CONFIGURATIONS = [
+    ("jpg", OutputOptions(format="jpg")),
+    ("jpg q50", OutputOptions(format="jpg", quality=50)),
+    ("jpg 1280px", OutputOptions(format="jpg", max_width=1280)),
+    ("jpg 640px cinza", OutputOptions(format="jpg", max_width=640, grayscale=True)),
+    ("webp", OutputOptions(format="webp")),
+    ("webp 1280px", OutputOptions(format="webp", max_width=1280)),
+    ("png", OutputOptions(format="png")),
+    ("png 1280px", OutputOptions(format="png", max_width=1280)),
+]
+
+def time_output(video_path, interval, output):
+    buffer = io.BytesIO()
+    with TemporaryDirectory() as work_dir:
+        started = time.perf_counter()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            extract_frames(video_path, work_dir, archive, interval, mode="select", output=output)
+            frames = len(archive.namelist())
+            frame_bytes = sum(info.file_size for info in archive.infolist())
+        elapsed = time.perf_counter() - started
+    return elapsed, frames, frame_bytes, buffer.tell()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=int, default=120, help="Duração do vídeo sintético (s)")
+    parser.add_argument("--size", default="3840x2160", help="Resolução do vídeo sintético")
+    parser.add_argument("--interval", type=int, default=1, help="Intervalo entre frames (s)")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as temp_dir:
+        video_path = os.path.join(temp_dir, "bench.mp4")
+        print(f"Gerando vídeo de {args.duration}s em {args.size}...")
+        generate_video(video_path, args.duration, 2.0, size=args.size)
+
+        print(f"{'saída':>16} | {'frames':>6} | {'tempo (s)':>9} | {'frames/s':>8} | {'KB/frame':>8} | {'.zip (MB)':>9}")
+        for name, output in CONFIGURATIONS:
+            try:
+                elapsed, frames, frame_bytes, archive_bytes = time_output(video_path, args.interval, output)
+            except Exception as e:
+                print(f"{name:>16} | falhou: {e}")
+                continue
+            per_frame = frame_bytes / frames / 1024 if frames else 0
+            print(
+                f"{name:>16} | {frames:>6} | {elapsed:>9.2f} | {frames / elapsed:>8.1f} | "
+                f"{per_frame:>8.1f} | {archive_bytes / 1024 / 1024:>9.1f}"
+            )
+
+if __name__ == "__main__":
+    main()